@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaccion, DetallePago, CierreCaja, HistorialModificacion, AlertaStock
+from .models import Transaccion, DetallePago, CierreCaja, HistorialModificacion, AlertaStock, FacturaAnulada, SecuenciaFactura
 
 
 @admin.register(Transaccion)
@@ -190,3 +190,32 @@ class AlertaStockAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(SecuenciaFactura)
+class SecuenciaFacturaAdmin(admin.ModelAdmin):
+    """Contador diario de facturas (solo lectura: lo avanzan los bloques reservados)"""
+
+    list_display = ['fecha', 'ultimo_numero', 'auditada']
+    readonly_fields = ['fecha', 'ultimo_numero', 'auditada']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(FacturaAnulada)
+class FacturaAnuladaAdmin(admin.ModelAdmin):
+    """Números de factura reservados que no llegaron a usarse (auditoría fiscal)"""
+
+    list_display = ['fecha', 'numero', 'motivo', 'fecha_registro']
+    list_filter = ['motivo', 'fecha']
+    readonly_fields = ['fecha', 'numero', 'motivo', 'fecha_registro']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
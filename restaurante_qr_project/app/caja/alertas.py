@@ -0,0 +1,162 @@
+"""
+Escáner de alertas de stock basado en conjuntos.
+
+En lugar de revisar producto por producto (un .exists() y un create() por
+fila), cada escaneo hace un número fijo de consultas sin importar el tamaño
+del catálogo:
+
+1. Alertas activas junto con el stock actual de su producto/insumo
+2. Productos en stock crítico SIN alerta activa (anti-join con NOT EXISTS)
+3. Insumos en stock crítico SIN alerta activa (anti-join con NOT EXISTS)
+4. Un bulk_create con las alertas nuevas
+5. Un bulk_update con las alertas resueltas o que cambiaron de tipo
+
+Stock crítico = stock_actual <= stock_minimo ('agotado' si no queda stock,
+'stock_bajo' en otro caso). Una alerta activa cuyo producto/insumo ya se
+repuso (o dejó de llevar inventario) se marca como resuelta.
+
+El escaneo se ejecuta desde el comando escanear_alertas_stock (cron) o al
+confirmar una transacción que movió stock (programar_escaneo_alertas).
+"""
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+logger = logging.getLogger('app.caja')
+
+# Clave del advisory lock de PostgreSQL que serializa los escaneos concurrentes
+LOCK_ESCANEO = 7_301_016
+OBSERVACION_AUTOMATICA = 'Stock repuesto (resuelta automáticamente)'
+
+
+def tipo_alerta(stock_actual):
+    """Tipo de alerta que corresponde a un stock crítico"""
+    return 'agotado' if stock_actual <= 0 else 'stock_bajo'
+
+
+def _bloquear_escaneo():
+    """Evita que dos escaneos simultáneos creen alertas duplicadas"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_ESCANEO])
+
+
+def _estado_actual(alerta):
+    """
+    Stock vigente del producto/insumo de una alerta activa.
+
+    Returns:
+        int | None: Stock actual si sigue en estado crítico, None si ya no
+    """
+    if alerta.producto_id:
+        producto = alerta.producto
+        critico = producto.requiere_inventario and producto.activo and producto.stock_actual <= producto.stock_minimo
+        return producto.stock_actual if critico else None
+    insumo = alerta.insumo
+    critico = insumo.activo and insumo.stock_actual <= insumo.stock_minimo
+    return insumo.stock_actual if critico else None
+
+
+@transaction.atomic
+def escanear_alertas_stock():
+    """
+    Sincroniza AlertaStock con el stock actual de productos e insumos.
+
+    Returns:
+        dict: {'creadas': [AlertaStock], 'resueltas': int, 'actualizadas': int}
+    """
+    from app.inventario.models import Insumo
+    from app.productos.models import Producto
+    from .models import AlertaStock
+
+    _bloquear_escaneo()
+    ahora = timezone.now()
+    activas = AlertaStock.objects.filter(estado='activa')
+
+    # 1) Alertas activas con el estado de su producto/insumo (una consulta)
+    vigentes = (
+        activas
+        .filter(Q(producto__isnull=False) | Q(insumo__isnull=False))
+        .select_related('producto', 'insumo')
+        .order_by()
+        .only(
+            'id', 'estado', 'tipo_alerta', 'stock_actual', 'producto', 'insumo',
+            'producto__stock_actual', 'producto__stock_minimo',
+            'producto__requiere_inventario', 'producto__activo',
+            'insumo__stock_actual', 'insumo__stock_minimo', 'insumo__activo',
+        )
+    )
+    modificadas = []
+    resueltas = 0
+    for alerta in vigentes:
+        stock = _estado_actual(alerta)
+        if stock is None:
+            alerta.estado = 'resuelta'
+            alerta.fecha_resolucion = ahora
+            alerta.observaciones = OBSERVACION_AUTOMATICA
+            modificadas.append(alerta)
+            resueltas += 1
+        elif alerta.tipo_alerta != tipo_alerta(stock):
+            # Pasó de stock bajo a agotado (o al revés): misma alerta, nuevo tipo
+            alerta.tipo_alerta = tipo_alerta(stock)
+            alerta.stock_actual = stock
+            modificadas.append(alerta)
+
+    # 2) y 3) Stock crítico sin alerta activa (anti-join)
+    productos = (
+        Producto.objects
+        .filter(requiere_inventario=True, activo=True, stock_actual__lte=F('stock_minimo'))
+        .filter(~Exists(activas.filter(producto=OuterRef('pk'))))
+        .values_list('id', 'nombre', 'stock_actual')
+    )
+    insumos = (
+        Insumo.objects
+        .filter(activo=True, stock_actual__lte=F('stock_minimo'))
+        .filter(~Exists(activas.filter(insumo=OuterRef('pk'))))
+        .order_by()
+        .values_list('id', 'nombre', 'stock_actual')
+    )
+    nuevas = [
+        AlertaStock(producto_id=pk, producto_nombre=nombre[:100], tipo_alerta=tipo_alerta(stock), stock_actual=stock)
+        for pk, nombre, stock in productos
+    ] + [
+        AlertaStock(insumo_id=pk, producto_nombre=nombre[:100], tipo_alerta=tipo_alerta(stock), stock_actual=stock)
+        for pk, nombre, stock in insumos
+    ]
+
+    # 4) y 5) Escritura en lote
+    creadas = AlertaStock.objects.bulk_create(nuevas) if nuevas else []
+    if modificadas:
+        AlertaStock.objects.bulk_update(
+            modificadas, ['estado', 'tipo_alerta', 'stock_actual', 'fecha_resolucion', 'observaciones']
+        )
+
+    if creadas or modificadas:
+        logger.info(
+            f"Alertas de stock: {len(creadas)} nuevas, {resueltas} resueltas, "
+            f"{len(modificadas) - resueltas} actualizadas"
+        )
+
+    return {
+        'creadas': creadas,
+        'resueltas': resueltas,
+        'actualizadas': len(modificadas) - resueltas,
+    }
+
+
+def _escanear_seguro():
+    try:
+        escanear_alertas_stock()
+    except Exception as e:
+        logger.warning(f"Error al escanear alertas de stock: {e}")
+
+
+def programar_escaneo_alertas():
+    """
+    Escanea las alertas al confirmar la transacción actual (inmediato si no
+    hay transacción abierta). Un error en el escaneo nunca afecta al cambio
+    de stock que lo disparó.
+    """
+    transaction.on_commit(_escanear_seguro)
@@ -5,30 +5,27 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Sum
-from django.core.cache import cache
 from decimal import Decimal
 from datetime import date, datetime
 import logging
 
 logger = logging.getLogger('app.caja')
 
-from app.pedidos.models import Pedido, DetallePedido
+from app.pedidos.models import Pedido, DetallePedido, EventoCocina
+from app.pedidos.eventos import publicar_evento_cocina
+from app.pedidos.versionado import cursor_actual, parse_since, etag_cursor, no_modificado
 from app.mesas.models import Mesa
 from app.mesas.utils import liberar_mesa
 from app.productos.models import Producto
-from .models import Transaccion, DetallePago, CierreCaja, HistorialModificacion, AlertaStock, JornadaLaboral
+from app.configuracion.idempotencia import idempotente
+from .mapa_mesas import obtener_mapa_mesas
+from .pagos import PagoRechazado, procesar_pago_mixto, procesar_pago_simple
+from .models import CierreCaja, HistorialModificacion, AlertaStock, JornadaLaboral
 from .utils import (
-    generar_numero_factura,
-    calcular_cambio,
-    validar_stock_pedido,
     descontar_stock_pedido,
-    calcular_totales_caja,
     crear_historial_modificacion,
-    verificar_alertas_stock,
     aplicar_descuento_porcentaje,
     aplicar_propina,
-    calcular_total_con_descuento_propina,
     obtener_estadisticas_caja_dia
 )
 
@@ -240,10 +237,15 @@ def api_detalle_pedido(request, pedido_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotente
 @transaction.atomic
 def api_procesar_pago_simple(request):
     """
     Procesa un pago simple con un solo método de pago
+
+    ✅ OPTIMIZADO: Motor de pagos (app.caja.pagos): fila del pedido bloqueada,
+    montos en Decimal y saldo actualizado con F() (sin pagos perdidos entre
+    cajeros concurrentes).
     """
     try:
         pedido_id = request.data.get('pedido_id')
@@ -260,123 +262,52 @@ def api_procesar_pago_simple(request):
                 'error': 'Faltan datos requeridos'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Obtener pedido
-        pedido = get_object_or_404(Pedido, id=pedido_id)
-
-        # Verificar que no esté pagado
-        if pedido.estado_pago == 'pagado':
+        try:
+            pago = procesar_pago_simple(pedido_id, request.user, metodo_pago, monto_recibido, referencia)
+        except Pedido.DoesNotExist:
             return Response({
                 'success': False,
-                'error': 'Este pedido ya ha sido pagado'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Validar stock
-        es_valido, productos_sin_stock = validar_stock_pedido(pedido)
-        if not es_valido:
+                'error': 'Pedido no encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except PagoRechazado as e:
             return Response({
                 'success': False,
-                'error': 'Productos sin stock suficiente',
-                'productos_sin_stock': productos_sin_stock
+                'error': e.messages[0],
+                **e.extra
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calcular total final del pedido
-        total_final_pedido = calcular_total_con_descuento_propina(pedido)
-        pedido.total_final = total_final_pedido
-
-        # ✅ CORREGIDO: Convertir a float para evitar conflictos Decimal/float
-        total_final_pedido = float(total_final_pedido)
-
-        # ✅ NUEVO: Determinar monto de este pago (puede ser parcial)
-        # Si monto_recibido es menor al total pendiente, es un pago parcial
-        monto_pagado_anterior = float(pedido.monto_pagado or 0)
-        monto_pendiente = total_final_pedido - monto_pagado_anterior
-
-        # El monto de esta transacción es lo que se está pagando AHORA
-        monto_esta_transaccion = float(monto_recibido) if monto_recibido else total_final_pedido
-
-        # Calcular cambio (si es efectivo)
-        cambio = 0
-        if metodo_pago == 'efectivo' and monto_recibido:
-            cambio = calcular_cambio(monto_pendiente, monto_recibido)
-
-        # Crear transacción por el monto pagado en esta operación
-        numero_factura = generar_numero_factura()
-        transaccion = Transaccion.objects.create(
-            pedido=pedido,
-            cajero=request.user,
-            monto_total=monto_esta_transaccion,
-            metodo_pago=metodo_pago,
-            estado='procesado',
-            numero_factura=numero_factura,
-            referencia=referencia
-        )
-
-        # ✅ NUEVO: Actualizar monto pagado acumulado
-        nuevo_monto_pagado = monto_pagado_anterior + monto_esta_transaccion
-        pedido.monto_pagado = nuevo_monto_pagado
-
-        # ✅ RONDA 3C: Actualizar total_pagado para reembolsos
-        pedido.total_pagado = (pedido.total_pagado or Decimal("0.00")) + monto_esta_transaccion
-
-        # ✅ NUEVO: Determinar si el pedido está completamente pagado
-        pago_completo = nuevo_monto_pagado >= total_final_pedido
+        pedido = pago['pedido']
+        numero_factura = pago['numero_factura']
+        total_final_pedido = pago['total_pedido']
+        nuevo_monto_pagado = pago['monto_total_pagado']
 
-        if pago_completo:
-            # Pago completo: marcar como pagado y liberar mesa
-            pedido.estado_pago = 'pagado'
-            pedido.fecha_pago = timezone.now()
-            pedido.cajero_responsable = request.user
-            pedido.forma_pago = metodo_pago
-
-            # ✅ PATCH-002: Cerrar pedido al completar pago - BLOQUEAR si falla
-            from app.pedidos.utils import validar_transicion_estado
-            from app.pedidos.models import Pedido
-            try:
-                validar_transicion_estado(pedido.estado, Pedido.ESTADO_CERRADO)
-                pedido.estado = Pedido.ESTADO_CERRADO
-                logger.info(f"Pedido #{pedido.id} cerrado automáticamente al completar pago")
-            except ValueError as e:
-                logger.error(f"No se pudo cerrar pedido #{pedido.id}: {e}")
-                return Response({
-                    'error': f'No se puede completar el pago: {str(e)}'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Descontar stock solo cuando se paga completo
+        if pago['pago_completo']:
+            # Descontar stock y liberar mesa solo cuando se paga completo
             descontar_stock_pedido(pedido)
-
-            # Liberar mesa solo cuando se paga completo
             if pedido.mesa:
                 liberar_mesa(pedido.mesa)
                 logger.info(f"Mesa {pedido.mesa.numero} liberada después del pago completo")
-        else:
-            # Pago parcial: mantener como pendiente pero actualizar monto
-            logger.info(f"Pago parcial - Pagado: Bs/ {nuevo_monto_pagado:.2f} de Bs/ {total_final_pedido:.2f}")
-
-        pedido.save()
-
-        # Verificar alertas de stock
-        verificar_alertas_stock()
 
         # ✅ NUEVO: Mensaje según tipo de pago
-        if pago_completo:
+        if pago['pago_completo']:
             mensaje = f'Pago procesado exitosamente - Factura: {numero_factura}'
             logger.info(f"Pago COMPLETO - Factura: {numero_factura}, Total: Bs/ {total_final_pedido:.2f}")
         else:
-            monto_restante = total_final_pedido - nuevo_monto_pagado
+            monto_restante = pago['monto_pendiente']
             mensaje = f'Pago parcial registrado. Pagado: Bs/ {nuevo_monto_pagado:.2f}, Resta: Bs/ {monto_restante:.2f}'
             logger.info(f"Pago PARCIAL - Pagado: Bs/ {nuevo_monto_pagado:.2f}, Resta: Bs/ {monto_restante:.2f}")
 
         return Response({
             'success': True,
             'message': mensaje,
-            'pago_completo': pago_completo,
-            'transaccion_id': transaccion.id,
+            'pago_completo': pago['pago_completo'],
+            'transaccion_id': pago['transaccion'].id,
             'numero_factura': numero_factura,
-            'monto_esta_transaccion': float(monto_esta_transaccion),
+            'monto_esta_transaccion': float(pago['monto_esta_transaccion']),
             'monto_total_pagado': float(nuevo_monto_pagado),
-            'monto_pendiente': float(total_final_pedido - nuevo_monto_pagado),
+            'monto_pendiente': float(pago['monto_pendiente']),
             'total_pedido': float(total_final_pedido),
-            'cambio': float(cambio) if cambio > 0 else 0,
+            'cambio': float(pago['cambio']),
             'metodo_pago': metodo_pago
         })
 
@@ -391,10 +322,14 @@ def api_procesar_pago_simple(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotente
 @transaction.atomic
 def api_procesar_pago_mixto(request):
     """
     Procesa un pago mixto con múltiples métodos de pago
+
+    ✅ OPTIMIZADO: Motor de pagos (app.caja.pagos); la transacción y sus
+    detalles se crean en lote.
     """
     try:
         pedido_id = request.data.get('pedido_id')
@@ -409,81 +344,21 @@ def api_procesar_pago_mixto(request):
                 'error': 'Faltan datos requeridos'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Obtener pedido
-        pedido = get_object_or_404(Pedido, id=pedido_id)
-
-        # Verificar que no esté pagado
-        if pedido.estado_pago == 'pagado':
+        try:
+            pago = procesar_pago_mixto(pedido_id, request.user, detalles_pago)
+        except Pedido.DoesNotExist:
             return Response({
                 'success': False,
-                'error': 'Este pedido ya ha sido pagado'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Calcular total final
-        total_final = calcular_total_con_descuento_propina(pedido)
-        pedido.total_final = total_final
-
-        # Validar que la suma de pagos coincida con el total
-        suma_pagos = sum(Decimal(str(d.get('monto', 0))) for d in detalles_pago)
-        if suma_pagos != total_final:
+                'error': 'Pedido no encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except PagoRechazado as e:
             return Response({
                 'success': False,
-                'error': f'La suma de pagos (Bs/ {suma_pagos}) no coincide con el total (Bs/ {total_final})'
+                'error': e.messages[0],
+                **e.extra
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Validar stock
-        es_valido, productos_sin_stock = validar_stock_pedido(pedido)
-        if not es_valido:
-            return Response({
-                'success': False,
-                'error': 'Productos sin stock suficiente',
-                'productos_sin_stock': productos_sin_stock
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Crear transacción principal
-        numero_factura = generar_numero_factura()
-        transaccion = Transaccion.objects.create(
-            pedido=pedido,
-            cajero=request.user,
-            monto_total=total_final,
-            metodo_pago='mixto',
-            estado='procesado',
-            numero_factura=numero_factura
-        )
-
-        # Crear detalles de pago
-        for detalle in detalles_pago:
-            DetallePago.objects.create(
-                transaccion=transaccion,
-                metodo_pago=detalle.get('metodo'),
-                monto=Decimal(str(detalle.get('monto'))),
-                referencia=detalle.get('referencia', '')
-            )
-
-        # Actualizar pedido
-        pedido.estado_pago = 'pagado'
-        pedido.fecha_pago = timezone.now()
-        pedido.cajero_responsable = request.user
-        pedido.monto_pagado = total_final
-        pedido.forma_pago = 'mixto'
-
-        # ✅ RONDA 3C: Actualizar total_pagado para reembolsos
-        pedido.total_pagado = (pedido.total_pagado or Decimal("0.00")) + total_final
-
-        # ✅ PATCH-002: Cerrar pedido al completar pago mixto - BLOQUEAR si falla
-        from app.pedidos.utils import validar_transicion_estado
-        from app.pedidos.models import Pedido
-        try:
-            validar_transicion_estado(pedido.estado, Pedido.ESTADO_CERRADO)
-            pedido.estado = Pedido.ESTADO_CERRADO
-            logger.info(f"Pedido #{pedido.id} cerrado automáticamente al completar pago mixto")
-        except ValueError as e:
-            logger.error(f"No se pudo cerrar pedido #{pedido.id}: {e}")
-            return Response({
-                'error': f'No se puede completar el pago mixto: {str(e)}'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        pedido.save()
+        pedido = pago['pedido']
 
         # Descontar stock
         descontar_stock_pedido(pedido)
@@ -493,22 +368,20 @@ def api_procesar_pago_mixto(request):
             liberar_mesa(pedido.mesa)
             logger.info(f"Mesa {pedido.mesa.numero} liberada después del pago")
 
-        # Verificar alertas de stock
-        verificar_alertas_stock()
-
-        logger.debug(f"Pago mixto procesado - Factura: {numero_factura}")
+        logger.debug(f"Pago mixto procesado - Factura: {pago['numero_factura']}")
 
         return Response({
             'success': True,
             'message': 'Pago mixto procesado exitosamente',
-            'transaccion_id': transaccion.id,
-            'numero_factura': numero_factura,
-            'total_pagado': float(total_final),
+            'transaccion_id': pago['transaccion'].id,
+            'numero_factura': pago['numero_factura'],
+            'total_pagado': float(pago['monto_total_pagado']),
+            'monto_pendiente': float(pago['monto_pendiente']),
             'detalles_pago': [
                 {
-                    'metodo': d.get('metodo'),
-                    'monto': float(d.get('monto'))
-                } for d in detalles_pago
+                    'metodo': metodo,
+                    'monto': float(monto)
+                } for metodo, monto in pago['detalles']
             ]
         })
 
@@ -695,11 +568,10 @@ def api_agregar_producto_pedido(request):
             subtotal=subtotal
         )
 
-        # Recalcular total del pedido
-        pedido.total = pedido.detalles.aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-        pedido.total_final = calcular_total_con_descuento_propina(pedido)
+        # ✅ OPTIMIZADO: El detalle ya aplicó su delta a total/total_final (ver pedidos/totales.py)
         pedido.modificado = True
-        pedido.save()
+        pedido.save(update_fields=['modificado'])
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
         # Guardar estado nuevo
         detalles_nuevos = list(pedido.detalles.all().values('producto__nombre', 'cantidad'))
@@ -760,7 +632,7 @@ def api_eliminar_producto_pedido(request, detalle_id):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         # Verificar que el pedido tenga más de un producto
-        if pedido.detalles.count() <= 1:
+        if pedido.cantidad_lineas <= 1:
             return Response({
                 'success': False,
                 'error': 'No se puede eliminar el único producto del pedido'
@@ -776,11 +648,10 @@ def api_eliminar_producto_pedido(request, detalle_id):
         # Eliminar detalle
         detalle.delete()
 
-        # Recalcular total
-        pedido.total = pedido.detalles.aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-        pedido.total_final = calcular_total_con_descuento_propina(pedido)
+        # ✅ OPTIMIZADO: El detalle ya aplicó su delta a total/total_final (ver pedidos/totales.py)
         pedido.modificado = True
-        pedido.save()
+        pedido.save(update_fields=['modificado'])
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
         detalles_nuevos = list(pedido.detalles.all().values('producto__nombre', 'cantidad'))
 
@@ -858,11 +729,10 @@ def api_modificar_cantidad_producto(request, detalle_id):
         detalle.subtotal = producto.precio * nueva_cantidad
         detalle.save()
 
-        # Recalcular total
-        pedido.total = pedido.detalles.aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-        pedido.total_final = calcular_total_con_descuento_propina(pedido)
+        # ✅ OPTIMIZADO: El detalle ya aplicó su delta a total/total_final (ver pedidos/totales.py)
         pedido.modificado = True
-        pedido.save()
+        pedido.save(update_fields=['modificado'])
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
         detalles_nuevos = list(pedido.detalles.all().values('producto__nombre', 'cantidad'))
 
@@ -943,6 +813,7 @@ def api_reasignar_pedido_mesa(request):
         pedido.mesa = nueva_mesa
         pedido.reasignado = True
         pedido.save()
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
         # Ocupar nueva mesa
         nueva_mesa.estado = 'ocupada'
@@ -1054,8 +925,8 @@ def api_cerrar_caja(request):
                 'error': 'Debe especificar el efectivo real contado'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Obtener turno abierto
-        turno = CierreCaja.objects.filter(
+        # Obtener turno abierto (bloqueado: ningún pago suma mientras se cierra)
+        turno = CierreCaja.objects.select_for_update().filter(
             cajero=request.user,
             estado='abierto',
             fecha=date.today()
@@ -1067,38 +938,8 @@ def api_cerrar_caja(request):
                 'error': 'No tienes un turno abierto para cerrar'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Obtener transacciones del turno
-        transacciones = Transaccion.objects.filter(
-            cajero=request.user,
-            fecha_hora__date=date.today(),
-            fecha_hora__gte=turno.hora_apertura,
-            estado='procesado'
-        )
-
-        # Calcular totales por método
-        totales = calcular_totales_caja(transacciones)
-
-        # Obtener pedidos del turno
-        pedidos = Pedido.objects.filter(
-            cajero_responsable=request.user,
-            fecha_pago__date=date.today(),
-            fecha_pago__gte=turno.hora_apertura
-        )
-
-        # Calcular descuentos y propinas
-        total_descuentos = pedidos.aggregate(Sum('descuento'))['descuento__sum'] or Decimal('0')
-        total_propinas = pedidos.aggregate(Sum('propina'))['propina__sum'] or Decimal('0')
-
-        # Actualizar datos del cierre
-        turno.total_efectivo = totales['efectivo']
-        turno.total_tarjeta = totales['tarjeta']
-        turno.total_qr = totales['qr']
-        turno.total_movil = totales['movil']
-        turno.total_ventas = totales['total']
-        turno.efectivo_esperado = turno.efectivo_inicial + totales['efectivo']
-        turno.total_descuentos = total_descuentos
-        turno.total_propinas = total_propinas
-        turno.numero_pedidos = pedidos.count()
+        # ✅ OPTIMIZADO: Totales, descuentos, propinas y conteos ya están en
+        # la fila del turno (contadores en vivo, ver contadores.py)
 
         # Cerrar caja
         turno.cerrar_caja(
@@ -1127,6 +968,8 @@ def api_cerrar_caja(request):
                 'total_descuentos': float(turno.total_descuentos),
                 'total_propinas': float(turno.total_propinas),
                 'numero_pedidos': turno.numero_pedidos,
+                'numero_transacciones': turno.numero_transacciones,
+                'total_reembolsos': float(turno.total_reembolsos),
                 'hora_cierre': turno.hora_cierre.isoformat()
             }
         })
@@ -1149,65 +992,24 @@ def api_mapa_mesas(request):
     """
     Obtiene el estado de todas las mesas para el mapa digital
     ✅ ACTUALIZADO: Muestra TODOS los productos de cada mesa
+    ✅ NUEVO: ?since=<cursor> devuelve solo mesas cambiadas; 304 si nada cambió
+    ✅ OPTIMIZADO: Consultas constantes sin importar el número de mesas (ver mapa_mesas.py)
     """
     try:
-        # Obtener TODAS las mesas
-        mesas = Mesa.objects.all().order_by('numero')
-
-        mesas_data = []
-        for mesa in mesas:
-            # Buscar pedidos activos
-            pedidos_activos = Pedido.objects.filter(
-                mesa=mesa,
-                estado_pago='pendiente'
-            ).exclude(estado='cancelado').prefetch_related('detalles__producto')
-
-            # ✅ CORREGIDO: Calcular total pendiente considerando pagos parciales
-            # Convertir todo a float para evitar conflictos entre Decimal y float
-            total_pendiente = sum(
-                float(p.total_final if p.total_final > 0 else p.total) - float(p.monto_pagado or 0)
-                for p in pedidos_activos
-            )
+        cursor = cursor_actual()
+        etag = etag_cursor(cursor)
+        if no_modificado(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
 
-            # Obtener TODOS los productos de esta mesa
-            productos_mesa = []
-            for pedido in pedidos_activos:
-                for detalle in pedido.detalles.all():
-                    productos_mesa.append({
-                        'nombre': detalle.producto.nombre,
-                        'cantidad': detalle.cantidad,
-                        'precio_unitario': float(detalle.precio_unitario),
-                        'subtotal': float(detalle.subtotal)
-                    })
-
-            # Determinar color según estado
-            if pedidos_activos.exists():
-                if mesa.estado == 'pagando':
-                    color = 'azul'  # En proceso de pago
-                else:
-                    color = 'rojo'  # Ocupada
-            elif mesa.estado == 'reservada':
-                color = 'amarillo'  # Reservada
-            else:
-                color = 'verde'  # Disponible
-
-            mesas_data.append({
-                'id': mesa.id,
-                'numero': mesa.numero,
-                'estado': mesa.estado,
-                'capacidad': mesa.capacidad,
-                'color': color,
-                'pedidos_activos': pedidos_activos.count(),
-                'total_pendiente': float(total_pendiente),
-                'productos': productos_mesa,  # ✅ NUEVO: Lista de todos los productos
-                'posicion_x': mesa.posicion_x,
-                'posicion_y': mesa.posicion_y
-            })
+        since = parse_since(request)
+        mesas_data = obtener_mapa_mesas(cursor, since)
 
         return Response({
             'success': True,
-            'mesas': mesas_data
-        })
+            'mesas': mesas_data,
+            'cursor': cursor,
+            'delta': since is not None
+        }, headers={'ETag': etag})
 
     except Exception as e:
         logger.exception("Error en api_mapa_mesas")
@@ -1308,7 +1110,7 @@ def api_resolver_alerta_stock(request, alerta_id):
 
         return Response({
             'success': True,
-            'message': f'Alerta resuelta: {alerta.producto.nombre}'
+            'message': f'Alerta resuelta: {alerta.producto.nombre if alerta.producto else alerta.producto_nombre}'
         })
 
     except Exception as e:
@@ -1423,8 +1225,16 @@ def api_pedidos_kanban(request):
     """
     Obtiene pedidos agrupados por estado para el tablero Kanban
     Estados: pedido, preparando, listo, entregado
+    ✅ NUEVO: ?since=<cursor> devuelve solo pedidos cambiados (+ 'removidos'); 304 si nada cambió
     """
     try:
+        cursor = cursor_actual()
+        etag = etag_cursor(cursor)
+        if no_modificado(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        since = parse_since(request)
+
         # Mapeo de estados del modelo a estados del Kanban (usando constantes válidas)
         mapeo_estados = {
             Pedido.ESTADO_CREADO: 'pedido',
@@ -1451,6 +1261,10 @@ def api_pedidos_kanban(request):
             'detalles__producto__categoria'
         ).order_by('fecha')
 
+        if since is not None:
+            pedidos = pedidos.filter(version__gt=since)
+            cambiados = set(Pedido.objects.filter(version__gt=since).values_list('id', flat=True))
+
         for pedido in pedidos:
             # Mapear estado del modelo al estado del Kanban
             estado_modelo = pedido.estado
@@ -1505,13 +1319,22 @@ def api_pedidos_kanban(request):
                 'alerta_20min': tiempo_minutos >= 20  # ✅ Alerta si pasa 20 minutos
             })
 
+        removidos = []
+        if since is not None:
+            # Pedidos que cambiaron y salieron del tablero (pagados o cancelados)
+            incluidos = {p['id'] for columna in resultado.values() for p in columna}
+            removidos = sorted(cambiados - incluidos)
+
         return Response({
             'success': True,
             'pedido': resultado['pedido'],
             'preparando': resultado['preparando'],
             'listo': resultado['listo'],
-            'entregado': resultado['entregado']
-        })
+            'entregado': resultado['entregado'],
+            'cursor': cursor,
+            'delta': since is not None,
+            'removidos': removidos
+        }, headers={'ETag': etag})
 
     except Exception as e:
         logger.exception("Error en api_pedidos_kanban")
@@ -1571,6 +1394,7 @@ def api_cambiar_estado_pedido(request, pedido_id):
                 pedido.fecha_pago = timezone.now()
 
         pedido.save(update_fields=['estado', 'fecha_pago'])
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_ESTADO)
 
         return Response({
             'success': True,
@@ -1661,9 +1485,8 @@ def api_jornada_iniciar(request):
             observaciones_apertura=observaciones
         )
 
-        # ✅ OPTIMIZACIÓN: Invalidar caché del middleware
-        cache.delete('jornada_laboral_activa')
-        logger.debug("Caché de jornada invalidado - nueva jornada activa")
+        # ✅ OPTIMIZACIÓN: JornadaLaboral.save() publica el nuevo estado en la
+        # caché compartida al confirmar; todos los workers lo ven sin esperar el TTL
 
         cajero_nombre = f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username
 
@@ -1709,9 +1532,8 @@ def api_jornada_finalizar(request):
         try:
             jornada.finalizar(request.user, observaciones)
 
-            # ✅ OPTIMIZACIÓN: Invalidar caché del middleware
-            cache.delete('jornada_laboral_activa')
-            logger.debug("Caché de jornada invalidado - jornada finalizada")
+            # ✅ OPTIMIZACIÓN: finalizar() guarda la jornada y eso publica el estado
+            # en la caché compartida (ver app.caja.jornada_cache)
 
         except Exception as validation_error:
             return Response({
@@ -1749,6 +1571,7 @@ def api_jornada_finalizar(request):
 # ============================================
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotente
 def reembolsar_pedido(request, pedido_id):
     """
     Procesa un reembolso parcial o total de un pedido.
@@ -1762,6 +1585,7 @@ def reembolsar_pedido(request, pedido_id):
     from app.pedidos.models import Pedido
     from app.caja.models import Reembolso
     from app.caja.utils import saldo_reembolsable
+    from app.caja.contadores import registrar_reembolso, turno_abierto_id
     from decimal import Decimal
     from django.utils import timezone
 
@@ -1825,7 +1649,7 @@ def reembolsar_pedido(request, pedido_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # ✅ Crear reembolso
+        # ✅ Crear reembolso (sale de la caja del turno abierto de quien lo procesa)
         reembolso = Reembolso.objects.create(
             pedido=pedido,
             monto=monto,
@@ -1833,8 +1657,10 @@ def reembolsar_pedido(request, pedido_id):
             motivo=motivo,
             creado_por=request.user,
             autorizado_por=request.user,
-            codigo_autorizacion=request.data.get('codigo_autorizacion')
+            codigo_autorizacion=request.data.get('codigo_autorizacion'),
+            cierre_caja_id=turno_abierto_id(request.user.id)
         )
+        registrar_reembolso(reembolso)
 
         # ✅ Actualizar acumulados del pedido
         anterior_reembolsado = pedido.total_reembolsado or Decimal("0.00")
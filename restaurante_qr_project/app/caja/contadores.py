@@ -0,0 +1,226 @@
+"""
+Contadores en vivo del turno de caja (CierreCaja).
+
+Cada escritura que mueve dinero aplica su delta al turno con UN UPDATE
+usando F(), dentro de la misma transacción de BD que la escribe:
+
+- Transaccion (alta en 'procesado'):  total_ventas, numero_transacciones y
+  el total de su método (los pagos mixtos suman por cada DetallePago)
+- DetallePago (alta):                 total del método
+- Reembolso (al aplicarse):           total_reembolsos, numero_reembolsos,
+                                      reembolsos_efectivo
+- Pedido (pasa a pagado):             total_descuentos, total_propinas,
+                                      numero_pedidos
+
+Los cobros de caja (app.caja.pagos) crean Transaccion/DetallePago con
+bulk_create y aplican todo junto con registrar_pago().
+
+efectivo_esperado se mantiene igual: inicial + efectivo - reembolsos en
+efectivo. Así cerrar caja es leer una fila. Lo que no pase por los modelos
+(SQL manual, admin de BD) se detecta y corrige con reconciliar_cierres()
+(comando reconciliar_caja), que recalcula todo desde las filas.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import (
+    Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+)
+from django.db.models.functions import Coalesce, Now
+
+logger = logging.getLogger('app.caja')
+
+METODOS_CAJA = ('efectivo', 'tarjeta', 'qr', 'movil')
+
+CAMPOS_CONTADORES = (
+    'total_efectivo', 'total_tarjeta', 'total_qr', 'total_movil', 'total_ventas',
+    'efectivo_esperado', 'total_descuentos', 'total_propinas', 'numero_pedidos',
+    'total_reembolsos', 'reembolsos_efectivo', 'numero_transacciones', 'numero_reembolsos',
+)
+
+
+def turno_abierto_id(cajero_id):
+    """Id del turno abierto hoy por el cajero (None si no tiene)"""
+    from .models import CierreCaja
+
+    if not cajero_id:
+        return None
+    return CierreCaja.objects.filter(
+        cajero_id=cajero_id, estado='abierto', fecha=date.today()
+    ).values_list('id', flat=True).first()
+
+
+def _aplicar(cierre_id, deltas):
+    """Un UPDATE con F() sobre los contadores del turno"""
+    from .models import CierreCaja
+
+    deltas = {campo: valor for campo, valor in deltas.items() if valor}
+    if cierre_id and deltas:
+        CierreCaja.objects.filter(id=cierre_id).update(
+            **{campo: F(campo) + valor for campo, valor in deltas.items()}
+        )
+
+
+def _delta_metodo(metodo, monto, deltas):
+    if metodo in METODOS_CAJA:
+        deltas[f'total_{metodo}'] = deltas.get(f'total_{metodo}', 0) + monto
+        if metodo == 'efectivo':
+            deltas['efectivo_esperado'] = deltas.get('efectivo_esperado', 0) + monto
+
+
+def registrar_transaccion(transaccion, signo=1, nueva=False):
+    """
+    Suma (signo=1) o resta (signo=-1) una transacción a su turno.
+
+    Una transacción nueva todavía no tiene DetallePago (suman al crearse);
+    al restarla se incluyen los detalles existentes.
+    """
+    monto = Decimal(str(transaccion.monto_total)) * signo
+    deltas = {'total_ventas': monto, 'numero_transacciones': signo}
+    _delta_metodo(transaccion.metodo_pago, monto, deltas)
+
+    if not nueva:
+        for metodo, monto_detalle in transaccion.detalles_pago.values_list('metodo_pago', 'monto'):
+            _delta_metodo(metodo, monto_detalle * signo, deltas)
+
+    _aplicar(transaccion.cierre_caja_id, deltas)
+
+
+def registrar_pago(transaccion, detalles=()):
+    """
+    Transacción recién creada con bulk_create (no pasa por save()) y sus
+    DetallePago: un solo UPDATE al turno.
+    """
+    monto = Decimal(str(transaccion.monto_total))
+    deltas = {'total_ventas': monto, 'numero_transacciones': 1}
+    _delta_metodo(transaccion.metodo_pago, monto, deltas)
+    for detalle in detalles:
+        _delta_metodo(detalle.metodo_pago, Decimal(str(detalle.monto)), deltas)
+
+    _aplicar(transaccion.cierre_caja_id, deltas)
+
+
+def registrar_detalle_pago(detalle):
+    """Suma el monto de un DetallePago al método correspondiente del turno"""
+    transaccion = detalle.transaccion
+    if transaccion.estado != 'procesado':
+        return
+
+    deltas = {}
+    _delta_metodo(detalle.metodo_pago, Decimal(str(detalle.monto)), deltas)
+    _aplicar(transaccion.cierre_caja_id, deltas)
+
+
+def registrar_reembolso(reembolso, signo=1):
+    """Aplica (o revierte) un reembolso en el turno del que sale el dinero"""
+    monto = Decimal(str(reembolso.monto)) * signo
+    deltas = {'total_reembolsos': monto, 'numero_reembolsos': signo}
+    if reembolso.metodo == 'efectivo':
+        deltas['reembolsos_efectivo'] = monto
+        deltas['efectivo_esperado'] = -monto
+
+    _aplicar(reembolso.cierre_caja_id, deltas)
+
+
+def registrar_pedido_pagado(pedido):
+    """Descuento, propina y conteo del pedido en el turno del cajero que lo cobró"""
+    _aplicar(turno_abierto_id(pedido.cajero_responsable_id), {
+        'total_descuentos': pedido.descuento or Decimal('0'),
+        'total_propinas': pedido.propina or Decimal('0'),
+        'numero_pedidos': 1,
+    })
+
+
+# ══════════════════════════════════════════════
+# 🔍 RECONCILIACIÓN
+# ══════════════════════════════════════════════
+
+def _suma(queryset, campo):
+    """Subconsulta escalar: suma de `campo` para el turno (0 si no hay filas)"""
+    suma = queryset.order_by().values('_turno').annotate(suma=Sum(campo)).values('suma')
+    return Coalesce(Subquery(suma), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _cuenta(queryset):
+    cuenta = queryset.order_by().values('_turno').annotate(cuenta=Count('pk')).values('cuenta')
+    return Coalesce(Subquery(cuenta), Value(0), output_field=IntegerField())
+
+
+def _contadores_reales():
+    """Expresiones con los contadores recalculados desde las filas de cada turno"""
+    from app.pedidos.models import Pedido
+    from .models import DetallePago, Reembolso, Transaccion
+
+    transacciones = Transaccion.objects.filter(
+        cierre_caja=OuterRef('pk'), estado='procesado'
+    ).annotate(_turno=F('cierre_caja'))
+    detalles = DetallePago.objects.filter(
+        transaccion__cierre_caja=OuterRef('pk'), transaccion__estado='procesado'
+    ).annotate(_turno=F('transaccion__cierre_caja'))
+    reembolsos = Reembolso.objects.filter(
+        cierre_caja=OuterRef('pk')
+    ).exclude(estado='rechazado').annotate(_turno=F('cierre_caja'))
+    # Pedidos cobrados por el cajero dentro del turno (misma regla que el cierre original)
+    pedidos = Pedido.objects.filter(
+        cajero_responsable=OuterRef('cajero'), estado_pago='pagado',
+        fecha_pago__gte=OuterRef('hora_apertura'),
+        fecha_pago__lte=Coalesce(OuterRef('hora_cierre'), Now()),
+    ).annotate(_turno=F('cajero_responsable'))
+
+    reales = {
+        'total_ventas': _suma(transacciones, 'monto_total'),
+        'numero_transacciones': _cuenta(transacciones),
+        'total_reembolsos': _suma(reembolsos, 'monto'),
+        'reembolsos_efectivo': _suma(reembolsos.filter(metodo='efectivo'), 'monto'),
+        'numero_reembolsos': _cuenta(reembolsos),
+        'total_descuentos': _suma(pedidos, 'descuento'),
+        'total_propinas': _suma(pedidos, 'propina'),
+        'numero_pedidos': _cuenta(pedidos),
+    }
+    for metodo in METODOS_CAJA:
+        reales[f'total_{metodo}'] = (
+            _suma(transacciones.filter(metodo_pago=metodo), 'monto_total') +
+            _suma(detalles.filter(metodo_pago=metodo), 'monto')
+        )
+    reales['efectivo_esperado'] = F('efectivo_inicial') + reales['total_efectivo'] - reales['reembolsos_efectivo']
+    return reales
+
+
+def reconciliar_cierres(cierres=None, reparar=False):
+    """
+    Compara los contadores en vivo contra lo que dicen las filas.
+
+    Args:
+        cierres (QuerySet): Turnos a revisar (default: los abiertos)
+        reparar (bool): Reescribir los contadores con deriva (un UPDATE)
+
+    Returns:
+        list: [{'cierre_id', 'campo', 'valor', 'real'}] por cada contador con deriva
+    """
+    from .models import CierreCaja
+
+    cierres = CierreCaja.objects.filter(estado='abierto') if cierres is None else cierres
+    reales = _contadores_reales()
+    anotados = cierres.order_by().annotate(**{f'{campo}_real': expr for campo, expr in reales.items()})
+
+    diferencias = Q()
+    for campo in CAMPOS_CONTADORES:
+        diferencias |= ~Q(**{campo: F(f'{campo}_real')})
+    filas = anotados.filter(diferencias).values(
+        'id', *CAMPOS_CONTADORES, *(f'{campo}_real' for campo in CAMPOS_CONTADORES)
+    )
+
+    desviados = [
+        {'cierre_id': fila['id'], 'campo': campo, 'valor': fila[campo], 'real': fila[f'{campo}_real']}
+        for fila in filas
+        for campo in CAMPOS_CONTADORES
+        if fila[campo] != fila[f'{campo}_real']
+    ]
+
+    ids = sorted({d['cierre_id'] for d in desviados})
+    if ids and reparar:
+        CierreCaja.objects.filter(id__in=ids).update(**_contadores_reales())
+        logger.warning(f"Contadores de caja reparados en turnos: {ids}")
+
+    return desviados
@@ -0,0 +1,151 @@
+"""
+Estadísticas de caja por rango de fechas (agregación en BD).
+
+Dos consultas agrupadas, sin importar cuántas transacciones o pedidos haya:
+
+1. Transacciones procesadas (LEFT JOIN a DetallePago): total por método con
+   Sum(..., filter=...); los pagos mixtos suman por sus líneas de detalle
+2. Pedidos: conteos por estado y estado de pago, descuentos, propinas e
+   ingresos con Count/Sum condicionales
+
+Los filtros son rangos [inicio, fin) sobre la columna datetime (usan el
+índice) en lugar de `__date`, que obliga a convertir cada fila.
+
+Los días ya cerrados no cambian: si el rango termina antes de hoy el
+resultado se guarda en la caché compartida por un TTL corto. Lo usan
+api_estadisticas_dia, estadisticas_dia_api y el panel de caja.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .contadores import METODOS_CAJA
+
+logger = logging.getLogger('app.caja')
+
+CACHE_PREFIX = 'estadisticas_caja'
+CACHE_TIMEOUT = 10 * 60  # Solo rangos pasados (inmutables salvo correcciones)
+
+
+def rango_fechas(desde, hasta=None):
+    """
+    Límites [inicio, fin) en la zona horaria local para filtrar por rango.
+
+    Returns:
+        tuple: (datetime inicio, datetime fin)
+    """
+    hasta = hasta or desde
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def _cero():
+    return Value(Decimal('0'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def totales_por_metodo(transacciones):
+    """
+    Totales por método de pago de un QuerySet de transacciones (una consulta).
+
+    Returns:
+        dict: {'efectivo', 'tarjeta', 'qr', 'movil', 'total': Decimal, 'cantidad': int}
+    """
+    agregados = {
+        metodo: (
+            Coalesce(Sum('monto_total', filter=Q(metodo_pago=metodo)), _cero()) +
+            Coalesce(Sum('detalles_pago__monto', filter=Q(detalles_pago__metodo_pago=metodo)), _cero())
+        )
+        for metodo in METODOS_CAJA
+    }
+    # Con el JOIN, un pago mixto aparece una vez por línea: su monto se toma de
+    # las líneas (la API valida que sumen el total) y se cuenta con DISTINCT
+    agregados['total'] = (
+        Coalesce(Sum('monto_total', filter=~Q(metodo_pago='mixto')), _cero()) +
+        Coalesce(Sum('detalles_pago__monto', filter=Q(metodo_pago='mixto')), _cero())
+    )
+    agregados['cantidad'] = Count('id', distinct=True)
+
+    return transacciones.order_by().aggregate(**agregados)
+
+
+def _totales_pedidos(pedidos):
+    from app.pedidos.models import Pedido
+
+    pagado = Q(estado_pago='pagado')
+    return pedidos.order_by().aggregate(
+        total_pedidos=Count('id'),
+        pedidos_pagados=Count('id', filter=pagado),
+        pedidos_pendientes=Count('id', filter=Q(estado_pago='pendiente')),
+        total_descuentos=Coalesce(Sum('descuento'), _cero()),
+        total_propinas=Coalesce(Sum('propina'), _cero()),
+        ingresos_totales=Coalesce(Sum('total', filter=pagado), _cero()),
+        creados=Count('id', filter=Q(estado=Pedido.ESTADO_CREADO)),
+        en_preparacion=Count('id', filter=Q(estado=Pedido.ESTADO_EN_PREPARACION)),
+        listos=Count('id', filter=Q(estado=Pedido.ESTADO_LISTO)),
+        entregados=Count('id', filter=Q(estado=Pedido.ESTADO_ENTREGADO)),
+    )
+
+
+def _calcular(desde, hasta):
+    from app.pedidos.models import Pedido
+    from .models import Transaccion
+
+    inicio, fin = rango_fechas(desde, hasta)
+    totales = totales_por_metodo(
+        Transaccion.objects.filter(estado='procesado', fecha_hora__gte=inicio, fecha_hora__lt=fin)
+    )
+    pedidos = _totales_pedidos(Pedido.objects.filter(fecha__gte=inicio, fecha__lt=fin))
+
+    numero_transacciones = totales.pop('cantidad')
+    total_pedidos = pedidos['total_pedidos']
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'totales': totales,
+        'numero_transacciones': numero_transacciones,
+        'total_pedidos': total_pedidos,
+        'pedidos_pagados': pedidos['pedidos_pagados'],
+        'pedidos_pendientes': pedidos['pedidos_pendientes'],
+        'total_descuentos': pedidos['total_descuentos'],
+        'total_propinas': pedidos['total_propinas'],
+        'ingresos_totales': pedidos['ingresos_totales'],
+        'pedidos_por_estado': {
+            'creados': pedidos['creados'],
+            'en_preparacion': pedidos['en_preparacion'],
+            'listos': pedidos['listos'],
+            'entregados': pedidos['entregados'],
+        },
+        'promedio_por_pedido': totales['total'] / total_pedidos if total_pedidos else Decimal('0'),
+    }
+
+
+def estadisticas_caja(desde=None, hasta=None):
+    """
+    Estadísticas de caja de un rango de días (ambos inclusive).
+
+    Args:
+        desde (date): Primer día (default: hoy)
+        hasta (date): Último día (default: desde)
+
+    Returns:
+        dict: totales por método, conteos de transacciones y pedidos,
+              descuentos, propinas, ingresos y pedidos por estado
+    """
+    desde = desde or timezone.localdate()
+    hasta = hasta or desde
+
+    if hasta >= timezone.localdate():
+        return _calcular(desde, hasta)
+
+    clave = f'{CACHE_PREFIX}:{desde.isoformat()}:{hasta.isoformat()}'
+    estadisticas = cache.get(clave)
+    if estadisticas is None:
+        estadisticas = _calcular(desde, hasta)
+        cache.set(clave, estadisticas, CACHE_TIMEOUT)
+    return estadisticas
@@ -0,0 +1,185 @@
+"""
+Numeración secuencial de facturas por día: FACT-YYYYMMDD-NNNNNN.
+
+Reemplaza al sufijo aleatorio (uuid4) por un contador diario
+(SecuenciaFactura) sin convertir su fila en un punto caliente:
+
+1. Cada hilo reserva un bloque de FACTURACION_BLOQUE números (default 20)
+   con UN UPSERT ... RETURNING en una conexión propia en autocommit. La
+   reserva se confirma al instante: la fila no queda bloqueada durante el
+   pago y un pago revertido no devuelve números ya entregados a otros
+2. Los números del bloque se entregan desde memoria, sin consultas
+
+Números sin usar, tratados en forma explícita (FacturaAnulada):
+
+- Al cambiar de día, el resto del bloque anterior se anula en el acto
+- Un pago revertido después de tomar su número, o un proceso que termina
+  con un bloque a medias, deja huecos: auditar_numeracion() los detecta y
+  los anula (comando auditar_facturas, tarea 'anular_facturas_sin_usar')
+
+Solo se anula en días cerrados hace más de FACTURACION_MARGEN_HORAS (default
+6): un pago que tomó su número a las 23:59 puede confirmarse pasada la
+medianoche. La tarea revisa todos los días cerrados sin auditar
+(SecuenciaFactura.auditada), así un día en que el runner no corrió se
+audita en la siguiente ejecución.
+
+Así cada número entre 1 y SecuenciaFactura.ultimo_numero está usado por una
+Transaccion o anulado con su motivo. Con varios workers los números del día
+no siguen el orden de cobro entre workers (cada uno avanza en su bloque);
+con FACTURACION_BLOQUE = 1 la numeración es estrictamente cronológica.
+"""
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from .models import FacturaAnulada, SecuenciaFactura, Transaccion
+
+logger = logging.getLogger('app.caja')
+
+PREFIJO = 'FACT'
+DIGITOS = 6
+
+_bloques = threading.local()
+
+
+def _tamano_bloque():
+    return max(getattr(settings, 'FACTURACION_BLOQUE', 20), 1)
+
+
+def _margen():
+    return timedelta(hours=getattr(settings, 'FACTURACION_MARGEN_HORAS', 6))
+
+
+def primer_dia_abierto():
+    """Primer día cuyos números todavía no se pueden anular (hoy, o ayer dentro del margen)"""
+    return (timezone.localtime() - _margen()).date()
+
+
+def formatear_numero(fecha, numero):
+    """FACT-YYYYMMDD-NNNNNN"""
+    return f"{PREFIJO}-{fecha:%Y%m%d}-{numero:0{DIGITOS}d}"
+
+
+def _reservar_bloque(fecha, tamano):
+    """
+    Reserva [inicio, fin] del día con un UPSERT atómico en una conexión propia.
+
+    La conexión del request puede estar dentro de la transacción del pago;
+    la reserva no debe esperar a su commit ni revertirse con ella.
+    """
+    tabla = SecuenciaFactura._meta.db_table
+    conexion = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tabla} (fecha, ultimo_numero, auditada) VALUES (%s, %s, FALSE) "
+                f"ON CONFLICT (fecha) DO UPDATE SET ultimo_numero = {tabla}.ultimo_numero + EXCLUDED.ultimo_numero "
+                f"RETURNING ultimo_numero",
+                [fecha, tamano]
+            )
+            fin = cursor.fetchone()[0]
+    finally:
+        conexion.close()
+    return fin - tamano + 1, fin
+
+
+def _anular(fecha, numeros, motivo):
+    if numeros:
+        FacturaAnulada.objects.bulk_create(
+            [FacturaAnulada(fecha=fecha, numero=numero, motivo=motivo) for numero in numeros],
+            ignore_conflicts=True
+        )
+        logger.info(f"Facturas anuladas {fecha} ({motivo}): {len(numeros)}")
+
+
+def liberar_bloque():
+    """Anula lo que quede del bloque de este hilo y lo descarta"""
+    bloque = getattr(_bloques, 'actual', None)
+    _bloques.actual = None
+    if bloque:
+        fecha, siguiente, fin = bloque
+        _anular(fecha, range(siguiente, fin + 1), FacturaAnulada.MOTIVO_BLOQUE)
+
+
+def siguiente_numero_factura():
+    """
+    Próximo número de factura del día (sin consultas salvo al reservar bloque).
+
+    Returns:
+        str: FACT-YYYYMMDD-NNNNNN
+    """
+    hoy = timezone.localdate()
+    bloque = getattr(_bloques, 'actual', None)
+
+    if bloque and bloque[0] != hoy:
+        liberar_bloque()
+        bloque = None
+    if not bloque or bloque[1] > bloque[2]:
+        bloque = (hoy, *_reservar_bloque(hoy, _tamano_bloque()))
+
+    fecha, numero, fin = bloque
+    _bloques.actual = (fecha, numero + 1, fin)
+    return formatear_numero(fecha, numero)
+
+
+# ══════════════════════════════════════════════
+# 🔍 AUDITORÍA
+# ══════════════════════════════════════════════
+
+def auditar_numeracion(fecha, anular=False):
+    """
+    Números del día reservados que no están usados ni anulados.
+
+    Args:
+        fecha (date): Día a auditar (solo se anula antes de primer_dia_abierto():
+                      hoy hay bloques en uso y pagos por confirmar)
+        anular (bool): Registrar los huecos como FacturaAnulada y marcar el
+                       día como auditado
+
+    Returns:
+        dict: {'ultimo', 'usados', 'anulados', 'sin_usar': [números]}
+    """
+    if anular and fecha >= primer_dia_abierto():
+        raise ValueError(
+            f'Solo se pueden anular números de días cerrados (anteriores a {primer_dia_abierto()})'
+        )
+
+    ultimo = SecuenciaFactura.objects.filter(fecha=fecha).values_list('ultimo_numero', flat=True).first() or 0
+    prefijo = formatear_numero(fecha, 0)[:-DIGITOS]
+    usados = {
+        int(numero[len(prefijo):])
+        for numero in Transaccion.objects.filter(
+            numero_factura__regex=rf'^{re.escape(prefijo)}[0-9]{{{DIGITOS}}}$'
+        ).values_list('numero_factura', flat=True)
+    }
+    anulados = set(FacturaAnulada.objects.filter(fecha=fecha).values_list('numero', flat=True))
+
+    sin_usar = [numero for numero in range(1, ultimo + 1) if numero not in usados and numero not in anulados]
+    if anular:
+        _anular(fecha, sin_usar, FacturaAnulada.MOTIVO_AUDITORIA)
+        # Pasado el margen nadie reserva números de ese día: queda completo
+        SecuenciaFactura.objects.filter(fecha=fecha, ultimo_numero=ultimo).update(auditada=True)
+
+    return {'ultimo': ultimo, 'usados': len(usados), 'anulados': len(anulados), 'sin_usar': sin_usar}
+
+
+def anular_sin_usar():
+    """
+    Anula los huecos de todos los días cerrados sin auditar (tarea
+    programada 'anular_facturas_sin_usar').
+
+    Returns:
+        dict: {fecha ISO: números anulados} de los días auditados
+    """
+    pendientes = SecuenciaFactura.objects.filter(
+        fecha__lt=primer_dia_abierto(), auditada=False
+    ).order_by('fecha').values_list('fecha', flat=True)
+    return {
+        fecha.isoformat(): len(auditar_numeracion(fecha, anular=True)['sin_usar'])
+        for fecha in pendientes
+    }
@@ -0,0 +1,58 @@
+"""
+Estado de la jornada laboral en la caché compartida.
+
+El middleware de jornada consulta este estado en cada request de meseros y
+cocineros. La caché es compartida entre workers (ver CACHE_BACKEND en
+settings), así que basta con una consulta a BD por TTL para todo el servidor.
+
+Invalidación explícita: cada vez que se guarda una JornadaLaboral (iniciar,
+finalizar, admin, recuperación de zombies) el nuevo estado se escribe en la
+caché al confirmar la transacción (write-through). Todos los workers lo ven en
+el siguiente request, sin esperar el TTL.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger('app.caja')
+
+CACHE_KEY_JORNADA = 'jornada_laboral_activa'
+CACHE_TIMEOUT = 300  # 5 minutos (red de seguridad; la publicación es explícita)
+
+
+def jornada_activa_cacheada():
+    """
+    Indica si hay jornada activa, usando la caché compartida.
+
+    Returns:
+        bool: True si hay una jornada activa
+    """
+    jornada_activa = cache.get(CACHE_KEY_JORNADA)
+    if jornada_activa is not None:
+        return jornada_activa
+
+    from .models import JornadaLaboral
+
+    jornada_activa = JornadaLaboral.hay_jornada_activa()
+    # add (no set): si otro worker publicó un estado más nuevo mientras
+    # consultábamos la BD, no se pisa con este valor
+    cache.add(CACHE_KEY_JORNADA, jornada_activa, CACHE_TIMEOUT)
+    logger.debug(f"Jornada consultada en BD y cacheada: {jornada_activa}")
+    return jornada_activa
+
+
+def publicar_estado_jornada():
+    """
+    Publica el estado de la jornada en la caché compartida al confirmar la
+    transacción actual (inmediato si no hay transacción abierta).
+    """
+    transaction.on_commit(_publicar)
+
+
+def _publicar():
+    from .models import JornadaLaboral
+
+    jornada_activa = JornadaLaboral.hay_jornada_activa()
+    cache.set(CACHE_KEY_JORNADA, jornada_activa, CACHE_TIMEOUT)
+    logger.debug(f"Estado de jornada publicado en caché: {jornada_activa}")
@@ -0,0 +1,69 @@
+"""
+Comando de Django para auditar la numeración secuencial de facturas.
+
+Uso:
+    python manage.py auditar_facturas                      # ayer, solo reporta
+    python manage.py auditar_facturas --fecha 2026-03-01
+    python manage.py auditar_facturas --anular             # anula los huecos de todos los días cerrados sin auditar
+    python manage.py auditar_facturas --fecha 2026-03-01 --anular
+
+Cada número entre 1 y el último reservado del día debe estar usado por una
+Transaccion o anulado (FacturaAnulada). Los huecos aparecen cuando un pago
+se revierte después de tomar su número o un worker termina con un bloque a
+medias. Sale con error si hay huecos sin --anular (apto para cron/monitoreo).
+Solo se anula en días cerrados fuera del margen de pagos pendientes
+(FACTURACION_MARGEN_HORAS).
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.caja.facturacion import anular_sin_usar, auditar_numeracion
+import logging
+
+logger = logging.getLogger('app.caja')
+
+
+class Command(BaseCommand):
+    help = 'Verifica que cada número de factura del día esté usado o anulado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=date.fromisoformat, help='Día a auditar YYYY-MM-DD (default: ayer; con --anular, todos los días cerrados sin auditar)')
+        parser.add_argument('--anular', action='store_true', help='Registrar los números sin usar como anulados')
+
+    def handle(self, *args, **options):
+        if options['anular'] and not options['fecha']:
+            anulados = anular_sin_usar()
+            for fecha, cantidad in anulados.items():
+                self.stdout.write(f"Facturas {fecha}: {cantidad} sin usar")
+            logger.info(f"Comando auditar_facturas --anular: {len(anulados)} días auditados")
+            self.stdout.write(self.style.SUCCESS(
+                f'🔧 {len(anulados)} días auditados, {sum(anulados.values())} números registrados como anulados'
+            ))
+            return
+
+        fecha = options['fecha'] or timezone.localdate() - timedelta(days=1)
+
+        try:
+            resultado = auditar_numeracion(fecha, anular=options['anular'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        sin_usar = resultado['sin_usar']
+        self.stdout.write(
+            f"Facturas {fecha}: {resultado['ultimo']} reservadas, {resultado['usados']} usadas, "
+            f"{resultado['anulados']} anuladas, {len(sin_usar)} sin usar"
+        )
+        if sin_usar:
+            muestra = ', '.join(map(str, sin_usar[:50]))
+            self.stdout.write(f"  • Sin usar: {muestra}{' …' if len(sin_usar) > 50 else ''}")
+
+        logger.info(f"Comando auditar_facturas {fecha}: {len(sin_usar)} sin usar (anular={options['anular']})")
+
+        if not sin_usar:
+            self.stdout.write(self.style.SUCCESS('✅ Numeración completa'))
+        elif options['anular']:
+            self.stdout.write(self.style.SUCCESS(f'🔧 {len(sin_usar)} números registrados como anulados'))
+        else:
+            raise CommandError(f'{len(sin_usar)} números sin usar ni anular (ejecutar con --anular)')
@@ -0,0 +1,40 @@
+"""
+Comando de Django para sincronizar las alertas de stock de productos e insumos.
+
+Uso:
+    python manage.py escanear_alertas_stock
+
+Crea las alertas que falten, actualiza el tipo (stock bajo ↔ agotado) y
+resuelve las de productos/insumos ya repuestos, con un número fijo de
+consultas sin importar el tamaño del catálogo (ver app.caja.alertas).
+
+Los cambios de stock ya disparan un escaneo al confirmar su transacción;
+este comando cubre las escrituras que no pasan por el modelo (importaciones,
+admin de BD) y debe ejecutarse periódicamente (cada 5-15 minutos) con Cron,
+Task Scheduler o Celery Beat.
+"""
+from django.core.management.base import BaseCommand
+
+from app.caja.alertas import escanear_alertas_stock
+import logging
+
+logger = logging.getLogger('app.caja')
+
+
+class Command(BaseCommand):
+    help = 'Crea, actualiza y resuelve alertas de stock en lote'
+
+    def handle(self, *args, **options):
+        resultado = escanear_alertas_stock()
+
+        for alerta in resultado['creadas']:
+            self.stdout.write(f'  • {alerta.producto_nombre}: {alerta.get_tipo_alerta_display()} ({alerta.stock_actual})')
+
+        logger.info(
+            f"Comando escanear_alertas_stock: {len(resultado['creadas'])} nuevas, "
+            f"{resultado['resueltas']} resueltas, {resultado['actualizadas']} actualizadas"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Alertas: {len(resultado['creadas'])} nuevas, "
+            f"{resultado['resueltas']} resueltas, {resultado['actualizadas']} actualizadas"
+        ))
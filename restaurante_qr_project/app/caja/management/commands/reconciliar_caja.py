@@ -0,0 +1,60 @@
+"""
+Comando de Django para reconciliar los contadores en vivo de CierreCaja.
+
+Uso:
+    python manage.py reconciliar_caja                  # turnos abiertos, solo reporta
+    python manage.py reconciliar_caja --dias 7         # también los turnos de los últimos 7 días
+    python manage.py reconciliar_caja --cierre 42 --reparar
+
+Los totales del turno se mantienen con deltas F() al escribir cada
+Transaccion, DetallePago y Reembolso. Las escrituras que no pasan por los
+modelos pueden dejar deriva; este comando la detecta recalculando desde las
+filas en una sola consulta y la corrige en un solo UPDATE. Sale con error si
+encuentra deriva sin --reparar (apto para cron/monitoreo).
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from app.caja.contadores import reconciliar_cierres
+from app.caja.models import CierreCaja
+import logging
+
+logger = logging.getLogger('app.caja')
+
+
+class Command(BaseCommand):
+    help = 'Detecta y repara deriva en los contadores en vivo de los turnos de caja'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Incluir turnos (abiertos o cerrados) de los últimos N días')
+        parser.add_argument('--cierre', type=int, help='Revisar solo este turno')
+        parser.add_argument('--reparar', action='store_true', help='Corregir los contadores con deriva')
+
+    def handle(self, *args, **options):
+        if options['cierre']:
+            cierres = CierreCaja.objects.filter(id=options['cierre'])
+        elif options['dias']:
+            desde = timezone.localdate() - timedelta(days=options['dias'])
+            cierres = CierreCaja.objects.filter(Q(estado='abierto') | Q(fecha__gte=desde))
+        else:
+            cierres = None
+
+        desviados = reconciliar_cierres(cierres, reparar=options['reparar'])
+
+        for d in desviados[:50]:
+            self.stdout.write(f"  • Turno #{d['cierre_id']} {d['campo']}: {d['valor']} (real {d['real']})")
+        if len(desviados) > 50:
+            self.stdout.write(f'  … y {len(desviados) - 50} más')
+
+        turnos = len({d['cierre_id'] for d in desviados})
+        logger.info(f"Comando reconciliar_caja: {turnos} turnos con deriva (reparar={options['reparar']})")
+
+        if not desviados:
+            self.stdout.write(self.style.SUCCESS('✅ Contadores de caja consistentes'))
+        elif options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f'🔧 Contadores reparados en {turnos} turnos'))
+        else:
+            raise CommandError(f'{turnos} turnos con deriva (ejecutar con --reparar)')
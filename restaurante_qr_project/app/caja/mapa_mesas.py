@@ -0,0 +1,128 @@
+"""
+Read model del mapa de mesas (api_mapa_mesas).
+
+Arma el estado de TODAS las mesas con un número constante de consultas:
+1. Mesas
+2. Agregado por mesa de pedidos activos (cantidad y total pendiente)
+3. Líneas de los pedidos activos (un solo "prefetch" plano)
+
+La proyección completa se cachea bajo la clave del cursor de cambios
+(app.pedidos.versionado): cualquier escritura de pedido, detalle, mesa o pago
+avanza el cursor y deja la entrada anterior obsoleta sin invalidación explícita.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, When
+
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido, DetallePedido
+
+logger = logging.getLogger('app.caja')
+
+CACHE_KEY_MAPA = 'mapa_mesas:v{cursor}'
+
+
+def _pedidos_activos():
+    """Pedidos que ocupan mesa en el mapa: pendientes de pago y no cancelados"""
+    return Pedido.objects.filter(estado_pago='pendiente').exclude(estado=Pedido.ESTADO_CANCELADO)
+
+
+def construir_mapa_mesas(since=None):
+    """
+    Construye el payload del mapa de mesas.
+
+    Args:
+        since (int, optional): Cursor de cambios; si se envía, solo mesas cambiadas
+
+    Returns:
+        list: Un dict por mesa (mismo formato que consume panel_unificado.js)
+    """
+    mesas = Mesa.objects.all().order_by('numero')
+    if since is not None:
+        # Una mesa cambia si cambió ella o cualquiera de sus pedidos
+        mesas_pedidos = Pedido.objects.filter(version__gt=since).values('mesa_id')
+        mesas = mesas.filter(Q(version__gt=since) | Q(id__in=mesas_pedidos))
+    mesas = list(mesas)
+    if not mesas:
+        return []
+
+    ids_mesas = [mesa.id for mesa in mesas]
+    pedidos = _pedidos_activos().filter(mesa_id__in=ids_mesas)
+
+    # ✅ Total pendiente considerando pagos parciales, agregado por mesa en BD
+    resumen = {
+        fila['mesa_id']: fila
+        for fila in pedidos.values('mesa_id').annotate(
+            cantidad=Count('id'),
+            pendiente=Sum(
+                Case(
+                    When(total_final__gt=0, then=F('total_final')),
+                    default=F('total'),
+                    output_field=DecimalField(max_digits=10, decimal_places=2)
+                ) - F('monto_pagado')
+            )
+        )
+    }
+
+    productos_por_mesa = {}
+    lineas = DetallePedido.objects.filter(pedido__in=pedidos).values_list(
+        'pedido__mesa_id', 'producto__nombre', 'cantidad', 'precio_unitario', 'subtotal'
+    ).order_by('pedido_id', 'id')
+    for mesa_id, nombre, cantidad, precio_unitario, subtotal in lineas:
+        productos_por_mesa.setdefault(mesa_id, []).append({
+            'nombre': nombre,
+            'cantidad': cantidad,
+            'precio_unitario': float(precio_unitario),
+            'subtotal': float(subtotal)
+        })
+
+    mesas_data = []
+    for mesa in mesas:
+        datos = resumen.get(mesa.id)
+        pedidos_activos = datos['cantidad'] if datos else 0
+
+        # Determinar color según estado
+        if pedidos_activos:
+            if mesa.estado == 'pagando':
+                color = 'azul'  # En proceso de pago
+            else:
+                color = 'rojo'  # Ocupada
+        elif mesa.estado == 'reservada':
+            color = 'amarillo'  # Reservada
+        else:
+            color = 'verde'  # Disponible
+
+        mesas_data.append({
+            'id': mesa.id,
+            'numero': mesa.numero,
+            'estado': mesa.estado,
+            'capacidad': mesa.capacidad,
+            'color': color,
+            'pedidos_activos': pedidos_activos,
+            'total_pendiente': float(datos['pendiente'] or 0) if datos else 0.0,
+            'productos': productos_por_mesa.get(mesa.id, []),
+            'posicion_x': mesa.posicion_x,
+            'posicion_y': mesa.posicion_y
+        })
+
+    return mesas_data
+
+
+def obtener_mapa_mesas(cursor, since=None):
+    """
+    Devuelve el mapa de mesas usando la proyección cacheada cuando es posible.
+
+    Solo se cachea el mapa completo (sin since). MAPA_MESAS_CACHE_TIMEOUT=0 desactiva la caché.
+    """
+    timeout = getattr(settings, 'MAPA_MESAS_CACHE_TIMEOUT', 60)
+    if since is not None or not timeout:
+        return construir_mapa_mesas(since)
+
+    clave = CACHE_KEY_MAPA.format(cursor=cursor)
+    mesas_data = cache.get(clave)
+    if mesas_data is None:
+        mesas_data = construir_mapa_mesas()
+        cache.set(clave, mesas_data, timeout)
+    return mesas_data
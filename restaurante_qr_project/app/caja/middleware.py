@@ -3,17 +3,15 @@ Middleware para validar que la jornada laboral esté activa
 Los empleados (meseros y cocineros) no pueden interactuar si la jornada está inactiva
 
 ✅ OPTIMIZADO: Implementa caché para reducir consultas a BD
+✅ NUEVO: El estado vive en la caché compartida entre workers (ver jornada_cache)
 """
 import logging
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.core.cache import cache
 
-logger = logging.getLogger('app.caja.middleware')
+from .jornada_cache import jornada_activa_cacheada
 
-# Constantes para caché
-CACHE_KEY_JORNADA = 'jornada_laboral_activa'
-CACHE_TIMEOUT = 300  # 5 minutos
+logger = logging.getLogger('app.caja.middleware')
 
 
 class JornadaLaboralMiddleware:
@@ -71,19 +69,8 @@ class JornadaLaboralMiddleware:
 
         # SOLO para meseros y cocineros: verificar jornada activa
         if user_rol in ['mesero', 'cocinero']:
-            from .models import JornadaLaboral
-
-            # ✅ OPTIMIZADO: Usar caché para reducir consultas a BD
-            jornada_activa = cache.get(CACHE_KEY_JORNADA)
-
-            if jornada_activa is None:
-                # No está en caché, consultar BD
-                jornada_activa = JornadaLaboral.hay_jornada_activa()
-                # Guardar en caché por 5 minutos
-                cache.set(CACHE_KEY_JORNADA, jornada_activa, CACHE_TIMEOUT)
-                logger.debug(f"[MIDDLEWARE] Jornada consultada en BD y cacheada: {jornada_activa}")
-            else:
-                logger.debug(f"[MIDDLEWARE] Jornada obtenida de caché: {jornada_activa}")
+            # ✅ OPTIMIZADO: Caché compartida (una consulta a BD por TTL para todos los workers)
+            jornada_activa = jornada_activa_cacheada()
 
             logger.info(f"[MIDDLEWARE] Jornada activa: {jornada_activa} para usuario {request.user.username}")
 
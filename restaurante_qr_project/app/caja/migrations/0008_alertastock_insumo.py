@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0007_remove_transaccion_cuenta_reembolso_autorizado_en_and_more'),
+        ('inventario', '0001_initial'),
+        ('productos', '0006_producto_imagen_derivados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertastock',
+            name='insumo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alertas_stock', to='inventario.insumo'),
+        ),
+        migrations.AddIndex(
+            model_name='alertastock',
+            index=models.Index(fields=['estado', 'producto'], name='alerta_estado_producto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertastock',
+            index=models.Index(fields=['estado', 'insumo'], name='alerta_estado_insumo_idx'),
+        ),
+    ]
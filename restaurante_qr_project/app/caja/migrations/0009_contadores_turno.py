@@ -0,0 +1,96 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:46
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+def asignar_turnos(apps, schema_editor):
+    """
+    Asigna cada transacción a su turno (misma regla que el cierre anterior:
+    cajero, día y hora dentro del turno) y calcula los contadores de los
+    turnos abiertos. Los cerrados ya guardaron sus totales al cerrar.
+    """
+    CierreCaja = apps.get_model('caja', 'CierreCaja')
+    Transaccion = apps.get_model('caja', 'Transaccion')
+    DetallePago = apps.get_model('caja', 'DetallePago')
+    Pedido = apps.get_model('pedidos', 'Pedido')
+
+    for cierre in CierreCaja.objects.exclude(cajero=None).order_by('hora_apertura'):
+        fin = cierre.hora_cierre or timezone.now()
+        Transaccion.objects.filter(
+            cierre_caja=None, cajero_id=cierre.cajero_id, fecha_hora__date=cierre.fecha,
+            fecha_hora__gte=cierre.hora_apertura, fecha_hora__lte=fin
+        ).update(cierre_caja=cierre)
+
+        if cierre.estado != 'abierto':
+            continue
+
+        transacciones = Transaccion.objects.filter(cierre_caja=cierre, estado='procesado')
+        ventas = transacciones.aggregate(total=Sum('monto_total'), cantidad=Count('id'))
+        por_metodo = dict(transacciones.order_by().values_list('metodo_pago').annotate(Sum('monto_total')))
+        for metodo, monto in DetallePago.objects.filter(
+            transaccion__cierre_caja=cierre, transaccion__estado='procesado'
+        ).order_by().values_list('metodo_pago').annotate(Sum('monto')):
+            por_metodo[metodo] = por_metodo.get(metodo, Decimal('0')) + monto
+        pedidos = Pedido.objects.filter(
+            cajero_responsable_id=cierre.cajero_id, estado_pago='pagado',
+            fecha_pago__gte=cierre.hora_apertura, fecha_pago__lte=fin
+        ).aggregate(descuentos=Sum('descuento'), propinas=Sum('propina'), cantidad=Count('id'))
+
+        cierre.total_efectivo = por_metodo.get('efectivo', Decimal('0'))
+        cierre.total_tarjeta = por_metodo.get('tarjeta', Decimal('0'))
+        cierre.total_qr = por_metodo.get('qr', Decimal('0'))
+        cierre.total_movil = por_metodo.get('movil', Decimal('0'))
+        cierre.total_ventas = ventas['total'] or Decimal('0')
+        cierre.numero_transacciones = ventas['cantidad']
+        cierre.efectivo_esperado = cierre.efectivo_inicial + cierre.total_efectivo
+        cierre.total_descuentos = pedidos['descuentos'] or Decimal('0')
+        cierre.total_propinas = pedidos['propinas'] or Decimal('0')
+        cierre.numero_pedidos = pedidos['cantidad']
+        cierre.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0008_alertastock_insumo'),
+        ('pedidos', '0016_pedido_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cierrecaja',
+            name='numero_reembolsos',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cierrecaja',
+            name='numero_transacciones',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cierrecaja',
+            name='reembolsos_efectivo',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Reembolsos pagados en efectivo (salen de la caja)', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='cierrecaja',
+            name='total_reembolsos',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='reembolso',
+            name='cierre_caja',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reembolsos', to='caja.cierrecaja'),
+        ),
+        migrations.AddField(
+            model_name='transaccion',
+            name='cierre_caja',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transacciones', to='caja.cierrecaja'),
+        ),
+        migrations.RunPython(asignar_turnos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0009_contadores_turno'),
+        ('pedidos', '0016_pedido_fecha_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['fecha_hora'], name='transaccion_fecha_hora_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0010_transaccion_fecha_hora_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaFactura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('ultimo_numero', models.PositiveIntegerField(default=0, help_text='Último número reservado del día')),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Facturas',
+                'verbose_name_plural': 'Secuencias de Facturas',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FacturaAnulada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('numero', models.PositiveIntegerField()),
+                ('motivo', models.CharField(choices=[('bloque', 'Resto de bloque sin usar'), ('auditoria', 'Sin usar (auditoría)')], max_length=20)),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Factura Anulada',
+                'verbose_name_plural': 'Facturas Anuladas',
+                'ordering': ['-fecha', 'numero'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'numero'), name='factura_anulada_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0011_secuencia_factura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='secuenciafactura',
+            name='auditada',
+            field=models.BooleanField(default=False, help_text='Día cerrado con cada número usado o anulado (auditar_numeracion)'),
+        ),
+    ]
@@ -65,6 +65,8 @@ class Transaccion(models.Model):
     # Relaciones
     pedido = models.ForeignKey('pedidos.Pedido', on_delete=models.CASCADE, related_name='transacciones')
     cajero = models.ForeignKey('usuarios.Usuario', on_delete=models.SET_NULL, null=True, related_name='transacciones_realizadas')
+    # ✅ NUEVO: Turno de caja al que suma la transacción (contadores en vivo)
+    cierre_caja = models.ForeignKey('CierreCaja', on_delete=models.SET_NULL, null=True, blank=True, related_name='transacciones')
 
     # Datos de la transacción
     monto_total = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
@@ -88,10 +90,44 @@ class Transaccion(models.Model):
         verbose_name = 'Transacción'
         verbose_name_plural = 'Transacciones'
         ordering = ['-fecha_hora']
+        indexes = [
+            # ✅ NUEVO: Estadísticas por rango de fechas (ver estadisticas.py)
+            models.Index(fields=['fecha_hora'], name='transaccion_fecha_hora_idx'),
+        ]
 
     def __str__(self):
         return f"Transacción #{self.id} - Pedido #{self.pedido.id} - Bs/ {self.monto_total}"
 
+    def save(self, *args, **kwargs):
+        """
+        ✅ NUEVO: Suma la transacción a los contadores de su turno de caja
+        (UPDATE con F() en la misma transacción de BD). Si deja de estar
+        'procesado', la resta.
+
+        La salida de 'procesado' se detecta en BD con un UPDATE condicional:
+        solo el save que cambia la fila resta (sirve igual para instancias
+        creadas con bulk_create, diferidas o refrescadas).
+        """
+        from .contadores import registrar_transaccion, turno_abierto_id
+
+        es_nueva = self._state.adding
+        if es_nueva and self.cierre_caja_id is None and self.cajero_id:
+            self.cierre_caja_id = turno_abierto_id(self.cajero_id)
+
+        with transaction.atomic():
+            sale_de_procesado = (
+                not es_nueva and self.estado != 'procesado' and
+                Transaccion.objects.filter(pk=self.pk, estado='procesado').update(estado=self.estado) == 1
+            )
+            super().save(*args, **kwargs)
+
+            if not self.cierre_caja_id:
+                return
+            if es_nueva and self.estado == 'procesado':
+                registrar_transaccion(self, nueva=True)
+            elif sale_de_procesado:
+                registrar_transaccion(self, signo=-1)
+
 
 class DetallePago(models.Model):
     """
@@ -110,6 +146,14 @@ class DetallePago(models.Model):
     def __str__(self):
         return f"{self.get_metodo_pago_display()} - Bs/ {self.monto}"
 
+    def save(self, *args, **kwargs):
+        # ✅ NUEVO: El monto de cada método de un pago mixto suma a su contador del turno
+        es_nuevo = self._state.adding
+        super().save(*args, **kwargs)
+        if es_nuevo:
+            from .contadores import registrar_detalle_pago
+            registrar_detalle_pago(self)
+
 
 class CierreCaja(models.Model):
     """
@@ -175,6 +219,13 @@ class CierreCaja(models.Model):
     total_propinas = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     numero_pedidos = models.IntegerField(default=0, help_text='Total de pedidos en el turno')
 
+    # ✅ NUEVO: Contadores en vivo (ver contadores.py); los totales de arriba
+    # también se actualizan con cada transacción, no recién al cerrar
+    total_reembolsos = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    reembolsos_efectivo = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Reembolsos pagados en efectivo (salen de la caja)')
+    numero_transacciones = models.IntegerField(default=0)
+    numero_reembolsos = models.IntegerField(default=0)
+
     observaciones = models.TextField(blank=True, null=True)
 
     # Timestamps
@@ -223,8 +274,6 @@ class CierreCaja(models.Model):
         CRÍTICO: Esta validación es OBLIGATORIA para evitar pérdidas.
         NO eliminar la validación de pedidos pendientes.
         """
-        from django.contrib.sessions.models import Session
-        from django.utils import timezone as tz
         from app.pedidos.models import Pedido
         from django.core.exceptions import ValidationError
 
@@ -253,24 +302,11 @@ class CierreCaja(models.Model):
             self.observaciones = observaciones
         self.save()
 
-        # Cerrar todas las sesiones activas de empleados (excepto admins y cajeros)
-        from app.usuarios.models import Usuario
-
-        # Obtener todas las sesiones activas
-        sesiones_activas = Session.objects.filter(expire_date__gte=tz.now())
-
-        for sesion in sesiones_activas:
-            data = sesion.get_decoded()
-            user_id = data.get('_auth_user_id')
-            if user_id:
-                try:
-                    usuario = Usuario.objects.get(id=user_id)
-                    if usuario.rol in ['mesero', 'cocinero']:
-                        # Eliminar la sesión
-                        sesion.delete()
-                        logger.info(f"✅ Sesión cerrada para {usuario.username}")
-                except Usuario.DoesNotExist:
-                    pass
+        # ✅ OPTIMIZADO: Cerrar sesiones de meseros y cocineros con el índice
+        # usuario → sesión (una consulta + DELETE en lote, sin decodificar
+        # cada sesión de django_session)
+        from app.usuarios.sesiones import cerrar_sesiones
+        cerrar_sesiones()
 
 
 class HistorialModificacion(models.Model):
@@ -371,6 +407,7 @@ class AlertaStock(models.Model):
     ]
 
     producto = models.ForeignKey('productos.Producto', on_delete=models.SET_NULL, null=True, related_name='alertas_stock')
+    insumo = models.ForeignKey('inventario.Insumo', on_delete=models.SET_NULL, null=True, blank=True, related_name='alertas_stock')
     producto_nombre = models.CharField(max_length=100, default='Producto sin nombre', help_text='Nombre del producto (guardado para historial)')
     tipo_alerta = models.CharField(max_length=20, choices=TIPO_ALERTA_CHOICES)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='activa')
@@ -386,6 +423,11 @@ class AlertaStock(models.Model):
         verbose_name = 'Alerta de Stock'
         verbose_name_plural = 'Alertas de Stock'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # ✅ NUEVO: Anti-join del escáner de alertas (ver caja.alertas)
+            models.Index(fields=['estado', 'producto'], name='alerta_estado_producto_idx'),
+            models.Index(fields=['estado', 'insumo'], name='alerta_estado_insumo_idx'),
+        ]
 
     def __str__(self):
         nombre = self.producto.nombre if self.producto else self.producto_nombre
@@ -461,6 +503,18 @@ class JornadaLaboral(models.Model):
     def __str__(self):
         return f"Jornada {self.fecha} - {self.get_estado_display()}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # ✅ NUEVO: Publicar el estado en la caché compartida (todos los workers lo ven al instante)
+        from .jornada_cache import publicar_estado_jornada
+        publicar_estado_jornada()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        from .jornada_cache import publicar_estado_jornada
+        publicar_estado_jornada()
+        return resultado
+
     @classmethod
     def jornada_activa(cls):
         """
@@ -538,6 +592,10 @@ class JornadaLaboral(models.Model):
             self.observaciones_cierre = f"{observaciones or ''}\n\n[CIERRE FORZADO] Con {pedidos_pendientes.count()} pedido(s) pendiente(s)"
         self.save()
 
+        # ✅ NUEVO: Cerrar sesiones de meseros y cocineros (índice usuario → sesión)
+        from app.usuarios.sesiones import cerrar_sesiones
+        cerrar_sesiones()
+
     @classmethod
     @transaction.atomic
     def recuperar_jornada_zombie(cls, usuario_autorizador):
@@ -631,6 +689,14 @@ class Reembolso(models.Model):
         blank=True,
         related_name='reembolsos_autorizados'
     )
+    # ✅ NUEVO: Turno de caja del que sale el dinero (se asigna al aplicarlo)
+    cierre_caja = models.ForeignKey(
+        'CierreCaja',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reembolsos'
+    )
 
     # Datos del reembolso
     estado = models.CharField(
@@ -687,11 +753,21 @@ class Reembolso(models.Model):
         if not codigo_autorizacion:
             raise ValidationError("Se requiere código de autorización")
 
+        from .contadores import registrar_reembolso, turno_abierto_id
+
+        # ✅ NUEVO: El dinero sale de la caja del turno de quien lo solicitó
+        # (si ya tiene turno, el reembolso ya se aplicó al crearlo)
+        ya_aplicado = self.cierre_caja_id is not None
+        if not ya_aplicado:
+            self.cierre_caja_id = turno_abierto_id(self.creado_por_id)
+
         self.estado = 'aprobado'
         self.autorizado_por = autorizador
         self.codigo_autorizacion = codigo_autorizacion
         self.autorizado_en = timezone.now()
         self.save()
+        if not ya_aplicado:
+            registrar_reembolso(self)
 
         # Actualizar el pedido
         self.pedido.total_reembolsado += self.monto
@@ -725,3 +801,62 @@ class Reembolso(models.Model):
         self.motivo += f"\n\nMOTIVO DE RECHAZO: {motivo_rechazo}"
         self.autorizado_en = timezone.now()
         self.save()
+
+        # ✅ NUEVO: Si ya se había descontado de un turno, devolverlo al contador
+        if self.cierre_caja_id:
+            from .contadores import registrar_reembolso
+            registrar_reembolso(self, signo=-1)
+
+
+class SecuenciaFactura(models.Model):
+    """
+    ✅ NUEVO: Contador diario de números de factura (ver caja.facturacion).
+
+    Los workers reservan bloques de números con un solo UPSERT atómico; la
+    fila no se toca en cada pago.
+    """
+    fecha = models.DateField(unique=True)
+    ultimo_numero = models.PositiveIntegerField(default=0, help_text='Último número reservado del día')
+    auditada = models.BooleanField(
+        default=False, help_text='Día cerrado con cada número usado o anulado (auditar_numeracion)'
+    )
+
+    class Meta:
+        verbose_name = 'Secuencia de Facturas'
+        verbose_name_plural = 'Secuencias de Facturas'
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"Facturas {self.fecha}: {self.ultimo_numero}"
+
+
+class FacturaAnulada(models.Model):
+    """
+    ✅ NUEVO: Número de factura reservado que no llegó a usarse.
+
+    Resto de un bloque al cambiar de día, o pago revertido después de tomar
+    su número. Cada número del día queda usado (Transaccion) o anulado aquí.
+    """
+    MOTIVO_BLOQUE = 'bloque'
+    MOTIVO_AUDITORIA = 'auditoria'
+
+    MOTIVO_CHOICES = [
+        (MOTIVO_BLOQUE, 'Resto de bloque sin usar'),
+        (MOTIVO_AUDITORIA, 'Sin usar (auditoría)'),
+    ]
+
+    fecha = models.DateField()
+    numero = models.PositiveIntegerField()
+    motivo = models.CharField(max_length=20, choices=MOTIVO_CHOICES)
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Factura Anulada'
+        verbose_name_plural = 'Facturas Anuladas'
+        ordering = ['-fecha', 'numero']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'numero'], name='factura_anulada_unica'),
+        ]
+
+    def __str__(self):
+        return f"Factura anulada {self.fecha} #{self.numero} ({self.get_motivo_display()})"
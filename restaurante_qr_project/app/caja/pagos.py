@@ -0,0 +1,217 @@
+"""
+Motor de pagos de caja (pago simple y mixto).
+
+Cada cobro se procesa dentro de la transacción de BD del endpoint:
+
+1. SELECT ... FOR UPDATE de la fila del Pedido: dos cajeros cobrando el
+   mismo pedido se serializan y el segundo ve el saldo ya actualizado
+2. Todo el cálculo es en Decimal (centavos exactos, sin float)
+3. Transaccion y DetallePago se crean con bulk_create y sus montos se
+   aplican a los contadores del turno en un solo UPDATE
+4. monto_pagado/total_pagado se actualizan con F() en el mismo UPDATE del
+   pedido; el nuevo saldo sale de la fila bloqueada sin releerla
+
+Si el pago se rechaza (ya pagado, montos inválidos, transición de estado no
+permitida) se lanza PagoRechazado antes de escribir nada.
+
+CRÍTICO: Llamar dentro de transaction.atomic (los endpoints ya lo son).
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+
+from app.pedidos.models import Pedido
+from app.pedidos.utils import validar_transicion_estado
+
+from .contadores import registrar_pago, turno_abierto_id
+from .models import DetallePago, Transaccion
+from .utils import calcular_cambio, calcular_total_con_descuento_propina, generar_numero_factura
+
+logger = logging.getLogger('app.caja')
+
+CENTAVO = Decimal('0.01')
+
+
+class PagoRechazado(ValidationError):
+    """
+    El pago no se aplicó (no se escribió nada).
+
+    Attributes:
+        extra (dict): Datos adicionales para la respuesta (p. ej. productos_sin_stock)
+    """
+
+    def __init__(self, mensaje, **extra):
+        self.extra = extra
+        super().__init__(mensaje)
+
+
+def monto_decimal(valor, campo='monto'):
+    """
+    Convierte un monto recibido (str/int/float) a Decimal con 2 decimales.
+
+    Raises:
+        PagoRechazado: Si no es un número mayor a cero
+    """
+    try:
+        monto = Decimal(str(valor)).quantize(CENTAVO)
+    except (InvalidOperation, TypeError, ValueError):
+        raise PagoRechazado(f'El {campo} no es un número válido: {valor}')
+    if not monto.is_finite() or monto <= 0:
+        raise PagoRechazado(f'El {campo} debe ser mayor a cero')
+    return monto
+
+
+def _bloquear_pedido(pedido_id):
+    """Pedido con su fila bloqueada hasta el commit (Pedido.DoesNotExist si no existe)"""
+    pedido = Pedido.objects.select_for_update().get(id=pedido_id)
+    if pedido.estado_pago == 'pagado':
+        raise PagoRechazado('Este pedido ya ha sido pagado')
+    return pedido
+
+
+def _validar_stock(pedido):
+    from .utils import validar_stock_pedido
+
+    es_valido, productos_sin_stock = validar_stock_pedido(pedido)
+    if not es_valido:
+        raise PagoRechazado('Productos sin stock suficiente', productos_sin_stock=productos_sin_stock)
+
+
+def _registrar(pedido, cajero, metodo_pago, monto, total_final, detalles=(), referencia=''):
+    """
+    Escribe la transacción (y sus detalles) y aplica el monto al pedido bloqueado.
+
+    Returns:
+        dict: transaccion, numero_factura, monto_total_pagado, monto_pendiente,
+              total_pedido, pago_completo
+    """
+    monto_pagado = pedido.monto_pagado + monto
+    total_pagado = pedido.total_pagado + monto
+    pago_completo = monto_pagado >= total_final
+
+    campos = ['monto_pagado', 'total_pagado', 'total_final']
+    if pago_completo:
+        # Validar antes de escribir: un 400 no revierte la transacción de BD
+        try:
+            validar_transicion_estado(pedido.estado, Pedido.ESTADO_CERRADO)
+        except ValueError as e:
+            logger.error(f"No se pudo cerrar pedido #{pedido.id}: {e}")
+            raise PagoRechazado(f'No se puede completar el pago: {str(e)}')
+
+    numero_factura = generar_numero_factura()
+    transaccion, = Transaccion.objects.bulk_create([
+        Transaccion(
+            pedido=pedido,
+            cajero=cajero,
+            cierre_caja_id=turno_abierto_id(cajero.id),
+            monto_total=monto,
+            metodo_pago=metodo_pago,
+            estado='procesado',
+            numero_factura=numero_factura,
+            referencia=referencia,
+        )
+    ])
+    detalles = DetallePago.objects.bulk_create([
+        DetallePago(transaccion=transaccion, metodo_pago=metodo, monto=monto_detalle, referencia=ref)
+        for metodo, monto_detalle, ref in detalles
+    ])
+    # bulk_create no pasa por save(): los contadores del turno se aplican aquí
+    registrar_pago(transaccion, detalles)
+
+    pedido.monto_pagado = F('monto_pagado') + monto
+    # ✅ RONDA 3C: total_pagado acumula lo cobrado (base de los reembolsos)
+    pedido.total_pagado = F('total_pagado') + monto
+    pedido.total_final = total_final
+
+    if pago_completo:
+        pedido.estado_pago = 'pagado'
+        pedido.fecha_pago = timezone.now()
+        pedido.cajero_responsable = cajero
+        pedido.forma_pago = metodo_pago
+        pedido.estado = Pedido.ESTADO_CERRADO
+        campos += ['estado_pago', 'fecha_pago', 'cajero_responsable', 'forma_pago', 'estado']
+
+    # save() con update_fields: un UPDATE y los hooks del modelo (versión,
+    # rollup de ventas, contadores del turno al quedar pagado)
+    pedido.save(update_fields=campos)
+    # La fila está bloqueada: los valores resultantes se conocen sin releer
+    pedido.monto_pagado = monto_pagado
+    pedido.total_pagado = total_pagado
+
+    return {
+        'transaccion': transaccion,
+        'numero_factura': numero_factura,
+        'pago_completo': pago_completo,
+        'monto_total_pagado': monto_pagado,
+        'monto_pendiente': max(total_final - monto_pagado, Decimal('0')),
+        'total_pedido': total_final,
+    }
+
+
+def procesar_pago_simple(pedido_id, cajero, metodo_pago, monto_recibido=None, referencia=''):
+    """
+    Cobra un pedido (total o parcialmente) con un solo método de pago.
+
+    Sin monto_recibido se cobra el saldo pendiente. En efectivo el excedente
+    es cambio: la transacción registra solo lo que se aplica al pedido.
+
+    Returns:
+        dict: Ver _registrar() + 'monto_esta_transaccion' y 'cambio'
+
+    Raises:
+        Pedido.DoesNotExist, PagoRechazado
+    """
+    pedido = _bloquear_pedido(pedido_id)
+    _validar_stock(pedido)
+
+    total_final = calcular_total_con_descuento_propina(pedido)
+    pendiente = max(total_final - pedido.monto_pagado, Decimal('0'))
+    recibido = monto_decimal(monto_recibido, 'monto recibido') if monto_recibido else pendiente
+    if recibido <= 0:
+        raise PagoRechazado('El pedido no tiene saldo pendiente')
+
+    cambio = Decimal('0')
+    if metodo_pago == 'efectivo':
+        cambio = calcular_cambio(pendiente, recibido)
+    monto = min(recibido, pendiente)
+
+    resultado = _registrar(pedido, cajero, metodo_pago, monto, total_final, referencia=referencia)
+    resultado.update(pedido=pedido, monto_esta_transaccion=monto, cambio=cambio)
+    return resultado
+
+
+def procesar_pago_mixto(pedido_id, cajero, detalles_pago):
+    """
+    Cobra el saldo pendiente de un pedido repartido en varios métodos.
+
+    Args:
+        detalles_pago (list): [{'metodo', 'monto', 'referencia'}]
+
+    Returns:
+        dict: Ver _registrar() + 'detalles' [(metodo, monto)]
+
+    Raises:
+        Pedido.DoesNotExist, PagoRechazado
+    """
+    pedido = _bloquear_pedido(pedido_id)
+
+    detalles = [
+        (d.get('metodo'), monto_decimal(d.get('monto')), d.get('referencia', ''))
+        for d in detalles_pago
+    ]
+    total_final = calcular_total_con_descuento_propina(pedido)
+    pendiente = max(total_final - pedido.monto_pagado, Decimal('0'))
+    suma_pagos = sum((monto for _, monto, _ in detalles), Decimal('0'))
+    if suma_pagos != pendiente:
+        raise PagoRechazado(
+            f'La suma de pagos (Bs/ {suma_pagos}) no coincide con el total (Bs/ {pendiente})'
+        )
+
+    _validar_stock(pedido)
+
+    resultado = _registrar(pedido, cajero, 'mixto', suma_pagos, total_final, detalles=detalles)
+    resultado.update(pedido=pedido, detalles=[(metodo, monto) for metodo, monto, _ in detalles])
+    return resultado
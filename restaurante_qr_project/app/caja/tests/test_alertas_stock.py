@@ -0,0 +1,89 @@
+"""
+Tests del escáner de alertas de stock por conjuntos (app.caja.alertas)
+"""
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from app.caja.alertas import escanear_alertas_stock
+from app.caja.models import AlertaStock
+from app.inventario.models import Insumo
+from app.productos.models import Producto
+from app.productos.stock import aplicar_deltas_stock
+
+
+class EscanerAlertasStockTestCase(TestCase):
+
+    def _producto(self, nombre, stock, minimo=5, **extra):
+        return Producto.objects.create(
+            nombre=nombre, precio=Decimal('10.00'), requiere_inventario=True,
+            stock_actual=stock, stock_minimo=minimo, **extra
+        )
+
+    def _activas(self):
+        return {a.producto_nombre: a.tipo_alerta for a in AlertaStock.objects.filter(estado='activa')}
+
+    def test_consultas_constantes(self):
+        for i in range(3):
+            self._producto(f'Bajo {i}', 2)
+        with self.assertNumQueries(7):  # savepoint + lock + 3 lecturas + bulk_create + release
+            self.assertEqual(len(escanear_alertas_stock()['creadas']), 3)
+
+        for i in range(30):
+            self._producto(f'Más {i}', 0)
+        Insumo.objects.create(nombre='Harina', stock_actual=1, stock_minimo=3)
+        with self.assertNumQueries(7):
+            self.assertEqual(len(escanear_alertas_stock()['creadas']), 31)
+
+        # Sin cambios: solo lecturas
+        with self.assertNumQueries(6):
+            self.assertEqual(escanear_alertas_stock()['creadas'], [])
+
+    def test_crea_actualiza_y_resuelve(self):
+        bajo = self._producto('Limonada', 3)
+        self._producto('Sopa', 0)
+        self._producto('Sobra', 50)
+        Producto.objects.create(nombre='Sin inventario', precio=Decimal('5.00'), stock_actual=0)
+        Insumo.objects.create(nombre='Azúcar', stock_actual=0, stock_minimo=2)
+
+        escanear_alertas_stock()
+        self.assertEqual(self._activas(), {'Limonada': 'stock_bajo', 'Sopa': 'agotado', 'Azúcar': 'agotado'})
+        self.assertTrue(AlertaStock.objects.get(producto_nombre='Azúcar').insumo_id)
+
+        Producto.objects.filter(id=bajo.id).update(stock_actual=0)
+        Producto.objects.filter(nombre='Sopa').update(stock_actual=20)
+        Insumo.objects.update(stock_actual=10)
+        resultado = escanear_alertas_stock()
+
+        self.assertEqual((resultado['resueltas'], resultado['actualizadas']), (2, 1))
+        self.assertEqual(self._activas(), {'Limonada': 'agotado'})
+        sopa = AlertaStock.objects.get(producto_nombre='Sopa')
+        self.assertEqual(sopa.estado, 'resuelta')
+        self.assertIsNotNone(sopa.fecha_resolucion)
+
+    def test_descuento_en_lote_escanea_al_confirmar(self):
+        producto = self._producto('Jugo', 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_deltas_stock({producto.id: -2})
+        self.assertEqual(self._activas(), {'Jugo': 'stock_bajo'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.refresh_from_db()
+            producto.agregar_stock(10)
+        self.assertEqual(self._activas(), {})
+
+    def test_insumo_descontar_stock(self):
+        insumo = Insumo.objects.create(nombre='Leche', stock_actual=5, stock_minimo=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            insumo.descontar_stock(3)
+        self.assertEqual(self._activas(), {'Leche': 'stock_bajo'})
+
+    def test_comando(self):
+        self._producto('Agua', 1)
+        salida = io.StringIO()
+        call_command('escanear_alertas_stock', stdout=salida)
+        self.assertIn('1 nuevas', salida.getvalue())
+        self.assertEqual(self._activas(), {'Agua': 'stock_bajo'})
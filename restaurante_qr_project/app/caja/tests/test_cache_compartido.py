@@ -0,0 +1,82 @@
+"""
+Tests de la caché compartida entre workers (jornada laboral)
+
+Cada "worker" se simula con un hilo: Django crea una instancia de backend de
+caché por hilo, igual que cada proceso de gunicorn tiene la suya. Con
+FileBasedCache esas instancias no comparten memoria, solo el almacenamiento.
+"""
+import tempfile
+import threading
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app.caja.jornada_cache import jornada_activa_cacheada
+from app.caja.models import JornadaLaboral
+from app.usuarios.models import Usuario
+
+CACHE_COMPARTIDA = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='cache_compartida_test_'),
+    }
+}
+
+
+def en_otro_worker(funcion):
+    """Ejecuta funcion en otro hilo (instancia de caché propia) y devuelve su resultado"""
+    resultado = {}
+
+    def ejecutar():
+        try:
+            resultado['valor'] = funcion()
+        except Exception as e:
+            resultado['error'] = e
+        finally:
+            caches.close_all()
+
+    hilo = threading.Thread(target=ejecutar)
+    hilo.start()
+    hilo.join()
+    if 'error' in resultado:
+        raise resultado['error']
+    return resultado['valor']
+
+
+@override_settings(CACHES=CACHE_COMPARTIDA)
+class CacheCompartidaTestCase(TestCase):
+    """El estado publicado por un worker es visible de inmediato en los demás"""
+
+    def setUp(self):
+        cache.clear()
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.cajero)
+
+    def test_iniciar_y_finalizar_jornada_se_ven_en_otros_workers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_api.post('/api/caja/jornada/iniciar/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        # Otro worker lo lee de la caché (su hilo no ve la transacción del test)
+        self.assertTrue(en_otro_worker(jornada_activa_cacheada))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_api.post('/api/caja/jornada/finalizar/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        # Sin esperar el TTL: todos los workers ven la jornada cerrada
+        self.assertFalse(en_otro_worker(jornada_activa_cacheada))
+        self.assertFalse(en_otro_worker(jornada_activa_cacheada))
+
+    def test_lectura_no_pisa_estado_publicado(self):
+        JornadaLaboral.objects.create(
+            cajero=self.cajero, fecha=timezone.localdate(), estado='activa', hora_inicio=timezone.now()
+        )
+        # La publicación todavía no se confirmó: la lectura va a BD
+        self.assertTrue(jornada_activa_cacheada())
+        cache.set('jornada_laboral_activa', False)
+        # El valor publicado (más nuevo) se respeta
+        self.assertFalse(jornada_activa_cacheada())
@@ -0,0 +1,158 @@
+"""
+Tests de los contadores en vivo del turno de caja (app.caja.contadores)
+"""
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from app.caja.contadores import reconciliar_cierres
+from app.caja.models import CierreCaja, DetallePago, Reembolso, Transaccion
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido
+from app.usuarios.models import Usuario
+
+
+class ContadoresCajaTestCase(TestCase):
+
+    def setUp(self):
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        self.gerente = Usuario.objects.create_user(username='gerente', password='test123', rol='gerente')
+        self.turno = CierreCaja.objects.create(
+            cajero=self.cajero, fecha=date.today(), turno='completo',
+            efectivo_inicial=Decimal('100.00'), efectivo_esperado=Decimal('100.00')
+        )
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+
+    def _pedido(self, **extra):
+        return Pedido.objects.create(mesa=self.mesa, **extra)
+
+    def _cobrar(self, metodo, monto, detalles=None):
+        transaccion = Transaccion.objects.create(
+            pedido=self._pedido(estado='cerrado'), cajero=self.cajero, monto_total=Decimal(monto), metodo_pago=metodo
+        )
+        for metodo_detalle, monto_detalle in detalles or []:
+            DetallePago.objects.create(transaccion=transaccion, metodo_pago=metodo_detalle, monto=Decimal(monto_detalle))
+        return transaccion
+
+    def test_pagos_simples_y_mixtos(self):
+        self._cobrar('efectivo', '50.00')
+        self._cobrar('tarjeta', '30.00')
+        self._cobrar('mixto', '40.00', [('efectivo', '10.00'), ('qr', '30.00')])
+
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.total_efectivo, Decimal('60.00'))
+        self.assertEqual(self.turno.total_tarjeta, Decimal('30.00'))
+        self.assertEqual(self.turno.total_qr, Decimal('30.00'))
+        self.assertEqual(self.turno.total_ventas, Decimal('120.00'))
+        self.assertEqual(self.turno.numero_transacciones, 3)
+        self.assertEqual(self.turno.efectivo_esperado, Decimal('160.00'))
+        self.assertEqual(reconciliar_cierres(), [])
+
+    def test_anular_transaccion_la_resta(self):
+        transaccion = self._cobrar('mixto', '40.00', [('efectivo', '10.00'), ('qr', '30.00')])
+
+        transaccion = Transaccion.objects.get(id=transaccion.id)
+        transaccion.estado = 'cancelado'
+        transaccion.save()
+
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.total_ventas, self.turno.total_qr), (Decimal('0'), Decimal('0')))
+        self.assertEqual(self.turno.numero_transacciones, 0)
+
+    def test_pedido_pagado_suma_descuento_y_propina(self):
+        pedido = self._pedido(descuento=Decimal('5.00'), propina=Decimal('8.00'))
+        pedido.estado_pago = 'pagado'
+        pedido.cajero_responsable = self.cajero
+        pedido.save()
+        pedido.save()  # Guardar de nuevo no vuelve a sumar
+
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.total_descuentos, self.turno.total_propinas), (Decimal('5.00'), Decimal('8.00')))
+        self.assertEqual(self.turno.numero_pedidos, 1)
+
+    def test_pedido_refrescado_o_diferido_no_suma_dos_veces(self):
+        pedido = self._pedido(descuento=Decimal('5.00'))
+        otra_copia = Pedido.objects.get(id=pedido.id)
+        pedido.estado_pago = 'pagado'
+        pedido.cajero_responsable = self.cajero
+        pedido.save()
+
+        # Copia leída antes del pago y refrescada después
+        otra_copia.refresh_from_db()
+        otra_copia.save()
+        # Carga diferida: estado_pago no está en memoria
+        diferido = Pedido.objects.only('id', 'mesa').get(id=pedido.id)
+        diferido.save()
+
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.numero_pedidos, 1)
+        self.assertEqual(self.turno.total_descuentos, Decimal('5.00'))
+
+    def test_anular_transaccion_creada_en_lote(self):
+        transaccion, = Transaccion.objects.bulk_create([Transaccion(
+            pedido=self._pedido(), cajero=self.cajero, cierre_caja=self.turno,
+            monto_total=Decimal('25.00'), metodo_pago='tarjeta', estado='procesado'
+        )])
+        CierreCaja.objects.filter(id=self.turno.id).update(
+            total_ventas=Decimal('25.00'), total_tarjeta=Decimal('25.00'), numero_transacciones=1
+        )
+
+        transaccion.estado = 'cancelado'
+        transaccion.save()
+        transaccion.save()  # Guardar de nuevo no vuelve a restar
+
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.total_ventas, self.turno.total_tarjeta), (Decimal('0'), Decimal('0')))
+        self.assertEqual(self.turno.numero_transacciones, 0)
+
+    def test_reembolso_aprobado_y_rechazado(self):
+        pedido = self._pedido()
+        reembolso = Reembolso.objects.create(
+            pedido=pedido, monto=Decimal('20.00'), metodo='efectivo', motivo='Error', creado_por=self.cajero
+        )
+        reembolso.aprobar(self.gerente, '1234')
+
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.total_reembolsos, Decimal('20.00'))
+        self.assertEqual(self.turno.efectivo_esperado, Decimal('80.00'))
+        self.assertEqual(reconciliar_cierres(), [])
+
+        # Pendiente sin aplicar: rechazarlo no toca los contadores
+        otro = Reembolso.objects.create(
+            pedido=pedido, monto=Decimal('5.00'), metodo='qr', motivo='Error', creado_por=self.cajero
+        )
+        otro.rechazar(self.gerente, 'No corresponde')
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.numero_reembolsos, 1)
+
+    def test_reconciliacion_detecta_y_repara(self):
+        self._cobrar('efectivo', '50.00')
+        CierreCaja.objects.filter(id=self.turno.id).update(total_efectivo=Decimal('0'), numero_transacciones=7)
+
+        desviados = reconciliar_cierres()
+        self.assertEqual({d['campo'] for d in desviados}, {'total_efectivo', 'numero_transacciones'})
+
+        with self.assertRaises(Exception):
+            call_command('reconciliar_caja', stdout=io.StringIO())
+        call_command('reconciliar_caja', '--reparar', stdout=io.StringIO())
+
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.total_efectivo, self.turno.numero_transacciones), (Decimal('50.00'), 1))
+        self.assertEqual(reconciliar_cierres(), [])
+
+    def test_cerrar_caja_lee_una_fila(self):
+        self._cobrar('efectivo', '50.00')
+        self._cobrar('qr', '25.00')
+        self.client.login(username='cajero', password='test123')
+
+        response = self.client.post('/api/caja/turno/cerrar/', {'efectivo_real': '150.00'}, content_type='application/json')
+
+        data = response.json()
+        self.assertTrue(data['success'], data)
+        self.assertEqual(data['cierre']['total_ventas'], 75.0)
+        self.assertEqual(data['cierre']['efectivo_esperado'], 150.0)
+        self.assertEqual(data['cierre']['diferencia'], 0.0)
+        self.assertEqual(data['cierre']['numero_transacciones'], 2)
@@ -0,0 +1,88 @@
+"""
+Tests de la capa de estadísticas de caja (app.caja.estadisticas)
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from app.caja.estadisticas import estadisticas_caja
+from app.caja.models import DetallePago, Transaccion
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido
+from app.usuarios.models import Usuario
+
+
+class EstadisticasCajaTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.hoy = timezone.localdate()
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+
+    def _momento(self, dia, hora=12):
+        return timezone.make_aware(datetime.combine(dia, time(hora)))
+
+    def _cobrar(self, dia, metodo, monto, detalles=(), **pedido):
+        pedido = Pedido.objects.create(mesa=self.mesa, **pedido)
+        Pedido.objects.filter(id=pedido.id).update(fecha=self._momento(dia))
+        transaccion = Transaccion.objects.create(
+            pedido=pedido, cajero=self.cajero, monto_total=Decimal(monto),
+            metodo_pago=metodo, fecha_hora=self._momento(dia)
+        )
+        for metodo_detalle, monto_detalle in detalles:
+            DetallePago.objects.create(transaccion=transaccion, metodo_pago=metodo_detalle, monto=Decimal(monto_detalle))
+
+    def test_totales_en_dos_consultas(self):
+        self._cobrar(self.hoy, 'efectivo', '50.00', descuento=Decimal('5.00'), estado_pago='pagado')
+        self._cobrar(self.hoy, 'tarjeta', '30.00', propina=Decimal('3.00'))
+        self._cobrar(self.hoy, 'mixto', '40.00', [('efectivo', '10.00'), ('qr', '30.00')])
+        self._cobrar(self.hoy - timedelta(days=1), 'movil', '99.00')
+
+        with self.assertNumQueries(2):
+            estadisticas = estadisticas_caja(self.hoy)
+
+        self.assertEqual(estadisticas['totales'], {
+            'efectivo': Decimal('60.00'), 'tarjeta': Decimal('30.00'), 'qr': Decimal('30.00'),
+            'movil': Decimal('0'), 'total': Decimal('120.00'),
+        })
+        self.assertEqual(estadisticas['numero_transacciones'], 3)
+        self.assertEqual((estadisticas['total_pedidos'], estadisticas['pedidos_pagados']), (3, 1))
+        self.assertEqual((estadisticas['total_descuentos'], estadisticas['total_propinas']), (Decimal('5.00'), Decimal('3.00')))
+
+        # Rango de dos días
+        rango = estadisticas_caja(self.hoy - timedelta(days=1), self.hoy)
+        self.assertEqual(rango['totales']['movil'], Decimal('99.00'))
+        self.assertEqual(rango['numero_transacciones'], 4)
+
+    def test_limites_del_dia_en_hora_local(self):
+        ayer = self.hoy - timedelta(days=1)
+        self._cobrar(ayer, 'efectivo', '10.00')
+        Transaccion.objects.update(fecha_hora=self._momento(ayer, 23) + timedelta(minutes=59))
+
+        self.assertEqual(estadisticas_caja(ayer)['totales']['efectivo'], Decimal('10.00'))
+        self.assertEqual(estadisticas_caja(self.hoy)['totales']['efectivo'], Decimal('0'))
+
+    def test_dias_pasados_se_cachean(self):
+        ayer = self.hoy - timedelta(days=1)
+        self._cobrar(ayer, 'efectivo', '10.00')
+        estadisticas_caja(ayer)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(estadisticas_caja(ayer)['totales']['total'], Decimal('10.00'))
+
+        # Hoy siempre se calcula en vivo
+        estadisticas_caja(self.hoy)
+        with self.assertNumQueries(2):
+            estadisticas_caja(self.hoy)
+
+    def test_api_comparte_la_capa(self):
+        self._cobrar(self.hoy, 'qr', '25.00', estado_pago='pagado')
+        self.client.login(username='cajero', password='test123')
+
+        data = self.client.get('/api/caja/estadisticas/').json()['estadisticas']
+        self.assertEqual(data['totales']['qr'], 25.0)
+        self.assertEqual(data['pedidos_pagados'], 1)
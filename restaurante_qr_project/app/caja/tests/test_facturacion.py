@@ -0,0 +1,135 @@
+"""
+Tests de la numeración secuencial de facturas (app.caja.facturacion)
+
+TransactionTestCase: los bloques se reservan en una conexión propia que
+confirma al instante (fuera de la transacción del test).
+"""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from app.caja import facturacion
+from app.caja.facturacion import anular_sin_usar, auditar_numeracion, formatear_numero, siguiente_numero_factura
+from app.caja.models import FacturaAnulada, SecuenciaFactura, Transaccion
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido
+from app.usuarios.models import Usuario
+
+
+@override_settings(FACTURACION_BLOQUE=3, FACTURACION_MARGEN_HORAS=0)
+class NumeracionFacturasTestCase(TransactionTestCase):
+
+    def setUp(self):
+        facturacion._bloques.actual = None
+        self.hoy = timezone.localdate()
+        self.ayer = self.hoy - timedelta(days=1)
+
+    def tearDown(self):
+        facturacion._bloques.actual = None
+
+    def test_numeros_secuenciales_por_bloques(self):
+        numeros = [siguiente_numero_factura() for _ in range(5)]
+
+        self.assertEqual(numeros, [formatear_numero(self.hoy, n) for n in range(1, 6)])
+        self.assertTrue(numeros[0].startswith(f"FACT-{self.hoy:%Y%m%d}-0000"))
+        # Dos bloques de 3: una reserva cada 3 números
+        self.assertEqual(SecuenciaFactura.objects.get(fecha=self.hoy).ultimo_numero, 6)
+
+    def test_reserva_no_se_revierte_con_el_pago(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                siguiente_numero_factura()
+                raise RuntimeError('pago revertido')
+
+        facturacion._bloques.actual = None  # Otro worker
+        self.assertEqual(siguiente_numero_factura(), formatear_numero(self.hoy, 4))
+
+    def test_cambio_de_dia_anula_el_resto_del_bloque(self):
+        with mock.patch('app.caja.facturacion.timezone.localdate', return_value=self.ayer):
+            self.assertEqual(siguiente_numero_factura(), formatear_numero(self.ayer, 1))
+
+        self.assertEqual(siguiente_numero_factura(), formatear_numero(self.hoy, 1))
+        self.assertEqual(
+            list(FacturaAnulada.objects.filter(fecha=self.ayer).values_list('numero', 'motivo')),
+            [(2, FacturaAnulada.MOTIVO_BLOQUE), (3, FacturaAnulada.MOTIVO_BLOQUE)]
+        )
+
+    def test_auditoria_anula_huecos_de_dias_cerrados(self):
+        cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        mesa = Mesa.objects.create(numero=1, capacidad=4)
+        SecuenciaFactura.objects.create(fecha=self.ayer, ultimo_numero=5)
+        for numero in (1, 2, 4):
+            Transaccion.objects.create(
+                pedido=Pedido.objects.create(mesa=mesa), cajero=cajero, monto_total=Decimal('10.00'),
+                metodo_pago='efectivo', numero_factura=formatear_numero(self.ayer, numero)
+            )
+        FacturaAnulada.objects.create(fecha=self.ayer, numero=5, motivo=FacturaAnulada.MOTIVO_BLOQUE)
+
+        self.assertEqual(auditar_numeracion(self.ayer)['sin_usar'], [3])
+        with self.assertRaises(CommandError):
+            call_command('auditar_facturas', stdout=io.StringIO())
+
+        call_command('auditar_facturas', '--anular', stdout=io.StringIO())
+        self.assertEqual(auditar_numeracion(self.ayer)['sin_usar'], [])
+        call_command('auditar_facturas', stdout=io.StringIO())
+
+        # Hoy hay bloques en uso: no se anula
+        with self.assertRaises(ValueError):
+            auditar_numeracion(self.hoy, anular=True)
+
+    def test_tarea_audita_todos_los_dias_cerrados_pendientes(self):
+        # El runner no corrió en días anteriores: quedaron sin auditar
+        anteayer = self.ayer - timedelta(days=1)
+        SecuenciaFactura.objects.create(fecha=anteayer - timedelta(days=1), ultimo_numero=2)
+        SecuenciaFactura.objects.create(fecha=anteayer, ultimo_numero=1, auditada=True)
+        SecuenciaFactura.objects.create(fecha=self.ayer, ultimo_numero=3)
+
+        self.assertEqual(anular_sin_usar(), {
+            (anteayer - timedelta(days=1)).isoformat(): 2, self.ayer.isoformat(): 3
+        })
+        self.assertEqual(FacturaAnulada.objects.filter(motivo=FacturaAnulada.MOTIVO_AUDITORIA).count(), 5)
+        self.assertFalse(SecuenciaFactura.objects.filter(auditada=False).exists())
+        self.assertEqual(anular_sin_usar(), {})
+
+    @override_settings(FACTURACION_MARGEN_HORAS=6)
+    def test_ayer_no_se_anula_dentro_del_margen(self):
+        SecuenciaFactura.objects.create(fecha=self.ayer - timedelta(days=1), ultimo_numero=1)
+        SecuenciaFactura.objects.create(fecha=self.ayer, ultimo_numero=1)
+        pasada_medianoche = timezone.make_aware(datetime.combine(self.hoy, time(0, 5)))
+
+        with mock.patch('app.caja.facturacion.timezone.localtime', return_value=pasada_medianoche):
+            # El número de las 23:59 puede estar en un pago que todavía no confirmó
+            self.assertEqual(anular_sin_usar(), {(self.ayer - timedelta(days=1)).isoformat(): 1})
+            with self.assertRaises(ValueError):
+                auditar_numeracion(self.ayer, anular=True)
+
+        self.assertFalse(FacturaAnulada.objects.filter(fecha=self.ayer).exists())
+        pasado_el_margen = timezone.make_aware(datetime.combine(self.hoy, time(12, 0)))
+        with mock.patch('app.caja.facturacion.timezone.localtime', return_value=pasado_el_margen):
+            self.assertEqual(anular_sin_usar(), {self.ayer.isoformat(): 1})
+
+    def test_workers_concurrentes_sin_duplicados(self):
+        hilos, por_hilo = 10, 5
+        barrera = threading.Barrier(hilos)
+
+        def facturar(_):
+            try:
+                barrera.wait()
+                return [siguiente_numero_factura() for _ in range(por_hilo)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            numeros = [numero for lote in pool.map(facturar, range(hilos)) for numero in lote]
+
+        self.assertEqual(len(set(numeros)), hilos * por_hilo)
+        # Cada hilo reservó 2 bloques de 3 (usó 5): 10 números sobrantes
+        self.assertEqual(SecuenciaFactura.objects.get(fecha=self.hoy).ultimo_numero, hilos * 6)
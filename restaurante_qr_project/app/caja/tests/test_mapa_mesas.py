@@ -0,0 +1,94 @@
+"""
+Tests para el read model del mapa de mesas (consultas constantes)
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app.caja.mapa_mesas import construir_mapa_mesas
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido, DetallePedido
+from app.productos.models import Producto, Categoria
+from app.usuarios.models import Usuario
+
+
+class MapaMesasConsultasTestCase(TestCase):
+    """El costo del mapa no debe crecer con el número de mesas"""
+
+    def setUp(self):
+        cache.clear()
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        categoria = Categoria.objects.create(nombre='Comida')
+        self.producto = Producto.objects.create(
+            nombre='Pizza',
+            precio=Decimal('40.00'),
+            categoria=categoria,
+            disponible=True
+        )
+        self.siguiente_numero = 1
+
+    def _crear_mesas_con_pedidos(self, cantidad):
+        for _ in range(cantidad):
+            mesa = Mesa.objects.create(numero=self.siguiente_numero, capacidad=4, estado='ocupada')
+            self.siguiente_numero += 1
+            # El total (80) lo aporta la línea (totales incrementales)
+            pedido = Pedido.objects.create(mesa=mesa, monto_pagado=Decimal('30.00'))
+            DetallePedido.objects.create(pedido=pedido, producto=self.producto, cantidad=2)
+
+    def _contar_consultas(self):
+        with CaptureQueriesContext(connection) as contexto:
+            construir_mapa_mesas()
+        return len(contexto.captured_queries)
+
+    def test_consultas_constantes_al_crecer_mesas(self):
+        """5 mesas y 60 mesas cuestan las mismas consultas"""
+        self._crear_mesas_con_pedidos(5)
+        consultas_pocas = self._contar_consultas()
+
+        self._crear_mesas_con_pedidos(55)
+        consultas_muchas = self._contar_consultas()
+
+        self.assertEqual(consultas_pocas, consultas_muchas)
+        self.assertLessEqual(consultas_muchas, 3)
+
+    def test_payload_totales_y_productos(self):
+        """El total pendiente descuenta pagos parciales y lista las líneas de la mesa"""
+        self._crear_mesas_con_pedidos(1)
+        Mesa.objects.create(numero=99, capacidad=2, estado='reservada')
+
+        mesas = {m['numero']: m for m in construir_mapa_mesas()}
+
+        self.assertEqual(mesas[1]['pedidos_activos'], 1)
+        self.assertEqual(mesas[1]['total_pendiente'], 50.0)
+        self.assertEqual(mesas[1]['color'], 'rojo')
+        self.assertEqual(mesas[1]['productos'][0]['nombre'], 'Pizza')
+        self.assertEqual(mesas[99]['pedidos_activos'], 0)
+        self.assertEqual(mesas[99]['color'], 'amarillo')
+
+    @override_settings(MAPA_MESAS_CACHE_TIMEOUT=60)
+    def test_proyeccion_cacheada_se_invalida_con_escrituras(self):
+        """La API reutiliza la proyección mientras el cursor no avance"""
+        self._crear_mesas_con_pedidos(3)
+        client = APIClient()
+        client.force_authenticate(self.cajero)
+
+        client.get('/api/caja/mapa-mesas/')
+        with CaptureQueriesContext(connection) as contexto:
+            response = client.get('/api/caja/mapa-mesas/')
+        self.assertEqual(response.status_code, 200)
+        consultas_cacheadas = len(contexto.captured_queries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = Pedido.objects.first()
+            pedido.estado_pago = 'pagado'
+            pedido.save()
+
+        with CaptureQueriesContext(connection) as contexto:
+            response = client.get('/api/caja/mapa-mesas/')
+        self.assertGreater(len(contexto.captured_queries), consultas_cacheadas)
+        activos = sum(m['pedidos_activos'] for m in response.json()['mesas'])
+        self.assertEqual(activos, 2)
@@ -0,0 +1,152 @@
+"""
+Tests del motor de pagos de caja (app.caja.pagos)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from app.caja.contadores import reconciliar_cierres
+from app.caja.models import CierreCaja, DetallePago, Transaccion
+from app.caja.pagos import PagoRechazado, procesar_pago_simple
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido
+from app.usuarios.models import Usuario
+
+
+class PagosMixin:
+
+    def crear_datos(self):
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        self.turno = CierreCaja.objects.create(
+            cajero=self.cajero, fecha=date.today(), turno='completo',
+            efectivo_inicial=Decimal('100.00'), efectivo_esperado=Decimal('100.00')
+        )
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4, estado='ocupada')
+        self.pedido = Pedido.objects.create(
+            mesa=self.mesa, estado='entregado', total=Decimal('100.00'), total_final=Decimal('100.00')
+        )
+
+
+class ProcesarPagoTestCase(PagosMixin, TestCase):
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.login(username='cajero', password='test123')
+
+    def _pagar(self, **datos):
+        return self.client.post('/api/caja/pago/simple/', {'pedido_id': self.pedido.id, **datos}, content_type='application/json')
+
+    def test_pagos_parciales_hasta_completar(self):
+        respuesta = self._pagar(metodo_pago='tarjeta', monto_recibido='33.33').json()
+        self.assertFalse(respuesta['pago_completo'])
+        self.assertEqual(respuesta['monto_pendiente'], 66.67)
+
+        # Efectivo: el excedente es cambio y no se registra como venta
+        respuesta = self._pagar(metodo_pago='efectivo', monto_recibido='70.00').json()
+        self.assertTrue(respuesta['pago_completo'])
+        self.assertEqual((respuesta['monto_esta_transaccion'], respuesta['cambio']), (66.67, 3.33))
+
+        self.pedido.refresh_from_db()
+        self.assertEqual((self.pedido.monto_pagado, self.pedido.total_pagado), (Decimal('100.00'), Decimal('100.00')))
+        self.assertEqual((self.pedido.estado_pago, self.pedido.estado), ('pagado', 'cerrado'))
+        self.mesa.refresh_from_db()
+        self.assertEqual(self.mesa.estado, 'disponible')
+
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.total_tarjeta, self.turno.total_efectivo), (Decimal('33.33'), Decimal('66.67')))
+        self.assertEqual(self.turno.numero_transacciones, 2)
+        self.assertEqual(reconciliar_cierres(), [])
+
+        respuesta = self._pagar(metodo_pago='efectivo')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['error'], 'Este pedido ya ha sido pagado')
+
+    def test_pago_mixto_en_lote(self):
+        respuesta = self.client.post('/api/caja/pago/mixto/', {
+            'pedido_id': self.pedido.id,
+            'detalles_pago': [{'metodo': 'efectivo', 'monto': '40.10'}, {'metodo': 'qr', 'monto': 59.9}],
+        }, content_type='application/json')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['total_pagado'], 100.0)
+        transaccion = Transaccion.objects.get(pedido=self.pedido)
+        self.assertEqual((transaccion.metodo_pago, transaccion.cierre_caja_id), ('mixto', self.turno.id))
+        self.assertEqual(DetallePago.objects.filter(transaccion=transaccion).count(), 2)
+
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.total_efectivo, self.turno.total_qr), (Decimal('40.10'), Decimal('59.90')))
+        self.assertEqual(self.turno.total_ventas, Decimal('100.00'))
+        self.assertEqual(reconciliar_cierres(), [])
+
+    def test_rechazos_no_escriben_nada(self):
+        respuesta = self.client.post('/api/caja/pago/mixto/', {
+            'pedido_id': self.pedido.id,
+            'detalles_pago': [{'metodo': 'efectivo', 'monto': '40.00'}, {'metodo': 'qr', 'monto': '50.00'}],
+        }, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+
+        self.assertEqual(self._pagar(metodo_pago='tarjeta', monto_recibido='abc').status_code, 400)
+        self.assertEqual(self._pagar(metodo_pago='tarjeta', pedido_id=999999).status_code, 404)
+
+        # Pedido que no puede cerrarse: se rechaza antes de crear la transacción
+        Pedido.objects.filter(id=self.pedido.id).update(estado='en_preparacion')
+        self.assertEqual(self._pagar(metodo_pago='tarjeta').status_code, 400)
+
+        self.assertFalse(Transaccion.objects.exists())
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.monto_pagado, Decimal('0'))
+
+
+class PagosConcurrentesTestCase(PagosMixin, TransactionTestCase):
+    """Varios cajeros cobrando el mismo pedido a la vez (hilos con conexiones propias)"""
+
+    HILOS = 20
+
+    def setUp(self):
+        self.crear_datos()
+
+    def _en_paralelo(self, monto):
+        barrera = threading.Barrier(self.HILOS)
+
+        def pagar(_):
+            try:
+                barrera.wait()
+                with transaction.atomic():
+                    procesar_pago_simple(self.pedido.id, self.cajero, 'tarjeta', monto)
+                return 'ok'
+            except PagoRechazado:
+                return 'rechazado'
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.HILOS) as pool:
+            return list(pool.map(pagar, range(self.HILOS)))
+
+    def test_pagos_parciales_concurrentes_no_se_pierden(self):
+        resultados = self._en_paralelo('5.00')
+
+        self.assertEqual(resultados.count('ok'), self.HILOS)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.monto_pagado, Decimal('100.00'))
+        self.assertEqual(self.pedido.total_pagado, Decimal('100.00'))
+        self.assertEqual(self.pedido.estado_pago, 'pagado')
+        self.assertEqual(Transaccion.objects.filter(pedido=self.pedido).count(), self.HILOS)
+
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.total_tarjeta, Decimal('100.00'))
+        self.assertEqual(self.turno.numero_transacciones, self.HILOS)
+        self.assertEqual(self.turno.numero_pedidos, 1)
+        self.assertEqual(reconciliar_cierres(), [])
+
+    def test_pagos_completos_concurrentes_cobran_una_vez(self):
+        resultados = self._en_paralelo(None)
+
+        self.assertEqual(resultados.count('ok'), 1)
+        self.assertEqual(resultados.count('rechazado'), self.HILOS - 1)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.monto_pagado, Decimal('100.00'))
+        self.assertEqual(Transaccion.objects.filter(pedido=self.pedido).count(), 1)
@@ -1,17 +1,17 @@
-from django.utils import timezone
-from django.db.models import Sum
 from decimal import Decimal
-import uuid
 
 
 def generar_numero_factura():
     """
     Genera un número de factura único
-    Formato: FACT-YYYYMMDD-XXXXX
+    Formato: FACT-YYYYMMDD-NNNNNN
+
+    ✅ NUEVO: Secuencial por día, entregado desde bloques reservados por
+    worker (app.caja.facturacion).
     """
-    fecha_str = timezone.now().strftime('%Y%m%d')
-    uuid_str = str(uuid.uuid4())[:8].upper()
-    return f"FACT-{fecha_str}-{uuid_str}"
+    from .facturacion import siguiente_numero_factura
+
+    return siguiente_numero_factura()
 
 
 def calcular_cambio(total, monto_recibido):
@@ -48,37 +48,29 @@ def validar_stock_pedido(pedido):
 def descontar_stock_pedido(pedido):
     """
     Descuenta el stock de todos los productos del pedido
+
+    ✅ OPTIMIZADO: Un solo lote bloqueado (app.productos.stock). Como antes,
+    los productos sin stock suficiente se omiten sin bloquear el cobro.
     """
-    for detalle in pedido.detalles.all():
-        producto = detalle.producto
-        if producto.requiere_inventario:
-            producto.descontar_stock(detalle.cantidad)
+    from app.productos.stock import descontar_stock_pedidos
+
+    descontar_stock_pedidos([pedido.id], permitir_parcial=True)
 
 
 def calcular_totales_caja(transacciones):
     """
     Calcula los totales por método de pago de una lista de transacciones
-    """
-    totales = {
-        'efectivo': Decimal('0'),
-        'tarjeta': Decimal('0'),
-        'qr': Decimal('0'),
-        'movil': Decimal('0'),
-        'total': Decimal('0'),
-    }
 
-    for transaccion in transacciones:
-        # Si es pago simple
-        if transaccion.metodo_pago in totales:
-            totales[transaccion.metodo_pago] += transaccion.monto_total
+    ✅ OPTIMIZADO: Una consulta agrupada en BD (estadisticas.totales_por_metodo)
+    en lugar de recorrer las transacciones con un SELECT de detalles por cada una.
 
-        # Si es pago mixto, sumar los detalles
-        for detalle in transaccion.detalles_pago.all():
-            if detalle.metodo_pago in totales:
-                totales[detalle.metodo_pago] += detalle.monto
-
-        totales['total'] += transaccion.monto_total
+    Args:
+        transacciones (QuerySet): Transacciones a totalizar
+    """
+    from .estadisticas import totales_por_metodo
 
+    totales = totales_por_metodo(transacciones)
+    totales.pop('cantidad')
     return totales
 
 
@@ -103,42 +95,14 @@ def crear_historial_modificacion(pedido, usuario, tipo_cambio, detalle_anterior,
 def verificar_alertas_stock():
     """
     Verifica y crea alertas para productos con stock bajo o agotado
+
+    ✅ OPTIMIZADO: Escaneo por conjuntos con consultas constantes
+    (app.caja.alertas); también cubre insumos y resuelve las alertas de
+    productos ya repuestos.
     """
-    from app.productos.models import Producto
-    from .models import AlertaStock
-
-    productos = Producto.objects.filter(requiere_inventario=True)
-    alertas_creadas = []
-
-    for producto in productos:
-        # Verificar si ya existe una alerta activa
-        alerta_existente = AlertaStock.objects.filter(
-            producto=producto,
-            estado='activa'
-        ).exists()
-
-        if alerta_existente:
-            continue
-
-        # Crear alerta si está agotado
-        if producto.agotado:
-            alerta = AlertaStock.objects.create(
-                producto=producto,
-                tipo_alerta='agotado',
-                stock_actual=producto.stock_actual
-            )
-            alertas_creadas.append(alerta)
-
-        # Crear alerta si el stock está bajo
-        elif producto.stock_bajo:
-            alerta = AlertaStock.objects.create(
-                producto=producto,
-                tipo_alerta='stock_bajo',
-                stock_actual=producto.stock_actual
-            )
-            alertas_creadas.append(alerta)
-
-    return alertas_creadas
+    from .alertas import escanear_alertas_stock
+
+    return escanear_alertas_stock()['creadas']
 
 
 def obtener_pedidos_pendientes_pago():
@@ -251,45 +215,24 @@ def aplicar_propina(pedido, monto_propina, usuario):
 def obtener_estadisticas_caja_dia(fecha=None):
     """
     Obtiene estadísticas de caja para un día específico
-    """
-    from .models import Transaccion
-    from app.pedidos.models import Pedido
-
-    if fecha is None:
-        fecha = timezone.now().date()
 
-    # Transacciones del día
-    transacciones = Transaccion.objects.filter(
-        fecha_hora__date=fecha,
-        estado='procesado'
-    )
-
-    # Pedidos del día
-    pedidos = Pedido.objects.filter(
-        fecha__date=fecha
-    )
-
-    # Calcular totales
-    totales = calcular_totales_caja(transacciones)
-
-    # Estadísticas de pedidos
-    total_pedidos = pedidos.count()
-    pedidos_pagados = pedidos.filter(estado_pago='pagado').count()
-    pedidos_pendientes = pedidos.filter(estado_pago='pendiente').count()
+    ✅ OPTIMIZADO: Dos consultas agrupadas por rango de fechas, con caché para
+    días pasados (ver estadisticas.py)
+    """
+    from .estadisticas import estadisticas_caja
 
-    # Descuentos y propinas
-    total_descuentos = pedidos.aggregate(Sum('descuento'))['descuento__sum'] or Decimal('0')
-    total_propinas = pedidos.aggregate(Sum('propina'))['propina__sum'] or Decimal('0')
+    estadisticas = estadisticas_caja(fecha)
 
     return {
-        'fecha': fecha,
-        'totales': totales,
-        'total_pedidos': total_pedidos,
-        'pedidos_pagados': pedidos_pagados,
-        'pedidos_pendientes': pedidos_pendientes,
-        'total_descuentos': float(total_descuentos),
-        'total_propinas': float(total_propinas),
-        'promedio_por_pedido': float(totales['total'] / total_pedidos) if total_pedidos > 0 else 0,
+        'fecha': estadisticas['desde'],
+        'totales': estadisticas['totales'],
+        'total_pedidos': estadisticas['total_pedidos'],
+        'pedidos_pagados': estadisticas['pedidos_pagados'],
+        'pedidos_pendientes': estadisticas['pedidos_pendientes'],
+        'numero_transacciones': estadisticas['numero_transacciones'],
+        'total_descuentos': float(estadisticas['total_descuentos']),
+        'total_propinas': float(estadisticas['total_propinas']),
+        'promedio_por_pedido': float(estadisticas['promedio_por_pedido']),
     }
 
 # ✅ RONDA 3C: Helper para calcular saldo reembolsable
@@ -3,7 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
 from django.views.decorators.csrf import ensure_csrf_cookie
 from datetime import date, datetime
 
@@ -329,28 +329,33 @@ def cierre_caja(request):
         messages.error(request, 'No tienes un turno abierto para cerrar.')
         return redirect('panel_caja')
 
-    # Obtener transacciones del turno
-    transacciones = Transaccion.objects.filter(
-        cajero=request.user,
-        fecha_hora__date=date.today(),
+    # ✅ OPTIMIZADO: Los totales del turno se mantienen en vivo en la propia
+    # fila (ver contadores.py); solo se listan las últimas transacciones
+    totales = {
+        'efectivo': turno_abierto.total_efectivo,
+        'tarjeta': turno_abierto.total_tarjeta,
+        'qr': turno_abierto.total_qr,
+        'movil': turno_abierto.total_movil,
+        'total': turno_abierto.total_ventas,
+    }
+    ultimas_transacciones = turno_abierto.transacciones.filter(
         estado='procesado'
-    )
-
-    # Calcular totales por método
-    from .utils import calcular_totales_caja
-    totales = calcular_totales_caja(transacciones)
-
-    # Calcular efectivo esperado
-    efectivo_esperado = turno_abierto.efectivo_inicial + totales['efectivo']
+    ).select_related('pedido__mesa').order_by('-fecha_hora')[:10]
 
     context = {
         'user': request.user,
         'title': 'Cierre de Caja',
         'turno': turno_abierto,
-        'transacciones': transacciones,
+        'cierre': turno_abierto,
         'totales': totales,
-        'efectivo_esperado': efectivo_esperado,
-        'numero_transacciones': transacciones.count(),
+        'efectivo_esperado': turno_abierto.efectivo_esperado,
+        'numero_transacciones': turno_abierto.numero_transacciones,
+        'total_transacciones': turno_abierto.numero_transacciones,
+        'ticket_promedio': (
+            turno_abierto.total_ventas / turno_abierto.numero_transacciones
+            if turno_abierto.numero_transacciones else 0
+        ),
+        'ultimas_transacciones': ultimas_transacciones,
     }
 
     return render(request, 'cajero/cierre_caja.html', context)
@@ -631,46 +636,29 @@ def estadisticas_dia_api(request):
     """
     API para obtener estadísticas del día en tiempo real
     Usado por el panel unificado para actualizar datos
-    """
-    from datetime import date
-
-    hoy = date.today()
-
-    # Pedidos del día
-    pedidos_hoy = Pedido.objects.filter(fecha__date=hoy)
-    total_pedidos = pedidos_hoy.count()
-    pedidos_pagados = pedidos_hoy.filter(estado_pago='pagado').count()
-    pedidos_pendientes = pedidos_hoy.filter(estado_pago='pendiente').count()
 
-    # Ingresos del día
-    ingresos_totales = pedidos_hoy.filter(estado_pago='pagado').aggregate(
-        total=Sum('total')
-    )['total'] or 0
+    ✅ OPTIMIZADO: Comparte la capa de estadísticas con api_estadisticas_dia
+    (consultas agrupadas, ver estadisticas.py) y cuenta las mesas en una consulta
+    """
+    from .estadisticas import estadisticas_caja
 
-    # Pedidos por estado (usando constantes válidas)
-    from app.pedidos.models import Pedido
-    creados = pedidos_hoy.filter(estado=Pedido.ESTADO_CREADO).count()
-    en_preparacion = pedidos_hoy.filter(estado=Pedido.ESTADO_EN_PREPARACION).count()
-    listos = pedidos_hoy.filter(estado=Pedido.ESTADO_LISTO).count()
-    entregados = pedidos_hoy.filter(estado=Pedido.ESTADO_ENTREGADO).count()
+    estadisticas = estadisticas_caja()
 
-    # Mesas ocupadas
-    mesas_ocupadas = Mesa.objects.filter(estado='ocupada').count()
-    mesas_totales = Mesa.objects.count()
+    mesas = Mesa.objects.aggregate(
+        ocupadas=Count('id', filter=Q(estado='ocupada')),
+        totales=Count('id'),
+    )
+    mesas_ocupadas = mesas['ocupadas']
+    mesas_totales = mesas['totales']
 
     return JsonResponse({
         'success': True,
         'estadisticas': {
-            'total_pedidos': total_pedidos,
-            'pedidos_pagados': pedidos_pagados,
-            'pedidos_pendientes': pedidos_pendientes,
-            'ingresos_totales': float(ingresos_totales),
-            'pedidos_por_estado': {
-                'creados': creados,  # renombrado de 'pendientes'
-                'en_preparacion': en_preparacion,
-                'listos': listos,
-                'entregados': entregados,
-            },
+            'total_pedidos': estadisticas['total_pedidos'],
+            'pedidos_pagados': estadisticas['pedidos_pagados'],
+            'pedidos_pendientes': estadisticas['pedidos_pendientes'],
+            'ingresos_totales': float(estadisticas['ingresos_totales']),
+            'pedidos_por_estado': estadisticas['pedidos_por_estado'],  # 'creados' renombrado de 'pendientes'
             'mesas': {
                 'ocupadas': mesas_ocupadas,
                 'totales': mesas_totales,
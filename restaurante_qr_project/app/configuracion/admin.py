@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ConfiguracionSistema
+from .models import ClaveIdempotencia, ConfiguracionSistema, TareaProgramada
 
 
 @admin.register(ConfiguracionSistema)
@@ -41,3 +41,33 @@ class ConfiguracionSistemaAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """No permitir borrar configuración"""
         return False
+
+
+@admin.register(TareaProgramada)
+class TareaProgramadaAdmin(admin.ModelAdmin):
+    """Agenda del runner de tareas periódicas (ejecutar_tareas_programadas)"""
+
+    list_display = ('nombre', 'intervalo_segundos', 'activa', 'proxima_ejecucion', 'ultima_ejecucion', 'ultimo_estado', 'ultima_duracion_ms')
+    list_filter = ('activa', 'ultimo_estado')
+    list_editable = ('intervalo_segundos', 'activa')
+    readonly_fields = (
+        'nombre', 'descripcion', 'bloqueada_hasta', 'bloqueada_por', 'ultima_ejecucion',
+        'ultimo_estado', 'ultimo_error', 'ultima_duracion_ms', 'ejecuciones'
+    )
+
+    def has_add_permission(self, request):
+        """Las tareas se registran en código (configuracion.tareas)"""
+        return False
+
+
+@admin.register(ClaveIdempotencia)
+class ClaveIdempotenciaAdmin(admin.ModelAdmin):
+    """Respuestas registradas por Idempotency-Key (solo lectura)"""
+
+    list_display = ('clave', 'ambito', 'estado_http', 'fecha_creacion', 'expira')
+    list_filter = ('estado_http',)
+    search_fields = ('clave', 'ambito')
+    readonly_fields = ('ambito', 'clave', 'huella', 'estado_http', 'respuesta', 'fecha_creacion', 'expira')
+
+    def has_add_permission(self, request):
+        return False
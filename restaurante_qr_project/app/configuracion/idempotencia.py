@@ -0,0 +1,133 @@
+"""
+Idempotency-Key para endpoints POST que mueven dinero o stock.
+
+Los dispositivos en Wi-Fi inestable reintentan la misma petición. Con el
+encabezado `Idempotency-Key` la primera ejecución guarda su respuesta
+(ClaveIdempotencia) y los reintentos la reciben tal cual, sin pasar por
+validaciones, stock ni escrituras:
+
+1. INSERT ... ON CONFLICT DO NOTHING de la clave (ámbito = usuario)
+2. SELECT ... FOR UPDATE de la fila: un duplicado concurrente espera aquí
+   hasta que la primera petición confirme
+3. Si ya hay respuesta registrada se repite (encabezado Idempotent-Replayed)
+4. Si no, se ejecuta la vista en la misma transacción y se guarda su
+   respuesta (salvo 5xx: el siguiente reintento vuelve a ejecutarla)
+
+Una clave reutilizada con otra petición (método, ruta o cuerpo distintos)
+se rechaza con 422. Sin encabezado la vista se ejecuta como siempre. Las
+claves vencen a las IDEMPOTENCIA_TTL_HORAS (default 24); la tarea
+programada 'limpiar_claves_idempotencia' las borra.
+
+Uso (debajo de @api_view/@permission_classes, ya autenticado):
+
+    @api_view(['POST'])
+    @permission_classes([IsAuthenticated])
+    @idempotente
+    def mi_vista(request): ...
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ClaveIdempotencia
+
+logger = logging.getLogger('app.configuracion')
+
+ENCABEZADO = 'Idempotency-Key'
+ENCABEZADO_REPETIDA = 'Idempotent-Replayed'
+LONGITUD_MAXIMA = 255
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCIA_TTL_HORAS', 24))
+
+
+def huella_peticion(request):
+    """SHA-256 de método, ruta y cuerpo (JSON canónico) de la petición"""
+    cuerpo = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{cuerpo}'.encode()).hexdigest()
+
+
+def _bloquear_clave(ambito, clave, huella, ahora):
+    """
+    Fila de la clave bloqueada hasta el commit (se crea si no existe).
+
+    Una clave vencida que todavía no se limpió se reutiliza como nueva.
+    """
+    expira = ahora + _ttl()
+    ClaveIdempotencia.objects.bulk_create(
+        [ClaveIdempotencia(ambito=ambito, clave=clave, huella=huella, expira=expira)],
+        ignore_conflicts=True
+    )
+    registro = ClaveIdempotencia.objects.select_for_update().get(ambito=ambito, clave=clave)
+
+    if registro.expira <= ahora:
+        registro.huella, registro.estado_http, registro.respuesta, registro.expira = huella, None, None, expira
+        registro.save(update_fields=['huella', 'estado_http', 'respuesta', 'expira'])
+    return registro
+
+
+def idempotente(vista):
+    """Decorador de vistas DRF: registra y repite respuestas por Idempotency-Key"""
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        clave = request.headers.get(ENCABEZADO)
+        if not clave:
+            return vista(request, *args, **kwargs)
+
+        if len(clave) > LONGITUD_MAXIMA:
+            return Response({
+                'success': False,
+                'error': f'{ENCABEZADO} no puede superar {LONGITUD_MAXIMA} caracteres'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        ambito = str(request.user.pk) if request.user.is_authenticated else 'anonimo'
+        huella = huella_peticion(request)
+
+        with transaction.atomic():
+            registro = _bloquear_clave(ambito, clave, huella, timezone.now())
+
+            if registro.huella != huella:
+                logger.warning(f"{ENCABEZADO} reutilizada con otra petición: {ambito}:{clave}")
+                return Response({
+                    'success': False,
+                    'error': f'La {ENCABEZADO} ya se usó con una petición distinta'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+            if registro.estado_http is not None:
+                logger.info(f"Respuesta repetida por {ENCABEZADO}: {ambito}:{clave}")
+                return Response(
+                    registro.respuesta, status=registro.estado_http, headers={ENCABEZADO_REPETIDA: 'true'}
+                )
+
+            respuesta = vista(request, *args, **kwargs)
+
+            if respuesta.status_code < 500 and hasattr(respuesta, 'data'):
+                ClaveIdempotencia.objects.filter(pk=registro.pk).update(
+                    estado_http=respuesta.status_code, respuesta=respuesta.data
+                )
+            return respuesta
+
+    return envoltura
+
+
+def limpiar_claves_vencidas():
+    """
+    Borra las claves vencidas (tarea programada 'limpiar_claves_idempotencia').
+
+    Returns:
+        int: Claves borradas
+    """
+    borradas, _ = ClaveIdempotencia.objects.filter(expira__lte=timezone.now()).delete()
+    if borradas:
+        logger.info(f"Claves de idempotencia vencidas borradas: {borradas}")
+    return borradas
@@ -0,0 +1,73 @@
+"""
+Runner de tareas periódicas (agenda en TareaProgramada).
+
+Uso:
+    python manage.py ejecutar_tareas_programadas                 # loop continuo
+    python manage.py ejecutar_tareas_programadas --una-vez       # ejecuta lo vencido y termina
+    python manage.py ejecutar_tareas_programadas --tarea liberar_mesas_no_show   # forzar una tarea
+
+Se pueden levantar varios runners: cada tarea se reclama con un lease
+(UPDATE condicional), así que nunca corre dos veces en paralelo. Las tareas
+disponibles están en app.configuracion.tareas.TAREAS; intervalo y activación
+se editan desde el admin.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from app.configuracion.models import TareaProgramada
+from app.configuracion.tareas import (
+    ejecutar_pendientes, ejecutar_tarea, identificador_worker, reclamar, sincronizar_tareas
+)
+import logging
+
+logger = logging.getLogger('app.configuracion')
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas periódicas vencidas (no-show, alertas de stock, rollups)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Ejecutar lo vencido y salir')
+        parser.add_argument('--intervalo', type=float, default=30, help='Segundos entre revisiones de la agenda (default: 30)')
+        parser.add_argument('--tarea', help='Ejecutar solo esta tarea ahora, aunque no esté vencida')
+
+    def handle(self, *args, **options):
+        worker = identificador_worker()
+        sincronizar_tareas()
+
+        if options['tarea']:
+            self._forzar(options['tarea'], worker)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'⏱️ Runner de tareas iniciado ({worker})'))
+        ejecutadas = 0
+
+        try:
+            while True:
+                for nombre, estado in ejecutar_pendientes(worker):
+                    ejecutadas += 1
+                    self.stdout.write(f'  • {nombre}: {estado}')
+
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                # Proceso de larga duración: descartar conexiones caídas u obsoletas
+                close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Runner detenido')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Tareas ejecutadas: {ejecutadas}'))
+        logger.info(f'Comando ejecutar_tareas_programadas finalizado: {ejecutadas} tareas')
+
+    def _forzar(self, nombre, worker):
+        tarea = TareaProgramada.objects.filter(nombre=nombre).first()
+        if tarea is None:
+            raise CommandError(f'Tarea desconocida: {nombre}')
+        if not reclamar(tarea, worker, forzar=True):
+            raise CommandError(f'La tarea {nombre} está en ejecución en {tarea.bloqueada_por}')
+
+        estado = ejecutar_tarea(tarea, worker)
+        estilo = self.style.SUCCESS if estado == TareaProgramada.ESTADO_OK else self.style.ERROR
+        self.stdout.write(estilo(f'{nombre}: {estado}'))
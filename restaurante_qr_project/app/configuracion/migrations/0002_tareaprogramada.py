@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:37
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('configuracion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaProgramada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('descripcion', models.CharField(blank=True, max_length=255)),
+                ('intervalo_segundos', models.PositiveIntegerField(help_text='Cada cuántos segundos se ejecuta', validators=[django.core.validators.MinValueValidator(10)])),
+                ('activa', models.BooleanField(default=True)),
+                ('proxima_ejecucion', models.DateTimeField(db_index=True)),
+                ('bloqueada_hasta', models.DateTimeField(blank=True, help_text='Lease del worker que la está ejecutando', null=True)),
+                ('bloqueada_por', models.CharField(blank=True, max_length=100)),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_estado', models.CharField(blank=True, choices=[('ok', 'OK'), ('error', 'Error')], max_length=10)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('ultima_duracion_ms', models.PositiveIntegerField(default=0)),
+                ('ejecuciones', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Tarea Programada',
+                'verbose_name_plural': 'Tareas Programadas',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
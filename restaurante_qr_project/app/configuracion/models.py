@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 import logging
 
@@ -143,6 +144,10 @@ class ConfiguracionSistema(models.Model):
         self.pk = 1  # Forzar siempre ID=1
         super().save(*args, **kwargs)
 
+        # Duración/tolerancia de reservas cacheadas por el motor de disponibilidad
+        from app.reservas.disponibilidad import invalidar_parametros
+        invalidar_parametros()
+
     @classmethod
     def get_configuracion(cls):
         """Obtiene la configuración única del sistema (o la crea si no existe)"""
@@ -155,3 +160,85 @@ class ConfiguracionSistema(models.Model):
         """Previene que se borre la configuración"""
         logger.warning("Intento de borrar ConfiguracionSistema bloqueado")
         pass  # No permitir borrado
+
+
+class TareaProgramada(models.Model):
+    """
+    Agenda persistente del runner de tareas periódicas (sin broker externo).
+
+    Cada fila corresponde a una tarea registrada en configuracion.tareas.TAREAS;
+    el comando `ejecutar_tareas_programadas` ejecuta las que están vencidas
+    (proxima_ejecucion <= ahora). El intervalo y la activación se pueden
+    ajustar desde el admin.
+
+    Bloqueo por tarea: antes de ejecutar, un worker reclama la fila con un
+    UPDATE condicional que fija bloqueada_hasta (lease). Otro worker no la toma
+    hasta que se libere o venza el lease (worker caído).
+    """
+    ESTADO_OK = 'ok'
+    ESTADO_ERROR = 'error'
+
+    ESTADO_CHOICES = [
+        (ESTADO_OK, 'OK'),
+        (ESTADO_ERROR, 'Error'),
+    ]
+
+    nombre = models.CharField(max_length=100, unique=True)
+    descripcion = models.CharField(max_length=255, blank=True)
+    intervalo_segundos = models.PositiveIntegerField(
+        validators=[MinValueValidator(10)],
+        help_text="Cada cuántos segundos se ejecuta"
+    )
+    activa = models.BooleanField(default=True)
+
+    proxima_ejecucion = models.DateTimeField(db_index=True)
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True, help_text="Lease del worker que la está ejecutando")
+    bloqueada_por = models.CharField(max_length=100, blank=True)
+
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+    ultimo_estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    ultima_duracion_ms = models.PositiveIntegerField(default=0)
+    ejecuciones = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Tarea Programada"
+        verbose_name_plural = "Tareas Programadas"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return f"{self.nombre} (cada {self.intervalo_segundos}s)"
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta registrada para un encabezado Idempotency-Key (ver
+    configuracion.idempotencia).
+
+    La primera petición con una clave guarda aquí su respuesta; los
+    reintentos con la misma clave la reciben tal cual sin volver a ejecutar
+    la vista. La fila también es el candado: un duplicado concurrente espera
+    en su SELECT ... FOR UPDATE hasta que termine la primera petición.
+
+    estado_http vacío = la petición original no terminó con una respuesta
+    reutilizable (error 5xx): el siguiente reintento la ejecuta de nuevo.
+    """
+    ambito = models.CharField(max_length=50, help_text="Usuario dueño de la clave")
+    clave = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64, help_text="SHA-256 de método, ruta y cuerpo de la petición")
+
+    estado_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Clave de Idempotencia"
+        verbose_name_plural = "Claves de Idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['ambito', 'clave'], name='clave_idempotencia_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.ambito}:{self.clave} ({self.estado_http or 'pendiente'})"
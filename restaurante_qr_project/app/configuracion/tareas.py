@@ -0,0 +1,164 @@
+"""
+Runner de tareas periódicas (reemplaza al cron externo).
+
+Las tareas se registran en TAREAS (nombre → función sin argumentos e
+intervalo por defecto). La agenda vive en la tabla TareaProgramada, así el
+intervalo y la activación se ajustan desde el admin y sobreviven reinicios.
+
+Ciclo del runner (comando ejecutar_tareas_programadas):
+
+1. sincronizar_tareas(): crea las filas de las tareas nuevas del registro
+2. Lee las tareas activas vencidas (una consulta)
+3. Reclama cada una con un UPDATE condicional (lease en bloqueada_hasta):
+   si otro worker la tomó, el UPDATE afecta 0 filas y se saltea
+4. Ejecuta la función y guarda resultado, duración y próxima ejecución en
+   un solo UPDATE que además libera el lease
+
+Si un worker muere a mitad de una tarea, el lease vence (DURACION_MAXIMA)
+y la tarea vuelve a estar disponible.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TareaProgramada
+
+logger = logging.getLogger('app.configuracion')
+
+DURACION_MAXIMA = timedelta(minutes=15)  # Lease: tiempo máximo de una ejecución
+
+TAREAS = {
+    'liberar_mesas_no_show': {
+        'funcion': 'app.reservas.no_show.barrer_no_show',
+        'intervalo': 5 * 60,
+        'descripcion': 'Marca reservas vencidas como no-show y libera sus mesas',
+    },
+    'escanear_alertas_stock': {
+        'funcion': 'app.caja.alertas.escanear_alertas_stock',
+        'intervalo': 10 * 60,
+        'descripcion': 'Crea, actualiza y resuelve alertas de stock en lote',
+    },
+    'reconstruir_ventas_recientes': {
+        'funcion': 'app.reportes.rollups.reconstruir_recientes',
+        'intervalo': 60 * 60,
+        'descripcion': 'Recalcula el rollup de ventas de ayer y hoy (corrige deriva)',
+    },
+    'limpiar_claves_idempotencia': {
+        'funcion': 'app.configuracion.idempotencia.limpiar_claves_vencidas',
+        'intervalo': 60 * 60,
+        'descripcion': 'Borra las claves Idempotency-Key vencidas',
+    },
+    'limpiar_intentos_login': {
+        'funcion': 'app.usuarios.decorators.limpiar_intentos_login',
+        'intervalo': 24 * 60 * 60,
+        'descripcion': 'Borra los intentos de login fallidos ya vencidos',
+    },
+    'anular_facturas_sin_usar': {
+        'funcion': 'app.caja.facturacion.anular_sin_usar',
+        'intervalo': 24 * 60 * 60,
+        'descripcion': 'Anula los números de factura sin usar de los días cerrados sin auditar',
+    },
+}
+
+
+def identificador_worker():
+    """host:pid del proceso (se guarda en bloqueada_por)"""
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def sincronizar_tareas():
+    """Crea en la agenda las tareas registradas que aún no tienen fila"""
+    ahora = timezone.now()
+    TareaProgramada.objects.bulk_create(
+        [
+            TareaProgramada(
+                nombre=nombre,
+                descripcion=definicion['descripcion'],
+                intervalo_segundos=definicion['intervalo'],
+                proxima_ejecucion=ahora,
+            )
+            for nombre, definicion in TAREAS.items()
+        ],
+        ignore_conflicts=True
+    )
+
+
+def reclamar(tarea, worker, ahora=None, forzar=False):
+    """
+    Toma el lease de una tarea (UPDATE condicional).
+
+    Returns:
+        bool: True si este worker la reclamó
+    """
+    ahora = ahora or timezone.now()
+    filtro = TareaProgramada.objects.filter(pk=tarea.pk).filter(
+        Q(bloqueada_hasta__isnull=True) | Q(bloqueada_hasta__lt=ahora)
+    )
+    if not forzar:
+        filtro = filtro.filter(activa=True, proxima_ejecucion__lte=ahora)
+    return filtro.update(bloqueada_hasta=ahora + DURACION_MAXIMA, bloqueada_por=worker) == 1
+
+
+def ejecutar_tarea(tarea, worker):
+    """
+    Ejecuta una tarea ya reclamada y registra el resultado (libera el lease).
+
+    Returns:
+        str: TareaProgramada.ESTADO_OK o ESTADO_ERROR
+    """
+    definicion = TAREAS.get(tarea.nombre)
+    inicio = timezone.now()
+    reloj = time.monotonic()
+    error = ''
+
+    try:
+        if definicion is None:
+            raise LookupError(f"Tarea no registrada: {tarea.nombre}")
+        import_string(definicion['funcion'])()
+        estado = TareaProgramada.ESTADO_OK
+    except Exception as e:
+        logger.exception(f"Error en tarea programada {tarea.nombre}")
+        estado = TareaProgramada.ESTADO_ERROR
+        error = str(e)
+
+    duracion_ms = int((time.monotonic() - reloj) * 1000)
+    # La próxima ejecución se ancla al inicio (sin deriva); si la tarea tardó
+    # más que su intervalo, se ejecuta de nuevo en el siguiente ciclo
+    TareaProgramada.objects.filter(pk=tarea.pk, bloqueada_por=worker).update(
+        proxima_ejecucion=inicio + timedelta(seconds=tarea.intervalo_segundos),
+        ultima_ejecucion=inicio,
+        ultimo_estado=estado,
+        ultimo_error=error,
+        ultima_duracion_ms=duracion_ms,
+        ejecuciones=tarea.ejecuciones + 1,
+        bloqueada_hasta=None,
+        bloqueada_por='',
+    )
+    logger.info(f"Tarea {tarea.nombre}: {estado} en {duracion_ms} ms")
+    return estado
+
+
+def ejecutar_pendientes(worker=None, ahora=None):
+    """
+    Ejecuta las tareas activas vencidas que este worker logre reclamar.
+
+    Returns:
+        list: [(nombre, estado)] de las tareas ejecutadas
+    """
+    worker = worker or identificador_worker()
+    ahora = ahora or timezone.now()
+    vencidas = TareaProgramada.objects.filter(activa=True, proxima_ejecucion__lte=ahora).filter(
+        Q(bloqueada_hasta__isnull=True) | Q(bloqueada_hasta__lt=ahora)
+    ).order_by('proxima_ejecucion')
+
+    ejecutadas = []
+    for tarea in vencidas:
+        if reclamar(tarea, worker, ahora):
+            ejecutadas.append((tarea.nombre, ejecutar_tarea(tarea, worker)))
+    return ejecutadas
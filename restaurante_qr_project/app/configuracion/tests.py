@@ -0,0 +1,184 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from app.caja.models import CierreCaja, Transaccion
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido
+from app.usuarios.models import Usuario
+
+from .idempotencia import ENCABEZADO_REPETIDA, limpiar_claves_vencidas
+from .models import ClaveIdempotencia, TareaProgramada
+from .tareas import TAREAS, ejecutar_pendientes, reclamar, sincronizar_tareas
+
+
+class TareasProgramadasTestCase(TestCase):
+    """Runner de tareas periódicas: agenda persistente y lease por tarea"""
+
+    def setUp(self):
+        sincronizar_tareas()
+        self.tarea = TareaProgramada.objects.get(nombre='liberar_mesas_no_show')
+        TareaProgramada.objects.exclude(pk=self.tarea.pk).update(activa=False)
+
+    def test_sincronizar_es_idempotente(self):
+        TareaProgramada.objects.filter(pk=self.tarea.pk).update(intervalo_segundos=60)
+        sincronizar_tareas()
+
+        self.assertEqual(TareaProgramada.objects.count(), len(TAREAS))
+        self.assertEqual(TareaProgramada.objects.get(pk=self.tarea.pk).intervalo_segundos, 60)
+
+    def test_ejecuta_y_agenda_la_siguiente(self):
+        ahora = timezone.now()
+        with mock.patch('app.reservas.no_show.barrer_no_show') as barrer:
+            self.assertEqual(ejecutar_pendientes('w1', ahora), [('liberar_mesas_no_show', 'ok')])
+        barrer.assert_called_once_with()
+
+        tarea = TareaProgramada.objects.get(pk=self.tarea.pk)
+        self.assertEqual(tarea.ejecuciones, 1)
+        self.assertIsNone(tarea.bloqueada_hasta)
+        self.assertGreaterEqual(tarea.proxima_ejecucion, ahora + timedelta(seconds=tarea.intervalo_segundos))
+
+        # No vencida: no se vuelve a ejecutar
+        self.assertEqual(ejecutar_pendientes('w1'), [])
+
+    def test_lease_impide_ejecucion_concurrente(self):
+        self.assertTrue(reclamar(self.tarea, 'w1'))
+        self.assertFalse(reclamar(self.tarea, 'w2'))
+        self.assertEqual(ejecutar_pendientes('w2'), [])
+
+        # Lease vencido (worker caído): otro worker la retoma
+        with mock.patch('app.reservas.no_show.barrer_no_show'):
+            resultado = ejecutar_pendientes('w2', timezone.now() + timedelta(hours=1))
+        self.assertEqual(resultado, [('liberar_mesas_no_show', 'ok')])
+
+    def test_error_queda_registrado(self):
+        with mock.patch('app.reservas.no_show.barrer_no_show', side_effect=RuntimeError('sin conexión')):
+            self.assertEqual(ejecutar_pendientes('w1'), [('liberar_mesas_no_show', 'error')])
+
+        tarea = TareaProgramada.objects.get(pk=self.tarea.pk)
+        self.assertEqual((tarea.ultimo_estado, tarea.ultimo_error), ('error', 'sin conexión'))
+        self.assertIsNone(tarea.bloqueada_hasta)
+
+    def test_comando_una_vez(self):
+        TareaProgramada.objects.update(activa=True)
+        call_command('ejecutar_tareas_programadas', '--una-vez', stdout=mock.MagicMock())
+
+        self.assertEqual(
+            set(TareaProgramada.objects.values_list('ultimo_estado', flat=True)), {TareaProgramada.ESTADO_OK}
+        )
+
+
+class IdempotenciaMixin:
+
+    def crear_datos(self):
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        CierreCaja.objects.create(
+            cajero=self.cajero, fecha=date.today(), turno='completo',
+            efectivo_inicial=Decimal('100.00'), efectivo_esperado=Decimal('100.00')
+        )
+        mesa = Mesa.objects.create(numero=1, capacidad=4, estado='ocupada')
+        self.pedido = Pedido.objects.create(
+            mesa=mesa, estado='entregado', total=Decimal('100.00'), total_final=Decimal('100.00')
+        )
+
+    def pagar(self, client, clave, monto='40.00'):
+        return client.post(
+            '/api/caja/pago/simple/',
+            {'pedido_id': self.pedido.id, 'metodo_pago': 'tarjeta', 'monto_recibido': monto},
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+
+class IdempotenciaTestCase(IdempotenciaMixin, TestCase):
+    """Idempotency-Key: la primera respuesta se registra y se repite en los reintentos"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.login(username='cajero', password='test123')
+
+    def test_reintento_repite_la_respuesta(self):
+        primera = self.pagar(self.client, 'pago-1')
+        reintento = self.pagar(self.client, 'pago-1')
+
+        self.assertEqual(reintento.status_code, 200)
+        self.assertEqual(reintento.json(), primera.json())
+        self.assertEqual(reintento[ENCABEZADO_REPETIDA], 'true')
+        self.assertFalse(primera.has_header(ENCABEZADO_REPETIDA))
+        self.assertEqual(Transaccion.objects.count(), 1)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.monto_pagado, Decimal('40.00'))
+
+        # Otra clave es otro pago
+        self.pagar(self.client, 'pago-2')
+        self.assertEqual(Transaccion.objects.count(), 2)
+
+    def test_clave_con_otra_peticion(self):
+        self.pagar(self.client, 'pago-1')
+        respuesta = self.pagar(self.client, 'pago-1', monto='10.00')
+
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(Transaccion.objects.count(), 1)
+
+    def test_sin_clave_y_errores_5xx_no_se_registran(self):
+        self.client.post(
+            '/api/caja/pago/simple/', {'pedido_id': self.pedido.id, 'metodo_pago': 'tarjeta', 'monto_recibido': '10.00'},
+            content_type='application/json'
+        )
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+
+        with mock.patch('app.caja.api_views.procesar_pago_simple', side_effect=RuntimeError('BD caída')):
+            self.assertEqual(self.pagar(self.client, 'pago-1').status_code, 500)
+        # El reintento vuelve a ejecutar la vista
+        self.assertEqual(self.pagar(self.client, 'pago-1').status_code, 200)
+        self.assertEqual(Transaccion.objects.count(), 2)
+
+    def test_limpieza_de_claves_vencidas(self):
+        self.pagar(self.client, 'pago-1')
+        ClaveIdempotencia.objects.update(expira=timezone.now() - timedelta(minutes=1))
+
+        # Vencida: la clave vuelve a ejecutar la petición
+        self.assertFalse(self.pagar(self.client, 'pago-1').has_header(ENCABEZADO_REPETIDA))
+        self.assertEqual(Transaccion.objects.count(), 2)
+
+        ClaveIdempotencia.objects.update(expira=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(limpiar_claves_vencidas(), 1)
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+
+
+class IdempotenciaConcurrenteTestCase(IdempotenciaMixin, TransactionTestCase):
+    """Duplicados simultáneos de la misma clave se serializan en la fila de la clave"""
+
+    HILOS = 10
+
+    def setUp(self):
+        self.crear_datos()
+
+    def test_duplicados_concurrentes_cobran_una_vez(self):
+        barrera = threading.Barrier(self.HILOS)
+
+        def reintentar(_):
+            try:
+                client = Client()
+                client.force_login(self.cajero)
+                barrera.wait()
+                respuesta = self.pagar(client, 'pago-concurrente')
+                return respuesta.status_code, respuesta.json()['transaccion_id']
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.HILOS) as pool:
+            resultados = list(pool.map(reintentar, range(self.HILOS)))
+
+        self.assertEqual({codigo for codigo, _ in resultados}, {200})
+        self.assertEqual(len({transaccion for _, transaccion in resultados}), 1)
+        self.assertEqual(Transaccion.objects.count(), 1)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.monto_pagado, Decimal('40.00'))
@@ -16,6 +16,8 @@ from django.core.validators import MinValueValidator
 from django.conf import settings
 import logging
 
+from app.caja.alertas import programar_escaneo_alertas
+
 logger = logging.getLogger(__name__)
 
 
@@ -92,6 +94,11 @@ class Insumo(models.Model):
         """Verifica si el insumo está agotado"""
         return self.stock_actual == 0
 
+    @property
+    def stock_critico(self):
+        """Stock bajo o agotado (criterio del escáner de alertas)"""
+        return self.stock_actual <= self.stock_minimo
+
     @property
     def estado_stock(self):
         """Devuelve el estado del stock como string"""
@@ -107,6 +114,7 @@ class Insumo(models.Model):
         if cantidad <= 0:
             raise ValueError("La cantidad debe ser positiva")
 
+        critico_antes = self.stock_critico
         self.stock_actual += cantidad
         self.save()
 
@@ -119,6 +127,9 @@ class Insumo(models.Model):
             creado_por=usuario
         )
 
+        if critico_antes and not self.stock_critico:
+            programar_escaneo_alertas()
+
         logger.info(f"Stock agregado: {self.nombre} +{cantidad} {self.unidad}")
         return True
 
@@ -142,9 +153,9 @@ class Insumo(models.Model):
             creado_por=usuario
         )
 
-        # Generar alerta si queda bajo
-        if self.stock_bajo or self.agotado:
-            self._crear_alerta_stock()
+        # Generar alerta si queda bajo (escaneo en lote al confirmar)
+        if self.stock_critico:
+            programar_escaneo_alertas()
 
         logger.info(f"Stock descontado: {self.nombre} -{cantidad} {self.unidad}")
         return True
@@ -152,6 +163,7 @@ class Insumo(models.Model):
     def ajustar_stock(self, cantidad_nueva, motivo="", usuario=None):
         """Ajusta el stock a un valor específico"""
         diferencia = cantidad_nueva - self.stock_actual
+        critico_antes = self.stock_critico
         self.stock_actual = cantidad_nueva
         self.save()
 
@@ -164,33 +176,12 @@ class Insumo(models.Model):
             creado_por=usuario
         )
 
+        if critico_antes or self.stock_critico:
+            programar_escaneo_alertas()
+
         logger.info(f"Stock ajustado: {self.nombre} a {cantidad_nueva} {self.unidad}")
         return True
 
-    def _crear_alerta_stock(self):
-        """Crea una alerta de stock bajo/agotado"""
-        # Reutilizar el modelo de AlertaStock de app.caja si existe
-        try:
-            from app.caja.models import AlertaStock
-
-            if self.agotado:
-                tipo_alerta = 'agotado'
-                mensaje = f"Insumo agotado: {self.nombre}"
-            else:
-                tipo_alerta = 'bajo'
-                mensaje = f"Stock bajo: {self.nombre} ({self.stock_actual}/{self.stock_minimo} {self.unidad})"
-
-            # Crear alerta solo si no existe una reciente del mismo tipo
-            AlertaStock.objects.get_or_create(
-                # producto=None,  # No es producto, es insumo
-                tipo=tipo_alerta,
-                mensaje=mensaje,
-                resuelta=False
-            )
-
-        except ImportError:
-            logger.warning("No se pudo crear alerta de stock (modelo AlertaStock no disponible)")
-
 
 class MovimientoInsumo(models.Model):
     """Historial de movimientos de insumos (entradas, salidas, ajustes)"""
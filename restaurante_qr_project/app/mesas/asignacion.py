@@ -0,0 +1,221 @@
+"""
+Optimizador de asignación de mesas (en memoria).
+
+Las mesas candidatas se cargan una sola vez y la mejor opción se calcula en
+Python; después solo se bloquean (select_for_update) las filas elegidas.
+
+Criterio (el mismo orden de preferencia que la asignación original):
+
+1. Una mesa individual: la más chica que alcance
+2. Si ninguna alcanza, una combinación de hasta MAX_MESAS_COMBINADAS mesas
+   con el menor desperdicio de asientos (capacidad total - personas); a
+   igual desperdicio, menos mesas; a igualdad, las más cercanas entre sí
+
+Sin restricción de adyacencia es un subset-sum acotado por programación
+dinámica sobre las capacidades: O(mesas × MAX_MESAS × (personas + capacidad
+máxima)). El desempate no enumera las combinaciones empatadas (en un salón
+uniforme son O(mesas³)): por cada reparto de capacidades que alcanza la
+mejor (capacidad, cantidad) arma un grupo por vecino más cercano desde cada
+mesa, O(repartos × mesas² × MAX_MESAS). Con adyacencia (posicion_x/posicion_y
+del mapa) solo se combinan grupos conectados de mesas a no más de
+DISTANCIA_ADYACENCIA entre vecinas.
+"""
+import logging
+import math
+
+logger = logging.getLogger('app.mesas')
+
+MAX_MESAS_COMBINADAS = 3
+DISTANCIA_ADYACENCIA = 150  # Unidades del mapa de mesas (la grilla usa pasos de 100)
+
+
+def _distancia(mesa_a, mesa_b):
+    return math.hypot(mesa_a.posicion_x - mesa_b.posicion_x, mesa_a.posicion_y - mesa_b.posicion_y)
+
+
+def _dispersion(mesas):
+    """Suma de distancias entre pares (desempate: mesas más juntas)"""
+    return sum(_distancia(a, b) for i, a in enumerate(mesas) for b in mesas[i + 1:])
+
+
+def _mejor_individual(mesas, personas):
+    aptas = [mesa for mesa in mesas if mesa.capacidad >= personas]
+    return min(aptas, key=lambda mesa: (mesa.capacidad, mesa.numero)) if aptas else None
+
+
+def _repartos(capacidades, cantidad, suma):
+    """
+    Multiconjuntos de `cantidad` capacidades que suman `suma`.
+
+    Args:
+        capacidades (list): [(capacidad, mesas disponibles)] ordenadas
+
+    Returns:
+        list: [[capacidad, ...]] (pocas: se combinan capacidades distintas, no mesas)
+    """
+    if cantidad == 0:
+        return [[]] if suma == 0 else []
+    repartos = []
+    for posicion, (capacidad, disponibles) in enumerate(capacidades):
+        for usadas in range(1, min(disponibles, cantidad) + 1):
+            if capacidad * usadas > suma:
+                break
+            for resto in _repartos(capacidades[posicion + 1:], cantidad - usadas, suma - capacidad * usadas):
+                repartos.append([capacidad] * usadas + resto)
+    return repartos
+
+
+def _grupo_cercano(coordenadas, capacidades, inicio, faltan, por_capacidad):
+    """
+    Completa un grupo desde la mesa `inicio` agregando cada vez la mesa de
+    una capacidad faltante más cercana al grupo (menor suma de distancias a
+    sus mesas). Las distancias acumuladas se recalculan una vez por mesa
+    agregada: O(mesas) por paso.
+    """
+    x, y = coordenadas[inicio]
+    acumulada = [math.hypot(xj - x, yj - y) for xj, yj in coordenadas]
+    grupo = [inicio]
+    faltan = list(faltan)
+    while faltan:
+        libres = [j for capacidad in set(faltan) for j in por_capacidad[capacidad] if j not in grupo]
+        if not libres:
+            return None
+        elegida = min(libres, key=acumulada.__getitem__)
+        grupo.append(elegida)
+        faltan.remove(capacidades[elegida])
+        if faltan:
+            x, y = coordenadas[elegida]
+            acumulada = [d + math.hypot(xj - x, yj - y) for d, (xj, yj) in zip(acumulada, coordenadas)]
+    return tuple(sorted(grupo))
+
+
+def _combinaciones_libres(mesas, personas, max_mesas):
+    """
+    Subset-sum por programación dinámica.
+
+    Estado: cantidad de mesas → capacidades totales alcanzables. Las sumas se
+    acotan a personas + capacidad máxima: en una combinación mínima, quitar
+    cualquier mesa deja capacidad < personas.
+
+    Con la mejor (capacidad, cantidad) se arman candidatas para el desempate
+    por dispersión: por cada reparto de capacidades, un grupo por vecino más
+    cercano desde cada mesa de su capacidad menos frecuente (todo grupo del
+    reparto contiene una de ellas).
+
+    Returns:
+        list: [(capacidad_total, cantidad, (índices...))] de la mejor
+              (capacidad_total, cantidad) con capacidad >= personas
+    """
+    tope = personas + max(mesa.capacidad for mesa in mesas)
+    sumas = [{0}] + [set() for _ in range(max_mesas)]
+
+    for mesa in mesas:
+        for cantidad in range(max_mesas, 0, -1):
+            sumas[cantidad].update(
+                suma + mesa.capacidad for suma in sumas[cantidad - 1] if suma + mesa.capacidad <= tope
+            )
+
+    candidatas = [
+        (suma, cantidad)
+        for cantidad in range(2, max_mesas + 1)
+        for suma in sumas[cantidad]
+        if suma >= personas
+    ]
+    if not candidatas:
+        return []
+    mejor_suma, mejor_cantidad = min(candidatas)
+
+    por_capacidad = {}
+    for indice, mesa in enumerate(mesas):
+        por_capacidad.setdefault(mesa.capacidad, []).append(indice)
+    capacidades = sorted((capacidad, len(indices)) for capacidad, indices in por_capacidad.items())
+
+    coordenadas = [(mesa.posicion_x, mesa.posicion_y) for mesa in mesas]
+    capacidad_de = [mesa.capacidad for mesa in mesas]
+    combinaciones = set()
+    for reparto in _repartos(capacidades, mejor_cantidad, mejor_suma):
+        inicial = min(set(reparto), key=lambda capacidad: len(por_capacidad[capacidad]))
+        faltan = list(reparto)
+        faltan.remove(inicial)
+        for inicio in por_capacidad[inicial]:
+            grupo = _grupo_cercano(coordenadas, capacidad_de, inicio, faltan, por_capacidad)
+            if grupo:
+                combinaciones.add((mejor_suma, mejor_cantidad, grupo))
+    return list(combinaciones)
+
+
+def _combinaciones_adyacentes(mesas, personas, max_mesas, distancia_max):
+    """
+    Grupos conectados de 2..max_mesas mesas (cada mesa a distancia_max de
+    alguna otra del grupo), generados creciendo desde cada mesa por vecinos.
+    """
+    # Vecinos por celdas de lado distancia_max: solo se comparan celdas contiguas
+    celdas = {}
+    for i, mesa in enumerate(mesas):
+        celdas.setdefault((mesa.posicion_x // distancia_max, mesa.posicion_y // distancia_max), []).append(i)
+    vecinos = []
+    for i, mesa in enumerate(mesas):
+        cx, cy = mesa.posicion_x // distancia_max, mesa.posicion_y // distancia_max
+        vecinos.append([
+            j
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            for j in celdas.get((cx + dx, cy + dy), ())
+            if j != i and _distancia(mesa, mesas[j]) <= distancia_max
+        ])
+
+    vistos = set()
+    nivel = {frozenset([i]) for i in range(len(mesas))}
+    combinaciones = []
+    for cantidad in range(2, max_mesas + 1):
+        siguiente = set()
+        for grupo in nivel:
+            for i in grupo:
+                for j in vecinos[i]:
+                    nuevo = grupo | {j}
+                    if len(nuevo) == cantidad and nuevo not in vistos:
+                        vistos.add(nuevo)
+                        siguiente.add(nuevo)
+        for grupo in siguiente:
+            suma = sum(mesas[i].capacidad for i in grupo)
+            if suma >= personas:
+                combinaciones.append((suma, cantidad, tuple(sorted(grupo))))
+        nivel = siguiente
+    return combinaciones
+
+
+def mejor_asignacion(mesas, personas, max_mesas=MAX_MESAS_COMBINADAS, adyacentes=False,
+                     distancia_max=DISTANCIA_ADYACENCIA):
+    """
+    Elige la mesa o combinación de mesas para un grupo.
+
+    Args:
+        mesas (list): Mesas candidatas (con numero, capacidad, posicion_x/y)
+        personas (int): Tamaño del grupo
+        max_mesas (int): Máximo de mesas a combinar
+        adyacentes (bool): Combinar solo mesas vecinas en el mapa
+        distancia_max (int): Distancia máxima entre mesas vecinas
+
+    Returns:
+        list: Mesas elegidas (la primera es la principal) o [] si no hay opción
+    """
+    mesas = sorted(mesas, key=lambda mesa: mesa.numero)
+    if not mesas:
+        return []
+
+    individual = _mejor_individual(mesas, personas)
+    if individual:
+        return [individual]
+
+    if adyacentes:
+        combinaciones = _combinaciones_adyacentes(mesas, personas, max_mesas, distancia_max)
+    else:
+        combinaciones = _combinaciones_libres(mesas, personas, max_mesas)
+    if not combinaciones:
+        return []
+
+    # Menor desperdicio → menos mesas → más juntas (la dispersión solo se
+    # calcula entre los empates) → números de mesa más bajos
+    mejor = min((suma, cantidad) for suma, cantidad, _ in combinaciones)
+    empatadas = [combinacion for suma, cantidad, combinacion in combinaciones if (suma, cantidad) == mejor]
+    combinacion = min(empatadas, key=lambda c: (_dispersion([mesas[i] for i in c]), c))
+    return [mesas[i] for i in combinacion]
@@ -0,0 +1,59 @@
+"""
+Comando de Django para (re)generar los QR de las mesas en lote.
+
+Uso:
+    python manage.py regenerar_qr_mesas                      # todas las mesas con QR desactualizado
+    python manage.py regenerar_qr_mesas --solo-pendientes    # solo las encoladas por Mesa.save() (cron)
+    python manage.py regenerar_qr_mesas --formato svg --workers 4
+    python manage.py regenerar_qr_mesas --forzar             # volver a renderizar aunque estén vigentes
+
+Después de un cambio de dominio (Site) todas las URLs cambian y se
+regeneran todas. Los QR se renderizan en un pool de procesos y se guardan
+con un solo bulk_update.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.mesas.models import Mesa
+from app.mesas.qr import FORMATOS, regenerar_qr
+import logging
+
+logger = logging.getLogger('app.mesas')
+
+
+class Command(BaseCommand):
+    help = 'Regenera los QR de las mesas en un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='png', help='Formato de imagen (default: png)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Procesos en paralelo (default: CPUs disponibles; 1 = sin pool)')
+        parser.add_argument('--solo-pendientes', action='store_true', help='Solo las mesas encoladas por Mesa.save()')
+        parser.add_argument('--forzar', action='store_true', help='Renderizar aunque el QR esté vigente')
+        parser.add_argument('--incluir-inactivas', action='store_true', help='Incluir mesas eliminadas (soft delete)')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers debe ser al menos 1')
+
+        mesas = Mesa.objects.order_by('numero')
+        if not options['incluir_inactivas']:
+            mesas = mesas.filter(activo=True)
+        if options['solo_pendientes']:
+            mesas = mesas.filter(qr_pendiente=True)
+        mesas = list(mesas)
+
+        self.stdout.write(f'🔲 Revisando QR de {len(mesas)} mesas ({options["formato"]})...')
+
+        if options['workers'] > 1 and len(mesas) > 1:
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                actualizadas = regenerar_qr(mesas, options['formato'], options['forzar'], ejecutor=pool)
+        else:
+            actualizadas = regenerar_qr(mesas, options['formato'], options['forzar'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ QR actualizados: {actualizadas} mesas ({len(mesas) - actualizadas} ya estaban vigentes)'
+        ))
+        logger.info(f'Comando regenerar_qr_mesas ejecutado: {actualizadas}/{len(mesas)} mesas')
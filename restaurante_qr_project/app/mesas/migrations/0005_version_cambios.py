@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesas', '0004_add_soft_delete_to_mesa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesa',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesas', '0005_version_cambios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesa',
+            name='qr_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash de la URL y formato del QR vigente', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='qr_pendiente',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='El QR debe (re)generarse'),
+        ),
+    ]
@@ -8,15 +8,12 @@ Gestiona las mesas del restaurante y su distribución:
 - Soft delete (activo/inactivo) para mantener historial
 - Posicionamiento en plano (x, y) para mapa visual
 
-IMPORTANTE: Cada mesa tiene un QR único que se genera automáticamente.
+IMPORTANTE: Cada mesa tiene un QR único que se genera en lote
+(comando regenerar_qr_mesas o al abrir la página de QR).
 Los clientes escanean el QR para acceder al menú digital.
 """
-import qrcode
 import logging
-from io import BytesIO
-from django.core.files import File
 from django.db import models
-from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +30,9 @@ class Mesa(models.Model):
         default='disponible'
     )
     qr_image = models.ImageField(upload_to='qrcodes/', blank=True, null=True)
+    # ✅ NUEVO: Cola y caché de QR (ver app/mesas/qr.py)
+    qr_pendiente = models.BooleanField(default=False, db_index=True, editable=False, help_text='El QR debe (re)generarse')
+    qr_hash = models.CharField(max_length=64, blank=True, default='', editable=False, help_text='Hash de la URL y formato del QR vigente')
 
     # Campos nuevos para módulo de caja
     capacidad = models.PositiveIntegerField(default=4, help_text='Número de personas que caben en la mesa')
@@ -52,60 +52,26 @@ class Mesa(models.Model):
     fecha_eliminacion = models.DateTimeField(null=True, blank=True, help_text='Fecha en que se eliminó la mesa')
     eliminado_por = models.ForeignKey('usuarios.Usuario', on_delete=models.SET_NULL, null=True, blank=True, related_name='mesas_eliminadas')
 
+    # ✅ NUEVO: Cursor de cambios para el mapa de mesas (?since=)
+    version = models.BigIntegerField(default=0, db_index=True, editable=False)
+
     def __str__(self):
         return f"Mesa {self.numero}"
 
     def save(self, *args, **kwargs):
         """
-        ✅ OPTIMIZADO: Solo genera QR cuando es nueva mesa o fuerza regeneración (#5)
+        ✅ OPTIMIZADO: El QR no se renderiza aquí; solo se encola (qr_pendiente)
+        cuando es nueva mesa, no tiene QR o se fuerza la regeneración.
+        Los QR encolados se generan en lote (ver app/mesas/qr.py).
         """
-        # ✅ Detectar si necesitamos generar QR
-        generar_qr = False
-
-        if self.pk is None:
-            # Es una mesa nueva
-            generar_qr = True
-        elif not self.qr_image:
-            # La mesa existe pero no tiene QR
-            generar_qr = True
-        elif kwargs.pop('force_qr_generation', False):
-            # Regeneración forzada (opcional)
-            generar_qr = True
-
-        # Guardar primero para obtener el ID
-        super().save(*args, **kwargs)
+        forzar_qr = kwargs.pop('force_qr_generation', False)
+        if self.pk is None or not self.qr_image or forzar_qr:
+            self.qr_pendiente = True
 
-        # Solo generar QR si es necesario
-        if generar_qr:
-            self._generate_qr_code()
+        super().save(*args, **kwargs)
 
-    def _generate_qr_code(self):
-        """
-        ✅ NUEVO: Método privado para generar QR sin llamar a save()
-        Separado del save() principal para evitar regeneraciones innecesarias
-        """
-        from django.contrib.sites.models import Site
-
-        try:
-            domain = Site.objects.get_current().domain
-            protocol = 'https' if settings.DEBUG is False else 'http'
-        except Exception as e:
-            logger.warning(f"Error al obtener dominio actual: {e}")
-            domain = '127.0.0.1:8000'
-            protocol = 'http'
-
-        url_qr = f"{protocol}://{domain}/menu/mesa/{self.id}/"
-        qr = qrcode.make(url_qr)
-        buffer = BytesIO()
-        qr.save(buffer, format='PNG')
-        buffer.seek(0)
-        file_name = f"mesa-{self.numero}-qr.png"
-
-        # Guardar sin llamar a save() recursivamente
-        self.qr_image.save(file_name, File(buffer), save=False)
-
-        # Actualizar solo el campo qr_image en la base de datos
-        Mesa.objects.filter(pk=self.pk).update(qr_image=self.qr_image.name)
+        from app.pedidos.versionado import registrar_cambio
+        registrar_cambio(Mesa, self.pk)
 
     def eliminar_suave(self, usuario=None):
         """
@@ -0,0 +1,162 @@
+"""
+Generación de los QR de las mesas (menú digital).
+
+Mesa.save() ya no renderiza el QR: solo marca la mesa con qr_pendiente=True
+(encolar). Los QR se generan en lote con regenerar_qr():
+
+- Una sola consulta a Site para todas las mesas
+- Render en un pool de procesos (comando regenerar_qr_mesas) o en línea
+- Un solo bulk_update de qr_image/qr_hash/qr_pendiente
+
+Caché por contenido: el archivo se llama qrcodes/<hash>.<formato>, donde el
+hash se calcula sobre la URL y el formato. Si la URL de una mesa no cambió
+(mismo qr_hash) no se hace nada, y si el archivo ya existe en el storage no
+se vuelve a renderizar. Tras un cambio de dominio todas las URLs cambian y se
+regeneran todas.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+
+logger = logging.getLogger('app.mesas')
+
+FORMATOS = ('png', 'svg')
+CARPETA_QR = 'qrcodes'
+VERSION_RENDER = 1  # Subir si cambia el estilo del QR (invalida la caché)
+
+
+def base_url_qr():
+    """
+    Protocolo y dominio de las URLs de los QR (una consulta a Site).
+
+    Returns:
+        str: p. ej. 'https://restaurante.com'
+    """
+    from django.contrib.sites.models import Site
+
+    try:
+        domain = Site.objects.get_current().domain
+        protocol = 'https' if settings.DEBUG is False else 'http'
+    except Exception as e:
+        logger.warning(f"Error al obtener dominio actual: {e}")
+        domain = '127.0.0.1:8000'
+        protocol = 'http'
+    return f"{protocol}://{domain}"
+
+
+def url_menu_mesa(base_url, mesa_id):
+    return f"{base_url}/menu/mesa/{mesa_id}/"
+
+
+def hash_qr(url, formato):
+    return hashlib.sha256(f'{VERSION_RENDER}:{formato}:{url}'.encode('utf-8')).hexdigest()
+
+
+def nombre_archivo_qr(hash_contenido, formato):
+    return f'{CARPETA_QR}/{hash_contenido[:24]}.{formato}'
+
+
+def renderizar_qr(url, formato='png'):
+    """
+    Renderiza el QR de una URL.
+
+    Returns:
+        bytes: Imagen PNG o documento SVG
+    """
+    fabrica = qrcode.image.svg.SvgPathImage if formato == 'svg' else None
+    imagen = qrcode.make(url, image_factory=fabrica)
+    buffer = BytesIO()
+    if formato == 'svg':
+        imagen.save(buffer)
+    else:
+        imagen.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def guardar_qr(url, formato='png'):
+    """
+    Renderiza y guarda el QR si no está ya en el storage.
+
+    No accede a la base de datos (se puede ejecutar en otro proceso).
+
+    Returns:
+        tuple: (nombre del archivo, hash)
+    """
+    hash_contenido = hash_qr(url, formato)
+    nombre = nombre_archivo_qr(hash_contenido, formato)
+    if not default_storage.exists(nombre):
+        guardado = default_storage.save(nombre, ContentFile(renderizar_qr(url, formato)))
+        if guardado != nombre:
+            # Otro proceso lo guardó en paralelo: quedarse con el original
+            default_storage.delete(guardado)
+    return nombre, hash_contenido
+
+
+def regenerar_qr(mesas, formato='png', forzar=False, ejecutor=None):
+    """
+    Genera los QR de un conjunto de mesas y los guarda con un solo bulk_update.
+
+    Args:
+        mesas (iterable): Instancias de Mesa
+        formato (str): 'png' o 'svg'
+        forzar (bool): Regenerar aunque la mesa ya tenga el QR vigente
+        ejecutor (Executor): Pool para renderizar en paralelo (None = en línea)
+
+    Returns:
+        int: Mesas actualizadas
+    """
+    from .models import Mesa
+
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de QR no soportado: {formato}")
+
+    base_url = base_url_qr()
+    pendientes = []
+    for mesa in mesas:
+        url = url_menu_mesa(base_url, mesa.id)
+        vigente = mesa.qr_image and mesa.qr_hash == hash_qr(url, formato)
+        if forzar or not vigente:
+            pendientes.append((mesa, url))
+        elif mesa.qr_pendiente:
+            mesa.qr_pendiente = False
+            pendientes.append((mesa, None))
+
+    if not pendientes:
+        return 0
+
+    urls = [url for _, url in pendientes if url]
+    if forzar:
+        for url in urls:
+            default_storage.delete(nombre_archivo_qr(hash_qr(url, formato), formato))
+    if ejecutor:
+        # Los procesos del pool se crean al enviar el trabajo: no deben
+        # heredar conexiones abiertas a la BD
+        connections.close_all()
+    mapear = ejecutor.map if ejecutor else map
+    resultados = dict(zip(urls, mapear(guardar_qr, urls, [formato] * len(urls))))
+
+    for mesa, url in pendientes:
+        if url:
+            mesa.qr_image, mesa.qr_hash = resultados[url]
+            mesa.qr_pendiente = False
+
+    Mesa.objects.bulk_update([mesa for mesa, _ in pendientes], ['qr_image', 'qr_hash', 'qr_pendiente'])
+    logger.info(f"QR regenerados: {len(urls)} mesas ({formato})")
+    return len(pendientes)
+
+
+def asegurar_qr(mesas):
+    """
+    Genera en línea los QR encolados de las mesas indicadas (p. ej. antes de
+    mostrar la página de QR). Las mesas con el QR vigente no cuestan nada.
+    """
+    pendientes = [mesa for mesa in mesas if mesa.qr_pendiente or not mesa.qr_image]
+    if pendientes:
+        regenerar_qr(pendientes)
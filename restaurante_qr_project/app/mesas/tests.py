@@ -0,0 +1,172 @@
+import io
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.sites.models import Site
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from app.mesas import qr
+from app.mesas.asignacion import mejor_asignacion
+from app.mesas.models import Mesa
+from app.mesas.utils import asignar_mesa_automatica
+
+
+class MediaTemporalMixin:
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp(prefix='media_test_')
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        Site.objects.update_or_create(id=1, defaults={'domain': 'menu.local', 'name': 'menu'})
+        Site.objects.clear_cache()
+
+    def _archivos_qr(self):
+        carpeta = os.path.join(self.media, qr.CARPETA_QR)
+        return sorted(os.listdir(carpeta)) if os.path.isdir(carpeta) else []
+
+
+class RegenerarQRTestCase(MediaTemporalMixin, TestCase):
+    """QR de mesas: encolados en save(), generados en lote con caché por contenido"""
+
+    def test_save_solo_encola(self):
+        with mock.patch.object(qr, 'renderizar_qr') as renderizar:
+            mesa = Mesa.objects.create(numero=1, capacidad=4)
+        renderizar.assert_not_called()
+        self.assertTrue(mesa.qr_pendiente)
+        self.assertFalse(mesa.qr_image)
+        self.assertEqual(self._archivos_qr(), [])
+
+    def test_lote_con_un_bulk_update_y_cache(self):
+        mesas = [Mesa.objects.create(numero=i, capacidad=4) for i in range(1, 6)]
+
+        with self.assertNumQueries(2):  # Site + bulk_update
+            self.assertEqual(qr.regenerar_qr(mesas), 5)
+        self.assertEqual(len(self._archivos_qr()), 5)
+
+        mesa = Mesa.objects.get(numero=1)
+        self.assertFalse(mesa.qr_pendiente)
+        self.assertTrue(default_storage.exists(mesa.qr_image.name))
+        self.assertEqual(mesa.qr_hash, qr.hash_qr(qr.url_menu_mesa(qr.base_url_qr(), mesa.id), 'png'))
+
+        # Mismas URLs: no se renderiza ni se escribe nada
+        with mock.patch.object(qr, 'renderizar_qr') as renderizar:
+            self.assertEqual(qr.regenerar_qr(Mesa.objects.all()), 0)
+        renderizar.assert_not_called()
+
+    def test_cambio_de_dominio_regenera_todo(self):
+        mesas = [Mesa.objects.create(numero=i, capacidad=4) for i in range(1, 4)]
+        qr.regenerar_qr(mesas)
+        anteriores = set(Mesa.objects.values_list('qr_image', flat=True))
+
+        Site.objects.filter(id=1).update(domain='nuevo-dominio.local')
+        Site.objects.clear_cache()
+        self.assertEqual(qr.regenerar_qr(Mesa.objects.all()), 3)
+
+        nuevos = set(Mesa.objects.values_list('qr_image', flat=True))
+        self.assertFalse(anteriores & nuevos)
+
+    def test_formato_svg(self):
+        Mesa.objects.create(numero=7, capacidad=2)
+        call_command('regenerar_qr_mesas', formato='svg', workers=1, stdout=io.StringIO())
+
+        mesa = Mesa.objects.get(numero=7)
+        self.assertTrue(mesa.qr_image.name.endswith('.svg'))
+        with default_storage.open(mesa.qr_image.name) as archivo:
+            self.assertIn(b'<svg', archivo.read())
+
+    def test_solo_pendientes(self):
+        qr.regenerar_qr([Mesa.objects.create(numero=1, capacidad=4)])
+        nueva = Mesa.objects.create(numero=2, capacidad=4)
+
+        with mock.patch.object(qr, 'renderizar_qr', wraps=qr.renderizar_qr) as renderizar:
+            call_command('regenerar_qr_mesas', solo_pendientes=True, workers=1, stdout=io.StringIO())
+        self.assertEqual(renderizar.call_count, 1)
+        nueva.refresh_from_db()
+        self.assertFalse(nueva.qr_pendiente)
+
+
+class RegenerarQRPoolTestCase(MediaTemporalMixin, TransactionTestCase):
+    """Render en pool de procesos (TransactionTestCase: se cierran las conexiones)"""
+
+    def test_pool_de_procesos(self):
+        Mesa.objects.bulk_create([Mesa(numero=i, capacidad=4, qr_pendiente=True) for i in range(1, 9)])
+
+        call_command('regenerar_qr_mesas', workers=3, stdout=io.StringIO())
+
+        self.assertFalse(Mesa.objects.filter(qr_pendiente=True).exists())
+        self.assertEqual(len(self._archivos_qr()), 8)
+        self.assertEqual(len(set(Mesa.objects.values_list('qr_image', flat=True))), 8)
+
+
+def mesa_plano(numero, capacidad, x=0, y=0):
+    return SimpleNamespace(id=numero, numero=numero, capacidad=capacidad, posicion_x=x, posicion_y=y)
+
+
+class MejorAsignacionTestCase(SimpleTestCase):
+    """Optimizador en memoria: individual primero, luego menor desperdicio"""
+
+    def _numeros(self, mesas, personas, **opciones):
+        return [mesa.numero for mesa in mejor_asignacion(mesas, personas, **opciones)]
+
+    def test_mesa_individual_mas_chica(self):
+        mesas = [mesa_plano(1, 8), mesa_plano(2, 4), mesa_plano(3, 6)]
+        self.assertEqual(self._numeros(mesas, 4), [2])
+        self.assertEqual(self._numeros(mesas, 5), [3])
+
+    def test_combinacion_con_menor_desperdicio(self):
+        # La asignación anterior tomaba 1+2 (capacidad 12) para 10 personas
+        mesas = [mesa_plano(1, 6), mesa_plano(2, 6), mesa_plano(3, 4), mesa_plano(4, 2), mesa_plano(5, 2)]
+        self.assertEqual(self._numeros(mesas, 10), [1, 3])
+        self.assertEqual(self._numeros(mesas, 14), [1, 2, 4])
+        self.assertEqual(self._numeros(mesas, 30), [])
+
+    def test_a_igual_desperdicio_menos_mesas(self):
+        mesas = [mesa_plano(1, 2), mesa_plano(2, 2), mesa_plano(3, 2), mesa_plano(4, 6)]
+        self.assertEqual(self._numeros(mesas, 8), [1, 4])
+
+    def test_a_igualdad_las_mesas_mas_juntas(self):
+        # 1+2, 1+3 y 2+3 empatan en capacidad y cantidad; 1 y 3 son vecinas
+        mesas = [mesa_plano(1, 4, 0, 0), mesa_plano(2, 4, 900, 0), mesa_plano(3, 4, 100, 0)]
+        self.assertEqual(self._numeros(mesas, 8), [1, 3])
+
+    def test_solo_mesas_adyacentes(self):
+        mesas = [mesa_plano(1, 4, 0, 0), mesa_plano(2, 4, 900, 0), mesa_plano(3, 2, 100, 0), mesa_plano(4, 2, 200, 0)]
+        self.assertEqual(self._numeros(mesas, 8), [1, 2])
+        # 1 y 2 están lejos: la mejor combinación conectada es la fila 1-3-4
+        self.assertEqual(self._numeros(mesas, 8, adyacentes=True), [1, 3, 4])
+
+
+class AsignarMesaAutomaticaTestCase(TestCase):
+    """Una consulta para las candidatas y un bloqueo solo de las filas elegidas"""
+
+    def test_consultas_constantes(self):
+        Mesa.objects.bulk_create([Mesa(numero=i, capacidad=2 + (i % 3) * 2) for i in range(1, 41)])
+
+        with self.assertNumQueries(4):  # savepoint + candidatas + bloqueo + release
+            resultado = asignar_mesa_automatica(15)
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['capacidad_total'], 16)
+        self.assertEqual(len(resultado['mesas_combinadas']), 3)
+
+    def test_mesa_tomada_se_descarta(self):
+        Mesa.objects.create(numero=1, capacidad=4)
+        Mesa.objects.create(numero=2, capacidad=6)
+
+        def elegir_y_perder_la_mesa(mesas, *args, **kwargs):
+            # Otra transacción ocupa la mesa 1 entre la lectura y el bloqueo
+            Mesa.objects.filter(numero=1).update(estado='ocupada')
+            return mejor_asignacion(mesas, *args, **kwargs)
+
+        with mock.patch('app.mesas.utils.mejor_asignacion', side_effect=elegir_y_perder_la_mesa) as optimizador:
+            resultado = asignar_mesa_automatica(4)
+
+        self.assertEqual(optimizador.call_count, 2)
+        self.assertEqual(resultado['mesa'].numero, 2)
@@ -3,21 +3,29 @@ Utilidades para gestión de mesas
 """
 import logging
 from django.db import transaction
+from .asignacion import mejor_asignacion
 from .models import Mesa
 
 logger = logging.getLogger('app.mesas')
 
+INTENTOS_ASIGNACION = 3
+
 
 @transaction.atomic  # ✅ NUEVO: Garantiza atomicidad y permite select_for_update
-def asignar_mesa_automatica(numero_personas, fecha_reserva=None, hora_reserva=None):
+def asignar_mesa_automatica(numero_personas, fecha_reserva=None, hora_reserva=None, solo_adyacentes=False):
     """
     Asigna automáticamente una mesa o combinación de mesas según el número de personas.
     Usa select_for_update() para prevenir condiciones de carrera.
 
+    ✅ OPTIMIZADO: Las candidatas se cargan en una consulta y la mejor opción
+    (menor desperdicio de asientos) se calcula en memoria (mesas.asignacion);
+    solo se bloquean las filas elegidas.
+
     Args:
         numero_personas (int): Número de personas que necesitan mesa
         fecha_reserva (date, optional): Fecha de la reserva para verificar disponibilidad
         hora_reserva (time, optional): Hora de la reserva
+        solo_adyacentes (bool): Combinar solo mesas vecinas en el mapa
 
     Returns:
         dict: {
@@ -30,62 +38,42 @@ def asignar_mesa_automatica(numero_personas, fecha_reserva=None, hora_reserva=No
     """
     logger.info(f"Buscando mesa para {numero_personas} personas")
 
-    # 1. Buscar mesa individual con capacidad suficiente
-    # ✅ NUEVO: Usar select_for_update() para evitar condiciones de carrera
-    mesa_individual = Mesa.objects.select_for_update().filter(
-        disponible=True,
-        capacidad__gte=numero_personas,
-        estado='disponible',
-        es_combinada=False
-    ).order_by('capacidad').first()  # Ordenar por capacidad para asignar la más pequeña que sirva
+    # ✅ NUEVO: Con fecha/hora la disponibilidad es por horario (grilla de
+    # reservas del día) y no por el estado actual de la mesa
+    filtro_estado = {'estado': 'disponible'}
+    mesas_ocupadas = []
+    if fecha_reserva and hora_reserva:
+        from app.reservas.disponibilidad import ocupacion_dia
 
-    if mesa_individual:
-        logger.info(f"Mesa {mesa_individual.numero} asignada (capacidad: {mesa_individual.capacidad})")
-        return {
-            'success': True,
-            'mesa': mesa_individual,
-            'mesas_combinadas': None,
-            'capacidad_total': mesa_individual.capacidad,
-            'mensaje': f'Mesa {mesa_individual.numero} asignada (capacidad: {mesa_individual.capacidad} personas)'
-        }
+        ocupacion = ocupacion_dia(fecha_reserva)
+        filtro_estado = {}
+        mesas_ocupadas = [mesa_id for mesa_id in ocupacion.intervalos if ocupacion.ocupada(mesa_id, hora_reserva)]
 
-    # 2. Si no hay mesa individual, buscar combinación de mesas
-    logger.info("No hay mesa individual suficiente, buscando combinación de mesas")
-    # ✅ NUEVO: Usar select_for_update() para bloquear todas las mesas candidatas
-    mesas_disponibles = Mesa.objects.select_for_update().filter(
+    candidatas = Mesa.objects.filter(
         disponible=True,
-        estado='disponible',
-        es_combinada=False
-    ).order_by('numero')
-
-    # Intentar combinar 2 mesas
-    for i, mesa1 in enumerate(mesas_disponibles):
-        for mesa2 in mesas_disponibles[i+1:]:
-            capacidad_total = mesa1.capacidad + mesa2.capacidad
-            if capacidad_total >= numero_personas:
-                logger.info(f"Combinación encontrada: Mesa {mesa1.numero} + Mesa {mesa2.numero} (capacidad: {capacidad_total})")
-                return {
-                    'success': True,
-                    'mesa': mesa1,  # Mesa principal
-                    'mesas_combinadas': [mesa1, mesa2],
-                    'capacidad_total': capacidad_total,
-                    'mensaje': f'Mesas {mesa1.numero}+{mesa2.numero} combinadas (capacidad: {capacidad_total} personas)'
-                }
-
-    # Intentar combinar 3 mesas (para grupos muy grandes)
-    for i, mesa1 in enumerate(mesas_disponibles):
-        for j, mesa2 in enumerate(mesas_disponibles[i+1:], start=i+1):
-            for mesa3 in mesas_disponibles[j+1:]:
-                capacidad_total = mesa1.capacidad + mesa2.capacidad + mesa3.capacidad
-                if capacidad_total >= numero_personas:
-                    logger.info(f"Combinación de 3 mesas encontrada: {mesa1.numero}+{mesa2.numero}+{mesa3.numero}")
-                    return {
-                        'success': True,
-                        'mesa': mesa1,
-                        'mesas_combinadas': [mesa1, mesa2, mesa3],
-                        'capacidad_total': capacidad_total,
-                        'mensaje': f'Mesas {mesa1.numero}+{mesa2.numero}+{mesa3.numero} combinadas (capacidad: {capacidad_total} personas)'
-                    }
+        es_combinada=False,
+        **filtro_estado
+    ).exclude(id__in=mesas_ocupadas)
+
+    descartadas = set()
+    for _ in range(INTENTOS_ASIGNACION):
+        opciones = [
+            mesa for mesa in candidatas.only('id', 'numero', 'capacidad', 'posicion_x', 'posicion_y')
+            if mesa.id not in descartadas
+        ]
+        elegidas = mejor_asignacion(opciones, numero_personas, adyacentes=solo_adyacentes)
+        if not elegidas:
+            break
+
+        # Bloquear solo las filas elegidas; el WHERE se reevalúa tras la espera,
+        # así que una mesa tomada por otra transacción no vuelve
+        ids = [mesa.id for mesa in elegidas]
+        bloqueadas = {mesa.id: mesa for mesa in candidatas.select_for_update().filter(id__in=ids)}
+        if len(bloqueadas) == len(ids):
+            return _resultado_asignacion([bloqueadas[mesa_id] for mesa_id in ids])
+
+        descartadas.update(set(ids) - set(bloqueadas))
+        logger.info(f"Mesas tomadas por otra transacción, reintentando: {set(ids) - set(bloqueadas)}")
 
     # 3. No hay mesas disponibles
     logger.warning(f"No hay mesas disponibles para {numero_personas} personas")
@@ -98,6 +86,31 @@ def asignar_mesa_automatica(numero_personas, fecha_reserva=None, hora_reserva=No
     }
 
 
+def _resultado_asignacion(mesas):
+    capacidad_total = sum(mesa.capacidad for mesa in mesas)
+
+    if len(mesas) == 1:
+        mesa = mesas[0]
+        logger.info(f"Mesa {mesa.numero} asignada (capacidad: {mesa.capacidad})")
+        return {
+            'success': True,
+            'mesa': mesa,
+            'mesas_combinadas': None,
+            'capacidad_total': capacidad_total,
+            'mensaje': f'Mesa {mesa.numero} asignada (capacidad: {mesa.capacidad} personas)'
+        }
+
+    numeros = '+'.join(str(mesa.numero) for mesa in mesas)
+    logger.info(f"Combinación encontrada: Mesas {numeros} (capacidad: {capacidad_total})")
+    return {
+        'success': True,
+        'mesa': mesas[0],  # Mesa principal
+        'mesas_combinadas': mesas,
+        'capacidad_total': capacidad_total,
+        'mensaje': f'Mesas {numeros} combinadas (capacidad: {capacidad_total} personas)'
+    }
+
+
 def combinar_mesas(mesas_list, estado='reservada'):
     """
     Combina físicamente las mesas en el sistema.
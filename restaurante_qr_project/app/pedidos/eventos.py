@@ -0,0 +1,194 @@
+"""
+Feed push de cocina (Server-Sent Events).
+
+Reemplaza el polling de pedidos_en_cocina_api: cada pantalla de cocina abre un
+único stream que recibe un snapshot inicial y luego solo los deltas de pedidos
+(creado, cambio de estado, líneas modificadas).
+
+Los deltas se publican desde Pedido.cambiar_estado/confirmar, las vistas que
+cambian estado y las APIs de modificación de caja, siempre vía
+publicar_evento_cocina(). El evento se registra en EventoCocina al confirmar la
+transacción (on_commit), así un rollback nunca llega a las pantallas.
+
+El stream avanza por EventoCocina.cursor y no por id: los INSERT corren en
+workers distintos y el id 11 puede confirmarse antes que el 10 (un stream
+que ya envió el 11 nunca vería el 10). El cursor se toma del contador
+ContadorCambios.ID_COCINA en la misma sentencia, igual que en versionado.py:
+el upsert bloquea la fila del contador hasta el commit, así los cursores
+se hacen visibles en orden.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import ContadorCambios, Pedido, EventoCocina
+
+logger = logging.getLogger('app.pedidos')
+
+# Estados que el cocinero debe trabajar (listo/entregado ya no son de cocina)
+ESTADOS_COCINA = [
+    Pedido.ESTADO_CREADO,
+    Pedido.ESTADO_CONFIRMADO,
+    Pedido.ESTADO_EN_PREPARACION,
+]
+
+
+def queryset_cocina():
+    """Queryset base con todas las relaciones que usa el payload de cocina"""
+    return Pedido.objects.select_related(
+        'mesa', 'mesero_comanda'
+    ).prefetch_related('detalles__producto')
+
+
+def serializar_pedido_cocina(pedido):
+    """
+    Serializa un pedido en el formato que consume panel_cocina.js.
+
+    Requiere que el pedido venga de queryset_cocina() para no disparar N+1.
+    """
+    detalles_data = [
+        {
+            'cantidad': detalle.cantidad,
+            'producto': detalle.producto.nombre if detalle.producto else 'Producto',
+            'subtotal': float(detalle.subtotal)
+        }
+        for detalle in pedido.detalles.all()
+    ]
+    if not detalles_data:
+        # Si no hay detalles, crear uno genérico
+        detalles_data = [{
+            'cantidad': 1,
+            'producto': f'Pedido para mesa {pedido.mesa.numero if pedido.mesa else "N/A"}',
+            'subtotal': float(pedido.total)
+        }]
+
+    mesero_nombre = "Cliente directo"
+    if pedido.mesero_comanda:
+        mesero_nombre = f"{pedido.mesero_comanda.first_name} {pedido.mesero_comanda.last_name}".strip() or pedido.mesero_comanda.username
+
+    return {
+        'id': pedido.id,
+        'mesa': pedido.mesa.numero if pedido.mesa else 'N/A',
+        'estado': pedido.estado,
+        'total': float(pedido.total),
+        'fecha': pedido.fecha.isoformat(),
+        'detalles': detalles_data,
+        'numero_personas': pedido.numero_personas,
+        'mesero': mesero_nombre
+    }
+
+
+def snapshot_cocina():
+    """Lista completa de pedidos abiertos para cocina (consultas constantes)"""
+    pedidos = queryset_cocina().filter(estado__in=ESTADOS_COCINA).order_by('-fecha')
+    return [serializar_pedido_cocina(pedido) for pedido in pedidos]
+
+
+def publicar_evento_cocina(pedido_id, tipo):
+    """
+    Publica un delta de pedido para los streams de cocina.
+
+    Se difiere a on_commit: el payload se arma con el estado ya confirmado y
+    nunca se emiten cambios de transacciones revertidas.
+    """
+    transaction.on_commit(lambda: _registrar_evento(pedido_id, tipo))
+
+
+def _registrar_evento(pedido_id, tipo):
+    try:
+        pedido = queryset_cocina().filter(id=pedido_id).first()
+        if pedido is None:
+            return
+        contador = ContadorCambios._meta.db_table
+        tabla = EventoCocina._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH c AS ("
+                f"  INSERT INTO {contador} (id, valor) VALUES (%s, 1)"
+                f"  ON CONFLICT (id) DO UPDATE SET valor = {contador}.valor + 1 RETURNING valor"
+                f") INSERT INTO {tabla} (pedido_id, tipo, datos, creado_en, cursor) "
+                f"SELECT %s, %s, %s::jsonb, %s, c.valor FROM c",
+                [
+                    ContadorCambios.ID_COCINA, pedido.id, tipo,
+                    json.dumps(serializar_pedido_cocina(pedido)), timezone.now()
+                ]
+            )
+    except Exception as e:
+        # El pedido ya está confirmado: sin este delta las pantallas lo ven en
+        # el próximo evento del pedido o en el snapshot al reconectar
+        logger.error(f"Error registrando evento de cocina (pedido {pedido_id}): {str(e)}")
+
+
+def ultimo_cursor():
+    """Cursor del último evento registrado (0 si no hay eventos)"""
+    return EventoCocina.objects.aggregate(ultimo=Max('cursor'))['ultimo'] or 0
+
+
+def cursor_vigente(cursor):
+    """
+    Indica si se puede reanudar desde el cursor sin perder eventos.
+
+    Si la purga ya eliminó eventos posteriores al cursor, el cliente necesita
+    un snapshot nuevo.
+    """
+    primero = EventoCocina.objects.aggregate(primero=Min('cursor'))['primero']
+    return primero is None or cursor >= primero - 1
+
+
+def formatear_sse(evento, datos, evento_id=None):
+    """Formatea un mensaje según el protocolo text/event-stream"""
+    lineas = []
+    if evento_id is not None:
+        lineas.append(f"id: {evento_id}")
+    lineas.append(f"event: {evento}")
+    lineas.append(f"data: {json.dumps(datos, ensure_ascii=False)}")
+    return "\n".join(lineas) + "\n\n"
+
+
+def stream_eventos_cocina(cursor=None):
+    """
+    Generador del stream SSE de cocina.
+
+    - Sin cursor (o cursor purgado): envía 'snapshot' y continúa desde ahí.
+    - Con cursor (Last-Event-ID): reanuda enviando solo los eventos pendientes.
+
+    La conexión se cierra después de COCINA_STREAM_DURACION segundos para no
+    superar el timeout del worker; EventSource reconecta solo con Last-Event-ID.
+    """
+    duracion = getattr(settings, 'COCINA_STREAM_DURACION', 55)
+    intervalo = getattr(settings, 'COCINA_STREAM_INTERVALO', 1)
+    heartbeat = getattr(settings, 'COCINA_STREAM_HEARTBEAT', 15)
+
+    yield "retry: 3000\n\n"
+
+    if cursor is None or not cursor_vigente(cursor):
+        EventoCocina.purgar_antiguos()
+        # Leer el cursor ANTES del snapshot: un cambio concurrente se reenvía como delta
+        cursor = ultimo_cursor()
+        yield formatear_sse('snapshot', snapshot_cocina(), evento_id=cursor)
+
+    inicio = time.monotonic()
+    ultimo_envio = inicio
+    while time.monotonic() - inicio < duracion:
+        time.sleep(intervalo)
+        eventos = list(
+            EventoCocina.objects.filter(cursor__gt=cursor).order_by('cursor').values('cursor', 'tipo', 'datos')[:200]
+        )
+        for evento in eventos:
+            cursor = evento['cursor']
+            yield formatear_sse(
+                'pedido',
+                {'tipo': evento['tipo'], 'pedido': evento['datos']},
+                evento_id=cursor
+            )
+        if eventos:
+            ultimo_envio = time.monotonic()
+        elif time.monotonic() - ultimo_envio >= heartbeat:
+            # Comentario SSE: mantiene viva la conexión a través de proxies
+            ultimo_envio = time.monotonic()
+            yield ": ping\n\n"
@@ -0,0 +1,56 @@
+"""
+Comando de Django para verificar (y reparar) los totales incrementales de Pedido.
+
+Uso:
+    python manage.py verificar_totales_pedidos                  # todos los pedidos, solo reporta
+    python manage.py verificar_totales_pedidos --dias 7         # pedidos de los últimos 7 días
+    python manage.py verificar_totales_pedidos --reparar
+
+Los totales (total, total_final, cantidad_lineas) se mantienen con deltas
+atómicos al guardar/eliminar cada DetallePedido. Las escrituras que no pasan
+por el modelo (bulk, SQL manual, admin de BD) pueden dejar deriva; este
+comando la detecta en una sola consulta y la corrige en un solo UPDATE.
+Sale con error si encuentra deriva sin --reparar (apto para cron/monitoreo).
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.pedidos.models import Pedido
+from app.pedidos.totales import verificar_totales
+import logging
+
+logger = logging.getLogger('app.pedidos')
+
+
+class Command(BaseCommand):
+    help = 'Detecta y repara deriva en los totales incrementales de Pedido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Revisar solo pedidos de los últimos N días')
+        parser.add_argument('--reparar', action='store_true', help='Corregir los pedidos con deriva')
+
+    def handle(self, *args, **options):
+        pedidos = Pedido.objects.all()
+        if options['dias']:
+            pedidos = pedidos.filter(fecha__gte=timezone.now() - timedelta(days=options['dias']))
+
+        desviados = verificar_totales(pedidos, reparar=options['reparar'])
+
+        for d in desviados[:50]:
+            self.stdout.write(
+                f"  • Pedido #{d['pedido_id']}: total {d['total']} (real {d['total_real']}), "
+                f"líneas {d['cantidad_lineas']} (reales {d['lineas_reales']})"
+            )
+        if len(desviados) > 50:
+            self.stdout.write(f'  … y {len(desviados) - 50} más')
+
+        logger.info(f"Comando verificar_totales_pedidos: {len(desviados)} con deriva (reparar={options['reparar']})")
+
+        if not desviados:
+            self.stdout.write(self.style.SUCCESS('✅ Totales consistentes'))
+        elif options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f'🔧 Totales reparados en {len(desviados)} pedidos'))
+        else:
+            raise CommandError(f'{len(desviados)} pedidos con deriva (ejecutar con --reparar)')
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0012_remove_pedido_cuenta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoCocina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('creado', 'Pedido creado'), ('estado', 'Cambio de estado'), ('modificado', 'Líneas modificadas')], max_length=20)),
+                ('datos', models.JSONField(default=dict, help_text='Snapshot del pedido en formato cocina')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_cocina', to='pedidos.pedido')),
+            ],
+            options={
+                'verbose_name': 'Evento de Cocina',
+                'verbose_name_plural': 'Eventos de Cocina',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:17
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def contar_lineas(apps, schema_editor):
+    """Carga inicial de cantidad_lineas (el total ya existía)"""
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    DetallePedido = apps.get_model('pedidos', 'DetallePedido')
+    lineas = DetallePedido.objects.filter(pedido_id=models.OuterRef('pk')).order_by().values('pedido_id')
+    Pedido.objects.update(cantidad_lineas=Coalesce(
+        models.Subquery(lineas.annotate(cuenta=models.Count('id')).values('cuenta')), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0014_version_cambios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='cantidad_lineas',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Cantidad de líneas (detalles) del pedido'),
+        ),
+        migrations.RunPython(contar_lineas, migrations.RunPython.noop),
+    ]
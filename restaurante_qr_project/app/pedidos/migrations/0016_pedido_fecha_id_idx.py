@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesas', '0006_mesa_qr_pendiente'),
+        ('pedidos', '0015_pedido_cantidad_lineas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha', 'id'], name='pedido_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+def sellar_eventos_existentes(apps, schema_editor):
+    """Los eventos ya registrados conservan su id como cursor (Last-Event-ID vigentes)"""
+    EventoCocina = apps.get_model('pedidos', 'EventoCocina')
+    ContadorCambios = apps.get_model('pedidos', 'ContadorCambios')
+
+    EventoCocina.objects.update(cursor=models.F('id'))
+    ultimo = EventoCocina.objects.aggregate(ultimo=models.Max('id'))['ultimo'] or 0
+    ContadorCambios.objects.update_or_create(id=2, defaults={'valor': ultimo})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0016_pedido_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventococina',
+            name='cursor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(sellar_eventos_existentes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='eventococina',
+            name='cursor',
+            field=models.BigIntegerField(help_text='Orden de commit (ContadorCambios.ID_COCINA)', unique=True),
+        ),
+        migrations.AlterModelOptions(
+            name='eventococina',
+            options={'ordering': ['cursor'], 'verbose_name': 'Evento de Cocina', 'verbose_name_plural': 'Eventos de Cocina'},
+        ),
+    ]
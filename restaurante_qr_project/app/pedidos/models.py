@@ -11,6 +11,8 @@ Este módulo gestiona el ciclo completo de vida de los pedidos en el restaurante
 
 IMPORTANTE: La máquina de estados es ESTRICTA. No modificar transiciones sin validación.
 """
+from datetime import timedelta
+from decimal import Decimal
 from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -85,6 +87,8 @@ class Pedido(models.Model):
     descuento = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Descuento aplicado')
     descuento_porcentaje = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text='% de descuento')
     total_final = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Total con descuento y propina')
+    # ✅ NUEVO: Mantenido en forma incremental por DetallePedido (ver totales.py)
+    cantidad_lineas = models.PositiveIntegerField(default=0, editable=False, help_text='Cantidad de líneas (detalles) del pedido')
 
     observaciones = models.TextField(blank=True, null=True, help_text='Notas del pedido')
     observaciones_caja = models.TextField(blank=True, null=True, help_text='Notas del cajero')
@@ -128,25 +132,67 @@ class Pedido(models.Model):
         help_text='Estado del reembolso'
     )
     
+    # ✅ NUEVO: Cursor de cambios para endpoints ?since= (ver versionado.py)
+    version = models.BigIntegerField(default=0, db_index=True, editable=False)
+
     class Meta:
         ordering = ['-fecha']
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
+        indexes = [
+            # ✅ NUEVO: Paginación keyset (fecha, id) del listado de pedidos
+            models.Index(fields=['fecha', 'id'], name='pedido_fecha_id_idx'),
+        ]
     
     def __str__(self):
         return f"Pedido #{self.id} - Mesa {self.mesa.numero if self.mesa else 'N/A'} - {self.get_estado_display()}"
 
+    def _valores_db(self, *campos):
+        """
+        Valores guardados en BD, con la fila bloqueada hasta el commit ({} si
+        el pedido es nuevo).
+
+        Las transiciones se detectan contra la BD y no contra un valor
+        recordado en memoria, que falla con cargas diferidas (.only()),
+        refresh_from_db() o un cambio hecho por otro request.
+        """
+        if self._state.adding or self.pk is None:
+            return {}
+        return Pedido.objects.select_for_update().filter(pk=self.pk).values(*campos).first() or {}
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            anterior = self._valores_db('estado', 'estado_pago', 'total_reembolsado')
+            super().save(*args, **kwargs)
+            from .versionado import registrar_cambio
+            registrar_cambio(Pedido, self.pk)
+
+            # ✅ NUEVO: Rollup diario de ventas (cierre, cancelación, reembolso)
+            from app.reportes.rollups import registrar_cambios_pedido
+            registrar_cambios_pedido(self, anterior.get('estado'), anterior.get('total_reembolsado'))
+
+            # ✅ NUEVO: Descuento/propina/conteo en los contadores del turno de caja
+            if self.estado_pago == 'pagado' and anterior.get('estado_pago') != 'pagado':
+                from app.caja.contadores import registrar_pedido_pagado
+                registrar_pedido_pagado(self)
+
     def calcular_total(self):
         """
         Calcula el total del pedido sumando todos los detalles.
 
-        Útil cuando se modifican productos o cantidades.
+        ✅ NUEVO: El total ya se mantiene en forma incremental (ver totales.py);
+        usar solo para verificar o reconstruir.
 
         Returns:
             Decimal: Suma de todos los subtotales de los detalles
         """
         return sum(detalle.subtotal for detalle in self.detalles.all())
 
+    @property
+    def saldo_pendiente(self):
+        """Monto que falta cobrar (total_final - monto_pagado), sin consultas"""
+        return max(self.total_final - self.monto_pagado, 0)
+
     def todos_productos_pagados(self):
         """
         Verifica si TODOS los productos del pedido están completamente pagados.
@@ -240,6 +286,10 @@ class Pedido(models.Model):
         self.estado = nuevo_estado
         self.save()
 
+        # ✅ NUEVO: Delta para el feed push de cocina (cubre también confirmar())
+        from .eventos import publicar_evento_cocina
+        publicar_evento_cocina(self.id, EventoCocina.TIPO_ESTADO)
+
     @transaction.atomic
     def confirmar(self, usuario=None):
         """
@@ -262,40 +312,17 @@ class Pedido(models.Model):
         """
         Descuenta stock de inventario para todos los detalles del pedido.
 
+        ✅ OPTIMIZADO: Un solo lote (app.productos.stock): filas de Producto
+        bloqueadas en orden de id y un UPDATE para todas las líneas.
+
         CRÍTICO: Este método debe llamarse dentro de transaction.atomic
 
         Raises:
-            ValidationError: Si no hay stock suficiente
+            ValidationError: Si no hay stock suficiente (no se descuenta nada)
         """
-        from app.inventario.models import Insumo, MovimientoInventario
-
-        for detalle in self.detalles.all():
-            producto = detalle.producto
-
-            # Verificar si el producto tiene receta (insumos)
-            if hasattr(producto, 'receta') and producto.receta:
-                for ingrediente in producto.receta.ingredientes.all():
-                    insumo = ingrediente.insumo
-                    cantidad_necesaria = ingrediente.cantidad * detalle.cantidad
-
-                    if insumo.stock_actual < cantidad_necesaria:
-                        raise ValidationError(
-                            f"Stock insuficiente para '{insumo.nombre}'. "
-                            f"Necesario: {cantidad_necesaria}, Disponible: {insumo.stock_actual}"
-                        )
-
-                    # Descontar stock
-                    insumo.stock_actual -= cantidad_necesaria
-                    insumo.save()
-
-                    # Registrar movimiento
-                    MovimientoInventario.objects.create(
-                        insumo=insumo,
-                        tipo='salida',
-                        cantidad=cantidad_necesaria,
-                        motivo=f'Pedido #{self.id}',
-                        usuario=self.mesero_comanda
-                    )
+        from app.productos.stock import descontar_stock_pedidos
+
+        descontar_stock_pedidos([self.id])
 
     def _devolver_stock(self):
         """
@@ -303,28 +330,9 @@ class Pedido(models.Model):
 
         CRÍTICO: Este método debe llamarse dentro de transaction.atomic
         """
-        from app.inventario.models import Insumo, MovimientoInventario
-
-        for detalle in self.detalles.all():
-            producto = detalle.producto
-
-            if hasattr(producto, 'receta') and producto.receta:
-                for ingrediente in producto.receta.ingredientes.all():
-                    insumo = ingrediente.insumo
-                    cantidad_devolver = ingrediente.cantidad * detalle.cantidad
+        from app.productos.stock import devolver_stock_pedidos
 
-                    # Devolver stock
-                    insumo.stock_actual += cantidad_devolver
-                    insumo.save()
-
-                    # Registrar movimiento
-                    MovimientoInventario.objects.create(
-                        insumo=insumo,
-                        tipo='entrada',
-                        cantidad=cantidad_devolver,
-                        motivo=f'Cancelación Pedido #{self.id}',
-                        usuario=self.cajero_responsable
-                    )
+        devolver_stock_pedidos([self.id])
 
     @transaction.atomic
     def registrar_pago(self, monto, forma_pago='efectivo', cajero=None):
@@ -450,7 +458,62 @@ class DetallePedido(models.Model):
             self.precio_unitario = self.producto.precio
         if not self.subtotal:
             self.subtotal = self.precio_unitario * self.cantidad
-        super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            subtotal_anterior = self._subtotal_db()
+            super().save(*args, **kwargs)
+
+            # ✅ NUEVO: Delta atómico sobre los totales del pedido (sin releer las líneas)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'subtotal' not in update_fields:
+                delta = Decimal('0')  # El subtotal guardado no cambió
+            else:
+                delta = self.subtotal - (subtotal_anterior or Decimal('0'))
+            from .totales import ajustar_totales
+            ajustar_totales(
+                self.pedido_id,
+                delta,
+                1 if subtotal_anterior is None else 0,
+                instancia=self._pedido_cacheado()
+            )
+
+        # Un cambio de línea es un cambio del pedido para los paneles
+        from .versionado import registrar_cambio
+        registrar_cambio(Pedido, self.pedido_id)
+
+    def delete(self, *args, **kwargs):
+        pedido_id = self.pedido_id
+        pedido = self._pedido_cacheado()
+        with transaction.atomic():
+            subtotal = self._subtotal_db()
+            resultado = super().delete(*args, **kwargs)
+
+            if subtotal is not None:
+                from .totales import ajustar_totales
+                ajustar_totales(pedido_id, -subtotal, -1, instancia=pedido)
+
+        from .versionado import registrar_cambio
+        registrar_cambio(Pedido, pedido_id)
+        return resultado
+
+    def _subtotal_db(self):
+        """
+        Subtotal guardado en BD con la fila bloqueada hasta el commit (None si
+        la línea no existe): base del delta de totales del pedido.
+
+        Un valor recordado al cargar la línea falla con dos ediciones
+        concurrentes: ambas parten del mismo subtotal y el segundo delta
+        descuadra Pedido.total/total_final.
+        """
+        if self._state.adding or self.pk is None:
+            return None
+        return DetallePedido.objects.select_for_update().filter(pk=self.pk).values_list(
+            'subtotal', flat=True
+        ).first()
+
+    def _pedido_cacheado(self):
+        """Instancia de Pedido ya cargada en este detalle (None si no hay)"""
+        return self._state.fields_cache.get('pedido')
 
     @property
     def cantidad_pendiente(self):
@@ -476,4 +539,70 @@ class DetallePedido(models.Model):
         Usado para validar si se puede cerrar el pedido o si se deben
         seguir aceptando pagos parciales.
         """
-        return self.cantidad_pagada >= self.cantidad
\ No newline at end of file
+        return self.cantidad_pagada >= self.cantidad
+
+class ContadorCambios(models.Model):
+    """
+    Contadores globales (una fila por cursor) sellados en orden de commit.
+
+    ID_UNICO: cada escritura de Pedido/DetallePedido/Mesa lo incrementa y
+    sella la fila afectada con el nuevo valor. Ver app/pedidos/versionado.py.
+    ID_COCINA: cursor del feed de cocina (EventoCocina.cursor, ver
+    app/pedidos/eventos.py).
+    """
+    ID_UNICO = 1
+    ID_COCINA = 2
+
+    valor = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador de Cambios'
+        verbose_name_plural = 'Contador de Cambios'
+
+    def __str__(self):
+        return f"Cursor de cambios: {self.valor}"
+
+
+class EventoCocina(models.Model):
+    """
+    Bitácora de cambios de pedidos para el feed push de cocina (SSE).
+
+    Cada escritura relevante (creación, cambio de estado, modificación de líneas)
+    registra una fila con el payload ya serializado del pedido. El stream de cocina
+    solo lee filas con cursor > último enviado, por lo que cada pantalla cuesta una
+    consulta liviana por tick en lugar de recorrer todos los pedidos abiertos.
+
+    IMPORTANTE: El cursor del stream es `cursor`, no el id: el id se asigna al
+    INSERT y dos workers pueden confirmar en otro orden (el id 11 visible antes
+    que el 10, que se saltaría). `cursor` sale de ContadorCambios en la misma
+    sentencia y sigue el orden de commit. No reutilizar ni reordenar.
+    """
+    TIPO_CREADO = 'creado'
+    TIPO_ESTADO = 'estado'
+    TIPO_MODIFICADO = 'modificado'
+
+    TIPO_CHOICES = [
+        (TIPO_CREADO, 'Pedido creado'),
+        (TIPO_ESTADO, 'Cambio de estado'),
+        (TIPO_MODIFICADO, 'Líneas modificadas'),
+    ]
+
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='eventos_cocina')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    datos = models.JSONField(default=dict, help_text='Snapshot del pedido en formato cocina')
+    creado_en = models.DateTimeField(auto_now_add=True, db_index=True)
+    cursor = models.BigIntegerField(unique=True, help_text='Orden de commit (ContadorCambios.ID_COCINA)')
+
+    class Meta:
+        ordering = ['cursor']
+        verbose_name = 'Evento de Cocina'
+        verbose_name_plural = 'Eventos de Cocina'
+
+    def __str__(self):
+        return f"Evento #{self.id} - Pedido #{self.pedido_id} ({self.tipo})"
+
+    @classmethod
+    def purgar_antiguos(cls, horas=24):
+        """Elimina eventos viejos (el snapshot inicial ya cubre el estado actual)"""
+        limite = timezone.now() - timedelta(hours=horas)
+        return cls.objects.filter(creado_en__lt=limite).delete()[0]
@@ -0,0 +1,96 @@
+"""
+Paginación por cursor (keyset) sobre (fecha, id) para listados de pedidos.
+
+A diferencia de ?page=N (OFFSET), cada página es un rango del índice:
+
+    WHERE fecha < :fecha OR (fecha = :fecha AND id < :id)
+    ORDER BY fecha DESC, id DESC
+    LIMIT :page_size + 1
+
+El costo de la página 1000 es el mismo que el de la página 1, y un pedido
+nuevo no desplaza los resultados entre páginas. El cursor es opaco
+(base64 de "fecha|id") y se devuelve en `next`.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorFechaIdPagination(BasePagination):
+    """Keyset sobre (-fecha, -id); ?cursor=<opaco>&page_size=N"""
+
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    mensaje_cursor_invalido = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.tamano = self._tamano_pagina(request)
+
+        queryset = queryset.order_by('-fecha', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            fecha, pedido_id = self._decodificar(cursor)
+            queryset = queryset.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pedido_id))
+
+        # Una fila extra indica si hay página siguiente (sin COUNT)
+        resultados = list(queryset[:self.tamano + 1])
+        self.hay_siguiente = len(resultados) > self.tamano
+        resultados = resultados[:self.tamano]
+        self.ultimo = resultados[-1] if resultados else None
+        return resultados
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'page_size': self.tamano,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.hay_siguiente:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._codificar(self.ultimo))
+
+    def _tamano_pagina(self, request):
+        try:
+            tamano = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            tamano = self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    @staticmethod
+    def _codificar(pedido):
+        posicion = f'{pedido.fecha.isoformat()}|{pedido.id}'
+        return base64.urlsafe_b64encode(posicion.encode('utf-8')).decode('ascii')
+
+    def _decodificar(self, cursor):
+        try:
+            posicion = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            fecha, pedido_id = posicion.rsplit('|', 1)
+            fecha = parse_datetime(fecha)
+            pedido_id = int(pedido_id)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.mensaje_cursor_invalido)
+        if fecha is None:
+            raise NotFound(self.mensaje_cursor_invalido)
+        return fecha, pedido_id
@@ -4,6 +4,32 @@ from rest_framework import serializers
 from .models import Pedido, DetallePedido
 
 
+class CamposDinamicosMixin:
+    """
+    ✅ NUEVO: Sparse fieldsets con ?fields=id,estado,total
+
+    Los campos no pedidos se quitan del serializer (y la vista evita sus
+    consultas). Sin ?fields= se devuelven todos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = campos_solicitados(self.context.get('request'))
+        if campos is not None:
+            for nombre in set(self.fields) - campos:
+                self.fields.pop(nombre)
+
+
+def campos_solicitados(request):
+    """Conjunto de campos de ?fields= (None si no se filtró)"""
+    if request is None or not hasattr(request, 'query_params'):
+        return None
+    valor = request.query_params.get('fields')
+    if not valor:
+        return None
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
 class DetallePedidoSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
     producto_precio = serializers.DecimalField(source='producto.precio', max_digits=10, decimal_places=2, read_only=True)
@@ -14,9 +40,13 @@ class DetallePedidoSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'producto_nombre', 'producto_precio', 'subtotal']
 
 
-class PedidoSerializer(serializers.ModelSerializer):
+class PedidoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para lectura de pedidos (GET requests)
+
+    ✅ OPTIMIZADO: Sin consultas por pedido si el queryset viene de
+    PedidoViewSet (detalles+producto prefetcheados, última modificación en
+    `ultimas_modificaciones`).
     """
     detalles = DetallePedidoSerializer(many=True, read_only=True)
     mesa_numero = serializers.IntegerField(source='mesa.numero', read_only=True)
@@ -32,8 +62,11 @@ class PedidoSerializer(serializers.ModelSerializer):
         if not obj.modificado:
             return None
 
-        # Buscar la última modificación
-        ultima_modificacion = obj.historial_modificaciones.order_by('-fecha_hora').first()
+        # Buscar la última modificación (prefetcheada por el ViewSet si existe)
+        if hasattr(obj, 'ultimas_modificaciones'):
+            ultima_modificacion = obj.ultimas_modificaciones[0] if obj.ultimas_modificaciones else None
+        else:
+            ultima_modificacion = obj.historial_modificaciones.select_related('usuario').order_by('-fecha_hora').first()
         if ultima_modificacion and ultima_modificacion.usuario:
             return {
                 'nombre': ultima_modificacion.usuario.get_full_name() or ultima_modificacion.usuario.username,
@@ -1,4 +1,7 @@
-from django.test import TestCase, Client
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
@@ -6,7 +9,7 @@ from decimal import Decimal
 from app.usuarios.models import Usuario
 from app.mesas.models import Mesa
 from app.productos.models import Producto, Categoria
-from .models import Pedido, DetallePedido
+from .models import Pedido, DetallePedido, EventoCocina
 
 
 class PedidoModelTestCase(TestCase):
@@ -377,3 +380,474 @@ class PedidoTransaccionAtomicaTestCase(TestCase):
         import inspect
         cerrar_pedido_source = inspect.getsource(Pedido.cerrar_pedido)
         self.assertIn('transaction.atomic', cerrar_pedido_source)
+
+
+class FeedCocinaTestCase(TestCase):
+    """Tests para el feed push de cocina (SSE)"""
+
+    def setUp(self):
+        self.client = Client()
+        self.usuario = Usuario.objects.create_user(
+            username='cocinero',
+            password='testpass123',
+            rol='cocinero'
+        )
+        # El middleware exige jornada activa para cocineros
+        from django.core.cache import cache
+        from app.caja.models import JornadaLaboral
+        cache.clear()
+        JornadaLaboral.objects.create(cajero=self.usuario)
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        categoria = Categoria.objects.create(nombre='Comida')
+        self.producto = Producto.objects.create(
+            nombre='Pizza',
+            precio=Decimal('40.00'),
+            categoria=categoria,
+            disponible=True
+        )
+        self.pedido = Pedido.objects.create(
+            mesa=self.mesa,
+            fecha=timezone.now(),
+            estado=Pedido.ESTADO_CREADO
+        )
+        DetallePedido.objects.create(pedido=self.pedido, producto=self.producto, cantidad=2)
+
+    def test_cambiar_estado_publica_evento(self):
+        """Cambiar estado registra un delta con el pedido serializado al confirmar la transacción"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pedido.cambiar_estado(Pedido.ESTADO_CONFIRMADO)
+
+        evento = EventoCocina.objects.get(pedido=self.pedido)
+        self.assertEqual(evento.tipo, EventoCocina.TIPO_ESTADO)
+        self.assertEqual(evento.datos['estado'], Pedido.ESTADO_CONFIRMADO)
+        self.assertEqual(evento.datos['detalles'][0]['producto'], 'Pizza')
+
+    def test_snapshot_consultas_constantes(self):
+        """El snapshot de cocina no hace una consulta por pedido"""
+        for numero in range(2, 7):
+            mesa = Mesa.objects.create(numero=numero, capacidad=4)
+            pedido = Pedido.objects.create(mesa=mesa, estado=Pedido.ESTADO_CREADO)
+            DetallePedido.objects.create(pedido=pedido, producto=self.producto, cantidad=1)
+
+        from .eventos import snapshot_cocina
+        # pedidos + detalles + productos, sin importar cuántos pedidos haya
+        with self.assertNumQueries(3):
+            pedidos = snapshot_cocina()
+        self.assertEqual(len(pedidos), 6)
+
+    @override_settings(COCINA_STREAM_DURACION=0)
+    def test_stream_envia_snapshot_y_reanuda_desde_cursor(self):
+        """El stream envía snapshot inicial y, con Last-Event-ID, solo los deltas pendientes"""
+        self.client.login(username='cocinero', password='testpass123')
+        response = self.client.get(reverse('stream_cocina'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenido = b''.join(response.streaming_content).decode()
+        self.assertIn('event: snapshot', contenido)
+        self.assertIn('Pizza', contenido)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pedido.cambiar_estado(Pedido.ESTADO_CONFIRMADO)
+        cursor = EventoCocina.objects.get().cursor - 1
+
+        with override_settings(COCINA_STREAM_DURACION=0.5, COCINA_STREAM_INTERVALO=0.01):
+            response = self.client.get(reverse('stream_cocina'), HTTP_LAST_EVENT_ID=str(cursor))
+            contenido = b''.join(response.streaming_content).decode()
+        self.assertNotIn('event: snapshot', contenido)
+        self.assertIn('event: pedido', contenido)
+
+
+class FeedCocinaOrdenCommitTestCase(TransactionTestCase):
+    """El cursor del feed sigue el orden de commit, no el de los INSERT"""
+
+    def test_evento_posterior_no_se_confirma_antes(self):
+        from .eventos import _registrar_evento
+
+        mesa = Mesa.objects.create(numero=1, capacidad=4)
+        primero, segundo = (Pedido.objects.create(mesa=mesa) for _ in range(2))
+        insertado, liberar = threading.Event(), threading.Event()
+
+        def worker_lento():
+            try:
+                with transaction.atomic():
+                    _registrar_evento(primero.id, EventoCocina.TIPO_CREADO)
+                    insertado.set()
+                    liberar.wait(5)
+            finally:
+                connection.close()
+
+        def worker_rapido():
+            try:
+                _registrar_evento(segundo.id, EventoCocina.TIPO_CREADO)
+            finally:
+                connection.close()
+
+        lento = threading.Thread(target=worker_lento)
+        lento.start()
+        insertado.wait(5)
+        rapido = threading.Thread(target=worker_rapido)
+        rapido.start()
+
+        # El segundo espera al primero: un stream no puede ver su cursor y saltear el otro
+        rapido.join(0.3)
+        self.assertTrue(rapido.is_alive())
+        self.assertFalse(EventoCocina.objects.exists())
+
+        liberar.set()
+        lento.join()
+        rapido.join()
+        self.assertEqual(
+            list(EventoCocina.objects.values_list('pedido_id', flat=True)), [primero.id, segundo.id]
+        )
+        primer_cursor, segundo_cursor = EventoCocina.objects.values_list('cursor', flat=True)
+        self.assertEqual(segundo_cursor, primer_cursor + 1)
+
+
+class CursorCambiosTestCase(TestCase):
+    """Tests para el cursor de cambios (?since=) y ETag de los paneles"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from app.caja.models import JornadaLaboral
+        cache.clear()
+        self.client = Client()
+        self.usuario = Usuario.objects.create_user(
+            username='mesero',
+            password='testpass123',
+            rol='mesero'
+        )
+        JornadaLaboral.objects.create(cajero=self.usuario)
+        self.client.login(username='mesero', password='testpass123')
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        categoria = Categoria.objects.create(nombre='Comida')
+        self.producto = Producto.objects.create(
+            nombre='Pizza',
+            precio=Decimal('40.00'),
+            categoria=categoria,
+            disponible=True
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listo = Pedido.objects.create(mesa=self.mesa, estado=Pedido.ESTADO_LISTO)
+            self.entregado = Pedido.objects.create(mesa=self.mesa, estado=Pedido.ESTADO_ENTREGADO)
+        self.url = reverse('api_pedidos_mesero')
+
+    def test_escrituras_sellan_version_monotona(self):
+        """Cada escritura de pedido o detalle avanza el cursor y sella la fila"""
+        self.listo.refresh_from_db()
+        version_inicial = self.listo.version
+        self.assertGreater(version_inicial, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DetallePedido.objects.create(pedido=self.listo, producto=self.producto, cantidad=1)
+
+        self.listo.refresh_from_db()
+        self.assertGreater(self.listo.version, version_inicial)
+
+    def test_since_devuelve_solo_cambios_y_removidos(self):
+        """Con ?since= solo llegan pedidos cambiados; los que salen de la lista van en 'removidos'"""
+        cursor = self.client.get(self.url).json()['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entregado.estado = Pedido.ESTADO_CERRADO
+            self.entregado.save()
+
+        data = self.client.get(self.url, {'since': cursor}).json()
+        self.assertTrue(data['delta'])
+        self.assertEqual(data['pedidos_listos'], [])
+        self.assertEqual(data['pedidos_entregados'], [])
+        self.assertEqual(data['removidos'], [self.entregado.id])
+
+    def test_etag_sin_cambios_responde_304(self):
+        """Si el cursor no avanzó, If-None-Match devuelve 304"""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listo.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class StockLoteTestCase(TestCase):
+    """Descuento/devolución de stock en un solo lote bloqueado"""
+
+    def setUp(self):
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        categoria = Categoria.objects.create(nombre='Comida')
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Producto {i}',
+                precio=Decimal('10.00'),
+                categoria=categoria,
+                requiere_inventario=True,
+                stock_actual=10,
+                stock_minimo=0
+            )
+            for i in range(5)
+        ]
+
+    def _crear_pedido(self, cantidades):
+        pedido = Pedido.objects.create(mesa=self.mesa)
+        for producto, cantidad in zip(self.productos, cantidades):
+            DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=cantidad)
+        return pedido
+
+    def _stock(self):
+        return list(Producto.objects.order_by('id').values_list('stock_actual', flat=True))
+
+    def test_consultas_constantes_por_pedido(self):
+        """El costo no crece con la cantidad de líneas del pedido"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from app.productos.stock import descontar_stock_pedidos
+
+        una_linea = self._crear_pedido([1])
+        cinco_lineas = self._crear_pedido([1, 1, 1, 1, 1])
+
+        with CaptureQueriesContext(connection) as consultas_una:
+            descontar_stock_pedidos([una_linea.id])
+        with CaptureQueriesContext(connection) as consultas_cinco:
+            descontar_stock_pedidos([cinco_lineas.id])
+
+        self.assertEqual(len(consultas_una), len(consultas_cinco))
+        self.assertEqual(self._stock(), [8, 9, 9, 9, 9])
+
+    def test_varios_pedidos_en_un_lote(self):
+        from app.productos.stock import descontar_stock_pedidos
+
+        a = self._crear_pedido([2, 1])
+        b = self._crear_pedido([3])
+        productos, faltantes = descontar_stock_pedidos([a.id, b.id])
+
+        self.assertEqual(faltantes, [])
+        self.assertEqual(len(productos), 2)
+        self.assertEqual(self._stock(), [5, 9, 10, 10, 10])
+
+    def test_faltante_no_aplica_nada(self):
+        """Si un producto no alcanza, ninguna línea se descuenta"""
+        from app.productos.stock import StockInsuficiente
+
+        pedido = self._crear_pedido([2, 20])
+        with self.assertRaises(StockInsuficiente) as contexto:
+            pedido.confirmar()
+
+        self.assertEqual(contexto.exception.faltantes[0]['producto_id'], self.productos[1].id)
+        self.assertEqual(self._stock(), [10, 10, 10, 10, 10])
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado, Pedido.ESTADO_CREADO)
+
+    def test_confirmar_y_cancelar_devuelve_stock(self):
+        pedido = self._crear_pedido([2, 3])
+        pedido.confirmar()
+        self.assertEqual(self._stock(), [8, 7, 10, 10, 10])
+
+        pedido.cambiar_estado(Pedido.ESTADO_CANCELADO, motivo='Cliente se fue')
+        self.assertEqual(self._stock(), [10, 10, 10, 10, 10])
+
+    def test_modificar_pedido_reserva_diferencia_en_lote(self):
+        """Eliminar, reducir, aumentar y agregar líneas en una sola reserva"""
+        from app.pedidos.utils import modificar_pedido_con_stock
+
+        pedido = self._crear_pedido([2, 3, 1])
+        # El stock de las líneas originales ya se había descontado
+        Producto.objects.filter(id__in=[p.id for p in self.productos[:3]]).update(stock_actual=5)
+
+        resultado = modificar_pedido_con_stock(pedido.id, {
+            self.productos[0].id: 4,   # +2
+            self.productos[1].id: 1,   # -2
+            self.productos[3].id: 2,   # nuevo
+        })
+
+        self.assertEqual(self._stock(), [3, 7, 6, 8, 10])
+        cantidades = dict(pedido.detalles.values_list('producto_id', 'cantidad'))
+        self.assertEqual(cantidades, {
+            self.productos[0].id: 4,
+            self.productos[1].id: 1,
+            self.productos[3].id: 2,
+        })
+        self.assertEqual(resultado['nuevo_total'], 70.0)
+
+    def test_modificar_pedido_con_faltantes_no_aplica_nada(self):
+        pedido = self._crear_pedido([1, 1])
+        usuario = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        self.client.force_login(usuario)
+
+        response = self.client.post(
+            reverse('modificar_pedido', args=[pedido.id]),
+            {'productos': {self.productos[0].id: 5, self.productos[1].id: 30}},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        faltantes = response.json()['faltantes']
+        self.assertEqual([f['producto_id'] for f in faltantes], [self.productos[1].id])
+        self.assertEqual(self._stock(), [10, 10, 10, 10, 10])
+        self.assertEqual(pedido.detalles.get(producto=self.productos[0]).cantidad, 1)
+
+
+class TotalesIncrementalesTestCase(TestCase):
+    """Totales del pedido mantenidos con deltas atómicos por cada línea"""
+
+    def setUp(self):
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        self.cafe = Producto.objects.create(nombre='Café', precio=Decimal('8.00'))
+        self.torta = Producto.objects.create(nombre='Torta', precio=Decimal('15.00'))
+        self.pedido = Pedido.objects.create(mesa=self.mesa, descuento=Decimal('5.00'), propina=Decimal('2.00'))
+        cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero')
+        self.client.force_login(cajero)
+
+    def _totales(self):
+        pedido = Pedido.objects.get(id=self.pedido.id)
+        return pedido.total, pedido.total_final, pedido.cantidad_lineas
+
+    def test_alta_cambio_y_baja_de_lineas(self):
+        detalle = DetallePedido.objects.create(pedido=self.pedido, producto=self.cafe, cantidad=2)
+        DetallePedido.objects.create(pedido=self.pedido, producto=self.torta, cantidad=1)
+        self.assertEqual(self._totales(), (Decimal('31.00'), Decimal('28.00'), 2))
+        # La instancia en memoria recibe los valores del UPDATE
+        self.assertEqual(self.pedido.total_final, Decimal('28.00'))
+
+        detalle = DetallePedido.objects.get(id=detalle.id)
+        detalle.cantidad = 5
+        detalle.subtotal = detalle.precio_unitario * 5
+        # Subtotal previo con la fila bloqueada + UPDATE del detalle + UPDATE del pedido (+ savepoint)
+        with self.assertNumQueries(5):
+            detalle.save()
+        self.assertEqual(self._totales(), (Decimal('55.00'), Decimal('52.00'), 2))
+
+        detalle.delete()
+        self.assertEqual(self._totales(), (Decimal('15.00'), Decimal('12.00'), 1))
+
+    def test_ediciones_concurrentes_de_la_misma_linea(self):
+        detalle = DetallePedido.objects.create(pedido=self.pedido, producto=self.cafe, cantidad=1)
+
+        # Dos requests cargan la línea antes de que cualquiera guarde
+        primera = DetallePedido.objects.get(id=detalle.id)
+        segunda = DetallePedido.objects.get(id=detalle.id)
+        primera.cantidad, primera.subtotal = 3, Decimal('24.00')
+        primera.save()
+        segunda.cantidad, segunda.subtotal = 5, Decimal('40.00')
+        segunda.save()
+
+        # El delta de la segunda parte del subtotal guardado (24), no del leído (8)
+        self.assertEqual(self._totales(), (Decimal('40.00'), Decimal('37.00'), 1))
+
+        primera.delete()
+        segunda.delete()  # Ya borrada: no descuenta dos veces
+        self.assertEqual(self._totales(), (Decimal('0.00'), Decimal('0.00'), 0))
+
+    def test_apis_de_caja_sin_recalcular_lineas(self):
+        DetallePedido.objects.create(pedido=self.pedido, producto=self.cafe, cantidad=1)
+
+        response = self.client.post('/api/caja/pedidos/agregar-producto/', {
+            'pedido_id': self.pedido.id, 'producto_id': self.torta.id, 'cantidad': 2
+        }, content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pedido']['total_final'], 35.0)
+        detalle_id = response.json()['detalle']['id']
+
+        response = self.client.patch(f'/api/caja/pedidos/detalle/{detalle_id}/cantidad/', {
+            'cantidad': 3
+        }, content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pedido']['total'], 53.0)
+
+        response = self.client.delete(f'/api/caja/pedidos/detalle/{detalle_id}/eliminar/', {
+            'motivo': 'Error de carga'
+        }, content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._totales(), (Decimal('8.00'), Decimal('5.00'), 1))
+
+    def test_verificar_y_reparar_deriva(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        DetallePedido.objects.create(pedido=self.pedido, producto=self.cafe, cantidad=3)
+        self.assertEqual(self._totales(), (Decimal('24.00'), Decimal('21.00'), 1))
+
+        # Escritura que no pasa por el modelo
+        DetallePedido.objects.filter(pedido=self.pedido).update(subtotal=Decimal('30.00'))
+        with self.assertRaises(CommandError):
+            call_command('verificar_totales_pedidos', stdout=StringIO())
+
+        call_command('verificar_totales_pedidos', reparar=True, stdout=StringIO())
+        self.assertEqual(self._totales(), (Decimal('30.00'), Decimal('27.00'), 1))
+        call_command('verificar_totales_pedidos', stdout=StringIO())
+
+
+class PedidoViewSetPaginacionTestCase(TestCase):
+    """Listado por cursor (fecha, id), ?fields= y consultas constantes"""
+
+    URL = '/api/pedidos/pedidos/'
+
+    def setUp(self):
+        from datetime import timedelta
+        from app.caja.models import HistorialModificacion
+
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        producto = Producto.objects.create(nombre='Café', precio=Decimal('8.00'))
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero', first_name='Ana')
+        self.client.force_login(self.cajero)
+
+        # Varios pedidos con la misma fecha: el desempate es el id
+        misma_fecha = timezone.now()
+        self.pedidos = []
+        for i in range(12):
+            pedido = Pedido.objects.create(mesa=self.mesa, fecha=misma_fecha if i % 2 else misma_fecha - timedelta(minutes=i))
+            DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=1)
+            DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=2)
+            self.pedidos.append(pedido)
+
+        for pedido in self.pedidos[:6]:
+            pedido.modificado = True
+            pedido.save(update_fields=['modificado'])
+            for motivo in ('primero', 'ultimo'):
+                HistorialModificacion.objects.create(
+                    pedido=pedido, usuario=self.cajero, tipo_cambio='otro',
+                    detalle_anterior={}, detalle_nuevo={}, motivo=motivo
+                )
+
+    def _get(self, url):
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_recorre_todo_sin_repetir(self):
+        vistos = []
+        url = f'{self.URL}?page_size=5'
+        while url:
+            data = self._get(url)
+            vistos.extend(p['id'] for p in data['results'])
+            url = data['next']
+        self.assertEqual(len(vistos), 12)
+        self.assertEqual(set(vistos), {p.id for p in self.pedidos})
+
+    def test_consultas_constantes_por_pagina(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def consultas(page_size):
+            self.client.get(f'{self.URL}?page_size={page_size}', secure=True)  # calentar sesión
+            with CaptureQueriesContext(connection) as contexto:
+                self._get(f'{self.URL}?page_size={page_size}')
+            return len(contexto)
+
+        self.assertEqual(consultas(2), consultas(12))
+
+    def test_modificado_por_y_campos(self):
+        data = self._get(f'{self.URL}?page_size=20')
+        modificados = [p for p in data['results'] if p['modificado']]
+        self.assertEqual(len(modificados), 6)
+        self.assertEqual(modificados[0]['modificado_por']['username'], 'cajero')
+        self.assertEqual(len(data['results'][0]['detalles']), 2)
+
+        data = self._get(f'{self.URL}?fields=id,total')
+        self.assertEqual(set(data['results'][0]), {'id', 'total'})
+
+    def test_cursor_invalido(self):
+        response = self.client.get(f'{self.URL}?cursor=no-es-un-cursor', secure=True)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,124 @@
+"""
+Totales de Pedido mantenidos de forma incremental.
+
+Cada alta, cambio o baja de un DetallePedido (save()/delete()) aplica su
+delta al pedido con UN solo UPDATE atómico:
+
+    total           = total + Δsubtotal
+    total_final     = GREATEST(total + Δsubtotal - descuento + propina, 0)
+    cantidad_lineas = cantidad_lineas + Δlíneas
+
+El UPDATE devuelve (RETURNING) los valores resultantes y se copian a la
+instancia de Pedido que tenga cacheada el detalle, así quien llame a
+`detalle.pedido` ve los totales vigentes sin releer todas las líneas.
+
+Las operaciones en lote (bulk_create/bulk_update/QuerySet.delete) no pasan
+por save()/delete(): quien las use debe fijar los totales del pedido él
+mismo (ver modificar_pedido_con_stock). Cualquier deriva se detecta y se
+corrige con el comando verificar_totales_pedidos.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+logger = logging.getLogger('app.pedidos')
+
+CAMPOS_TOTALES = ('total', 'total_final', 'cantidad_lineas')
+
+
+def total_final_pedido(pedido):
+    """Total con descuento y propina (misma regla que el UPDATE incremental)"""
+    return max(pedido.total - (pedido.descuento or 0) + (pedido.propina or 0), Decimal('0'))
+
+
+def ajustar_totales(pedido_id, delta_total, delta_lineas=0, instancia=None):
+    """
+    Aplica un delta a los totales del pedido en un solo UPDATE.
+
+    Args:
+        pedido_id (int): Pedido afectado
+        delta_total (Decimal): Variación del subtotal de líneas
+        delta_lineas (int): Variación de la cantidad de líneas
+        instancia (Pedido): Instancia en memoria a sincronizar (opcional)
+    """
+    if not delta_total and not delta_lineas:
+        return
+
+    from .models import Pedido
+
+    tabla = Pedido._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {tabla} SET "
+            f"  total = total + %s,"
+            f"  total_final = GREATEST(total + %s - descuento + propina, 0),"
+            f"  cantidad_lineas = cantidad_lineas + %s "
+            f"WHERE id = %s "
+            f"RETURNING total, total_final, cantidad_lineas",
+            [delta_total, delta_total, delta_lineas, pedido_id]
+        )
+        fila = cursor.fetchone()
+
+    if fila and instancia is not None:
+        instancia.total, instancia.total_final, instancia.cantidad_lineas = fila
+
+
+def _totales_reales():
+    """Subconsultas con la suma real de las líneas de cada pedido"""
+    from .models import DetallePedido
+
+    lineas = DetallePedido.objects.filter(pedido_id=OuterRef('pk')).order_by().values('pedido_id')
+    return {
+        'total_real': Coalesce(
+            Subquery(lineas.annotate(suma=Sum('subtotal')).values('suma')),
+            Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+        'lineas_reales': Coalesce(
+            Subquery(lineas.annotate(cuenta=Count('id')).values('cuenta')),
+            Value(0), output_field=IntegerField()
+        ),
+    }
+
+
+def verificar_totales(pedidos=None, reparar=False):
+    """
+    Compara los totales mantenidos contra la suma real de las líneas.
+
+    Args:
+        pedidos (QuerySet): Pedidos a revisar (default: todos)
+        reparar (bool): Corregir la deriva con un UPDATE por lote
+
+    Returns:
+        list: [{'pedido_id', 'total', 'total_real', 'cantidad_lineas', 'lineas_reales'}]
+    """
+    from .models import Pedido
+
+    pedidos = Pedido.objects.all() if pedidos is None else pedidos
+    anotados = pedidos.order_by().annotate(**_totales_reales())
+    desviados = list(
+        anotados.exclude(total=F('total_real'), cantidad_lineas=F('lineas_reales'))
+        .values('id', 'total', 'total_real', 'cantidad_lineas', 'lineas_reales')
+    )
+
+    if desviados and reparar:
+        reales = _totales_reales()
+        Pedido.objects.filter(id__in=[d['id'] for d in desviados]).update(
+            total=reales['total_real'],
+            total_final=Greatest(reales['total_real'] - F('descuento') + F('propina'), Value(Decimal('0'))),
+            cantidad_lineas=reales['lineas_reales'],
+        )
+        logger.warning(f"Totales de {len(desviados)} pedidos reparados: {[d['id'] for d in desviados]}")
+
+    return [
+        {
+            'pedido_id': d['id'],
+            'total': d['total'],
+            'total_real': d['total_real'],
+            'cantidad_lineas': d['cantidad_lineas'],
+            'lineas_reales': d['lineas_reales'],
+        }
+        for d in desviados
+    ]
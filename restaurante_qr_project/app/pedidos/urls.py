@@ -12,6 +12,7 @@ urlpatterns = [
     
     # 👨🍳 APIs para Cocinero
     path('cocina/', views.pedidos_en_cocina_api, name='pedidos_cocina'),
+    path('cocina/stream/', views.stream_cocina, name='stream_cocina'),  # ✅ NUEVO: Feed push SSE
     path('<int:pedido_id>/actualizar/', views.actualizar_estado_pedido, name='actualizar_estado'),
     path('<int:pedido_id>/actualizar-estado/', views.actualizar_estado_pedido, name='actualizar_estado_pedido'),  # Alias para tests
 
@@ -2,8 +2,12 @@
 Utilidades para gestión de pedidos con control de inventario
 """
 from django.db import transaction
-from .models import Pedido, DetallePedido
+from .models import Pedido, DetallePedido, EventoCocina
+from .eventos import publicar_evento_cocina
+from .totales import total_final_pedido
 from app.productos.models import Producto
+from app.productos.stock import StockInsuficiente, aplicar_deltas_stock, requerimientos_pedidos, reservar_stock
+from decimal import Decimal
 import logging
 
 logger = logging.getLogger('app.pedidos')
@@ -51,6 +55,10 @@ def modificar_pedido_con_stock(pedido_id, productos_nuevos, usuario=None):
     Modifica un pedido existente restaurando stock de productos eliminados
     y descontando stock de productos nuevos/aumentados.
 
+    ✅ OPTIMIZADO: La diferencia completa {producto_id: delta} se reserva en un
+    solo lote (app.productos.stock.reservar_stock): filas de Producto
+    bloqueadas en orden de id, un UPDATE y sin aplicación parcial.
+
     Args:
         pedido_id: ID del pedido a modificar
         productos_nuevos: Dict con formato {producto_id: cantidad_nueva}
@@ -60,25 +68,12 @@ def modificar_pedido_con_stock(pedido_id, productos_nuevos, usuario=None):
         dict: {'success': True/False, 'mensaje': str, 'pedido': Pedido}
 
     Raises:
-        ValueError: Si hay stock insuficiente o el pedido no existe
+        ValueError: Si el pedido o algún producto no existe / no es modificable
+        StockInsuficiente: Si falta stock (con .faltantes por producto); no se aplica nada
     """
     try:
-        # 1. Obtener el pedido
-        pedido = Pedido.objects.get(id=pedido_id)
-
-        # Guardar estado anterior para el historial
-        detalle_anterior = {
-            'total': float(pedido.total),
-            'productos': [
-                {
-                    'producto_id': d.producto.id,
-                    'nombre': d.producto.nombre,
-                    'cantidad': d.cantidad,
-                    'precio_unitario': float(d.precio_unitario)
-                }
-                for d in pedido.detalles.all()
-            ]
-        }
+        # 1. Obtener el pedido (bloqueado: caja y mesero no lo editan a la vez)
+        pedido = Pedido.objects.select_for_update().get(id=pedido_id)
 
         # 2. Validar que el pedido se pueda modificar
         # ✅ RONDA 2: Validar contra estados finales
@@ -89,107 +84,108 @@ def modificar_pedido_con_stock(pedido_id, productos_nuevos, usuario=None):
                 f"El pedido ya fue {pedido.get_estado_display().lower()}."
             )
 
-        # 3. Obtener detalles actuales
+        # 3. Obtener detalles actuales (una consulta; también alimentan el historial)
         detalles_actuales = {
-            d.producto.id: d
+            d.producto_id: d
             for d in pedido.detalles.select_related('producto').all()
         }
 
+        # Guardar estado anterior para el historial
+        detalle_anterior = {
+            'total': float(pedido.total),
+            'productos': [
+                {
+                    'producto_id': d.producto.id,
+                    'nombre': d.producto.nombre,
+                    'cantidad': d.cantidad,
+                    'precio_unitario': float(d.precio_unitario)
+                }
+                for d in detalles_actuales.values()
+            ]
+        }
+
         logger.info(f"Modificando pedido #{pedido_id}. Detalles actuales: {list(detalles_actuales.keys())}")
         logger.info(f"Productos nuevos: {productos_nuevos}")
 
-        # 4. Restaurar stock de productos eliminados o reducidos
+        # 4. Productos solicitados (una consulta)
+        productos = Producto.objects.filter(id__in=productos_nuevos, activo=True).in_bulk()
+        for producto_id in productos_nuevos:
+            if producto_id not in productos:
+                raise ValueError(f"Producto con ID {producto_id} no encontrado o no está disponible")
+
+        # 5. Diferencia de stock de toda la modificación {producto_id: delta}
+        # (solo se restaura lo no pagado)
+        diferencias = {}
         for producto_id, detalle_actual in detalles_actuales.items():
             if producto_id not in productos_nuevos:
-                # Producto eliminado completamente - restaurar todo el stock
-                cantidad_a_restaurar = detalle_actual.cantidad - detalle_actual.cantidad_pagada
-
-                if cantidad_a_restaurar > 0:
-                    detalle_actual.producto.agregar_stock(cantidad_a_restaurar)
-                    logger.info(
-                        f"  [OK] Producto '{detalle_actual.producto.nombre}' eliminado - "
-                        f"Stock restaurado: {cantidad_a_restaurar} unidades"
-                    )
-
-                # Eliminar el detalle
-                detalle_actual.delete()
-
+                diferencias[producto_id] = -max(detalle_actual.cantidad_pendiente, 0)
             elif productos_nuevos[producto_id] < detalle_actual.cantidad:
-                # Cantidad reducida - restaurar diferencia (solo lo no pagado)
-                diferencia = detalle_actual.cantidad - productos_nuevos[producto_id]
-                cantidad_a_restaurar = min(diferencia, detalle_actual.cantidad_pendiente)
-
-                if cantidad_a_restaurar > 0:
-                    detalle_actual.producto.agregar_stock(cantidad_a_restaurar)
-                    logger.info(
-                        f"  [OK] Cantidad reducida de '{detalle_actual.producto.nombre}' - "
-                        f"Stock restaurado: {cantidad_a_restaurar} unidades"
-                    )
-
-        # 5. Descontar stock de productos nuevos o aumentados
-        errores_stock = []
+                reduccion = detalle_actual.cantidad - productos_nuevos[producto_id]
+                diferencias[producto_id] = -max(min(reduccion, detalle_actual.cantidad_pendiente), 0)
 
         for producto_id, cantidad_nueva in productos_nuevos.items():
-            try:
-                producto = Producto.objects.get(id=producto_id, activo=True)
-            except Producto.DoesNotExist:
-                raise ValueError(f"Producto con ID {producto_id} no encontrado o no está disponible")
+            detalle_actual = detalles_actuales.get(producto_id)
+            if detalle_actual is None:
+                diferencias[producto_id] = cantidad_nueva
+            elif cantidad_nueva > detalle_actual.cantidad:
+                diferencias[producto_id] = cantidad_nueva - detalle_actual.cantidad
+
+        # 6. Reservar todo el lote; con faltantes no se aplica nada
+        faltantes = reservar_stock(diferencias)
+        if faltantes:
+            raise StockInsuficiente(faltantes)
+
+        # 7. Aplicar cambios en las líneas (en lote) y recalcular el total en memoria
+        eliminados = []
+        modificados = []
+        detalles_finales = []
 
-            if producto_id not in detalles_actuales:
-                # Producto NUEVO - descontar todo el stock
-                if not producto.descontar_stock(cantidad_nueva):
-                    errores_stock.append(
-                        f"{producto.nombre}: Stock insuficiente "
-                        f"(Disponible: {producto.stock_actual}, Solicitado: {cantidad_nueva})"
-                    )
-                else:
-                    logger.info(
-                        f"  [OK] Producto nuevo '{producto.nombre}' agregado - "
-                        f"Stock descontado: {cantidad_nueva} unidades"
-                    )
-
-                    # Crear nuevo detalle
-                    DetallePedido.objects.create(
-                        pedido=pedido,
-                        producto=producto,
-                        cantidad=cantidad_nueva,
-                        precio_unitario=producto.precio,
-                        subtotal=producto.precio * cantidad_nueva
-                    )
-
-            elif cantidad_nueva > detalles_actuales[producto_id].cantidad:
-                # Cantidad AUMENTADA - descontar solo la diferencia
-                diferencia = cantidad_nueva - detalles_actuales[producto_id].cantidad
-
-                if not producto.descontar_stock(diferencia):
-                    errores_stock.append(
-                        f"{producto.nombre}: Stock insuficiente para aumentar cantidad "
-                        f"(Disponible: {producto.stock_actual}, Adicional: {diferencia})"
-                    )
-                else:
-                    logger.info(
-                        f"  [OK] Cantidad aumentada de '{producto.nombre}' - "
-                        f"Stock descontado: {diferencia} unidades"
-                    )
-
-                    # Actualizar detalle existente
-                    detalle = detalles_actuales[producto_id]
-                    detalle.cantidad = cantidad_nueva
-                    detalle.subtotal = detalle.precio_unitario * cantidad_nueva
-                    detalle.save()
-
-            else:
-                # Cantidad sin cambios - no hacer nada con el stock
-                logger.info(f"  [INFO] Producto '{producto.nombre}' sin cambios de cantidad")
-
-        # 6. Si hubo errores de stock, hacer rollback
-        if errores_stock:
-            raise ValueError("Errores de stock:\n" + "\n".join(errores_stock))
-
-        # 7. Recalcular total del pedido
-        pedido.total = pedido.calcular_total()
+        for producto_id, detalle_actual in detalles_actuales.items():
+            if producto_id not in productos_nuevos:
+                eliminados.append(detalle_actual.id)
+                logger.info(f"  [OK] Producto '{detalle_actual.producto.nombre}' eliminado")
+                continue
+
+            cantidad_nueva = max(productos_nuevos[producto_id], detalle_actual.cantidad_pagada)
+            if cantidad_nueva != detalle_actual.cantidad:
+                logger.info(
+                    f"  [OK] Cantidad de '{detalle_actual.producto.nombre}': "
+                    f"{detalle_actual.cantidad} -> {cantidad_nueva}"
+                )
+                detalle_actual.cantidad = cantidad_nueva
+                detalle_actual.subtotal = detalle_actual.precio_unitario * cantidad_nueva
+                modificados.append(detalle_actual)
+            detalles_finales.append(detalle_actual)
+
+        nuevos = [
+            DetallePedido(
+                pedido=pedido,
+                producto=productos[producto_id],
+                cantidad=cantidad_nueva,
+                precio_unitario=productos[producto_id].precio,
+                subtotal=productos[producto_id].precio * cantidad_nueva
+            )
+            for producto_id, cantidad_nueva in productos_nuevos.items()
+            if producto_id not in detalles_actuales
+        ]
+
+        if eliminados:
+            DetallePedido.objects.filter(id__in=eliminados).delete()
+        if modificados:
+            DetallePedido.objects.bulk_update(modificados, ['cantidad', 'subtotal'])
+        if nuevos:
+            DetallePedido.objects.bulk_create(nuevos)
+            detalles_finales.extend(nuevos)
+
+        # pedido.save() avanza el cursor de cambios por todo el lote de líneas.
+        # Las operaciones en lote no pasan por DetallePedido.save(): los totales
+        # se fijan aquí (el pedido está bloqueado)
+        pedido.total = sum((d.subtotal for d in detalles_finales), Decimal('0'))
+        pedido.total_final = total_final_pedido(pedido)
+        pedido.cantidad_lineas = len(detalles_finales)
         pedido.modificado = True  # Marcar como modificado
         pedido.save()
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
         # 8. Guardar historial de modificación
         if usuario:
@@ -205,7 +201,7 @@ def modificar_pedido_con_stock(pedido_id, productos_nuevos, usuario=None):
                             'cantidad': d.cantidad,
                             'precio_unitario': float(d.precio_unitario)
                         }
-                        for d in pedido.detalles.all()
+                        for d in detalles_finales
                     ]
                 }
 
@@ -251,6 +247,10 @@ def modificar_pedido_con_stock(pedido_id, productos_nuevos, usuario=None):
         logger.error(f"Producto no encontrado al modificar pedido: {e}")
         raise ValueError(f"Producto no encontrado: {e}")
 
+    except StockInsuficiente as e:
+        logger.warning(f"Stock insuficiente modificando pedido #{pedido_id}: {e.faltantes}")
+        raise
+
     except Exception as e:
         logger.exception(f"Error modificando pedido #{pedido_id}: {str(e)}")
         raise
@@ -271,7 +271,9 @@ def eliminar_producto_de_pedido(pedido_id, producto_id):
     """
     try:
         pedido = Pedido.objects.get(id=pedido_id)
-        detalle = DetallePedido.objects.get(pedido=pedido, producto_id=producto_id)
+        # Por el related manager: detalle.pedido es esta misma instancia y
+        # recibe los totales actualizados por DetallePedido.save()/delete()
+        detalle = pedido.detalles.get(producto_id=producto_id)
 
         # Verificar que no esté completamente pagado
         if detalle.esta_pagado_completo:
@@ -283,7 +285,7 @@ def eliminar_producto_de_pedido(pedido_id, producto_id):
         cantidad_a_restaurar = detalle.cantidad_pendiente
 
         if cantidad_a_restaurar > 0:
-            detalle.producto.agregar_stock(cantidad_a_restaurar)
+            reservar_stock({detalle.producto_id: -cantidad_a_restaurar})
             logger.info(
                 f"Stock restaurado: {cantidad_a_restaurar} unidades de '{detalle.producto.nombre}'"
             )
@@ -304,10 +306,9 @@ def eliminar_producto_de_pedido(pedido_id, producto_id):
             detalle.delete()
             mensaje = f"Producto '{producto_nombre}' eliminado completamente del pedido"
 
-        # Recalcular total
-        pedido.total = pedido.calcular_total()
         pedido.modificado = True
-        pedido.save()
+        pedido.save(update_fields=['modificado'])
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
         logger.info(f"[OK] {mensaje}. Nuevo total: Bs/ {pedido.total}")
 
@@ -392,25 +393,17 @@ def devolver_stock_pedido(pedido):
         )
         return 0
 
-    productos_restaurados = 0
-
-    for detalle in pedido.detalles.all():
-        producto = detalle.producto
-
-        # Solo devolver stock si el producto requiere control de inventario
-        if not producto.requiere_inventario:
-            continue
-
-        # Devolver stock
-        producto.agregar_stock(detalle.cantidad)
-        productos_restaurados += 1
+    # ✅ OPTIMIZADO: Devolución en un solo lote bloqueado (app.productos.stock)
+    requerimientos = requerimientos_pedidos([pedido.id])
+    productos, _ = aplicar_deltas_stock(requerimientos)
 
+    for producto in productos:
         logger.info(
             f"AUDIT stock_devuelto pedido_id={pedido.id} "
             f"producto={producto.nombre} "
-            f"cantidad={detalle.cantidad} "
+            f"cantidad={requerimientos[producto.id]} "
             f"stock_nuevo={producto.stock_actual} "
             f"ts={timezone.now().isoformat()}"
         )
 
-    return productos_restaurados
+    return len(productos)
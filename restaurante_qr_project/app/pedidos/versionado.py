@@ -0,0 +1,89 @@
+"""
+Cursor monótono de cambios para los paneles con polling (mesero y caja).
+
+Cada escritura de Pedido, DetallePedido o Mesa sella la fila afectada con el
+siguiente valor de ContadorCambios (columna `version`). Los endpoints aceptan
+?since=<cursor> y devuelven solo las entidades con version > cursor, o 304 si
+el cursor no avanzó (ETag / If-None-Match).
+
+El sellado corre en on_commit y en una sola sentencia (upsert del contador + UPDATE),
+así las versiones se hacen visibles en orden: nunca aparece después una fila con
+versión menor al cursor que ya recibió un cliente.
+"""
+import logging
+
+from django.db import connection, transaction
+
+logger = logging.getLogger('app.pedidos')
+
+
+def registrar_cambio(modelo, pk):
+    """Programa el sellado de versión de la fila (modelo, pk) al confirmar la transacción"""
+    if pk is None:
+        return
+    transaction.on_commit(lambda: _sellar_version(modelo, pk))
+
+
+def registrar_cambios(modelo, pks):
+    """
+    Como registrar_cambio() para un lote (QuerySet.update): todas las filas
+    reciben la misma versión en una sola sentencia
+    """
+    pks = [pk for pk in pks if pk is not None]
+    if pks:
+        transaction.on_commit(lambda: _sellar_version(modelo, pks))
+
+
+def _sellar_version(modelo, pk):
+    from .models import ContadorCambios
+
+    contador = ContadorCambios._meta.db_table
+    tabla = modelo._meta.db_table
+    pks = list(pk) if isinstance(pk, (list, tuple, set)) else [pk]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH c AS ("
+                f"  INSERT INTO {contador} (id, valor) VALUES (%s, 1)"
+                f"  ON CONFLICT (id) DO UPDATE SET valor = {contador}.valor + 1 RETURNING valor"
+                f") UPDATE {tabla} SET version = c.valor FROM c WHERE {tabla}.id = ANY(%s)",
+                [ContadorCambios.ID_UNICO, pks]
+            )
+    except Exception as e:
+        # Corre tras el commit: la fila queda con su versión anterior y los polls
+        # ?since= la omiten hasta su próximo cambio (una carga completa sí la trae)
+        logger.error(f"Error sellando versión de {tabla} #{pk}: {str(e)}")
+
+
+def cursor_actual():
+    """Último valor emitido por el contador (0 si aún no hubo cambios)"""
+    from .models import ContadorCambios
+
+    valor = ContadorCambios.objects.filter(id=ContadorCambios.ID_UNICO).values_list('valor', flat=True).first()
+    return valor or 0
+
+
+def parse_since(request):
+    """Extrae ?since=<cursor> como entero (None si no viene o es inválido)"""
+    since = request.GET.get('since')
+    if since is None:
+        return None
+    try:
+        since = int(since)
+    except ValueError:
+        return None
+    return since if since >= 0 else None
+
+
+def etag_cursor(cursor, *partes):
+    """ETag débil derivado del cursor (y de partes extra que afecten el payload)"""
+    sufijo = '-'.join(str(p) for p in partes)
+    return f'W/"{cursor}{"-" + sufijo if sufijo else ""}"'
+
+
+def no_modificado(request, etag):
+    """True si el cliente ya tiene la versión actual (If-None-Match)"""
+    recibido = request.headers.get('If-None-Match')
+    if not recibido:
+        return False
+    return etag in [valor.strip() for valor in recibido.split(',')]
@@ -1,8 +1,10 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.db import transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -10,13 +12,21 @@ from rest_framework.response import Response
 from datetime import date, datetime, timedelta
 import logging
 
-from .models import Pedido, DetallePedido
-from .serializers import PedidoSerializer
+from .models import Pedido, DetallePedido, EventoCocina
+from .serializers import PedidoSerializer, campos_solicitados
+from .paginacion import CursorFechaIdPagination
+from .eventos import snapshot_cocina, stream_eventos_cocina, publicar_evento_cocina
+from .versionado import cursor_actual, parse_since, etag_cursor, no_modificado
 from app.mesas.models import Mesa
 from app.productos.models import Producto
+from app.productos.stock import StockInsuficiente
 from app.reservas.models import Reserva
+from app.reservas.disponibilidad import ocupacion_dia
+
+from app.configuracion.idempotencia import idempotente
 
 from django.contrib.auth.decorators import login_required
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 #  Configurar logger
@@ -404,76 +414,77 @@ def mapa_mesas_mesero(request):
 #  FUNCIN 1 CORREGIDA: api_pedidos_mesero
 @login_required
 def api_pedidos_mesero(request):
-    """API para obtener pedidos del mesero (listos y entregados) - DJANGO AUTH"""
+    """API para obtener pedidos del mesero (listos y entregados) - DJANGO AUTH
+
+    ✅ NUEVO: Soporta ?since=<cursor> (solo pedidos cambiados + 'removidos') y
+    responde 304 con ETag/If-None-Match cuando no hubo cambios.
+    """
     try:
-        logger.info(f" API Pedidos Mesero - Usuario: {request.user}")
-        logger.info(f" Usuario autenticado: {request.user.is_authenticated}")
-        
         fecha_hoy = date.today()
-        
+
+        # Leer el cursor ANTES de consultar: un cambio concurrente se reenvía en el próximo poll
+        cursor = cursor_actual()
+        etag = etag_cursor(cursor, fecha_hoy.isoformat())
+        if no_modificado(request, etag):
+            response = HttpResponse(status=304)
+            response['ETag'] = etag
+            return response
+
+        since = parse_since(request)
+
         #  SOLUCIONADO: Usar 'detalles' en lugar de 'detallepedido_set'
-        pedidos_listos = Pedido.objects.filter(
-            estado='listo',
-            fecha__date=fecha_hoy
-        ).select_related('mesa').prefetch_related('detalles__producto').order_by('-fecha')
-        
-        pedidos_entregados = Pedido.objects.filter(
-            estado='entregado',
+        pedidos = Pedido.objects.filter(
+            estado__in=['listo', 'entregado'],
             fecha__date=fecha_hoy
         ).select_related('mesa').prefetch_related('detalles__producto').order_by('-fecha')
-        
-        logger.info(f" Pedidos listos encontrados: {pedidos_listos.count()}")
-        logger.info(f" Pedidos entregados encontrados: {pedidos_entregados.count()}")
-        
-        # Serializar pedidos listos
+
+        removidos = []
+        if since is not None:
+            pedidos = pedidos.filter(version__gt=since)
+            cambiados = set(Pedido.objects.filter(version__gt=since).values_list('id', flat=True))
+
         pedidos_listos_data = []
-        for pedido in pedidos_listos:
-            try:
-                #  SOLUCIONADO: Usar 'detalles' en lugar de 'detallepedido_set'
-                productos = [detalle.producto.nombre for detalle in pedido.detalles.all()]
-            except Exception as e:
-                logger.warning(f"Error al obtener productos del pedido {pedido.id}: {e}")
-                productos = [f'Pedido Mesa {pedido.mesa.numero if pedido.mesa else "N/A"}']
-                
-            pedidos_listos_data.append({
-                'id': pedido.id,
-                'mesa': pedido.mesa.numero if pedido.mesa else 'Sin mesa',
-                'tiempo': pedido.fecha.strftime('%H:%M'),
-                'productos': productos,
-                'total': f'Bs/ {pedido.total:.2f}',
-                'forma_pago': pedido.forma_pago,
-                'observaciones': getattr(pedido, 'observaciones', '') or ''
-            })
-        
-        # Serializar pedidos entregados
         pedidos_entregados_data = []
-        for pedido in pedidos_entregados:
+        for pedido in pedidos:
             try:
                 #  SOLUCIONADO: Usar 'detalles' en lugar de 'detallepedido_set'
                 productos = [detalle.producto.nombre for detalle in pedido.detalles.all()]
             except Exception as e:
                 logger.warning(f"Error al obtener productos del pedido {pedido.id}: {e}")
                 productos = [f'Pedido Mesa {pedido.mesa.numero if pedido.mesa else "N/A"}']
-                
-            pedidos_entregados_data.append({
+
+            pedido_data = {
                 'id': pedido.id,
                 'mesa': pedido.mesa.numero if pedido.mesa else 'Sin mesa',
                 'tiempo': pedido.fecha.strftime('%H:%M'),
                 'productos': productos,
                 'total': f'Bs/ {pedido.total:.2f}',
                 'forma_pago': pedido.forma_pago
-            })
-        
+            }
+            if pedido.estado == 'listo':
+                pedido_data['observaciones'] = getattr(pedido, 'observaciones', '') or ''
+                pedidos_listos_data.append(pedido_data)
+            else:
+                pedidos_entregados_data.append(pedido_data)
+
+        if since is not None:
+            # Pedidos que cambiaron pero ya no pertenecen a ninguna lista (cerrados, cancelados...)
+            incluidos = {p['id'] for p in pedidos_listos_data + pedidos_entregados_data}
+            removidos = sorted(cambiados - incluidos)
+
         response_data = {
             'success': True,
             'pedidos_listos': pedidos_listos_data,
             'pedidos_entregados': pedidos_entregados_data,
+            'cursor': cursor,
+            'delta': since is not None,
+            'removidos': removidos,
             'timestamp': datetime.now().isoformat()
         }
-        
-        logger.info(f" Enviando {len(pedidos_listos_data)} pedidos listos y {len(pedidos_entregados_data)} entregados")
-        
-        return JsonResponse(response_data)
+
+        response = JsonResponse(response_data)
+        response['ETag'] = etag
+        return response
         
     except Exception as e:
         logger.info(f" Error en api_pedidos_mesero: {str(e)}")
@@ -510,9 +521,10 @@ def api_reservas_mesero(request):
             logger.info(f"   Reserva #{reserva.id}: {reserva.nombre_completo} | {reserva.fecha_reserva} | {reserva.estado}")
         
         # Obtener reservas de hoy
+        # ✅ OPTIMIZADO: select_related('mesa') evita una consulta por reserva
         reservas_hoy = Reserva.objects.filter(
             fecha_reserva=fecha_hoy
-        ).order_by('hora_reserva')
+        ).select_related('mesa').order_by('hora_reserva')
         
         logger.info(f" Reservas encontradas para HOY ({fecha_hoy}): {reservas_hoy.count()}")
         
@@ -523,7 +535,7 @@ def api_reservas_mesero(request):
         # Prximas reservas (maana en adelante)
         reservas_proximas = Reserva.objects.filter(
             fecha_reserva__gte=fecha_manana
-        ).order_by('fecha_reserva', 'hora_reserva')[:10]
+        ).select_related('mesa').order_by('fecha_reserva', 'hora_reserva')[:10]
         
         logger.info(f" Prximas reservas encontradas: {reservas_proximas.count()}")
         
@@ -786,6 +798,19 @@ def api_asignar_mesa_reserva(request, reserva_id):
                 'error': f'Mesa {mesa_numero} no encontrada'
             }, status=404)
         
+        # ✅ NUEVO: Verificar el horario con la grilla de ocupación (en memoria)
+        ocupacion = ocupacion_dia(reserva.fecha_reserva)
+        if ocupacion.ocupada(mesa.id, reserva.hora_reserva, excluir_reserva=reserva.id):
+            mesas_sugeridas = Mesa.objects.filter(
+                disponible=True, activo=True, capacidad__gte=reserva.numero_personas
+            ).only('id', 'numero', 'capacidad')
+            libres = ocupacion.mesas_libres(mesas_sugeridas, reserva.hora_reserva, excluir_reserva=reserva.id)
+            return JsonResponse({
+                'success': False,
+                'error': f'Mesa {mesa_numero} ya está reservada en ese horario',
+                'mesas_libres': [m.numero for m in libres]
+            }, status=409)
+
         mesa_anterior = reserva.mesa.numero if reserva.mesa else None
         reserva.mesa = mesa
         reserva.save()
@@ -819,80 +844,20 @@ def api_asignar_mesa_reserva(request, reserva_id):
 #  NUEVA FUNCIN PARA REEMPLAZAR PedidosEnCocinaAPIView
 @login_required
 def pedidos_en_cocina_api(request):
-    """API para obtener todos los pedidos para la cocina - DJANGO AUTH"""
+    """API para obtener todos los pedidos para la cocina - DJANGO AUTH
+
+    ✅ OPTIMIZADO: Snapshot con consultas constantes (select_related + prefetch).
+    El panel usa el stream SSE (stream_cocina); este endpoint queda como
+    carga inicial y fallback de polling.
+    """
     try:
-        #  Debug: Verificar el usuario y rol
-        logger.info(f" API Cocina - Usuario autenticado: {request.user}")
-        logger.info(f" Username: {request.user.username}")
-        
         #  CORREGIDO: Solo mostrar pedidos que el cocinero necesita trabajar
         # Excluir 'listo' y 'entregado' porque ya no son responsabilidad del cocinero
-        pedidos = Pedido.objects.filter(
-            estado__in=[
-                Pedido.ESTADO_CREADO,
-                Pedido.ESTADO_CONFIRMADO,
-                Pedido.ESTADO_EN_PREPARACION
-            ]  #  SOLO ESTOS ESTADOS
-        ).order_by('-fecha')
-        
-        logger.info(f" Pedidos encontrados para cocina: {pedidos.count()}")
-        
-        pedidos_data = []
-        for pedido in pedidos:
-            logger.info(f" Procesando pedido ID: {pedido.id}, Mesa: {pedido.mesa}, Estado: {pedido.estado}")
-            
-            #  SOLUCIONADO: Usar 'detalles' en lugar de 'detallepedido_set'
-            try:
-                detalles = pedido.detalles.all()  #  CORREGIDO
-                if detalles.exists():
-                    detalles_data = []
-                    for detalle in detalles:
-                        detalles_data.append({
-                            'cantidad': detalle.cantidad,
-                            'producto': detalle.producto.nombre if detalle.producto else 'Producto',
-                            'subtotal': float(detalle.subtotal)
-                        })
-                    logger.info(f"   Detalles encontrados: {len(detalles_data)}")
-                else:
-                    # Si no hay detalles, crear uno genrico
-                    detalles_data = [
-                        {
-                            'cantidad': 1,
-                            'producto': f'Pedido para mesa {pedido.mesa.numero if pedido.mesa else "N/A"}',
-                            'subtotal': float(pedido.total)
-                        }
-                    ]
-                    logger.info("   No hay detalles, creando genrico")
-            except Exception as e:
-                logger.info(f"   Error obteniendo detalles: {str(e)}")
-                # Fallback: usar datos bsicos
-                detalles_data = [
-                    {
-                        'cantidad': 1,
-                        'producto': f'Producto para mesa {pedido.mesa.numero if pedido.mesa else "N/A"}',
-                        'subtotal': float(pedido.total)
-                    }
-                ]
-            
-            #  NUEVO: Informacin del mesero que comand
-            mesero_nombre = "Cliente directo"
-            if pedido.mesero_comanda:
-                mesero_nombre = f"{pedido.mesero_comanda.first_name} {pedido.mesero_comanda.last_name}".strip() or pedido.mesero_comanda.username
+        pedidos_data = snapshot_cocina()
 
-            pedidos_data.append({
-                'id': pedido.id,
-                'mesa': pedido.mesa.numero if pedido.mesa else 'N/A',
-                'estado': pedido.estado,
-                'total': float(pedido.total),
-                'fecha': pedido.fecha.isoformat(),
-                'detalles': detalles_data,
-                'numero_personas': pedido.numero_personas,
-                'mesero': mesero_nombre
-            })
-        
-        logger.info(f" Enviando {len(pedidos_data)} pedidos al frontend (solo pendientes y en preparacin)")
+        logger.debug(f" Enviando {len(pedidos_data)} pedidos a cocina (usuario: {request.user})")
         return JsonResponse(pedidos_data, safe=False)
-        
+
     except Exception as e:
         logger.info(f" ERROR GRAVE en pedidos_en_cocina_api: {str(e)}")
         import traceback
@@ -903,6 +868,29 @@ def pedidos_en_cocina_api(request):
             'mensaje_debug': 'Ver consola del servidor para detalles'
         }, status=500)
 
+# ✅ NUEVO: Feed push de cocina (Server-Sent Events)
+@login_required
+def stream_cocina(request):
+    """
+    Stream SSE de pedidos para cocina.
+
+    Envía un snapshot inicial y luego solo deltas (creado, estado, modificado).
+    Si el navegador reconecta con Last-Event-ID, reanuda sin repetir el snapshot.
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor')
+    try:
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        cursor = None
+
+    response = StreamingHttpResponse(
+        stream_eventos_cocina(cursor),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Evitar buffering en nginx
+    return response
+
 #  FUNCIN CORREGIDA: actualizar_estado_pedido
 @login_required
 def actualizar_estado_pedido(request, pedido_id):
@@ -951,6 +939,7 @@ def actualizar_estado_pedido(request, pedido_id):
         # Actualizar el estado
         pedido.estado = nuevo_estado
         pedido.save()
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_ESTADO)
 
         logger.info(f" Pedido {pedido_id} actualizado de '{estado_anterior}' a '{nuevo_estado}'")
 
@@ -1069,9 +1058,51 @@ def marcar_entregado(request, pedido_id):
 
 #  CRUD completo (opcional si usas routers)
 class PedidoViewSet(viewsets.ModelViewSet):
-    queryset = Pedido.objects.all().order_by('-fecha')
+    """
+    ✅ OPTIMIZADO: Listado paginado por cursor (fecha, id), con ?fields= y
+    consultas constantes por página (no crecen con page_size).
+    """
+    queryset = Pedido.objects.all().order_by('-fecha', '-id')
     serializer_class = PedidoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorFechaIdPagination
+
+    def get_queryset(self):
+        from app.caja.models import HistorialModificacion
+
+        queryset = super().get_queryset()
+        campos = campos_solicitados(self.request)
+
+        def solicitado(campo):
+            return campos is None or campo in campos
+
+        if solicitado('mesa_numero'):
+            queryset = queryset.select_related('mesa')
+        if solicitado('detalles'):
+            queryset = queryset.prefetch_related(
+                Prefetch('detalles', queryset=DetallePedido.objects.select_related('producto').order_by('id'))
+            )
+        if solicitado('modificado_por'):
+            # Solo la última modificación de cada pedido (ventana por pedido)
+            ultima = HistorialModificacion.objects.select_related('usuario').annotate(
+                orden=Window(RowNumber(), partition_by=F('pedido_id'), order_by=F('fecha_hora').desc())
+            ).filter(orden=1)
+            queryset = queryset.prefetch_related(
+                Prefetch('historial_modificaciones', queryset=ultima, to_attr='ultimas_modificaciones')
+            )
+        return queryset
+
+    @method_decorator(idempotente)
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        pedido = serializer.save()
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_CREADO)
+
+    def perform_update(self, serializer):
+        pedido = serializer.save()
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_MODIFICADO)
 
 # 
 #  MODIFICACIN DE PEDIDOS CON STOCK
@@ -1079,6 +1110,7 @@ class PedidoViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotente
 def modificar_pedido_api(request, pedido_id):
     """
     API para modificar un pedido existente con control de stock.
@@ -1120,6 +1152,13 @@ def modificar_pedido_api(request, pedido_id):
             'nuevo_total': resultado['nuevo_total']
         }, status=status.HTTP_200_OK)
 
+    except StockInsuficiente as e:
+        # ✅ NUEVO: Faltantes por producto (no se aplicó ningún cambio)
+        return Response({
+            'error': e.messages[0],
+            'faltantes': e.faltantes
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     except ValueError as e:
         logger.warning(f"Error de validacin modificando pedido #{pedido_id}: {str(e)}")
         return Response({
@@ -1258,6 +1297,7 @@ def cancelar_pedido(request, pedido_id):
         pedido.estado = Pedido.ESTADO_CANCELADO
         pedido.motivo_cancelacion = motivo
         pedido.save()
+        publicar_evento_cocina(pedido.id, EventoCocina.TIPO_ESTADO)
 
         logger.info(
             f"AUDIT pedido_cancelado pedido_id={pedido.id} "
@@ -0,0 +1,142 @@
+"""
+Derivados responsivos de Producto.imagen (miniaturas WebP/JPEG).
+
+Las fotos del menú se suben a resolución completa. Por cada imagen se
+generan versiones reducidas a anchos fijos (ANCHOS) en WebP y JPEG, para que
+el menú del cliente las ofrezca en un srcset y el teléfono descargue solo el
+tamaño que necesita.
+
+Los derivados se guardan con direccionamiento por contenido junto al
+original:
+
+    productos/derivados/<hash del original>-<ancho>.<formato>
+
+El mismo archivo subido dos veces reutiliza los derivados, y una imagen nueva
+nunca pisa las URLs de la anterior. Qué derivados existen queda registrado en
+Producto.imagen_derivados (manifiesto):
+
+    {'original': 'productos/foto.jpg', 'hash': '...', 'anchos': [160, 320]}
+
+Generación: al guardar un producto con imagen nueva (al confirmar la
+transacción) o con el comando generar_derivados_imagenes (backfill en un pool
+de procesos). Mientras no hay manifiesto se sirve solo el original.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger('app.productos')
+
+ANCHOS = (160, 320, 640)
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+CARPETA_DERIVADOS = 'derivados'
+
+
+def ruta_derivado(original, hash_contenido, ancho, formato):
+    carpeta = posixpath.join(posixpath.dirname(original), CARPETA_DERIVADOS)
+    return posixpath.join(carpeta, f'{hash_contenido}-{ancho}.{formato}')
+
+
+def generar_derivados(original):
+    """
+    Genera los derivados de una imagen ya guardada en el storage.
+
+    No accede a la base de datos (se puede ejecutar en otro proceso).
+
+    Args:
+        original (str): Nombre del archivo en el storage (Producto.imagen.name)
+
+    Returns:
+        dict: Manifiesto {'original', 'hash', 'anchos'}
+    """
+    with default_storage.open(original, 'rb') as archivo:
+        datos = archivo.read()
+    hash_contenido = hashlib.sha256(datos).hexdigest()[:20]
+
+    with Image.open(io.BytesIO(datos)) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ('RGB', 'RGBA'):
+            con_alfa = 'A' in imagen.getbands() or 'transparency' in imagen.info
+            imagen = imagen.convert('RGBA' if con_alfa else 'RGB')
+        # Sin ampliar: solo anchos menores que el original (al menos el más chico)
+        anchos = [ancho for ancho in ANCHOS if ancho < imagen.width] or [min(ANCHOS[0], imagen.width)]
+
+        for ancho in anchos:
+            alto = max(1, round(imagen.height * ancho / imagen.width))
+            reducida = None
+            for formato, opciones in FORMATOS.items():
+                ruta = ruta_derivado(original, hash_contenido, ancho, formato)
+                if default_storage.exists(ruta):
+                    continue
+                if reducida is None:
+                    reducida = imagen.resize((ancho, alto), Image.LANCZOS)
+                salida = io.BytesIO()
+                copia = reducida if formato == 'webp' else reducida.convert('RGB')
+                copia.save(salida, **opciones)
+                default_storage.save(ruta, ContentFile(salida.getvalue()))
+
+    return {'original': original, 'hash': hash_contenido, 'anchos': anchos}
+
+
+def manifiesto_vigente(producto):
+    """Manifiesto de derivados si corresponde a la imagen actual, o None"""
+    manifiesto = producto.imagen_derivados or {}
+    if producto.imagen and manifiesto.get('original') == producto.imagen.name:
+        return manifiesto
+    return None
+
+
+def srcset(producto, formato='webp'):
+    """
+    Valor del atributo srcset ('' si todavía no hay derivados).
+
+    Ejemplo: '/media/productos/derivados/ab12-160.webp 160w, ...'
+    """
+    manifiesto = manifiesto_vigente(producto)
+    if not manifiesto:
+        return ''
+    return ', '.join(
+        f"{default_storage.url(ruta_derivado(manifiesto['original'], manifiesto['hash'], ancho, formato))} {ancho}w"
+        for ancho in manifiesto['anchos']
+    )
+
+
+def url_miniatura(producto, formato='webp'):
+    """URL del derivado más chico (o del original si no hay derivados)"""
+    manifiesto = manifiesto_vigente(producto)
+    if not manifiesto:
+        return producto.imagen.url if producto.imagen else ''
+    return default_storage.url(
+        ruta_derivado(manifiesto['original'], manifiesto['hash'], manifiesto['anchos'][0], formato)
+    )
+
+
+def generar_derivados_producto(producto_id):
+    """
+    Genera los derivados de la imagen actual de un producto y guarda el
+    manifiesto (sin pasar por save(); luego republica el menú).
+    """
+    from .menu_cache import publicar_menu
+    from .models import Producto
+
+    producto = Producto.objects.filter(id=producto_id).only('id', 'imagen', 'imagen_derivados').first()
+    if not producto or not producto.imagen or manifiesto_vigente(producto):
+        return
+
+    try:
+        manifiesto = generar_derivados(producto.imagen.name)
+    except Exception as e:
+        logger.warning(f"No se pudieron generar derivados de {producto.imagen.name}: {e}")
+        return
+
+    Producto.objects.filter(id=producto_id).update(imagen_derivados=manifiesto)
+    publicar_menu()
+    logger.info(f"Derivados generados para producto {producto_id}: {manifiesto['anchos']}")
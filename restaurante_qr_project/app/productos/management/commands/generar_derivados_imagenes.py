@@ -0,0 +1,74 @@
+"""
+Comando de Django para generar las miniaturas de las imágenes existentes.
+
+Uso:
+    python manage.py generar_derivados_imagenes                 # solo las que faltan
+    python manage.py generar_derivados_imagenes --workers 4
+    python manage.py generar_derivados_imagenes --todos         # regenerar todas
+
+Las imágenes se procesan en un pool de procesos (Pillow es CPU intensivo).
+Los procesos solo leen/escriben archivos; los manifiestos se guardan en la
+base desde el proceso principal y al final se republica el menú.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.productos.imagenes import generar_derivados, manifiesto_vigente
+from app.productos.menu_cache import reconstruir_menu
+from app.productos.models import Producto
+import logging
+
+logger = logging.getLogger('app.productos')
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas WebP/JPEG de Producto.imagen en un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Procesos en paralelo (default: CPUs disponibles)')
+        parser.add_argument('--todos', action='store_true',
+                            help='Regenerar también las imágenes que ya tienen derivados')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers debe ser al menos 1')
+
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True).only('id', 'imagen', 'imagen_derivados')
+        pendientes = {}
+        for producto in productos:
+            if options['todos'] or not manifiesto_vigente(producto):
+                pendientes.setdefault(producto.imagen.name, []).append(producto.id)
+
+        if not pendientes:
+            self.stdout.write(self.style.SUCCESS('✅ Todas las imágenes ya tienen derivados'))
+            return
+
+        self.stdout.write(f'🖼️ Generando derivados de {len(pendientes)} imágenes con {options["workers"]} procesos...')
+
+        # Los procesos hijos no deben heredar conexiones abiertas a la BD
+        connections.close_all()
+
+        generadas = 0
+        errores = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futuros = {pool.submit(generar_derivados, original): original for original in pendientes}
+            for futuro in as_completed(futuros):
+                original = futuros[futuro]
+                try:
+                    manifiesto = futuro.result()
+                except Exception as e:
+                    errores += 1
+                    self.stdout.write(self.style.WARNING(f'⚠️ {original}: {e}'))
+                    continue
+                Producto.objects.filter(id__in=pendientes[original]).update(imagen_derivados=manifiesto)
+                generadas += 1
+
+        if generadas:
+            reconstruir_menu()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Derivados generados: {generadas} imágenes, {errores} con error'))
+        logger.info(f'Comando generar_derivados_imagenes ejecutado: {generadas} ok, {errores} errores')
@@ -0,0 +1,131 @@
+"""
+Snapshot versionado del menú público (QR de las mesas).
+
+Cada escaneo de QR pide /api/productos/agrupados/. En lugar de recorrer los
+productos en cada request, el menú agrupado se serializa una sola vez a un
+blob JSON que vive en la caché compartida (ver CACHE_BACKEND en settings):
+
+- version: hash del contenido; dos workers que reconstruyen el mismo menú
+  obtienen la misma versión
+- etag: ETag fuerte derivado de la versión (If-None-Match → 304)
+
+Invalidación explícita (write-through): al guardar o eliminar un Producto o
+una Categoría (incluye eliminar_suave/restaurar) y cuando un producto pasa
+de tener stock a agotado o viceversa, el snapshot se reconstruye al
+confirmar la transacción. El TTL es solo una red de seguridad.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .imagenes import srcset
+
+logger = logging.getLogger('app.productos')
+
+CACHE_KEY_MENU = 'menu_publico_snapshot'
+CACHE_TIMEOUT = 60 * 60 * 24  # 24 horas (red de seguridad; la publicación es explícita)
+MAX_AGE_NAVEGADOR = 30  # segundos que el cliente puede reutilizar el menú sin revalidar
+
+CATEGORIA_POR_DEFECTO = 'Menú Principal'
+
+
+def _url_imagen(producto):
+    if not producto.imagen:
+        return ''
+    try:
+        return producto.imagen.url
+    except Exception as e:
+        logger.warning(f"Error procesando imagen para {producto.nombre}: {e}")
+        return ''
+
+
+def construir_menu():
+    """
+    Arma el menú agrupado por categoría (una consulta).
+
+    Returns:
+        dict: {'categorias': [{'nombre', 'productos'}], 'total_productos'}
+    """
+    from .models import Producto
+
+    productos = (
+        Producto.objects.filter(activo=True)
+        .filter(Q(categoria__isnull=True) | Q(categoria__activo=True))
+        .select_related('categoria')
+        .order_by('nombre')
+    )
+
+    agrupados = {}
+    total = 0
+    for producto in productos:
+        categoria = producto.categoria.nombre if producto.categoria else CATEGORIA_POR_DEFECTO
+        agrupados.setdefault(categoria, []).append({
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'precio': float(producto.precio),
+            'descripcion': producto.descripcion or '',
+            'imagen': _url_imagen(producto),
+            # Miniaturas responsivas ('' hasta que se generen los derivados)
+            'srcset': srcset(producto, 'webp'),
+            'srcset_jpeg': srcset(producto, 'jpeg'),
+            # Un producto agotado no se puede pedir aunque esté marcado disponible
+            'disponible': producto.disponible and not producto.agotado,
+        })
+        total += 1
+
+    return {
+        'categorias': [
+            {'nombre': nombre, 'productos': lista}
+            for nombre, lista in agrupados.items()
+        ],
+        'total_productos': total,
+    }
+
+
+def _serializar(menu):
+    contenido = json.dumps(menu, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    version = hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16]
+    menu = {**menu, 'version': version}
+    return {
+        'version': version,
+        'etag': f'"menu-{version}"',
+        'contenido': json.dumps(menu, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+    }
+
+
+def reconstruir_menu():
+    """
+    Reconstruye el snapshot y lo publica en la caché compartida.
+
+    Returns:
+        dict: Snapshot {'version', 'etag', 'contenido' (bytes JSON)}
+    """
+    snapshot = _serializar(construir_menu())
+    cache.set(CACHE_KEY_MENU, snapshot, CACHE_TIMEOUT)
+    logger.debug(f"Menú público reconstruido (versión {snapshot['version']})")
+    return snapshot
+
+
+def obtener_menu():
+    """
+    Snapshot vigente del menú; se reconstruye si la caché está vacía.
+
+    Returns:
+        dict: Snapshot {'version', 'etag', 'contenido' (bytes JSON)}
+    """
+    snapshot = cache.get(CACHE_KEY_MENU)
+    if snapshot is None:
+        snapshot = reconstruir_menu()
+    return snapshot
+
+
+def publicar_menu():
+    """
+    Reconstruye el snapshot al confirmar la transacción actual (inmediato si
+    no hay transacción abierta).
+    """
+    transaction.on_commit(reconstruir_menu)
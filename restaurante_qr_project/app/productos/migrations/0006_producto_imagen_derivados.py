@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_alter_producto_activo_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_derivados',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Manifiesto de miniaturas WebP/JPEG de la imagen (ver productos.imagenes)'),
+        ),
+    ]
@@ -11,13 +11,17 @@ Gestiona el catálogo de productos del restaurante:
 IMPORTANTE: Los productos pueden tener recetas asociadas (Inventario)
 que se usan para descontar stock automáticamente al confirmar pedidos.
 """
-from django.db import models
+from django.db import models, transaction
 from django.db.models import F
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 import logging
 
+from .imagenes import generar_derivados_producto, manifiesto_vigente, url_miniatura
+from .menu_cache import publicar_menu
+from app.caja.alertas import programar_escaneo_alertas
+
 logger = logging.getLogger(__name__)
 
 class Categoria(models.Model):
@@ -30,6 +34,15 @@ class Categoria(models.Model):
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        publicar_menu()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        publicar_menu()
+        return resultado
+
     def eliminar_suave(self, usuario=None):
         from django.utils import timezone
         self.activo = False
@@ -51,6 +64,7 @@ class Producto(models.Model):
     disponible = models.BooleanField(default=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True, related_name="productos")
     imagen = models.ImageField(upload_to="productos/", blank=True, null=True)
+    imagen_derivados = models.JSONField(default=dict, blank=True, editable=False, help_text="Manifiesto de miniaturas WebP/JPEG de la imagen (ver productos.imagenes)")
     stock_actual = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     stock_minimo = models.IntegerField(default=5, validators=[MinValueValidator(0)])
     requiere_inventario = models.BooleanField(default=False)
@@ -74,7 +88,23 @@ class Producto(models.Model):
         """
         self.full_clean()
         super().save(*args, **kwargs)
+        # ✅ NUEVO: Miniaturas de una imagen nueva (después del commit: el archivo ya está en el storage)
+        if self.imagen and not manifiesto_vigente(self):
+            producto_id = self.pk
+            transaction.on_commit(lambda: generar_derivados_producto(producto_id))
+        # ✅ NUEVO: Reconstruir el menú público al confirmar
+        publicar_menu()
 
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        publicar_menu()
+        return resultado
+
+
+    @property
+    def imagen_miniatura_url(self):
+        """URL de la miniatura más chica (o del original si aún no hay derivados)"""
+        return url_miniatura(self)
 
     @property
     def stock_bajo(self):
@@ -96,25 +126,27 @@ class Producto(models.Model):
         updated = Producto.objects.filter(id=self.id, stock_actual__gte=cantidad).update(stock_actual=F("stock_actual") - cantidad)
         if updated:
             self.refresh_from_db()
+            if self.agotado:
+                publicar_menu()
             if self.stock_bajo:
-                self._crear_alerta_stock()
+                programar_escaneo_alertas()
             return True
         return False
 
     def agregar_stock(self, cantidad):
         if cantidad <= 0:
             return False
+        agotado_antes = self.agotado
+        bajo_antes = self.stock_bajo
         Producto.objects.filter(id=self.id).update(stock_actual=F("stock_actual") + cantidad)
         self.refresh_from_db()
+        if agotado_antes and not self.agotado:
+            publicar_menu()
+        if bajo_antes and not self.stock_bajo:
+            # Repuesto: el escáner resuelve la alerta activa
+            programar_escaneo_alertas()
         return True
 
-    def _crear_alerta_stock(self):
-        try:
-            from app.caja.models import AlertaStock
-            AlertaStock.objects.get_or_create(producto=self, tipo="stock_bajo" if self.stock_actual > 0 else "agotado", estado="activa", defaults={"stock_actual": self.stock_actual, "mensaje": f"{self.nombre} - Stock: {self.stock_actual}"})
-        except Exception as e:
-            logger.warning(f"Error al crear alerta de stock para {self.nombre}: {e}")
-
     def eliminar_suave(self, usuario=None):
         from django.utils import timezone
         self.activo = False
@@ -0,0 +1,193 @@
+"""
+Motor de stock por lotes (Producto.stock_actual).
+
+En lugar de un save()/UPDATE + refresh por producto:
+
+1. Se calcula en memoria el vector de requerimientos {producto_id: cantidad}
+   de uno o varios pedidos (una consulta agrupada).
+2. Se bloquean las filas de Producto afectadas con un único
+   SELECT ... FOR UPDATE ordenado por id (orden fijo = sin deadlocks entre
+   confirmaciones concurrentes).
+3. Se valida todo el lote; si falta stock no se aplica nada.
+4. Se aplica un solo UPDATE con CASE/WHEN sobre F('stock_actual').
+
+El costo es constante por pedido (no crece con la cantidad de líneas) y no
+hay actualizaciones perdidas: las filas quedan bloqueadas hasta el commit.
+
+Las modificaciones de pedidos usan reservar_stock() con la diferencia
+completa {producto_id: delta}: mismo lote, sin aplicación parcial.
+
+CRÍTICO: Llamar dentro de transaction.atomic (las funciones públicas ya lo son).
+"""
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, When
+
+from app.caja.alertas import programar_escaneo_alertas
+
+from .menu_cache import publicar_menu
+from .models import Producto
+
+logger = logging.getLogger('app.productos')
+
+
+class StockInsuficiente(ValidationError):
+    """
+    No hay stock para todo el lote; no se aplicó ningún movimiento.
+
+    Attributes:
+        faltantes (list): [{'producto_id', 'producto', 'solicitado', 'disponible'}]
+    """
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        detalle = ', '.join(
+            f"'{f['producto']}' (necesario: {f['solicitado']}, disponible: {f['disponible']})"
+            for f in faltantes
+        )
+        super().__init__(f"Stock insuficiente para {detalle}")
+
+
+def requerimientos_pedidos(pedido_ids):
+    """
+    Vector de requerimientos de stock de uno o varios pedidos.
+
+    Returns:
+        dict: {producto_id: cantidad} solo de productos con requiere_inventario
+    """
+    from app.pedidos.models import DetallePedido
+
+    filas = DetallePedido.objects.filter(
+        pedido_id__in=pedido_ids,
+        producto__requiere_inventario=True
+    ).values('producto_id').annotate(cantidad=Sum('cantidad'))
+    return {fila['producto_id']: fila['cantidad'] for fila in filas}
+
+
+@transaction.atomic
+def aplicar_deltas_stock(deltas, permitir_parcial=False):
+    """
+    Aplica {producto_id: delta} en un solo lote (delta negativo = descuento).
+
+    Args:
+        deltas (dict): Movimientos por producto; los productos sin
+            requiere_inventario se ignoran
+        permitir_parcial (bool): Si True, omite los productos sin stock y
+            aplica el resto; si False, lanza StockInsuficiente sin aplicar nada
+
+    Returns:
+        tuple: (productos actualizados con el stock nuevo, faltantes omitidos)
+
+    Raises:
+        StockInsuficiente: Si falta stock y permitir_parcial=False
+    """
+    deltas = {producto_id: delta for producto_id, delta in deltas.items() if delta}
+    if not deltas:
+        return [], []
+
+    productos = list(
+        Producto.objects.select_for_update()
+        .filter(id__in=deltas, requiere_inventario=True)
+        .order_by('id')
+        .only('id', 'nombre', 'stock_actual', 'stock_minimo', 'requiere_inventario')
+    )
+
+    faltantes = [
+        {
+            'producto_id': producto.id,
+            'producto': producto.nombre,
+            'solicitado': -deltas[producto.id],
+            'disponible': producto.stock_actual,
+        }
+        for producto in productos
+        if producto.stock_actual + deltas[producto.id] < 0
+    ]
+    if faltantes and not permitir_parcial:
+        raise StockInsuficiente(faltantes)
+
+    sin_stock = {f['producto_id'] for f in faltantes}
+    productos = [producto for producto in productos if producto.id not in sin_stock]
+    if not productos:
+        return [], faltantes
+
+    # Un UPDATE para todo el lote; las filas están bloqueadas, así que el
+    # resultado es exactamente stock_actual + delta
+    Producto.objects.filter(id__in=[producto.id for producto in productos]).update(
+        stock_actual=Case(
+            *[When(id=producto.id, then=F('stock_actual') + deltas[producto.id]) for producto in productos],
+            output_field=IntegerField()
+        )
+    )
+
+    cambio_disponibilidad = False
+    cambio_alertas = False
+    for producto in productos:
+        agotado_antes = producto.agotado
+        bajo_antes = producto.stock_bajo
+        producto.stock_actual += deltas[producto.id]
+        cambio_disponibilidad |= agotado_antes != producto.agotado
+        cambio_alertas |= producto.stock_bajo or bajo_antes
+
+    # Un solo escaneo de alertas por lote (al confirmar la transacción)
+    if cambio_alertas:
+        programar_escaneo_alertas()
+
+    # El menú público muestra los agotados como no disponibles
+    if cambio_disponibilidad:
+        publicar_menu()
+
+    return productos, faltantes
+
+
+def reservar_stock(diferencias):
+    """
+    Reserva (o libera) stock para una modificación completa de pedido.
+
+    Args:
+        diferencias (dict): {producto_id: delta}; positivo = unidades que se
+            reservan (descuentan), negativo = unidades que se liberan
+
+    Returns:
+        list: Faltantes por producto ([] si se aplicó todo). Con faltantes no
+            se aplica ningún movimiento.
+    """
+    try:
+        aplicar_deltas_stock({producto_id: -delta for producto_id, delta in diferencias.items()})
+    except StockInsuficiente as e:
+        return e.faltantes
+    return []
+
+
+@transaction.atomic
+def descontar_stock_pedidos(pedido_ids, permitir_parcial=False):
+    """
+    Descuenta el stock de uno o varios pedidos en un solo lote.
+
+    Returns:
+        tuple: (productos actualizados, faltantes omitidos)
+
+    Raises:
+        StockInsuficiente: Si falta stock y permitir_parcial=False
+    """
+    requerimientos = requerimientos_pedidos(pedido_ids)
+    productos, faltantes = aplicar_deltas_stock(
+        {producto_id: -cantidad for producto_id, cantidad in requerimientos.items()},
+        permitir_parcial=permitir_parcial
+    )
+    if faltantes:
+        logger.warning(f"Stock no descontado (sin disponibilidad) en pedidos {list(pedido_ids)}: {faltantes}")
+    return productos, faltantes
+
+
+@transaction.atomic
+def devolver_stock_pedidos(pedido_ids):
+    """
+    Devuelve al inventario el stock de uno o varios pedidos en un solo lote.
+
+    Returns:
+        list: Productos actualizados (stock_actual ya refleja la devolución)
+    """
+    productos, _ = aplicar_deltas_stock(requerimientos_pedidos(pedido_ids))
+    return productos
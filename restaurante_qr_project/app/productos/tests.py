@@ -0,0 +1,189 @@
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from app.productos.imagenes import ANCHOS, ruta_derivado
+from app.productos.models import Categoria, Producto
+from app.productos.stock import aplicar_deltas_stock
+
+URL_MENU = '/api/productos/agrupados/'
+
+
+class MenuSnapshotTestCase(TestCase):
+    """Menú público precalculado, versionado y servido con ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+        self.producto = Producto.objects.create(
+            nombre='Limonada',
+            precio=Decimal('12.50'),
+            categoria=self.categoria,
+            requiere_inventario=True,
+            stock_actual=2,
+            stock_minimo=0
+        )
+        Producto.objects.create(nombre='Sopa', precio=Decimal('20.00'))
+
+    def _menu(self, **headers):
+        return self.client.get(URL_MENU, secure=True, **headers)
+
+    def test_menu_agrupado_con_etag(self):
+        response = self._menu()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"menu-'))
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        data = response.json()
+        self.assertEqual(data['total_productos'], 2)
+        self.assertEqual(response['ETag'], f'"menu-{data["version"]}"')
+        categorias = {c['nombre']: c['productos'] for c in data['categorias']}
+        self.assertEqual(categorias['Bebidas'][0]['precio'], 12.5)
+        self.assertEqual(categorias['Menú Principal'][0]['nombre'], 'Sopa')
+
+    def test_snapshot_sin_consultas_y_304(self):
+        etag = self._menu()['ETag']
+
+        with self.assertNumQueries(0):
+            response = self._menu(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.assertEqual(self._menu(HTTP_IF_NONE_MATCH='W/' + etag).status_code, 304)
+        self.assertEqual(self._menu(HTTP_IF_NONE_MATCH='"menu-vieja"').status_code, 200)
+
+    def test_guardar_producto_publica_nueva_version(self):
+        etag = self._menu()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.precio = Decimal('15.00')
+            self.producto.save()
+
+        response = self._menu(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_eliminar_suave_y_restaurar_categoria(self):
+        self._menu()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria.eliminar_suave()
+        self.assertEqual(self._menu().json()['total_productos'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria.restaurar()
+        self.assertEqual(self._menu().json()['total_productos'], 2)
+
+    def test_agotado_se_publica_como_no_disponible(self):
+        self._menu()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            aplicar_deltas_stock({self.producto.id: -1})
+        # Sigue habiendo stock: el menú no cambia
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_deltas_stock({self.producto.id: -1})
+        limonada = self._menu().json()['categorias'][0]['productos'][0]
+        self.assertFalse(limonada['disponible'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.refresh_from_db()
+            self.producto.agregar_stock(5)
+        limonada = self._menu().json()['categorias'][0]['productos'][0]
+        self.assertTrue(limonada['disponible'])
+
+
+def imagen_subida(ancho, alto, nombre='foto.png'):
+    salida = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 80, 40)).save(salida, 'PNG')
+    return SimpleUploadedFile(nombre, salida.getvalue(), content_type='image/png')
+
+
+class MediaTemporalMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.media = tempfile.mkdtemp(prefix='media_test_')
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _existe(self, producto, ancho, formato):
+        manifiesto = producto.imagen_derivados
+        return default_storage.exists(ruta_derivado(manifiesto['original'], manifiesto['hash'], ancho, formato))
+
+
+class ImagenDerivadosTestCase(MediaTemporalMixin, TestCase):
+    """Miniaturas WebP/JPEG de Producto.imagen"""
+
+    def test_subir_imagen_genera_derivados_y_srcset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(nombre='Pizza', precio=Decimal('50.00'), imagen=imagen_subida(1200, 800))
+
+        producto.refresh_from_db()
+        self.assertEqual(producto.imagen_derivados['anchos'], list(ANCHOS))
+        for ancho in ANCHOS:
+            self.assertTrue(self._existe(producto, ancho, 'webp'))
+            self.assertTrue(self._existe(producto, ancho, 'jpeg'))
+
+        with default_storage.open(ruta_derivado(producto.imagen.name, producto.imagen_derivados['hash'], 320, 'webp')) as archivo:
+            self.assertEqual(Image.open(archivo).size, (320, 213))
+
+        pizza = self.client.get(URL_MENU, secure=True).json()['categorias'][0]['productos'][0]
+        self.assertEqual(pizza['srcset'].count('w,'), len(ANCHOS) - 1)
+        self.assertIn('.webp 640w', pizza['srcset'])
+        self.assertIn('.jpeg 160w', pizza['srcset_jpeg'])
+        self.assertTrue(producto.imagen_miniatura_url.endswith('-160.webp'))
+
+    def test_imagen_chica_no_se_amplia(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(nombre='Icono', precio=Decimal('5.00'), imagen=imagen_subida(100, 100))
+        producto.refresh_from_db()
+        self.assertEqual(producto.imagen_derivados['anchos'], [100])
+
+    def test_imagen_nueva_invalida_el_manifiesto(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(nombre='Pizza', precio=Decimal('50.00'), imagen=imagen_subida(800, 600))
+        producto.refresh_from_db()
+        hash_anterior = producto.imagen_derivados['hash']
+
+        producto.imagen = imagen_subida(900, 600, 'otra.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        producto.refresh_from_db()
+        self.assertNotEqual(producto.imagen_derivados['hash'], hash_anterior)
+        self.assertEqual(producto.imagen_derivados['original'], producto.imagen.name)
+
+
+class GenerarDerivadosComandoTestCase(MediaTemporalMixin, TransactionTestCase):
+    """Backfill en pool de procesos (TransactionTestCase: el comando cierra las conexiones)"""
+
+    def test_backfill_de_imagenes_existentes(self):
+        nombre = default_storage.save('productos/existente.png', imagen_subida(700, 700))
+        Producto.objects.bulk_create([
+            Producto(nombre='Sin derivados', precio=Decimal('10.00'), imagen=nombre),
+            Producto(nombre='Misma foto', precio=Decimal('12.00'), imagen=nombre),
+            Producto(nombre='Sin imagen', precio=Decimal('8.00')),
+        ])
+
+        call_command('generar_derivados_imagenes', workers=2, stdout=io.StringIO())
+
+        productos = Producto.objects.exclude(imagen='').order_by('id')
+        self.assertEqual(len(productos), 2)
+        for producto in productos:
+            self.assertEqual(producto.imagen_derivados['anchos'], list(ANCHOS))
+            self.assertTrue(self._existe(producto, 640, 'jpeg'))
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.media, 'productos', 'derivados'))), len(ANCHOS) * 2
+        )
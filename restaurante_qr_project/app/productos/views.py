@@ -4,7 +4,10 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Producto
+from .menu_cache import MAX_AGE_NAVEGADOR, obtener_menu
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,77 +17,26 @@ logger = logging.getLogger(__name__)
 def productos_agrupados(request):
     """
     API para obtener productos agrupados por categoría para el menú del cliente
+
+    ✅ OPTIMIZADO: Sirve el snapshot precalculado del menú (ver menu_cache).
+    Responde 304 si el cliente ya tiene la versión vigente (If-None-Match).
     """
     try:
-        logger.debug("Cargando productos para el menú del cliente")
-
-        # Obtener todos los productos activos
-        productos = Producto.objects.filter(activo=True).order_by('nombre')
-        logger.debug(f"Productos encontrados: {productos.count()}")
-        
-        # Agrupar productos por categoría
-        productos_agrupados = {}
-        
-        for producto in productos:
-            # Convertir categoría a string
-            try:
-                if hasattr(producto, 'categoria') and producto.categoria:
-                    categoria = str(producto.categoria.nombre if hasattr(producto.categoria, 'nombre') else producto.categoria)
-                else:
-                    categoria = 'Menú Principal'
-            except Exception as e:
-                logger.warning(f"Error obteniendo categoría: {e}")
-                categoria = 'Menú Principal'
-
-            if categoria not in productos_agrupados:
-                productos_agrupados[categoria] = []
-
-            # Procesar imagen
-            imagen_url = ''
-            if hasattr(producto, 'imagen') and producto.imagen:
-                try:
-                    if hasattr(producto.imagen, 'url'):
-                        imagen_url = producto.imagen.url
-                    elif hasattr(producto.imagen, 'name') and producto.imagen.name:
-                        imagen_url = f"{settings.MEDIA_URL}{producto.imagen.name}"
-                    else:
-                        imagen_str = str(producto.imagen).strip()
-                        if imagen_str and imagen_str != '':
-                            imagen_url = imagen_str if imagen_str.startswith('http') else f"{settings.MEDIA_URL}{imagen_str}"
-                except Exception as e:
-                    logger.warning(f"Error procesando imagen para {producto.nombre}: {e}")
-                    imagen_url = ''
-            
-            # ✅ Crear diccionario del producto
-            producto_data = {
-                'id': producto.id,
-                'nombre': str(producto.nombre),
-                'precio': float(producto.precio),
-                'descripcion': str(getattr(producto, 'descripcion', '')),
-                'imagen': imagen_url,  # ✅ URL de imagen
-                'disponible': bool(getattr(producto, 'disponible', True)),
-            }
-            
-            productos_agrupados[categoria].append(producto_data)
-        
-        # Convertir a lista para el frontend
-        categorias_lista = []
-        for categoria_nombre, productos_lista in productos_agrupados.items():
-            categorias_lista.append({
-                'nombre': str(categoria_nombre),
-                'productos': productos_lista
-            })
+        snapshot = obtener_menu()
 
-        # ✅ Estructura de respuesta
-        response_data = {
-            'categorias': categorias_lista,
-            'total_productos': int(productos.count())
+        # If-None-Match usa comparación débil: W/"x" coincide con "x"
+        etags_cliente = {
+            etag.removeprefix('W/') for etag in parse_etags(request.headers.get('If-None-Match', ''))
         }
+        if '*' in etags_cliente or snapshot['etag'] in etags_cliente:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot['contenido'], content_type='application/json')
 
-        logger.debug(f"Enviando {len(categorias_lista)} categorías con {productos.count()} productos")
+        response['ETag'] = snapshot['etag']
+        response['Cache-Control'] = f'public, max-age={MAX_AGE_NAVEGADOR}'
+        return response
 
-        return Response(response_data, status=status.HTTP_200_OK)
-        
     except Exception as e:
         logger.exception(f"Error cargando productos: {str(e)}")
 
@@ -0,0 +1,8 @@
+"""
+Benchmarks de rendimiento de las APIs críticas (consultas, latencia, memoria).
+
+- fabricas.py: siembra datos realistas (mesas, productos, días de pedidos, reservas)
+- escenarios.py: endpoints medidos, medición y comparación contra baselines.json
+- Comando: python manage.py benchmark_apis
+- Tests: python -m pytest -m benchmark (o manage.py test app.rendimiento)
+"""
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class RendimientoConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'app.rendimiento'
+    verbose_name = 'Rendimiento'
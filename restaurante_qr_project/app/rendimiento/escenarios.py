@@ -0,0 +1,189 @@
+"""
+Escenarios medidos y comparación contra baselines.
+
+Cada escenario es un GET a un endpoint crítico. Por escenario se registra:
+- consultas: cantidad de queries SQL (con la caché vacía)
+- p50_ms / p95_ms: latencia sobre N repeticiones
+- memoria_kb: pico de memoria Python (tracemalloc) de una request
+
+Regresiones (fallan el benchmark):
+- consultas por fila: las consultas crecen al sembrar más datos (N+1)
+- consultas por encima del baseline guardado en baselines.json
+Latencia y memoria se comparan con tolerancia; solo fallan en modo estricto.
+"""
+import json
+import os
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from .fabricas import crear_gerente, sembrar_datos
+
+RUTA_BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+
+def _rango_dias(dias):
+    hoy = timezone.localdate()
+    return f'desde={hoy - timedelta(days=dias)}&hasta={hoy}'
+
+
+# (nombre, url); las URLs con {rango} reciben el rango de días sembrado
+ESCENARIOS = [
+    ('api_pedidos_pendientes_pago', '/api/caja/pedidos/pendientes/'),
+    ('api_pedidos_kanban', '/api/caja/pedidos/kanban/'),
+    ('api_mapa_mesas', '/api/caja/mapa-mesas/'),
+    ('pedidos_en_cocina_api', '/api/pedidos/cocina/'),
+    ('api_reservas_mesero', '/api/pedidos/mesero/reservas/'),
+    ('productos_agrupados', '/api/productos/agrupados/'),
+    ('datos_ventas_semanales', '/reportes/api/ventas-semanales/'),
+    ('ventas_xlsx', '/api/reportes/exportar/ventas/xlsx/?{rango}'),
+    ('top_productos_xlsx', '/api/reportes/exportar/top-productos/xlsx/?{rango}'),
+]
+
+
+@dataclass
+class Medicion:
+    escenario: str
+    status: int
+    consultas: int
+    p50_ms: float
+    p95_ms: float
+    memoria_kb: float
+
+
+def _percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[round(fraccion * (len(ordenados) - 1))]
+
+
+def _get(client, url):
+    response = client.get(url, secure=True)
+    # Consumir el cuerpo: las exportaciones se sirven en streaming
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def medir_escenario(client, nombre, url, repeticiones=10):
+    """Mide un escenario (consultas en frío, latencia y pico de memoria)"""
+    cache.clear()
+    # Con DEBUG=True el log de queries (máx. 9000) puede venir lleno por la siembra
+    reset_queries()
+    with CaptureQueriesContext(connection) as consultas:
+        response = _get(client, url)
+
+    tracemalloc.start()
+    _get(client, url)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        _get(client, url)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    return Medicion(
+        escenario=nombre,
+        status=response.status_code,
+        consultas=len(consultas),
+        p50_ms=round(_percentil(tiempos, 0.5), 2),
+        p95_ms=round(_percentil(tiempos, 0.95), 2),
+        memoria_kb=round(pico / 1024, 1),
+    )
+
+
+def medir_escala(escala, repeticiones=10, dias=7, escenarios=None):
+    """
+    Siembra los datos de `escala` dentro de una transacción, mide todos los
+    escenarios y revierte.
+
+    Args:
+        escala (dict): Parámetros de sembrar_datos()
+
+    Returns:
+        tuple: (cantidades sembradas, {escenario: Medicion})
+    """
+    resultados = {}
+    with transaction.atomic():
+        cantidades = sembrar_datos(dias=dias, **escala)
+        client = Client()
+        client.force_login(crear_gerente())
+
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for nombre, url in escenarios or ESCENARIOS:
+                url = url.format(rango=_rango_dias(dias))
+                resultados[nombre] = medir_escenario(client, nombre, url, repeticiones)
+
+        transaction.set_rollback(True)
+    return cantidades, resultados
+
+
+def consultas_por_fila(chica, grande, filas_chica, filas_grande):
+    """
+    Consultas extra por fila sembrada entre dos escalas, por escenario.
+    0 = costo constante; > 0 = el endpoint hace consultas por fila (N+1).
+    """
+    return {
+        nombre: round((grande[nombre].consultas - chica[nombre].consultas) / max(filas_grande - filas_chica, 1), 4)
+        for nombre in grande
+    }
+
+
+def cargar_baselines(ruta=RUTA_BASELINES):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def guardar_baselines(mediciones, ruta=RUTA_BASELINES):
+    datos = {
+        nombre: {k: v for k, v in asdict(medicion).items() if k not in ('escenario', 'status')}
+        for nombre, medicion in sorted(mediciones.items())
+    }
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, indent=2, ensure_ascii=False)
+        archivo.write('\n')
+
+
+def detectar_regresiones(mediciones, por_fila, baselines, tolerancia=0.5, estricto=False):
+    """
+    Compara contra los baselines.
+
+    Returns:
+        tuple: (regresiones que fallan, advertencias)
+    """
+    regresiones = []
+    advertencias = []
+
+    for nombre, medicion in mediciones.items():
+        if medicion.status != 200:
+            regresiones.append(f'{nombre}: respondió {medicion.status}')
+
+        if por_fila.get(nombre, 0) > 0:
+            regresiones.append(f'{nombre}: {por_fila[nombre]} consultas extra por fila sembrada')
+
+        baseline = baselines.get(nombre)
+        if not baseline:
+            advertencias.append(f'{nombre}: sin baseline guardado')
+            continue
+
+        if medicion.consultas > baseline['consultas']:
+            regresiones.append(f"{nombre}: {medicion.consultas} consultas (baseline {baseline['consultas']})")
+
+        for metrica in ('p95_ms', 'memoria_kb'):
+            limite = baseline[metrica] * (1 + tolerancia)
+            valor = getattr(medicion, metrica)
+            if valor > limite:
+                mensaje = f'{nombre}: {metrica} {valor} > {limite:.1f} (baseline {baseline[metrica]} +{tolerancia:.0%})'
+                (regresiones if estricto else advertencias).append(mensaje)
+
+    return regresiones, advertencias
@@ -0,0 +1,150 @@
+"""
+Fábricas de datos para los benchmarks.
+
+sembrar_datos() crea un restaurante sintético con bulk_create (sin efectos
+secundarios de save(): QR de mesas, hooks del rollup, cursor de cambios):
+
+- N mesas, una con pedido activo por cada estado del tablero
+- M productos en varias categorías
+- K días de pedidos cerrados con sus líneas (+ rollup diario reconstruido)
+- Reservas de hoy y de los próximos días
+
+Usar siempre dentro de una transacción que se revierte (comando y tests).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Max
+from django.utils import timezone
+
+from app.mesas.models import Mesa
+from app.pedidos.models import DetallePedido, Pedido
+from app.productos.models import Categoria, Producto
+from app.reservas.models import Reserva
+from app.usuarios.models import Usuario
+
+ESTADOS_ACTIVOS = [
+    Pedido.ESTADO_CREADO,
+    Pedido.ESTADO_CONFIRMADO,
+    Pedido.ESTADO_EN_PREPARACION,
+    Pedido.ESTADO_LISTO,
+    Pedido.ESTADO_ENTREGADO,
+]
+
+
+def crear_gerente(username='benchmark_gerente'):
+    """Usuario con acceso a todos los endpoints medidos (caja, reportes, staff)"""
+    usuario, _ = Usuario.objects.get_or_create(
+        username=username,
+        defaults={'rol': 'gerente', 'is_staff': True}
+    )
+    return usuario
+
+
+def sembrar_datos(mesas=20, productos=30, dias=7, pedidos_por_dia=40, lineas_por_pedido=3, reservas_por_dia=8):
+    """
+    Siembra el restaurante sintético.
+
+    Returns:
+        dict: Cantidades creadas (mesas, productos, pedidos, detalles, reservas)
+    """
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+
+    categorias = Categoria.objects.bulk_create([Categoria(nombre=f'Benchmark {i}') for i in range(5)])
+    lista_productos = Producto.objects.bulk_create([
+        Producto(
+            nombre=f'Producto benchmark {i}',
+            precio=Decimal('10.00') + i,
+            categoria=categorias[i % len(categorias)],
+            stock_actual=1000,
+            requiere_inventario=i % 3 == 0,
+        )
+        for i in range(productos)
+    ])
+
+    primer_numero = (Mesa.objects.aggregate(maximo=Max('numero'))['maximo'] or 0) + 1
+    lista_mesas = Mesa.objects.bulk_create([
+        Mesa(
+            numero=primer_numero + i,
+            capacidad=4,
+            estado='ocupada' if i < len(ESTADOS_ACTIVOS) * 2 else 'disponible',
+            posicion_x=(i % 10) * 100,
+            posicion_y=(i // 10) * 100,
+        )
+        for i in range(mesas)
+    ])
+
+    # Pedidos activos de hoy (tablero, cocina, pendientes de pago, mapa)
+    pedidos = [
+        Pedido(
+            mesa=lista_mesas[i],
+            estado=ESTADOS_ACTIVOS[i % len(ESTADOS_ACTIVOS)],
+            estado_pago='pendiente',
+            fecha=ahora - timedelta(minutes=i),
+            numero_personas=2,
+        )
+        for i in range(min(len(ESTADOS_ACTIVOS) * 2, mesas))
+    ]
+
+    # Pedidos cerrados de los últimos K días (reportes y exportaciones)
+    for dia in range(1, dias + 1):
+        fecha = timezone.make_aware(datetime.combine(hoy - timedelta(days=dia), time(12)))
+        for i in range(pedidos_por_dia):
+            momento = fecha + timedelta(minutes=i * 5)
+            pedidos.append(Pedido(
+                mesa=lista_mesas[i % mesas],
+                estado=Pedido.ESTADO_CERRADO,
+                estado_pago='pagado',
+                forma_pago='efectivo',
+                fecha=momento,
+                fecha_pago=momento,
+                numero_personas=2,
+            ))
+
+    pedidos = Pedido.objects.bulk_create(pedidos)
+
+    detalles = []
+    for indice, pedido in enumerate(pedidos):
+        total = Decimal('0')
+        for linea in range(lineas_por_pedido):
+            producto = lista_productos[(indice + linea) % productos]
+            detalles.append(DetallePedido(
+                pedido=pedido,
+                producto=producto,
+                cantidad=1 + linea,
+                precio_unitario=producto.precio,
+                subtotal=producto.precio * (1 + linea),
+            ))
+            total += producto.precio * (1 + linea)
+        pedido.total = total
+        pedido.total_final = total
+        pedido.cantidad_lineas = lineas_por_pedido
+    DetallePedido.objects.bulk_create(detalles)
+    Pedido.objects.bulk_update(pedidos, ['total', 'total_final', 'cantidad_lineas'])
+
+    reservas = Reserva.objects.bulk_create([
+        Reserva(
+            numero_carnet=f'{dia}{i:04d}',
+            nombre_completo=f'Cliente benchmark {dia}-{i}',
+            fecha_reserva=hoy + timedelta(days=dia),
+            hora_reserva=time(12 + i % 10, 0),
+            numero_personas=2,
+            mesa=lista_mesas[i % mesas],
+            estado='confirmada',
+        )
+        for dia in range(3)
+        for i in range(reservas_por_dia)
+    ])
+
+    # bulk_create no pasa por los hooks del rollup diario
+    from app.reportes.rollups import reconstruir_rango
+    reconstruir_rango(hoy - timedelta(days=dias), hoy - timedelta(days=1))
+
+    return {
+        'mesas': len(lista_mesas),
+        'productos': len(lista_productos),
+        'pedidos': len(pedidos),
+        'detalles': len(detalles),
+        'reservas': len(reservas),
+    }
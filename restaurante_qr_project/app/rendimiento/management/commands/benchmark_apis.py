@@ -0,0 +1,81 @@
+"""
+Benchmark de regresión de las APIs críticas.
+
+Uso:
+    python manage.py benchmark_apis                       # compara contra baselines.json
+    python manage.py benchmark_apis --guardar-baseline    # actualiza baselines.json
+    python manage.py benchmark_apis --mesas 60 --pedidos-por-dia 200 --estricto
+
+Siembra dos escalas de datos (la segunda multiplicada por --factor) dentro de
+transacciones que se revierten. Si las consultas de un endpoint crecen entre
+escalas, hace consultas por fila (N+1) y el comando falla. También falla si
+las consultas superan el baseline; latencia/memoria solo con --estricto.
+
+NO ejecutar contra la base de producción en horario de servicio.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from app.rendimiento.escenarios import (
+    cargar_baselines, consultas_por_fila, detectar_regresiones, guardar_baselines, medir_escala
+)
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas, latencia p50/p95 y memoria de las APIs críticas contra baselines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mesas', type=int, default=20, help='Mesas en la escala base (default: 20)')
+        parser.add_argument('--productos', type=int, default=30, help='Productos (default: 30)')
+        parser.add_argument('--dias', type=int, default=7, help='Días de pedidos cerrados (default: 7)')
+        parser.add_argument('--pedidos-por-dia', type=int, default=40, help='Pedidos por día en la escala base (default: 40)')
+        parser.add_argument('--reservas-por-dia', type=int, default=8, help='Reservas por día en la escala base (default: 8)')
+        parser.add_argument('--factor', type=int, default=3, help='Multiplicador de la segunda escala (default: 3)')
+        parser.add_argument('--repeticiones', type=int, default=15, help='Requests por escenario para p50/p95 (default: 15)')
+        parser.add_argument('--tolerancia', type=float, default=0.5, help='Margen sobre baseline de latencia/memoria (default: 0.5 = +50%%)')
+        parser.add_argument('--estricto', action='store_true', help='Fallar también por latencia/memoria')
+        parser.add_argument('--guardar-baseline', action='store_true', help='Guardar las mediciones como nuevo baseline')
+
+    def handle(self, *args, **options):
+        factor = options['factor']
+        if factor < 2:
+            raise CommandError('--factor debe ser al menos 2')
+
+        base = {
+            'mesas': options['mesas'],
+            'productos': options['productos'],
+            'pedidos_por_dia': options['pedidos_por_dia'],
+            'reservas_por_dia': options['reservas_por_dia'],
+        }
+        grande = {**base, 'mesas': base['mesas'] * factor, 'pedidos_por_dia': base['pedidos_por_dia'] * factor,
+                  'reservas_por_dia': base['reservas_por_dia'] * factor}
+
+        self.stdout.write(f'🧪 Escala base: {base}')
+        filas_chica, chica = medir_escala(base, repeticiones=1, dias=options['dias'])
+        self.stdout.write(f'🧪 Escala x{factor}: {grande}')
+        filas_grande, mediciones = medir_escala(grande, repeticiones=options['repeticiones'], dias=options['dias'])
+
+        por_fila = consultas_por_fila(chica, mediciones, sum(filas_chica.values()), sum(filas_grande.values()))
+
+        self.stdout.write('')
+        self.stdout.write(f"{'Escenario':32} {'Status':>6} {'Consultas':>9} {'x fila':>7} {'p50 ms':>8} {'p95 ms':>8} {'Mem KB':>9}")
+        for nombre, m in mediciones.items():
+            self.stdout.write(
+                f'{nombre:32} {m.status:>6} {m.consultas:>9} {por_fila[nombre]:>7} '
+                f'{m.p50_ms:>8} {m.p95_ms:>8} {m.memoria_kb:>9}'
+            )
+
+        if options['guardar_baseline']:
+            guardar_baselines(mediciones)
+            self.stdout.write(self.style.SUCCESS('💾 Baseline actualizado (app/rendimiento/baselines.json)'))
+            return
+
+        regresiones, advertencias = detectar_regresiones(
+            mediciones, por_fila, cargar_baselines(),
+            tolerancia=options['tolerancia'], estricto=options['estricto']
+        )
+        for advertencia in advertencias:
+            self.stdout.write(self.style.WARNING(f'⚠️ {advertencia}'))
+
+        if regresiones:
+            raise CommandError('Regresiones de rendimiento:\n  ' + '\n  '.join(regresiones))
+        self.stdout.write(self.style.SUCCESS('✅ Sin regresiones'))
@@ -0,0 +1,121 @@
+"""
+Benchmark de regresión de consultas (versión corta del comando benchmark_apis)
+
+Excluido de la corrida normal de pytest; ejecutar con:
+    python -m pytest -m benchmark app/rendimiento/tests.py
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.test import SimpleTestCase, TestCase
+
+from app.mesas.asignacion import mejor_asignacion
+from app.mesas.models import Mesa
+from app.mesas.utils import asignar_mesa_automatica
+from app.rendimiento.escenarios import cargar_baselines, consultas_por_fila, medir_escala
+
+ESCALA_CHICA = {'mesas': 12, 'productos': 10, 'pedidos_por_dia': 5, 'reservas_por_dia': 3}
+ESCALA_GRANDE = {'mesas': 36, 'productos': 10, 'pedidos_por_dia': 15, 'reservas_por_dia': 9}
+
+
+@pytest.mark.benchmark
+class BenchmarkConsultasTestCase(TestCase):
+    """Las consultas de las APIs críticas no crecen con los datos ni superan el baseline"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.filas_chica, cls.chica = medir_escala(ESCALA_CHICA, repeticiones=1, dias=3)
+        cls.filas_grande, cls.grande = medir_escala(ESCALA_GRANDE, repeticiones=1, dias=3)
+
+    def test_todos_los_escenarios_responden(self):
+        for nombre, medicion in self.grande.items():
+            with self.subTest(escenario=nombre):
+                self.assertEqual(medicion.status, 200)
+
+    def test_sin_consultas_por_fila(self):
+        por_fila = consultas_por_fila(
+            self.chica, self.grande,
+            sum(self.filas_chica.values()), sum(self.filas_grande.values())
+        )
+        for nombre, extra in por_fila.items():
+            with self.subTest(escenario=nombre):
+                self.assertEqual(extra, 0, f'{nombre}: consultas N+1')
+
+    def test_consultas_dentro_del_baseline(self):
+        baselines = cargar_baselines()
+        for nombre, medicion in self.grande.items():
+            with self.subTest(escenario=nombre):
+                self.assertIn(nombre, baselines)
+                self.assertLessEqual(medicion.consultas, baselines[nombre]['consultas'])
+
+
+def plano_de_mesas(cantidad, capacidad=None):
+    """
+    Salón en grilla de 10 columnas con capacidades 2/4/6 (como
+    fabricas.sembrar_datos), o todas de `capacidad` (salón uniforme)
+    """
+    return [
+        SimpleNamespace(
+            id=i, numero=i, capacidad=capacidad or 2 + (i % 3) * 2,
+            posicion_x=(i % 10) * 100, posicion_y=(i // 10) * 100,
+        )
+        for i in range(1, cantidad + 1)
+    ]
+
+
+# Milisegundos máximos por asignación (holgados: detectan saltos de orden, no ruido)
+LIMITE_MS_ASIGNACION = {10: 5, 50: 20, 200: 100}
+
+
+@pytest.mark.benchmark
+class BenchmarkAsignacionMesasTestCase(SimpleTestCase):
+    """El optimizador de mesas escala con el tamaño del salón"""
+
+    def _medir(self, mesas, personas, **opciones):
+        inicio = time.perf_counter()
+        for _ in range(5):
+            elegidas = mejor_asignacion(mesas, personas, **opciones)
+        return elegidas, (time.perf_counter() - inicio) * 1000 / 5
+
+    def test_grupo_grande_10_50_200_mesas(self):
+        for cantidad, limite in LIMITE_MS_ASIGNACION.items():
+            for adyacentes in (False, True):
+                with self.subTest(mesas=cantidad, adyacentes=adyacentes):
+                    # Capacidades pares: 11 personas → 12 asientos (6+6 o una fila 4+6+2)
+                    elegidas, ms = self._medir(plano_de_mesas(cantidad), 11, adyacentes=adyacentes)
+                    self.assertEqual(sum(mesa.capacidad for mesa in elegidas), 12)
+                    self.assertLess(ms, limite)
+
+    def test_grupo_de_tres_mesas(self):
+        for cantidad, limite in LIMITE_MS_ASIGNACION.items():
+            with self.subTest(mesas=cantidad):
+                # 13 personas: ninguna pareja alcanza (máximo 6+6), 14 asientos en 3 mesas
+                elegidas, ms = self._medir(plano_de_mesas(cantidad), 13)
+                self.assertEqual((sum(mesa.capacidad for mesa in elegidas), len(elegidas)), (14, 3))
+                self.assertLess(ms, limite)
+
+    def test_salon_uniforme(self):
+        # Todas las combinaciones de 3 mesas empatan: el desempate no puede enumerarlas
+        for cantidad, limite in LIMITE_MS_ASIGNACION.items():
+            for capacidad, personas in ((4, 10), (2, 5)):
+                with self.subTest(mesas=cantidad, capacidad=capacidad):
+                    elegidas, ms = self._medir(plano_de_mesas(cantidad, capacidad), personas)
+                    self.assertEqual(len(elegidas), 3)
+                    self.assertLess(ms, limite)
+
+
+@pytest.mark.benchmark
+class BenchmarkAsignacionMesasConsultasTestCase(TestCase):
+    """asignar_mesa_automatica: consultas constantes sin importar la cantidad de mesas"""
+
+    def test_consultas_10_50_200_mesas(self):
+        creadas = 0
+        for cantidad in LIMITE_MS_ASIGNACION:
+            Mesa.objects.bulk_create([
+                Mesa(numero=i, capacidad=2 + (i % 3) * 2, posicion_x=(i % 10) * 100, posicion_y=(i // 10) * 100)
+                for i in range(creadas + 1, cantidad + 1)
+            ])
+            creadas = cantidad
+            with self.subTest(mesas=cantidad), self.assertNumQueries(4):
+                self.assertTrue(asignar_mesa_automatica(11, solo_adyacentes=True)['success'])
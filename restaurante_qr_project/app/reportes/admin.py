@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import ReporteVentas
+from .models import ReporteVentas, TrabajoReporte, VentasDiarias
 
 @admin.register(ReporteVentas)
 class ReporteVentasAdmin(admin.ModelAdmin):
@@ -100,4 +100,26 @@ class ReporteVentasAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         # Los reportes se generan automáticamente
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(VentasDiarias)
+class VentasDiariasAdmin(admin.ModelAdmin):
+    """Rollup de solo lectura: se mantiene solo o con reconstruir_ventas_diarias"""
+    list_display = ['fecha', 'total_pedidos', 'total_final', 'total_reembolsado', 'pedidos_cancelados', 'actualizado_en']
+    date_hierarchy = 'fecha'
+    ordering = ['-fecha']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'formato', 'fecha_inicio', 'fecha_fin', 'estado', 'intentos', 'filas', 'solicitado_por', 'creado_en']
+    list_filter = ['estado', 'tipo', 'formato']
+    readonly_fields = ['clave', 'intentos', 'filas', 'mensaje_error', 'archivo', 'reporte', 'iniciado_en', 'finalizado_en']
+    ordering = ['-creado_en']
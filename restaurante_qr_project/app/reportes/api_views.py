@@ -5,23 +5,27 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.http import HttpResponse
-from django.db.models import Sum, Count, F
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.db.models import Count, F
 from django.utils import timezone
 from decimal import Decimal
 import logging
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 
-from app.pedidos.models import Pedido, DetallePedido
+from app.pedidos.models import Pedido
 from app.caja.models import CierreCaja, Reembolso
-from .utils import parse_rango_fechas, require_admin_or_manager, qp_bool, qp_int, qp_choice
+from .models import TrabajoReporte
+from .rollups import top_productos as top_productos_rollup
+from .trabajos import encolar_reporte
+from .xlsx import HojaXlsxStreaming, chunk_size
+from .utils import parse_rango_fechas, require_admin_or_manager, qp_int, qp_choice
 
 logger = logging.getLogger('app.reportes')
 
@@ -30,119 +34,66 @@ logger = logging.getLogger('app.reportes')
 # REPORTE DE VENTAS
 # ═══════════════════════════════════════════
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def ventas_xlsx(request):
-    """Exporta reporte de ventas a Excel (.xlsx)"""
-    # Validar permisos
-    error_response = require_admin_or_manager(request.user)
-    if error_response:
-        return error_response
+def construir_ventas_xlsx(fecha_inicio, fecha_fin):
+    """
+    Arma el XLSX de ventas (pedidos cerrados por fecha de pago) en modo streaming.
 
-    # Parsear rango de fechas
-    fecha_inicio, fecha_fin = parse_rango_fechas(request)
-    if not fecha_inicio or not fecha_fin:
-        return Response({'error': 'Rango de fechas inválido'}, status=400)
-
-    # RONDA 4.1: Filtro opcional solo_cerrados
-    solo_cerrados = qp_bool(request, "solo_cerrados", default=False)
-
-    # Consultar pedidos en el rango
+    Returns:
+        HojaXlsxStreaming: Lista para .respuesta() o .guardar()
+    """
+    # Solo pedidos cerrados (comportamiento original)
     pedidos = Pedido.objects.filter(
+        estado='cerrado',
         fecha_pago__date__gte=fecha_inicio.date(),
         fecha_pago__date__lte=fecha_fin.date()
-    ).select_related('mesa', 'cajero_responsable', 'mesero_comanda')
+    ).values_list(
+        'id', 'mesa__numero', 'mesero_comanda__username', 'cajero_responsable__username',
+        'fecha_pago', 'total', 'descuento', 'propina', 'total_final', 'forma_pago'
+    )
 
-    if solo_cerrados:
-        pedidos = pedidos.filter(estado='cerrado')
-    else:
-        # Por defecto solo pedidos cerrados (comportamiento original)
-        pedidos = pedidos.filter(estado='cerrado')
-
-    # Crear workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte de Ventas"
-
-    # Estilos
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    hoja = HojaXlsxStreaming(
+        "Reporte de Ventas",
+        f"Reporte de Ventas - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}",
+        ['ID Pedido', 'Mesa', 'Mesero', 'Cajero', 'Fecha Pago', 'Total', 'Descuento', 'Propina', 'Total Final', 'Forma Pago']
     )
 
-    # Título
-    ws.merge_cells('A1:J1')
-    ws['A1'] = f"Reporte de Ventas - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-
-    # Encabezados
-    headers = ['ID Pedido', 'Mesa', 'Mesero', 'Cajero', 'Fecha Pago', 'Total', 'Descuento', 'Propina', 'Total Final', 'Forma Pago']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-
-    # Datos
-    row = 4
     total_ventas = Decimal('0.00')
     total_descuentos = Decimal('0.00')
     total_propinas = Decimal('0.00')
     total_final_sum = Decimal('0.00')
 
-    for pedido in pedidos:
-        ws.cell(row=row, column=1, value=pedido.id).border = border
-        ws.cell(row=row, column=2, value=pedido.mesa.numero if pedido.mesa else 'N/A').border = border
-        ws.cell(row=row, column=3, value=pedido.mesero_comanda.username if pedido.mesero_comanda else 'N/A').border = border
-        ws.cell(row=row, column=4, value=pedido.cajero_responsable.username if pedido.cajero_responsable else 'N/A').border = border
-        ws.cell(row=row, column=5, value=pedido.fecha_pago.strftime('%d/%m/%Y %H:%M') if pedido.fecha_pago else 'N/A').border = border
-        ws.cell(row=row, column=6, value=float(pedido.total)).border = border
-        ws.cell(row=row, column=7, value=float(pedido.descuento)).border = border
-        ws.cell(row=row, column=8, value=float(pedido.propina)).border = border
-        ws.cell(row=row, column=9, value=float(pedido.total_final)).border = border
-        ws.cell(row=row, column=10, value=pedido.forma_pago or 'N/A').border = border
-
-        total_ventas += pedido.total
-        total_descuentos += pedido.descuento
-        total_propinas += pedido.propina
-        total_final_sum += pedido.total_final
-        row += 1
-
-    # Totales
-    row += 1
-    ws.cell(row=row, column=5, value='TOTALES:').font = Font(bold=True)
-    ws.cell(row=row, column=6, value=float(total_ventas)).font = Font(bold=True)
-    ws.cell(row=row, column=7, value=float(total_descuentos)).font = Font(bold=True)
-    ws.cell(row=row, column=8, value=float(total_propinas)).font = Font(bold=True)
-    ws.cell(row=row, column=9, value=float(total_final_sum)).font = Font(bold=True)
-
-    # Ajustar anchos
-    for col in range(1, 11):
-        ws.column_dimensions[chr(64 + col)].width = 15
-
-    # Generar respuesta HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="ventas_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx"'
-    wb.save(response)
-
-    logger.info(f"AUDIT reporte_ventas_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} pedidos={pedidos.count()}")
+    for pedido_id, mesa, mesero, cajero, fecha_pago, total, descuento, propina, total_final, forma_pago in pedidos.iterator(chunk_size=chunk_size()):
+        hoja.agregar_fila([
+            pedido_id,
+            mesa if mesa is not None else 'N/A',
+            mesero or 'N/A',
+            cajero or 'N/A',
+            fecha_pago.strftime('%d/%m/%Y %H:%M') if fecha_pago else 'N/A',
+            float(total),
+            float(descuento),
+            float(propina),
+            float(total_final),
+            forma_pago or 'N/A',
+        ])
+        total_ventas += total
+        total_descuentos += descuento
+        total_propinas += propina
+        total_final_sum += total_final
 
-    return response
+    hoja.agregar_totales({
+        5: 'TOTALES:',
+        6: float(total_ventas),
+        7: float(total_descuentos),
+        8: float(total_propinas),
+        9: float(total_final_sum),
+    })
+    return hoja
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def ventas_pdf(request):
-    """Exporta reporte de ventas a PDF"""
+def ventas_xlsx(request):
+    """Exporta reporte de ventas a Excel (.xlsx) en streaming"""
     # Validar permisos
     error_response = require_admin_or_manager(request.user)
     if error_response:
@@ -153,26 +104,29 @@ def ventas_pdf(request):
     if not fecha_inicio or not fecha_fin:
         return Response({'error': 'Rango de fechas inválido'}, status=400)
 
-    # RONDA 4.1: Filtro opcional solo_cerrados
-    solo_cerrados = qp_bool(request, "solo_cerrados", default=False)
+    # ✅ OPTIMIZADO: Workbook write_only + iterator, memoria constante por fila
+    hoja = construir_ventas_xlsx(fecha_inicio, fecha_fin)
 
-    # Consultar pedidos en el rango
+    logger.info(f"AUDIT reporte_ventas_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} pedidos={hoja.filas}")
+
+    return hoja.respuesta(f'ventas_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx')
+
+
+def construir_ventas_pdf(destino, fecha_inicio, fecha_fin):
+    """
+    Escribe el PDF de ventas (pedidos cerrados por fecha de pago) en `destino`.
+
+    Returns:
+        int: Filas de datos escritas
+    """
+    # Consultar pedidos en el rango (solo cerrados, comportamiento original)
     pedidos = Pedido.objects.filter(
+        estado='cerrado',
         fecha_pago__date__gte=fecha_inicio.date(),
         fecha_pago__date__lte=fecha_fin.date()
     ).select_related('mesa', 'cajero_responsable', 'mesero_comanda')
 
-    if solo_cerrados:
-        pedidos = pedidos.filter(estado='cerrado')
-    else:
-        # Por defecto solo pedidos cerrados (comportamiento original)
-        pedidos = pedidos.filter(estado='cerrado')
-
-    # Crear PDF
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="ventas_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
+    doc = SimpleDocTemplate(destino, pagesize=A4)
     elements = []
     styles = getSampleStyleSheet()
 
@@ -234,99 +188,78 @@ def ventas_pdf(request):
     elements.append(table)
     doc.build(elements)
 
-    logger.info(f"AUDIT reporte_ventas_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} pedidos={pedidos.count()}")
-
-    return response
+    return len(data) - 2
 
 
-# ═══════════════════════════════════════════
-# REPORTE DE CAJA (TURNOS)
-# ═══════════════════════════════════════════
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def caja_xlsx(request):
-    """Exporta reporte de turnos de caja a Excel"""
+def ventas_pdf(request):
+    """Exporta reporte de ventas a PDF"""
+    # Validar permisos
     error_response = require_admin_or_manager(request.user)
     if error_response:
         return error_response
 
+    # Parsear rango de fechas
     fecha_inicio, fecha_fin = parse_rango_fechas(request)
     if not fecha_inicio or not fecha_fin:
         return Response({'error': 'Rango de fechas inválido'}, status=400)
 
-    # RONDA 4 HOTFIX: usar campos reales de CierreCaja
-    turnos = CierreCaja.objects.filter(
-        fecha__range=(fecha_inicio.date(), fecha_fin.date())
-    ).select_related('cajero')
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte de Caja"
-
-    # Estilos
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="ventas_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
+    filas = construir_ventas_pdf(response, fecha_inicio, fecha_fin)
 
-    # Título
-    ws.merge_cells('A1:I1')
-    ws['A1'] = f"Reporte de Turnos de Caja - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-
-    # Encabezados
-    headers = ['ID', 'Cajero', 'Fecha', 'Turno', 'Efectivo Inicial', 'Total Efectivo', 'Total Tarjeta', 'Total QR', 'Total Ventas']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-
-    # Datos
-    row = 4
-    total_acumulado = Decimal('0.00')
+    logger.info(f"AUDIT reporte_ventas_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} pedidos={filas}")
 
-    for turno in turnos:
-        # Usar campos reales
-        total_ventas = getattr(turno, 'total_ventas', 0) or 0
+    return response
 
-        ws.cell(row=row, column=1, value=turno.id).border = border
-        ws.cell(row=row, column=2, value=turno.cajero.username if turno.cajero else 'N/A').border = border
-        ws.cell(row=row, column=3, value=turno.fecha.strftime('%d/%m/%Y')).border = border
-        ws.cell(row=row, column=4, value=turno.get_turno_display()).border = border
-        ws.cell(row=row, column=5, value=float(turno.efectivo_inicial or 0)).border = border
-        ws.cell(row=row, column=6, value=float(turno.total_efectivo or 0)).border = border
-        ws.cell(row=row, column=7, value=float(turno.total_tarjeta or 0)).border = border
-        ws.cell(row=row, column=8, value=float(turno.total_qr or 0)).border = border
-        ws.cell(row=row, column=9, value=float(total_ventas)).border = border
 
-        total_acumulado += Decimal(str(total_ventas))
-        row += 1
+# ═══════════════════════════════════════════
+# REPORTE DE CAJA (TURNOS)
+# ═══════════════════════════════════════════
 
-    # Totales
-    row += 1
-    ws.cell(row=row, column=8, value='TOTAL:').font = Font(bold=True)
-    ws.cell(row=row, column=9, value=float(total_acumulado)).font = Font(bold=True)
+def construir_caja_xlsx(fecha_inicio, fecha_fin):
+    """Arma el XLSX de turnos de caja en modo streaming"""
+    # RONDA 4 HOTFIX: usar campos reales de CierreCaja
+    turnos = CierreCaja.objects.filter(
+        fecha__range=(fecha_inicio.date(), fecha_fin.date())
+    ).values_list(
+        'id', 'cajero__username', 'fecha', 'turno', 'efectivo_inicial',
+        'total_efectivo', 'total_tarjeta', 'total_qr', 'total_ventas'
+    )
+    turnos_display = dict(CierreCaja.TURNO_CHOICES)
 
-    for col in range(1, 9):
-        ws.column_dimensions[chr(64 + col)].width = 15
+    hoja = HojaXlsxStreaming(
+        "Reporte de Caja",
+        f"Reporte de Turnos de Caja - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}",
+        ['ID', 'Cajero', 'Fecha', 'Turno', 'Efectivo Inicial', 'Total Efectivo', 'Total Tarjeta', 'Total QR', 'Total Ventas']
+    )
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="caja_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx"'
-    wb.save(response)
+    total_acumulado = Decimal('0.00')
 
-    logger.info(f"AUDIT reporte_caja_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} turnos={turnos.count()}")
+    for turno_id, cajero, fecha, turno, efectivo_inicial, total_efectivo, total_tarjeta, total_qr, total_ventas in turnos.iterator(chunk_size=chunk_size()):
+        total_ventas = total_ventas or 0
+        hoja.agregar_fila([
+            turno_id,
+            cajero or 'N/A',
+            fecha.strftime('%d/%m/%Y'),
+            turnos_display.get(turno, turno),
+            float(efectivo_inicial or 0),
+            float(total_efectivo or 0),
+            float(total_tarjeta or 0),
+            float(total_qr or 0),
+            float(total_ventas),
+        ])
+        total_acumulado += Decimal(str(total_ventas))
 
-    return response
+    hoja.agregar_totales({8: 'TOTAL:', 9: float(total_acumulado)})
+    return hoja
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def caja_pdf(request):
-    """Exporta reporte de turnos de caja a PDF"""
+def caja_xlsx(request):
+    """Exporta reporte de turnos de caja a Excel en streaming"""
     error_response = require_admin_or_manager(request.user)
     if error_response:
         return error_response
@@ -335,15 +268,26 @@ def caja_pdf(request):
     if not fecha_inicio or not fecha_fin:
         return Response({'error': 'Rango de fechas inválido'}, status=400)
 
+    hoja = construir_caja_xlsx(fecha_inicio, fecha_fin)
+
+    logger.info(f"AUDIT reporte_caja_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} turnos={hoja.filas}")
+
+    return hoja.respuesta(f'caja_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx')
+
+
+def construir_caja_pdf(destino, fecha_inicio, fecha_fin):
+    """
+    Escribe el PDF de turnos de caja en `destino`.
+
+    Returns:
+        int: Filas de datos escritas
+    """
     # RONDA 4 HOTFIX: usar campos reales de CierreCaja
     turnos = CierreCaja.objects.filter(
         fecha__range=(fecha_inicio.date(), fecha_fin.date())
     ).select_related('cajero')
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="caja_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
+    doc = SimpleDocTemplate(destino, pagesize=A4)
     elements = []
     styles = getSampleStyleSheet()
 
@@ -393,19 +337,13 @@ def caja_pdf(request):
     elements.append(table)
     doc.build(elements)
 
-    logger.info(f"AUDIT reporte_caja_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} turnos={turnos.count()}")
+    return len(data) - 2
 
-    return response
-
-
-# ═══════════════════════════════════════════
-# REPORTE DE REEMBOLSOS
-# ═══════════════════════════════════════════
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def reembolsos_xlsx(request):
-    """Exporta reporte de reembolsos a Excel"""
+def caja_pdf(request):
+    """Exporta reporte de turnos de caja a PDF"""
     error_response = require_admin_or_manager(request.user)
     if error_response:
         return error_response
@@ -414,74 +352,61 @@ def reembolsos_xlsx(request):
     if not fecha_inicio or not fecha_fin:
         return Response({'error': 'Rango de fechas inválido'}, status=400)
 
-    # RONDA 4.1: Filtro opcional por método
-    metodo = qp_choice(request, "metodo", {"efectivo", "qr", "tarjeta", "movil"})
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="caja_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
+    filas = construir_caja_pdf(response, fecha_inicio, fecha_fin)
+
+    logger.info(f"AUDIT reporte_caja_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} turnos={filas}")
+
+    return response
+
 
+# ═══════════════════════════════════════════
+# REPORTE DE REEMBOLSOS
+# ═══════════════════════════════════════════
+
+def construir_reembolsos_xlsx(fecha_inicio, fecha_fin, metodo=None):
+    """Arma el XLSX de reembolsos (opcionalmente filtrado por método) en modo streaming"""
     reembolsos = Reembolso.objects.filter(
         creado_en__date__gte=fecha_inicio.date(),
         creado_en__date__lte=fecha_fin.date()
-    ).select_related('pedido', 'creado_por', 'autorizado_por')
+    )
 
     if metodo:
         reembolsos = reembolsos.filter(metodo=metodo)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte de Reembolsos"
-
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    ws.merge_cells('A1:G1')
-    ws['A1'] = f"Reporte de Reembolsos - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-
-    headers = ['ID Reembolso', 'ID Pedido', 'Monto', 'Método', 'Motivo', 'Autorizado Por', 'Fecha']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-
-    row = 4
-    total_reembolsado = Decimal('0.00')
-
-    for reembolso in reembolsos:
-        ws.cell(row=row, column=1, value=reembolso.id).border = border
-        ws.cell(row=row, column=2, value=reembolso.pedido.id).border = border
-        ws.cell(row=row, column=3, value=float(reembolso.monto)).border = border
-        ws.cell(row=row, column=4, value=reembolso.metodo).border = border
-        ws.cell(row=row, column=5, value=reembolso.motivo[:50]).border = border
-        ws.cell(row=row, column=6, value=reembolso.autorizado_por.username if reembolso.autorizado_por else 'N/A').border = border
-        ws.cell(row=row, column=7, value=reembolso.creado_en.strftime('%d/%m/%Y %H:%M')).border = border
-
-        total_reembolsado += reembolso.monto
-        row += 1
-
-    row += 1
-    ws.cell(row=row, column=2, value='TOTAL REEMBOLSADO:').font = Font(bold=True)
-    ws.cell(row=row, column=3, value=float(total_reembolsado)).font = Font(bold=True)
+    reembolsos = reembolsos.values_list(
+        'id', 'pedido_id', 'monto', 'metodo', 'motivo', 'autorizado_por__username', 'creado_en'
+    )
 
-    for col in range(1, 8):
-        ws.column_dimensions[chr(64 + col)].width = 15
+    hoja = HojaXlsxStreaming(
+        "Reporte de Reembolsos",
+        f"Reporte de Reembolsos - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}",
+        ['ID Reembolso', 'ID Pedido', 'Monto', 'Método', 'Motivo', 'Autorizado Por', 'Fecha']
+    )
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="reembolsos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx"'
-    wb.save(response)
+    total_reembolsado = Decimal('0.00')
 
-    logger.info(f"AUDIT reporte_reembolsos_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} reembolsos={reembolsos.count()}")
+    for reembolso_id, pedido_id, monto, metodo_pago, motivo, autorizado_por, creado_en in reembolsos.iterator(chunk_size=chunk_size()):
+        hoja.agregar_fila([
+            reembolso_id,
+            pedido_id,
+            float(monto),
+            metodo_pago,
+            motivo[:50],
+            autorizado_por or 'N/A',
+            creado_en.strftime('%d/%m/%Y %H:%M'),
+        ])
+        total_reembolsado += monto
 
-    return response
+    hoja.agregar_totales({2: 'TOTAL REEMBOLSADO:', 3: float(total_reembolsado)})
+    return hoja
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def reembolsos_pdf(request):
-    """Exporta reporte de reembolsos a PDF"""
+def reembolsos_xlsx(request):
+    """Exporta reporte de reembolsos a Excel en streaming"""
     error_response = require_admin_or_manager(request.user)
     if error_response:
         return error_response
@@ -493,6 +418,20 @@ def reembolsos_pdf(request):
     # RONDA 4.1: Filtro opcional por método
     metodo = qp_choice(request, "metodo", {"efectivo", "qr", "tarjeta", "movil"})
 
+    hoja = construir_reembolsos_xlsx(fecha_inicio, fecha_fin, metodo=metodo)
+
+    logger.info(f"AUDIT reporte_reembolsos_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} reembolsos={hoja.filas}")
+
+    return hoja.respuesta(f'reembolsos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx')
+
+
+def construir_reembolsos_pdf(destino, fecha_inicio, fecha_fin, metodo=None):
+    """
+    Escribe el PDF de reembolsos (opcionalmente filtrado por método) en `destino`.
+
+    Returns:
+        int: Filas de datos escritas
+    """
     reembolsos = Reembolso.objects.filter(
         creado_en__date__gte=fecha_inicio.date(),
         creado_en__date__lte=fecha_fin.date()
@@ -501,10 +440,7 @@ def reembolsos_pdf(request):
     if metodo:
         reembolsos = reembolsos.filter(metodo=metodo)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="reembolsos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
+    doc = SimpleDocTemplate(destino, pagesize=A4)
     elements = []
     styles = getSampleStyleSheet()
 
@@ -549,19 +485,13 @@ def reembolsos_pdf(request):
     elements.append(table)
     doc.build(elements)
 
-    logger.info(f"AUDIT reporte_reembolsos_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} reembolsos={reembolsos.count()}")
-
-    return response
-
+    return len(data) - 2
 
-# ═══════════════════════════════════════════
-# REPORTE DE TOP PRODUCTOS
-# ═══════════════════════════════════════════
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def top_productos_xlsx(request):
-    """Exporta top productos más vendidos a Excel"""
+def reembolsos_pdf(request):
+    """Exporta reporte de reembolsos a PDF"""
     error_response = require_admin_or_manager(request.user)
     if error_response:
         return error_response
@@ -570,80 +500,55 @@ def top_productos_xlsx(request):
     if not fecha_inicio or not fecha_fin:
         return Response({'error': 'Rango de fechas inválido'}, status=400)
 
-    # RONDA 4.1: Filtro opcional top (cantidad de productos)
-    top_n = qp_int(request, "top", default=20, min_v=1, max_v=100)
+    # RONDA 4.1: Filtro opcional por método
+    metodo = qp_choice(request, "metodo", {"efectivo", "qr", "tarjeta", "movil"})
 
-    # Top N productos más vendidos
-    productos = DetallePedido.objects.filter(
-        pedido__estado='cerrado',
-        pedido__fecha_pago__date__gte=fecha_inicio.date(),
-        pedido__fecha_pago__date__lte=fecha_fin.date()
-    ).values(
-        'producto__nombre'
-    ).annotate(
-        cantidad_vendida=Sum('cantidad'),
-        ingresos_totales=Sum('subtotal')
-    ).order_by('-cantidad_vendida')[:top_n]
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Top Productos"
-
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    ws.merge_cells('A1:D1')
-    ws['A1'] = f"Top {top_n} Productos Más Vendidos - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-
-    headers = ['Ranking', 'Producto', 'Cantidad Vendida', 'Ingresos Totales']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-
-    row = 4
-    ranking = 1
-    total_cantidad = 0
-    total_ingresos = Decimal('0.00')
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="reembolsos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
+    filas = construir_reembolsos_pdf(response, fecha_inicio, fecha_fin, metodo=metodo)
 
-    for producto in productos:
-        ws.cell(row=row, column=1, value=ranking).border = border
-        ws.cell(row=row, column=2, value=producto['producto__nombre']).border = border
-        ws.cell(row=row, column=3, value=producto['cantidad_vendida']).border = border
-        ws.cell(row=row, column=4, value=float(producto['ingresos_totales'])).border = border
+    logger.info(f"AUDIT reporte_reembolsos_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} reembolsos={filas}")
 
-        total_cantidad += producto['cantidad_vendida']
-        total_ingresos += producto['ingresos_totales']
-        ranking += 1
-        row += 1
+    return response
+
+
+# ═══════════════════════════════════════════
+# REPORTE DE TOP PRODUCTOS
+# ═══════════════════════════════════════════
 
-    row += 1
-    ws.cell(row=row, column=2, value='TOTALES:').font = Font(bold=True)
-    ws.cell(row=row, column=3, value=total_cantidad).font = Font(bold=True)
-    ws.cell(row=row, column=4, value=float(total_ingresos)).font = Font(bold=True)
+def construir_top_productos_xlsx(fecha_inicio, fecha_fin, top_n=20):
+    """Arma el XLSX del top N de productos (rollup diario) en modo streaming"""
+    # ✅ OPTIMIZADO: Top N desde el rollup diario por producto (pedidos cerrados)
+    productos = top_productos_rollup(fecha_inicio.date(), fecha_fin.date(), limite=top_n)
 
-    for col in range(1, 5):
-        ws.column_dimensions[chr(64 + col)].width = 20
+    hoja = HojaXlsxStreaming(
+        "Top Productos",
+        f"Top {top_n} Productos Más Vendidos - {fecha_inicio.strftime('%d/%m/%Y')} a {fecha_fin.strftime('%d/%m/%Y')}",
+        ['Ranking', 'Producto', 'Cantidad Vendida', 'Ingresos Totales'],
+        ancho=20
+    )
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="top_productos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx"'
-    wb.save(response)
+    total_cantidad = 0
+    total_ingresos = Decimal('0.00')
 
-    logger.info(f"AUDIT reporte_top_productos_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} productos={productos.count()}")
+    for ranking, producto in enumerate(productos, start=1):
+        hoja.agregar_fila([
+            ranking,
+            producto['producto_nombre'],
+            producto['cantidad_vendida'],
+            float(producto['ingresos_totales']),
+        ])
+        total_cantidad += producto['cantidad_vendida']
+        total_ingresos += producto['ingresos_totales']
 
-    return response
+    hoja.agregar_totales({2: 'TOTALES:', 3: total_cantidad, 4: float(total_ingresos)})
+    return hoja
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def top_productos_pdf(request):
-    """Exporta top productos más vendidos a PDF"""
+def top_productos_xlsx(request):
+    """Exporta top productos más vendidos a Excel en streaming"""
     error_response = require_admin_or_manager(request.user)
     if error_response:
         return error_response
@@ -655,21 +560,24 @@ def top_productos_pdf(request):
     # RONDA 4.1: Filtro opcional top (cantidad de productos)
     top_n = qp_int(request, "top", default=20, min_v=1, max_v=100)
 
-    productos = DetallePedido.objects.filter(
-        pedido__estado='cerrado',
-        pedido__fecha_pago__date__gte=fecha_inicio.date(),
-        pedido__fecha_pago__date__lte=fecha_fin.date()
-    ).values(
-        'producto__nombre'
-    ).annotate(
-        cantidad_vendida=Sum('cantidad'),
-        ingresos_totales=Sum('subtotal')
-    ).order_by('-cantidad_vendida')[:top_n]
+    hoja = construir_top_productos_xlsx(fecha_inicio, fecha_fin, top_n=top_n)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="top_productos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
+    logger.info(f"AUDIT reporte_top_productos_xlsx user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} productos={hoja.filas}")
+
+    return hoja.respuesta(f'top_productos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.xlsx')
 
-    doc = SimpleDocTemplate(response, pagesize=A4)
+
+def construir_top_productos_pdf(destino, fecha_inicio, fecha_fin, top_n=20):
+    """
+    Escribe el PDF del top N de productos (rollup diario) en `destino`.
+
+    Returns:
+        int: Filas de datos escritas
+    """
+    # ✅ OPTIMIZADO: Top N desde el rollup diario por producto (pedidos cerrados)
+    productos = top_productos_rollup(fecha_inicio.date(), fecha_fin.date(), limite=top_n)
+
+    doc = SimpleDocTemplate(destino, pagesize=A4)
     elements = []
     styles = getSampleStyleSheet()
 
@@ -689,7 +597,7 @@ def top_productos_pdf(request):
     for producto in productos:
         data.append([
             str(ranking),
-            producto['producto__nombre'],
+            producto['producto_nombre'],
             str(producto['cantidad_vendida']),
             f"${float(producto['ingresos_totales']):.2f}",
         ])
@@ -715,6 +623,127 @@ def top_productos_pdf(request):
     elements.append(table)
     doc.build(elements)
 
-    logger.info(f"AUDIT reporte_top_productos_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} productos={productos.count()}")
+    return len(data) - 2
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def top_productos_pdf(request):
+    """Exporta top productos más vendidos a PDF"""
+    error_response = require_admin_or_manager(request.user)
+    if error_response:
+        return error_response
+
+    fecha_inicio, fecha_fin = parse_rango_fechas(request)
+    if not fecha_inicio or not fecha_fin:
+        return Response({'error': 'Rango de fechas inválido'}, status=400)
+
+    # RONDA 4.1: Filtro opcional top (cantidad de productos)
+    top_n = qp_int(request, "top", default=20, min_v=1, max_v=100)
+
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="top_productos_{fecha_inicio.strftime("%Y%m%d")}_{fecha_fin.strftime("%Y%m%d")}.pdf"'
+    filas = construir_top_productos_pdf(response, fecha_inicio, fecha_fin, top_n=top_n)
+
+    logger.info(f"AUDIT reporte_top_productos_pdf user={request.user.username} desde={fecha_inicio.date()} hasta={fecha_fin.date()} productos={filas}")
+
+    return response
+
+# ═══════════════════════════════════════════
+# COLA DE REPORTES EN SEGUNDO PLANO
+# ═══════════════════════════════════════════
+
+def _serializar_trabajo(request, trabajo):
+    datos = {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'formato': trabajo.formato,
+        'desde': trabajo.fecha_inicio.isoformat(),
+        'hasta': trabajo.fecha_fin.isoformat(),
+        'filtros': trabajo.filtros,
+        'estado': trabajo.estado,
+        'filas': trabajo.filas,
+        'error': trabajo.mensaje_error or None,
+        'creado_en': trabajo.creado_en.isoformat(),
+        'finalizado_en': trabajo.finalizado_en.isoformat() if trabajo.finalizado_en else None,
+        'descarga_url': None,
+    }
+    if trabajo.estado == TrabajoReporte.ESTADO_COMPLETADO and trabajo.archivo:
+        namespace = request.resolver_match.namespace if request.resolver_match else 'reportes_api'
+        datos['descarga_url'] = reverse(f'{namespace}:trabajo_reporte_descargar', args=[trabajo.id])
+    return datos
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def encolar_reporte_api(request):
+    """
+    Encola una exportación para el worker (procesar_reportes).
+
+    Query params: tipo (ventas|caja|reembolsos|top_productos), formato (xlsx|pdf),
+    desde/hasta (YYYY-MM-DD) y los filtros propios de cada reporte (metodo, top).
+    Responde 202 con el id del trabajo, o 200 si ya existe el archivo.
+    """
+    error_response = require_admin_or_manager(request.user)
+    if error_response:
+        return error_response
+
+    tipo = qp_choice(request, "tipo", {t for t, _ in TrabajoReporte.TIPO_CHOICES})
+    formato = qp_choice(request, "formato", {f for f, _ in TrabajoReporte.FORMATO_CHOICES})
+    if not tipo or not formato:
+        return Response({'success': False, 'error': 'Tipo o formato de reporte inválido'}, status=400)
+
+    fecha_inicio, fecha_fin = parse_rango_fechas(request)
+    if not fecha_inicio or not fecha_fin:
+        return Response({'success': False, 'error': 'Rango de fechas inválido'}, status=400)
+
+    # Mismos filtros que las exportaciones síncronas
+    filtros = {}
+    if tipo == TrabajoReporte.TIPO_REEMBOLSOS:
+        metodo = qp_choice(request, "metodo", {"efectivo", "qr", "tarjeta", "movil"})
+        if metodo:
+            filtros['metodo'] = metodo
+    elif tipo == TrabajoReporte.TIPO_TOP_PRODUCTOS:
+        filtros['top_n'] = qp_int(request, "top", default=20, min_v=1, max_v=100)
+
+    trabajo, reutilizado = encolar_reporte(
+        tipo, formato, fecha_inicio.date(), fecha_fin.date(), filtros=filtros, usuario=request.user
+    )
+
+    logger.info(f"AUDIT reporte_encolado user={request.user.username} trabajo={trabajo.id} reutilizado={reutilizado}")
+
+    listo = trabajo.estado == TrabajoReporte.ESTADO_COMPLETADO
+    return Response({
+        'success': True,
+        'reutilizado': reutilizado,
+        'trabajo': _serializar_trabajo(request, trabajo),
+    }, status=200 if listo else 202)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_trabajo_reporte(request, trabajo_id):
+    """Estado de un trabajo de reporte (polling del cliente)"""
+    error_response = require_admin_or_manager(request.user)
+    if error_response:
+        return error_response
+
+    trabajo = get_object_or_404(TrabajoReporte, id=trabajo_id)
+    return Response({'success': True, 'trabajo': _serializar_trabajo(request, trabajo)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def descargar_trabajo_reporte(request, trabajo_id):
+    """Descarga el archivo generado por el worker"""
+    error_response = require_admin_or_manager(request.user)
+    if error_response:
+        return error_response
+
+    trabajo = get_object_or_404(TrabajoReporte, id=trabajo_id)
+    if trabajo.estado != TrabajoReporte.ESTADO_COMPLETADO or not trabajo.archivo:
+        return Response({'success': False, 'error': f'El reporte aún no está listo ({trabajo.estado})'}, status=409)
+
+    logger.info(f"AUDIT reporte_descargado user={request.user.username} trabajo={trabajo.id}")
 
-    return response
\ No newline at end of file
+    return FileResponse(trabajo.archivo.open('rb'), as_attachment=True, filename=trabajo.nombre_archivo)
@@ -0,0 +1,93 @@
+"""
+Benchmark de la exportación XLSX de ventas en streaming.
+
+Uso:
+    python manage.py benchmark_exportacion_xlsx                  # 200.000 pedidos
+    python manage.py benchmark_exportacion_xlsx --pedidos 50000
+
+Crea pedidos cerrados sintéticos dentro de una transacción (que se revierte al
+final), exporta con construir_ventas_xlsx a un archivo temporal y reporta
+tiempo, tamaño y pico de memoria Python (tracemalloc). Mide además una corrida
+con el 10% de las filas: con write_only el pico debe ser prácticamente el mismo.
+
+NO ejecutar contra la base de producción en horario de servicio.
+"""
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido
+from app.reportes.api_views import construir_ventas_xlsx
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo y memoria de la exportación XLSX de ventas con N pedidos sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=200000, help='Pedidos sintéticos (default: 200000)')
+        parser.add_argument('--lote', type=int, default=5000, help='Tamaño de lote para bulk_create')
+
+    def handle(self, *args, **options):
+        total = options['pedidos']
+        lote = options['lote']
+
+        with transaction.atomic():
+            # Rango futuro y aislado (un pedido por minuto): no se mezcla con pedidos reales
+            inicio = datetime(2099, 1, 1)
+            self._crear_pedidos(total, lote, timezone.make_aware(inicio))
+            self.stdout.write(f'🧪 {total} pedidos sintéticos creados')
+
+            muestra = max(total // 10, 1)
+            fin_muestra = inicio + timedelta(minutes=muestra - 1)
+            fin_total = inicio + timedelta(minutes=total)
+
+            for etiqueta, fin in [('Muestra 10%', fin_muestra), ('Completo', fin_total)]:
+                segundos, pico, tamano, filas = self._medir(inicio, fin)
+                self.stdout.write(self.style.SUCCESS(
+                    f'📊 {etiqueta}: {filas} filas en {segundos:.2f}s, '
+                    f'pico memoria Python {pico / 1024 / 1024:.1f} MB, archivo {tamano / 1024 / 1024:.1f} MB'
+                ))
+
+            transaction.set_rollback(True)
+
+    def _crear_pedidos(self, total, lote, inicio):
+        # bulk_create: sin efectos secundarios de Mesa.save (QR, cursor de cambios)
+        mesa = Mesa.objects.bulk_create([Mesa(numero=9999, capacidad=4)])[0]
+        creados = 0
+        while creados < total:
+            cantidad = min(lote, total - creados)
+            Pedido.objects.bulk_create([
+                Pedido(
+                    mesa=mesa,
+                    estado=Pedido.ESTADO_CERRADO,
+                    estado_pago='pagado',
+                    total=Decimal('85.50'),
+                    descuento=Decimal('5.00'),
+                    propina=Decimal('8.00'),
+                    total_final=Decimal('88.50'),
+                    forma_pago='efectivo',
+                    fecha=inicio + timedelta(minutes=creados + i),
+                    fecha_pago=inicio + timedelta(minutes=creados + i),
+                )
+                for i in range(cantidad)
+            ])
+            creados += cantidad
+
+    def _medir(self, inicio, fin):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        hoja = construir_ventas_xlsx(inicio, fin)
+        with tempfile.TemporaryFile() as archivo:
+            hoja.guardar(archivo)
+            tamano = archivo.tell()
+        segundos = time.perf_counter() - t0
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return segundos, pico, tamano, hoja.filas
@@ -0,0 +1,60 @@
+"""
+Worker de la cola de reportes (TrabajoReporte).
+
+Uso:
+    python manage.py procesar_reportes               # loop continuo
+    python manage.py procesar_reportes --una-vez     # vacía la cola y termina (cron)
+
+Se pueden levantar varios workers: cada trabajo se reclama con
+SELECT ... FOR UPDATE SKIP LOCKED. Conviene ejecutarlos fuera de los workers
+web (contenedor o proceso aparte) para que las exportaciones largas no
+compitan con el servicio.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app.reportes.trabajos import procesar_trabajo, recuperar_colgados, tomar_siguiente
+import logging
+
+logger = logging.getLogger('app.reportes')
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de reportes en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y salir')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos de espera con la cola vacía (default: 5)')
+        parser.add_argument('--timeout-colgados', type=int, default=30, help='Minutos para reencolar trabajos de un worker caído (default: 30)')
+
+    def handle(self, *args, **options):
+        una_vez = options['una_vez']
+        intervalo = options['intervalo']
+        timeout_colgados = options['timeout_colgados']
+
+        self.stdout.write(self.style.SUCCESS('📑 Worker de reportes iniciado'))
+        procesados = 0
+
+        try:
+            while True:
+                recuperar_colgados(timeout_colgados)
+
+                trabajo = tomar_siguiente()
+                if trabajo is None:
+                    if una_vez:
+                        break
+                    time.sleep(intervalo)
+                    # Proceso de larga duración: descartar conexiones caídas u obsoletas
+                    close_old_connections()
+                    continue
+
+                procesar_trabajo(trabajo)
+                procesados += 1
+                self.stdout.write(f'  • Trabajo #{trabajo.id} {trabajo.tipo}.{trabajo.formato}: {trabajo.estado}')
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Worker detenido')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Trabajos procesados: {procesados}'))
+        logger.info(f'Comando procesar_reportes finalizado: {procesados} trabajos')
@@ -0,0 +1,65 @@
+"""
+Comando de Django para reconstruir el rollup diario de ventas.
+
+Uso:
+    python manage.py reconstruir_ventas_diarias                 # todo el histórico
+    python manage.py reconstruir_ventas_diarias --dias 7        # últimos 7 días
+    python manage.py reconstruir_ventas_diarias --desde 2025-01-01 --hasta 2025-12-31
+
+Útil para la carga inicial de VentasDiarias/VentasProductoDiarias y para
+corregir cualquier deriva del mantenimiento incremental.
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from app.pedidos.models import Pedido
+from app.reportes.rollups import reconstruir_rango
+import logging
+
+logger = logging.getLogger('app.reportes')
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye VentasDiarias y VentasProductoDiarias para un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=str, help='Fecha inicial YYYY-MM-DD (default: primer pedido)')
+        parser.add_argument('--hasta', type=str, help='Fecha final YYYY-MM-DD (default: hoy)')
+        parser.add_argument('--dias', type=int, help='Reconstruir solo los últimos N días')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+
+        try:
+            hasta = self._parse_fecha(options['hasta']) or hoy
+            desde = self._parse_fecha(options['desde'])
+        except ValueError:
+            raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        if options['dias']:
+            desde = hasta - timedelta(days=options['dias'] - 1)
+        if desde is None:
+            primero = Pedido.objects.aggregate(primero=Min('fecha'))['primero']
+            desde = timezone.localdate(primero) if primero else hasta
+
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        self.stdout.write(f'🔄 Reconstruyendo rollup de ventas {desde} → {hasta}...')
+        dias, productos = reconstruir_rango(desde, hasta)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Rollup reconstruido: {dias} días con movimiento, {productos} filas por producto'
+            )
+        )
+        logger.info(f'Comando reconstruir_ventas_diarias ejecutado: {desde}..{hasta}')
+
+    @staticmethod
+    def _parse_fecha(valor):
+        if not valor:
+            return None
+        return datetime.strptime(valor, '%Y-%m-%d').date()
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_alter_producto_activo_and_more'),
+        ('reportes', '0003_alter_analisisproducto_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentasDiarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('total_pedidos', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_descuentos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_propinas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_final', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_reembolsado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pedidos_cancelados', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Ventas Diarias',
+                'verbose_name_plural': 'Ventas Diarias',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentasProductoDiarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('producto_nombre', models.CharField(max_length=200)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ventas_diarias', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Ventas Diarias por Producto',
+                'verbose_name_plural': 'Ventas Diarias por Producto',
+                'ordering': ['-fecha', '-cantidad'],
+                'unique_together': {('fecha', 'producto')},
+            },
+        ),
+    ]
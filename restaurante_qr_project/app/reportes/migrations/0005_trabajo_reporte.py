@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_ventas_diarias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ventas', 'Ventas'), ('caja', 'Turnos de Caja'), ('reembolsos', 'Reembolsos'), ('top_productos', 'Top Productos')], max_length=20)),
+                ('formato', models.CharField(choices=[('xlsx', 'Excel'), ('pdf', 'PDF')], max_length=10)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(db_index=True, help_text='Hash de los parámetros (tipo, formato, rango, filtros)', max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('mensaje_error', models.TextField(blank=True)),
+                ('archivo', models.FileField(blank=True, null=True, upload_to='reportes/trabajos/')),
+                ('filas', models.IntegerField(default=0)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_en', models.DateTimeField(blank=True, null=True)),
+                ('finalizado_en', models.DateTimeField(blank=True, null=True)),
+                ('reporte', models.ForeignKey(blank=True, help_text='Reporte de ventas donde se archivó el resultado (solo ventas sin filtros)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to='reportes.reporteventas')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reportes',
+                'ordering': ['-creado_en'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='trabajo_reporte_cola_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
@@ -172,4 +175,163 @@ class AnalisisProducto(models.Model):
         unique_together = ['producto', 'periodo_inicio', 'periodo_fin']
     
     def __str__(self):
-        return f"Análisis {self.producto.nombre} - {self.periodo_inicio} a {self.periodo_fin}"
\ No newline at end of file
+        return f"Análisis {self.producto.nombre} - {self.periodo_inicio} a {self.periodo_fin}"
+
+class VentasDiarias(models.Model):
+    """
+    Rollup desnormalizado de ventas por día (una fila por fecha).
+
+    Se mantiene de forma incremental desde Pedido.save (cierre, cancelación y
+    reembolso, ver app.reportes.rollups) y se puede reconstruir para cualquier
+    rango con `python manage.py reconstruir_ventas_diarias`.
+
+    Convenciones (mismas que las exportaciones):
+    - Ventas: pedidos 'cerrado', por fecha de pago (fecha del pedido si no tiene)
+    - Cancelados: por fecha del pedido
+    - Reembolsos: por fecha de autorización/creación del reembolso
+    """
+    fecha = models.DateField(unique=True)
+    total_pedidos = models.IntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_descuentos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_propinas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_final = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_reembolsado = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pedidos_cancelados = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Ventas Diarias"
+        verbose_name_plural = "Ventas Diarias"
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"Ventas {self.fecha} - Bs/ {self.total_final} ({self.total_pedidos} pedidos)"
+
+    @property
+    def ventas_netas(self):
+        """Total cobrado menos reembolsos del día"""
+        return self.total_final - self.total_reembolsado
+
+
+class VentasProductoDiarias(models.Model):
+    """
+    Rollup por producto y día de los pedidos cerrados (alimenta el top de productos).
+    """
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='ventas_diarias')
+    producto_nombre = models.CharField(max_length=200)
+    cantidad = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Ventas Diarias por Producto"
+        verbose_name_plural = "Ventas Diarias por Producto"
+        ordering = ['-fecha', '-cantidad']
+        unique_together = ['fecha', 'producto']
+
+    def __str__(self):
+        return f"{self.producto_nombre} {self.fecha}: {self.cantidad}"
+
+
+class TrabajoReporte(models.Model):
+    """
+    Cola de exportaciones en segundo plano (tabla en BD, sin broker externo).
+
+    Una solicitud encola (tipo, formato, rango, filtros) y recibe el id para
+    consultar el estado; el comando `procesar_reportes` toma los trabajos con
+    SELECT ... FOR UPDATE SKIP LOCKED, genera el archivo y lo guarda en `archivo`.
+
+    Para periodos ya cerrados (fecha_fin < hoy) el resultado no cambia: una
+    solicitud con la misma `clave` reutiliza el archivo ya generado.
+    """
+    TIPO_VENTAS = 'ventas'
+    TIPO_CAJA = 'caja'
+    TIPO_REEMBOLSOS = 'reembolsos'
+    TIPO_TOP_PRODUCTOS = 'top_productos'
+
+    TIPO_CHOICES = [
+        (TIPO_VENTAS, 'Ventas'),
+        (TIPO_CAJA, 'Turnos de Caja'),
+        (TIPO_REEMBOLSOS, 'Reembolsos'),
+        (TIPO_TOP_PRODUCTOS, 'Top Productos'),
+    ]
+
+    FORMATO_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_PROCESANDO = 'procesando'
+    ESTADO_COMPLETADO = 'completado'
+    ESTADO_ERROR = 'error'
+
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_PROCESANDO, 'Procesando'),
+        (ESTADO_COMPLETADO, 'Completado'),
+        (ESTADO_ERROR, 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    filtros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=64, db_index=True, help_text='Hash de los parámetros (tipo, formato, rango, filtros)')
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    mensaje_error = models.TextField(blank=True)
+    archivo = models.FileField(upload_to='reportes/trabajos/', blank=True, null=True)
+    filas = models.IntegerField(default=0)
+
+    solicitado_por = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajos_reporte'
+    )
+    reporte = models.ForeignKey(
+        ReporteVentas,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajos',
+        help_text='Reporte de ventas donde se archivó el resultado (solo ventas sin filtros)'
+    )
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    finalizado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reportes"
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'id'], name='trabajo_reporte_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trabajo #{self.id} {self.tipo}.{self.formato} {self.fecha_inicio}..{self.fecha_fin} ({self.estado})"
+
+    @staticmethod
+    def calcular_clave(tipo, formato, fecha_inicio, fecha_fin, filtros):
+        """Hash estable de los parámetros que determinan el contenido del archivo"""
+        datos = json.dumps(
+            [tipo, formato, fecha_inicio.isoformat(), fecha_fin.isoformat(), filtros or {}],
+            sort_keys=True
+        )
+        return hashlib.sha256(datos.encode()).hexdigest()
+
+    @property
+    def periodo_cerrado(self):
+        """El rango terminó antes de hoy: su resultado ya no puede cambiar"""
+        return self.fecha_fin < timezone.localdate()
+
+    @property
+    def nombre_archivo(self):
+        return f"{self.tipo}_{self.fecha_inicio.strftime('%Y%m%d')}_{self.fecha_fin.strftime('%Y%m%d')}.{self.formato}"
@@ -0,0 +1,252 @@
+"""
+Mantenimiento del rollup diario de ventas (VentasDiarias / VentasProductoDiarias).
+
+Incremental: Pedido.save compara contra los valores de BD (fila bloqueada) y
+detecta las transiciones relevantes (cierre, cancelación, aumento de
+total_reembolsado); registrar_cambios_pedido() programa los deltas.
+Los deltas se aplican en on_commit con un upsert aditivo (INSERT ... ON CONFLICT
+DO UPDATE SET x = x + EXCLUDED.x), así dos cierres concurrentes del mismo día
+nunca se pisan y un rollback nunca llega al rollup.
+
+Reconstrucción: reconstruir_rango(desde, hasta) recalcula las filas del rango
+con agregados agrupados por día (comando reconstruir_ventas_diarias). Es la
+herramienta para cargar histórico o corregir cualquier deriva.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from app.pedidos.models import Pedido, DetallePedido
+from .models import VentasDiarias, VentasProductoDiarias
+
+logger = logging.getLogger('app.reportes')
+
+CAMPOS_DIA = [
+    'total_pedidos', 'total_ventas', 'total_descuentos', 'total_propinas',
+    'total_final', 'total_reembolsado', 'pedidos_cancelados',
+]
+
+
+def fecha_venta(pedido):
+    """Día al que se imputa la venta de un pedido cerrado (hora local)"""
+    return timezone.localdate(pedido.fecha_pago or pedido.fecha)
+
+
+# ══════════════════════════════════════════════
+# 🔁 MANTENIMIENTO INCREMENTAL
+# ══════════════════════════════════════════════
+
+def registrar_cambios_pedido(pedido, estado_anterior, reembolsado_anterior):
+    """
+    Programa los deltas del rollup según lo que cambió en el pedido.
+
+    Args:
+        pedido (Pedido): Pedido recién guardado
+        estado_anterior (str|None): Estado en BD antes del save (None si es nuevo)
+        reembolsado_anterior (Decimal|None): total_reembolsado en BD antes del save
+    """
+    if pedido.estado != estado_anterior:
+        if pedido.estado == Pedido.ESTADO_CERRADO:
+            fecha = fecha_venta(pedido)
+            deltas = {
+                'total_pedidos': 1,
+                'total_ventas': pedido.total or Decimal('0.00'),
+                'total_descuentos': pedido.descuento or Decimal('0.00'),
+                'total_propinas': pedido.propina or Decimal('0.00'),
+                'total_final': pedido.total_final or Decimal('0.00'),
+            }
+            pedido_id = pedido.id
+            transaction.on_commit(lambda: _aplicar_cierre(pedido_id, fecha, deltas))
+        elif pedido.estado == Pedido.ESTADO_CANCELADO:
+            fecha = timezone.localdate(pedido.fecha)
+            transaction.on_commit(lambda: _aplicar_dia(fecha, {'pedidos_cancelados': 1}))
+
+    reembolsado = (pedido.total_reembolsado or Decimal('0.00')) - (reembolsado_anterior or Decimal('0.00'))
+    if reembolsado > 0:
+        fecha_reembolso = timezone.localdate()
+        transaction.on_commit(lambda: _aplicar_dia(fecha_reembolso, {'total_reembolsado': reembolsado}))
+
+
+def _aplicar_cierre(pedido_id, fecha, deltas):
+    try:
+        _upsert_dia(fecha, deltas)
+        lineas = DetallePedido.objects.filter(pedido_id=pedido_id).values(
+            'producto_id', 'producto__nombre'
+        ).annotate(cantidad_total=Sum('cantidad'), ingresos_total=Sum('subtotal'))
+        _upsert_productos(fecha, [
+            (linea['producto_id'], linea['producto__nombre'], linea['cantidad_total'], linea['ingresos_total'])
+            for linea in lineas
+        ])
+    except Exception as e:
+        # El rollup es best-effort: se corrige con reconstruir_ventas_diarias
+        logger.error(f"Error actualizando rollup de ventas (pedido {pedido_id}): {str(e)}")
+
+
+def _aplicar_dia(fecha, deltas):
+    try:
+        _upsert_dia(fecha, deltas)
+    except Exception as e:
+        logger.error(f"Error actualizando rollup de ventas ({fecha}): {str(e)}")
+
+
+def _upsert_dia(fecha, deltas):
+    tabla = VentasDiarias._meta.db_table
+    valores = [deltas.get(campo, 0) for campo in CAMPOS_DIA]
+    columnas = ', '.join(CAMPOS_DIA)
+    sumas = ', '.join(f"{campo} = {tabla}.{campo} + EXCLUDED.{campo}" for campo in CAMPOS_DIA)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (fecha, {columnas}, actualizado_en) "
+            f"VALUES (%s, {', '.join(['%s'] * len(CAMPOS_DIA))}, %s) "
+            f"ON CONFLICT (fecha) DO UPDATE SET {sumas}, actualizado_en = EXCLUDED.actualizado_en",
+            [fecha, *valores, timezone.now()]
+        )
+
+
+def _upsert_productos(fecha, filas):
+    """filas: [(producto_id, nombre, cantidad, ingresos)] — una sola sentencia"""
+    if not filas:
+        return
+    tabla = VentasProductoDiarias._meta.db_table
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s)'] * len(filas))
+    parametros = []
+    for producto_id, nombre, cantidad, ingresos in filas:
+        parametros.extend([fecha, producto_id, nombre, cantidad, ingresos])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (fecha, producto_id, producto_nombre, cantidad, ingresos) "
+            f"VALUES {placeholders} "
+            f"ON CONFLICT (fecha, producto_id) DO UPDATE SET "
+            f"cantidad = {tabla}.cantidad + EXCLUDED.cantidad, "
+            f"ingresos = {tabla}.ingresos + EXCLUDED.ingresos, "
+            f"producto_nombre = EXCLUDED.producto_nombre",
+            parametros
+        )
+
+
+# ══════════════════════════════════════════════
+# 🛠️ RECONSTRUCCIÓN POR RANGO
+# ══════════════════════════════════════════════
+
+@transaction.atomic
+def reconstruir_rango(desde, hasta):
+    """
+    Recalcula el rollup para [desde, hasta] (fechas inclusive) desde los datos crudos.
+
+    Usa un agregado agrupado por día para cada fuente (ventas, cancelados,
+    reembolsos, productos): el costo no depende de la cantidad de días.
+
+    Returns:
+        tuple: (filas diarias, filas por producto) escritas
+    """
+    from app.caja.models import Reembolso
+
+    dias = {}
+
+    def fila(dia):
+        return dias.setdefault(dia, {campo: 0 for campo in CAMPOS_DIA})
+
+    cerrados = Pedido.objects.filter(estado=Pedido.ESTADO_CERRADO).annotate(
+        dia=TruncDate(Coalesce('fecha_pago', 'fecha'))
+    ).filter(dia__gte=desde, dia__lte=hasta)
+
+    for venta in cerrados.values('dia').annotate(
+        pedidos=Count('id'),
+        ventas=Sum('total'),
+        descuentos=Sum('descuento'),
+        propinas=Sum('propina'),
+        finales=Sum('total_final'),
+    ):
+        datos = fila(venta['dia'])
+        datos['total_pedidos'] = venta['pedidos']
+        datos['total_ventas'] = venta['ventas'] or 0
+        datos['total_descuentos'] = venta['descuentos'] or 0
+        datos['total_propinas'] = venta['propinas'] or 0
+        datos['total_final'] = venta['finales'] or 0
+
+    cancelados = Pedido.objects.filter(estado=Pedido.ESTADO_CANCELADO).annotate(
+        dia=TruncDate('fecha')
+    ).filter(dia__gte=desde, dia__lte=hasta).values('dia').annotate(cantidad=Count('id'))
+    for cancelado in cancelados:
+        fila(cancelado['dia'])['pedidos_cancelados'] = cancelado['cantidad']
+
+    # Reembolsos aplicados al pedido: autorizados y no rechazados
+    reembolsos = Reembolso.objects.filter(autorizado_por__isnull=False).exclude(estado='rechazado').annotate(
+        dia=TruncDate(Coalesce('autorizado_en', 'creado_en'))
+    ).filter(dia__gte=desde, dia__lte=hasta).values('dia').annotate(monto_total=Sum('monto'))
+    for reembolso in reembolsos:
+        fila(reembolso['dia'])['total_reembolsado'] = reembolso['monto_total'] or 0
+
+    productos = DetallePedido.objects.filter(pedido__in=cerrados).annotate(
+        dia=TruncDate(Coalesce('pedido__fecha_pago', 'pedido__fecha'))
+    ).values('dia', 'producto_id', 'producto__nombre').annotate(
+        cantidad_total=Sum('cantidad'), ingresos_total=Sum('subtotal')
+    )
+
+    VentasDiarias.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+    VentasProductoDiarias.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+
+    ahora = timezone.now()
+    VentasDiarias.objects.bulk_create(
+        [VentasDiarias(fecha=dia, actualizado_en=ahora, **datos) for dia, datos in dias.items()],
+        batch_size=500
+    )
+    filas_productos = VentasProductoDiarias.objects.bulk_create(
+        [
+            VentasProductoDiarias(
+                fecha=linea['dia'],
+                producto_id=linea['producto_id'],
+                producto_nombre=linea['producto__nombre'],
+                cantidad=linea['cantidad_total'],
+                ingresos=linea['ingresos_total'] or 0,
+            )
+            for linea in productos
+        ],
+        batch_size=500
+    )
+
+    logger.info(f"Rollup de ventas reconstruido {desde}..{hasta}: {len(dias)} días, {len(filas_productos)} filas de producto")
+    return len(dias), len(filas_productos)
+
+
+@transaction.atomic
+def reconstruir_recientes(dias=2):
+    """
+    Reconstruye los últimos `dias` días (hoy incluido). Tarea programada de
+    respaldo del mantenimiento incremental (ver configuracion.tareas).
+    """
+    from datetime import timedelta
+
+    hoy = timezone.localdate()
+    return reconstruir_rango(hoy - timedelta(days=dias - 1), hoy)
+
+
+# ══════════════════════════════════════════════
+# 📊 LECTURA
+# ══════════════════════════════════════════════
+
+def ventas_por_dia(desde, hasta):
+    """Dict {fecha: VentasDiarias} del rango (los días sin ventas no aparecen)"""
+    return {
+        venta.fecha: venta
+        for venta in VentasDiarias.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+    }
+
+
+def top_productos(desde, hasta, limite=20):
+    """
+    Top de productos vendidos (pedidos cerrados) en el rango, desde el rollup.
+
+    Returns:
+        QuerySet: dicts con producto_nombre, cantidad_vendida, ingresos_totales
+    """
+    return VentasProductoDiarias.objects.filter(
+        fecha__gte=desde, fecha__lte=hasta
+    ).values('producto_nombre').annotate(
+        cantidad_vendida=Sum('cantidad'),
+        ingresos_totales=Sum('ingresos')
+    ).order_by('-cantidad_vendida')[:limite]
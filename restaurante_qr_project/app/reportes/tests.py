@@ -0,0 +1,198 @@
+"""
+Tests para el rollup diario de ventas (VentasDiarias / VentasProductoDiarias)
+"""
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from app.mesas.models import Mesa
+from app.pedidos.models import Pedido, DetallePedido
+from app.productos.models import Producto, Categoria
+from app.reportes.models import TrabajoReporte, VentasDiarias, VentasProductoDiarias
+
+
+class VentasDiariasTestCase(TestCase):
+    """El rollup se mantiene al cerrar/cancelar/reembolsar y coincide con la reconstrucción"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Comida')
+        self.producto = Producto.objects.create(
+            nombre='Pizza',
+            precio=Decimal('40.00'),
+            categoria=categoria,
+            disponible=True
+        )
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        self.hoy = timezone.localdate()
+
+    def _cerrar_pedido(self, cantidad=2):
+        pedido = Pedido.objects.create(mesa=self.mesa, estado=Pedido.ESTADO_ENTREGADO, total=Decimal('80.00'))
+        DetallePedido.objects.create(pedido=pedido, producto=self.producto, cantidad=cantidad)
+        pedido = Pedido.objects.get(id=pedido.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.total = Decimal('40.00') * cantidad
+            pedido.total_final = pedido.total
+            pedido.fecha_pago = timezone.now()
+            pedido.estado = Pedido.ESTADO_CERRADO
+            pedido.save()
+        return pedido
+
+    def test_cierre_actualiza_rollup_incremental(self):
+        self._cerrar_pedido(cantidad=2)
+        self._cerrar_pedido(cantidad=1)
+
+        dia = VentasDiarias.objects.get(fecha=self.hoy)
+        self.assertEqual(dia.total_pedidos, 2)
+        self.assertEqual(dia.total_final, Decimal('120.00'))
+
+        producto = VentasProductoDiarias.objects.get(fecha=self.hoy, producto=self.producto)
+        self.assertEqual(producto.cantidad, 3)
+        self.assertEqual(producto.ingresos, Decimal('120.00'))
+
+    def test_guardar_sin_transicion_no_duplica(self):
+        pedido = self._cerrar_pedido()
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.observaciones_caja = 'nota'
+            pedido.save()
+
+        self.assertEqual(VentasDiarias.objects.get(fecha=self.hoy).total_pedidos, 1)
+
+    def test_copias_refrescadas_o_diferidas_no_duplican(self):
+        pedido = Pedido.objects.create(mesa=self.mesa, estado=Pedido.ESTADO_ENTREGADO, total=Decimal('80.00'))
+        copia = Pedido.objects.get(id=pedido.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.estado = Pedido.ESTADO_CERRADO
+            pedido.total_reembolsado = Decimal('10.00')
+            pedido.save()
+
+            # Copia leída antes del cierre y refrescada después
+            copia.refresh_from_db()
+            copia.save()
+            # Carga diferida: estado y total_reembolsado no están en memoria
+            Pedido.objects.only('id', 'mesa').get(id=pedido.id).save()
+
+        dia = VentasDiarias.objects.get(fecha=self.hoy)
+        self.assertEqual(dia.total_pedidos, 1)
+        self.assertEqual(dia.total_reembolsado, Decimal('10.00'))
+
+    def test_cancelacion_y_reembolso(self):
+        pedido = Pedido.objects.create(mesa=self.mesa, total=Decimal('50.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.cambiar_estado(Pedido.ESTADO_CANCELADO, motivo='Cliente se fue')
+
+        cerrado = self._cerrar_pedido()
+        with self.captureOnCommitCallbacks(execute=True):
+            cerrado.total_reembolsado = Decimal('30.00')
+            cerrado.save()
+
+        dia = VentasDiarias.objects.get(fecha=self.hoy)
+        self.assertEqual(dia.pedidos_cancelados, 1)
+        self.assertEqual(dia.total_reembolsado, Decimal('30.00'))
+        self.assertEqual(dia.ventas_netas, Decimal('50.00'))
+
+    def test_reconstruccion_coincide_con_incremental(self):
+        self._cerrar_pedido(cantidad=2)
+        self._cerrar_pedido(cantidad=3)
+        antes = VentasDiarias.objects.get(fecha=self.hoy)
+
+        VentasDiarias.objects.all().delete()
+        VentasProductoDiarias.objects.all().delete()
+        call_command('reconstruir_ventas_diarias', '--dias', '1', stdout=StringIO())
+
+        despues = VentasDiarias.objects.get(fecha=self.hoy)
+        self.assertEqual(despues.total_pedidos, antes.total_pedidos)
+        self.assertEqual(despues.total_final, antes.total_final)
+        self.assertEqual(VentasProductoDiarias.objects.get(fecha=self.hoy).cantidad, 5)
+
+
+class ExportacionXlsxStreamingTestCase(TestCase):
+    """Las exportaciones XLSX se sirven en streaming y conservan el contenido"""
+
+    def setUp(self):
+        from app.usuarios.models import Usuario
+
+        self.gerente = Usuario.objects.create_user(username='gerente', password='test123', rol='gerente')
+        mesa = Mesa.objects.create(numero=7, capacidad=4)
+        Pedido.objects.create(
+            mesa=mesa,
+            estado=Pedido.ESTADO_CERRADO,
+            total=Decimal('100.00'),
+            total_final=Decimal('110.00'),
+            propina=Decimal('10.00'),
+            fecha_pago=timezone.now()
+        )
+
+    def test_ventas_xlsx_streaming(self):
+        from openpyxl import load_workbook
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.gerente)
+        hoy = timezone.localdate().strftime('%Y-%m-%d')
+        response = client.get(f'/reportes/exportar/ventas/xlsx/?desde={hoy}&hasta={hoy}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        contenido = b''.join(response.streaming_content)
+        ws = load_workbook(BytesIO(contenido)).active
+        filas = [[celda.value for celda in fila] for fila in ws.iter_rows()]
+        self.assertEqual(filas[3][1], 7)
+        self.assertEqual(filas[-1][8], 110.0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='reportes_test_'))
+class TrabajoReporteTestCase(TestCase):
+    """Cola de reportes: encolar, procesar con el worker y reutilizar artefactos"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from app.usuarios.models import Usuario
+
+        self.gerente = Usuario.objects.create_user(username='gerente', password='test123', rol='gerente')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.gerente)
+        self.ayer = (timezone.localdate() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+    def _encolar(self, **params):
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client_api.post(f'/api/reportes/trabajos/?{query}')
+
+    def test_encolar_procesar_y_reutilizar(self):
+        response = self._encolar(tipo='ventas', formato='xlsx', desde=self.ayer, hasta=self.ayer)
+        self.assertEqual(response.status_code, 202)
+        trabajo_id = response.json()['trabajo']['id']
+
+        # Mientras está pendiente, la misma solicitud no duplica el trabajo
+        self.assertEqual(self._encolar(tipo='ventas', formato='xlsx', desde=self.ayer, hasta=self.ayer).json()['trabajo']['id'], trabajo_id)
+
+        call_command('procesar_reportes', '--una-vez', stdout=StringIO())
+
+        trabajo = TrabajoReporte.objects.get(id=trabajo_id)
+        self.assertEqual(trabajo.estado, TrabajoReporte.ESTADO_COMPLETADO)
+        self.assertTrue(trabajo.archivo)
+        # Ventas sin filtros de un periodo cerrado se archivan en ReporteVentas
+        self.assertEqual(trabajo.reporte.archivo_excel.name, trabajo.archivo.name)
+
+        reutilizado = self._encolar(tipo='ventas', formato='xlsx', desde=self.ayer, hasta=self.ayer)
+        self.assertEqual(reutilizado.status_code, 200)
+        self.assertTrue(reutilizado.json()['reutilizado'])
+        self.assertEqual(reutilizado.json()['trabajo']['id'], trabajo_id)
+        self.assertEqual(TrabajoReporte.objects.count(), 1)
+
+        descarga = self.client_api.get(reutilizado.json()['trabajo']['descarga_url'])
+        self.assertEqual(descarga.status_code, 200)
+
+    def test_filtros_distintos_generan_otro_trabajo(self):
+        self._encolar(tipo='top_productos', formato='pdf', desde=self.ayer, hasta=self.ayer, top=5)
+        self._encolar(tipo='top_productos', formato='pdf', desde=self.ayer, hasta=self.ayer, top=10)
+        self.assertEqual(TrabajoReporte.objects.count(), 2)
+
+        call_command('procesar_reportes', '--una-vez', stdout=StringIO())
+        self.assertEqual(
+            TrabajoReporte.objects.filter(estado=TrabajoReporte.ESTADO_COMPLETADO).count(), 2
+        )
@@ -0,0 +1,218 @@
+"""
+Cola de reportes en segundo plano (TrabajoReporte).
+
+- encolar_reporte(): crea el trabajo, o devuelve uno equivalente (misma clave)
+  que esté en curso o ya completado para un periodo cerrado.
+- tomar_siguiente(): reclama el próximo trabajo pendiente con
+  SELECT ... FOR UPDATE SKIP LOCKED (varios workers no se pisan).
+- procesar_trabajo(): genera el archivo con los mismos constructores que usan
+  las exportaciones síncronas y lo guarda en TrabajoReporte.archivo.
+
+El worker es el comando `python manage.py procesar_reportes`.
+"""
+import logging
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ReporteVentas, TrabajoReporte, VentasDiarias
+
+logger = logging.getLogger('app.reportes')
+
+MAX_INTENTOS = 3
+
+
+def _renderizadores():
+    from . import api_views
+
+    def xlsx(constructor):
+        def renderizar(destino, fecha_inicio, fecha_fin, filtros):
+            hoja = constructor(fecha_inicio, fecha_fin, **filtros)
+            hoja.guardar(destino)
+            return hoja.filas
+        return renderizar
+
+    def pdf(constructor):
+        def renderizar(destino, fecha_inicio, fecha_fin, filtros):
+            return constructor(destino, fecha_inicio, fecha_fin, **filtros)
+        return renderizar
+
+    return {
+        (TrabajoReporte.TIPO_VENTAS, 'xlsx'): xlsx(api_views.construir_ventas_xlsx),
+        (TrabajoReporte.TIPO_VENTAS, 'pdf'): pdf(api_views.construir_ventas_pdf),
+        (TrabajoReporte.TIPO_CAJA, 'xlsx'): xlsx(api_views.construir_caja_xlsx),
+        (TrabajoReporte.TIPO_CAJA, 'pdf'): pdf(api_views.construir_caja_pdf),
+        (TrabajoReporte.TIPO_REEMBOLSOS, 'xlsx'): xlsx(api_views.construir_reembolsos_xlsx),
+        (TrabajoReporte.TIPO_REEMBOLSOS, 'pdf'): pdf(api_views.construir_reembolsos_pdf),
+        (TrabajoReporte.TIPO_TOP_PRODUCTOS, 'xlsx'): xlsx(api_views.construir_top_productos_xlsx),
+        (TrabajoReporte.TIPO_TOP_PRODUCTOS, 'pdf'): pdf(api_views.construir_top_productos_pdf),
+    }
+
+
+# ══════════════════════════════════════════════
+# 📥 ENCOLAR
+# ══════════════════════════════════════════════
+
+def encolar_reporte(tipo, formato, fecha_inicio, fecha_fin, filtros=None, usuario=None):
+    """
+    Encola un reporte o reutiliza uno equivalente.
+
+    Args:
+        tipo (str): TrabajoReporte.TIPO_*
+        formato (str): 'xlsx' o 'pdf'
+        fecha_inicio (date), fecha_fin (date): Rango inclusive
+        filtros (dict): Filtros extra del reporte (metodo, top_n)
+        usuario (Usuario, optional): Solicitante
+
+    Returns:
+        tuple: (TrabajoReporte, reutilizado)
+    """
+    filtros = filtros or {}
+    clave = TrabajoReporte.calcular_clave(tipo, formato, fecha_inicio, fecha_fin, filtros)
+
+    existentes = TrabajoReporte.objects.filter(clave=clave).order_by('-id')
+
+    # Mismo reporte ya en cola o en proceso: no duplicar trabajo
+    en_curso = existentes.filter(
+        estado__in=[TrabajoReporte.ESTADO_PENDIENTE, TrabajoReporte.ESTADO_PROCESANDO]
+    ).first()
+    if en_curso:
+        return en_curso, True
+
+    # Periodo cerrado: el archivo generado sigue siendo válido
+    if fecha_fin < timezone.localdate():
+        completado = existentes.filter(estado=TrabajoReporte.ESTADO_COMPLETADO).exclude(archivo='').first()
+        if completado and completado.archivo and completado.archivo.storage.exists(completado.archivo.name):
+            return completado, True
+
+    trabajo = TrabajoReporte.objects.create(
+        tipo=tipo,
+        formato=formato,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        filtros=filtros,
+        clave=clave,
+        solicitado_por=usuario,
+    )
+    logger.info(f"Trabajo de reporte #{trabajo.id} encolado: {tipo}.{formato} {fecha_inicio}..{fecha_fin} {filtros}")
+    return trabajo, False
+
+
+# ══════════════════════════════════════════════
+# ⚙️ WORKER
+# ══════════════════════════════════════════════
+
+def tomar_siguiente():
+    """Reclama el trabajo pendiente más antiguo (None si la cola está vacía)"""
+    with transaction.atomic():
+        trabajo = TrabajoReporte.objects.select_for_update(skip_locked=True).filter(
+            estado=TrabajoReporte.ESTADO_PENDIENTE
+        ).order_by('id').first()
+        if trabajo is None:
+            return None
+        trabajo.estado = TrabajoReporte.ESTADO_PROCESANDO
+        trabajo.intentos += 1
+        trabajo.iniciado_en = timezone.now()
+        trabajo.save(update_fields=['estado', 'intentos', 'iniciado_en'])
+        return trabajo
+
+
+def procesar_trabajo(trabajo):
+    """Genera el archivo del trabajo y lo guarda; marca completado o error"""
+    renderizar = _renderizadores().get((trabajo.tipo, trabajo.formato))
+    if renderizar is None:
+        _marcar_error(trabajo, f"Tipo/formato no soportado: {trabajo.tipo}.{trabajo.formato}", reintentar=False)
+        return trabajo
+
+    # Los constructores trabajan con datetimes (igual que parse_rango_fechas)
+    fecha_inicio = datetime.combine(trabajo.fecha_inicio, time.min)
+    fecha_fin = datetime.combine(trabajo.fecha_fin, time.min)
+
+    try:
+        with tempfile.TemporaryFile() as temporal:
+            filas = renderizar(temporal, fecha_inicio, fecha_fin, trabajo.filtros or {})
+            temporal.seek(0)
+            trabajo.archivo.save(trabajo.nombre_archivo, File(temporal), save=False)
+
+        trabajo.filas = filas
+        trabajo.estado = TrabajoReporte.ESTADO_COMPLETADO
+        trabajo.mensaje_error = ''
+        trabajo.finalizado_en = timezone.now()
+        trabajo.save()
+
+        _archivar_en_reporte_ventas(trabajo)
+        logger.info(f"Trabajo de reporte #{trabajo.id} completado ({filas} filas)")
+    except Exception as e:
+        logger.exception(f"Error procesando trabajo de reporte #{trabajo.id}")
+        _marcar_error(trabajo, str(e))
+
+    return trabajo
+
+
+def _marcar_error(trabajo, mensaje, reintentar=True):
+    # Con intentos disponibles vuelve a la cola; si no, queda en error
+    if reintentar and trabajo.intentos < MAX_INTENTOS:
+        trabajo.estado = TrabajoReporte.ESTADO_PENDIENTE
+    else:
+        trabajo.estado = TrabajoReporte.ESTADO_ERROR
+        trabajo.finalizado_en = timezone.now()
+    trabajo.mensaje_error = mensaje
+    trabajo.save(update_fields=['estado', 'mensaje_error', 'finalizado_en'])
+
+
+def _archivar_en_reporte_ventas(trabajo):
+    """
+    Ventas sin filtros de un periodo cerrado: guarda el archivo también en
+    ReporteVentas (tipo personalizado) junto con los totales del rollup diario.
+    """
+    if trabajo.tipo != TrabajoReporte.TIPO_VENTAS or trabajo.filtros or not trabajo.periodo_cerrado:
+        return
+
+    totales = VentasDiarias.objects.filter(
+        fecha__gte=trabajo.fecha_inicio, fecha__lte=trabajo.fecha_fin
+    ).aggregate(ventas=Sum('total_final'), pedidos=Sum('total_pedidos'))
+    total_ventas = totales['ventas'] or 0
+    total_pedidos = totales['pedidos'] or 0
+
+    reporte, _ = ReporteVentas.objects.get_or_create(
+        tipo='personalizado',
+        fecha_inicio=trabajo.fecha_inicio,
+        fecha_fin=trabajo.fecha_fin,
+    )
+    reporte.total_ventas = total_ventas
+    reporte.total_pedidos = total_pedidos
+    reporte.promedio_por_pedido = total_ventas / total_pedidos if total_pedidos else 0
+    campo = 'archivo_excel' if trabajo.formato == 'xlsx' else 'archivo_pdf'
+    # Mismo archivo del trabajo (sin copiar bytes)
+    setattr(reporte, campo, trabajo.archivo.name)
+    reporte.save()
+
+    trabajo.reporte = reporte
+    trabajo.save(update_fields=['reporte'])
+
+
+def recuperar_colgados(minutos=30):
+    """
+    Devuelve a la cola los trabajos 'procesando' de un worker que murió.
+
+    Returns:
+        int: Trabajos recuperados
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    colgados = TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.ESTADO_PROCESANDO,
+        iniciado_en__lt=limite
+    )
+    agotados = colgados.filter(intentos__gte=MAX_INTENTOS).update(
+        estado=TrabajoReporte.ESTADO_ERROR,
+        mensaje_error='Worker interrumpido (intentos agotados)',
+        finalizado_en=timezone.now()
+    )
+    recuperados = colgados.filter(intentos__lt=MAX_INTENTOS).update(estado=TrabajoReporte.ESTADO_PENDIENTE)
+    if agotados or recuperados:
+        logger.warning(f"Trabajos de reporte colgados: {recuperados} reencolados, {agotados} en error")
+    return recuperados
@@ -33,4 +33,9 @@ urlpatterns = [
     # 🏆 Top Productos Más Vendidos
     path('exportar/top-productos/xlsx/', api_views.top_productos_xlsx, name='top_productos_xlsx'),
     path('exportar/top-productos/pdf/', api_views.top_productos_pdf, name='top_productos_pdf'),
+
+    # 📑 Cola de reportes en segundo plano (worker: procesar_reportes)
+    path('trabajos/', api_views.encolar_reporte_api, name='trabajo_reporte_encolar'),
+    path('trabajos/<int:trabajo_id>/', api_views.estado_trabajo_reporte, name='trabajo_reporte_estado'),
+    path('trabajos/<int:trabajo_id>/descargar/', api_views.descargar_trabajo_reporte, name='trabajo_reporte_descargar'),
 ]
\ No newline at end of file
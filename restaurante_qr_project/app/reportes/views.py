@@ -2,13 +2,15 @@ from django.shortcuts import render
 from django.http import HttpResponse, JsonResponse
 from django.contrib.admin.views.decorators import staff_member_required
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
 from datetime import timedelta
 import logging
 
 logger = logging.getLogger('app.reportes')
 
 from .models import ReporteVentas
+from .rollups import ventas_por_dia as rollup_ventas_por_dia, top_productos as rollup_top_productos
 from app.pedidos.models import Pedido, DetallePedido
 
 @staff_member_required
@@ -33,54 +35,51 @@ def datos_ventas_semanales(request):
         logger.info(f"📊 Inicio semana: {inicio_semana}")
         logger.info(f"📊 Fin semana: {fin_semana}")
         
-        # ✅ SOLUCIONADO: Incluir TODOS los pedidos no-cancelados (usando constantes válidas)
+        # ✅ OPTIMIZADO: Ventas cerradas desde el rollup diario (VentasDiarias) +
+        # un solo agregado agrupado para los pedidos aún en curso de la semana.
+        # Antes: 2 consultas por día + un count() de toda la tabla de pedidos.
         from app.pedidos.models import Pedido as PedidoModel
-        estados_ventas = [
+        estados_en_curso = [
             PedidoModel.ESTADO_CREADO,
             PedidoModel.ESTADO_CONFIRMADO,
             PedidoModel.ESTADO_EN_PREPARACION,
             PedidoModel.ESTADO_LISTO,
             PedidoModel.ESTADO_ENTREGADO,
-            PedidoModel.ESTADO_CERRADO  # cerrado también cuenta como venta
         ]
-        
-        # Debug: Contar todos los pedidos
-        total_pedidos_bd = Pedido.objects.all().count()
-        pedidos_semana = Pedido.objects.filter(
-            fecha__date__gte=inicio_semana,
-            fecha__date__lte=fin_semana
-        )
-        
-        logger.info(f"📊 Total pedidos en BD: {total_pedidos_bd}")
-        logger.info(f"📊 Pedidos en semana actual: {pedidos_semana.count()}")
-        
+
+        cerrados = rollup_ventas_por_dia(inicio_semana, fin_semana)
+        en_curso = {
+            fila['dia']: fila
+            for fila in Pedido.objects.filter(
+                fecha__date__gte=inicio_semana,
+                fecha__date__lte=fin_semana,
+                estado__in=estados_en_curso
+            ).annotate(dia=TruncDate('fecha')).values('dia').annotate(
+                ventas=Sum('total'), pedidos=Count('id')
+            )
+        }
+
         # Datos por día de la semana
         ventas_por_dia = []
         dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        
+
         for i in range(7):
             fecha = inicio_semana + timedelta(days=i)
-            
-            # ✅ SOLUCIONADO: Incluir todos los estados de ventas
-            ventas_dia = Pedido.objects.filter(
-                fecha__date=fecha,
-                estado__in=estados_ventas  # ✅ CAMBIADO: Todos los estados
-            ).aggregate(total=Sum('total'))['total'] or 0
-            
-            pedidos_dia = Pedido.objects.filter(
-                fecha__date=fecha,
-                estado__in=estados_ventas  # ✅ CAMBIADO: Todos los estados
-            ).count()
-            
+            cerrado = cerrados.get(fecha)
+            abierto = en_curso.get(fecha)
+
+            ventas_dia = (cerrado.total_ventas if cerrado else 0) + ((abierto['ventas'] or 0) if abierto else 0)
+            pedidos_dia = (cerrado.total_pedidos if cerrado else 0) + (abierto['pedidos'] if abierto else 0)
+
             logger.info(f"📊 {dias_semana[i]} ({fecha}): {pedidos_dia} pedidos, Bs/ {ventas_dia}")
-            
+
             ventas_por_dia.append({
                 'dia': dias_semana[i],
                 'fecha': fecha.strftime('%d/%m'),
                 'ventas': float(ventas_dia),
                 'pedidos': pedidos_dia
             })
-        
+
         total_semana = sum(dia['ventas'] for dia in ventas_por_dia)
         total_pedidos_semana = sum(dia['pedidos'] for dia in ventas_por_dia)
         
@@ -112,38 +111,44 @@ def datos_productos_top(request):
         
         logger.info(f"📊 PRODUCTOS TOP - Inicio semana: {inicio_semana}")
         
-        # ✅ SOLUCIONADO: Incluir todos los estados de ventas (usando constantes válidas)
+        # ✅ OPTIMIZADO: Cerrados desde el rollup por producto (VentasProductoDiarias),
+        # en curso con un agregado sobre los detalles de pedidos abiertos
         from app.pedidos.models import Pedido as PedidoModel
-        estados_ventas = [
+        estados_en_curso = [
             PedidoModel.ESTADO_CREADO,
             PedidoModel.ESTADO_CONFIRMADO,
             PedidoModel.ESTADO_EN_PREPARACION,
             PedidoModel.ESTADO_LISTO,
             PedidoModel.ESTADO_ENTREGADO,
-            PedidoModel.ESTADO_CERRADO
         ]
-        
-        productos_top = DetallePedido.objects.filter(
+
+        acumulado = {}
+        for fila in rollup_top_productos(inicio_semana, hoy, limite=None):
+            acumulado[fila['producto_nombre']] = [fila['cantidad_vendida'], fila['ingresos_totales']]
+
+        en_curso = DetallePedido.objects.filter(
             pedido__fecha__date__gte=inicio_semana,
-            pedido__estado__in=estados_ventas  # ✅ CAMBIADO: Todos los estados
-        ).values(
-            'producto__nombre'
-        ).annotate(
+            pedido__estado__in=estados_en_curso
+        ).values('producto__nombre').annotate(
             cantidad_vendida=Sum('cantidad'),
             ingresos=Sum('subtotal')
-        ).order_by('-cantidad_vendida')[:10]
-        
-        logger.info(f"📊 Productos encontrados: {productos_top.count()}")
-        
+        )
+        for fila in en_curso:
+            cantidad, ingresos = acumulado.get(fila['producto__nombre'], [0, 0])
+            acumulado[fila['producto__nombre']] = [cantidad + fila['cantidad_vendida'], ingresos + fila['ingresos']]
+
+        productos_top = sorted(acumulado.items(), key=lambda item: item[1][0], reverse=True)[:10]
+        logger.info(f"📊 Productos encontrados: {len(productos_top)}")
+
         productos_data = []
-        for producto in productos_top:
-            logger.info(f"📊 Producto: {producto['producto__nombre']} - Cantidad: {producto['cantidad_vendida']}")
+        for nombre, (cantidad, ingresos) in productos_top:
+            logger.info(f"📊 Producto: {nombre} - Cantidad: {cantidad}")
             productos_data.append({
-                'nombre': producto['producto__nombre'],
-                'cantidad': producto['cantidad_vendida'],
-                'ingresos': float(producto['ingresos'])
+                'nombre': nombre,
+                'cantidad': cantidad,
+                'ingresos': float(ingresos)
             })
-        
+
         return JsonResponse({
             'productos_top': productos_data
         })
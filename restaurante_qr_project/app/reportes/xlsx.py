@@ -0,0 +1,116 @@
+"""
+Exportación XLSX en modo streaming (openpyxl write_only).
+
+Las exportaciones grandes (un trimestre de ventas) ya no arman un Workbook
+completo en memoria: las filas se escriben a medida que se iteran los datos
+(.values_list().iterator()) y openpyxl las vuelca a disco. El archivo
+terminado se sirve con FileResponse (StreamingHttpResponse) en bloques, así
+la memoria del worker se mantiene constante sin importar la cantidad de filas.
+
+Los estilos son NamedStyle compartidos: cada celda referencia el estilo por
+nombre en lugar de crear su propio Border/Font.
+"""
+import tempfile
+from copy import copy
+
+from django.conf import settings
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+ESTILO_TITULO = 'reporte_titulo'
+ESTILO_ENCABEZADO = 'reporte_encabezado'
+ESTILO_DATO = 'reporte_dato'
+ESTILO_TOTAL = 'reporte_total'
+
+
+def chunk_size():
+    """Filas por lote al iterar querysets de exportación"""
+    return getattr(settings, 'REPORTES_XLSX_CHUNK_SIZE', 2000)
+
+
+def _estilos():
+    borde = Side(style='thin')
+    return [
+        NamedStyle(name=ESTILO_TITULO, font=Font(bold=True, size=14)),
+        NamedStyle(
+            name=ESTILO_ENCABEZADO,
+            font=Font(bold=True, color="FFFFFF", size=12),
+            fill=PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid"),
+            border=Border(left=borde, right=borde, top=borde, bottom=borde),
+            alignment=Alignment(horizontal='center'),
+        ),
+        NamedStyle(name=ESTILO_DATO, border=Border(left=borde, right=borde, top=borde, bottom=borde)),
+        NamedStyle(name=ESTILO_TOTAL, font=Font(bold=True)),
+    ]
+
+
+class HojaXlsxStreaming:
+    """
+    Hoja única de reporte: título, encabezados, filas de datos y fila de totales.
+
+    Uso:
+        hoja = HojaXlsxStreaming("Reporte de Ventas", titulo, encabezados, ancho=15)
+        for fila in queryset.values_list(...).iterator(chunk_size=chunk_size()):
+            hoja.agregar_fila(fila)
+        hoja.agregar_totales({6: total})
+        return hoja.respuesta("ventas.xlsx")
+    """
+
+    def __init__(self, nombre_hoja, titulo, encabezados, ancho=15):
+        self.wb = Workbook(write_only=True)
+        for estilo in _estilos():
+            self.wb.add_named_style(estilo)
+        self.ws = self.wb.create_sheet(title=nombre_hoja)
+        self.columnas = len(encabezados)
+        self.filas = 0
+        self._estilos_resueltos = {}
+
+        # En write_only los anchos se definen antes de escribir filas
+        for col in range(1, self.columnas + 1):
+            self.ws.column_dimensions[chr(64 + col)].width = ancho
+
+        self.ws.append([self._celda(titulo, ESTILO_TITULO)])
+        self.ws.append([])
+        self.ws.append([self._celda(valor, ESTILO_ENCABEZADO) for valor in encabezados])
+
+    def _celda(self, valor, estilo):
+        celda = WriteOnlyCell(self.ws, value=valor)
+        # Resolver el NamedStyle una sola vez y copiar su StyleArray (evita el lookup por celda)
+        resuelto = self._estilos_resueltos.get(estilo)
+        if resuelto is None:
+            celda.style = estilo
+            self._estilos_resueltos[estilo] = copy(celda._style)
+        else:
+            celda._style = copy(resuelto)
+        return celda
+
+    def agregar_fila(self, valores):
+        self.ws.append([self._celda(valor, ESTILO_DATO) for valor in valores])
+        self.filas += 1
+
+    def agregar_totales(self, valores_por_columna):
+        """valores_por_columna: {numero_columna (1-based): valor}"""
+        self.ws.append([])
+        self.ws.append([
+            self._celda(valores_por_columna[col], ESTILO_TOTAL) if col in valores_por_columna else None
+            for col in range(1, self.columnas + 1)
+        ])
+
+    def guardar(self, destino):
+        self.wb.save(destino)
+
+    def respuesta(self, nombre_archivo):
+        """Guarda en un temporal y lo sirve en bloques (FileResponse lo cierra y borra)"""
+        archivo = tempfile.TemporaryFile()
+        self.guardar(archivo)
+        archivo.seek(0)
+        return FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=nombre_archivo,
+            content_type=CONTENT_TYPE_XLSX
+        )
@@ -0,0 +1,313 @@
+"""
+Motor de disponibilidad de mesas para reservas.
+
+Cada día tiene una grilla de ocupación (mesa × horario) en la caché
+compartida (ver CACHE_BACKEND en settings). La grilla guarda solo el inicio
+de cada reserva activa, en minutos desde la medianoche:
+
+    {'reservas': {reserva_id: [mesa_id, inicio_min, estado]}}
+
+El intervalo ocupado se calcula al consultar con la duración configurada
+(ConfiguracionSistema.reserva_max_minutos), así que cambiar la duración no
+obliga a reconstruir nada:
+
+    ocupa [inicio, inicio + duración)
+
+Una reserva pendiente/confirmada cuya hora + tolerancia
+(reserva_tolerancia_minutos) ya pasó es un no-show: deja de ocupar la mesa
+aunque el barrido de no-shows todavía no la haya marcado.
+
+Versión por día (VersionOcupacion, en la BD): cada cambio en las reservas
+del día la sube con un upsert dentro de su propia transacción, así la
+versión se confirma junto con el cambio y los escritores del mismo día se
+serializan en esa fila. La grilla en caché guarda la versión con la que se
+construyó y cada lectura la compara con la de la BD (una consulta por PK):
+una grilla leída antes de un cambio, o escrita tarde por otro worker, nunca
+se usa. No depende de operaciones atómicas de la caché, así que sirve
+también con el backend de archivo.
+
+Actualización incremental: al confirmar, el cambio se aplica solo a su
+entrada en la grilla del día (y del día anterior si cambió de fecha), si la
+grilla en caché es la de la versión inmediatamente anterior. Si no, la
+siguiente lectura la reconstruye con una consulta. Las consultas ("qué
+mesas sirven para N personas a las T", "próximos horarios libres") se
+resuelven en memoria.
+
+La grilla es una guía rápida; la validación definitiva sigue siendo
+Reserva.validar_solapamiento() al guardar.
+"""
+import logging
+from datetime import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('app.reservas')
+
+ESTADOS_OCUPAN = ('pendiente', 'confirmada', 'en_uso')
+ESTADOS_EN_ESPERA = ('pendiente', 'confirmada')  # Pueden caer en no-show
+
+CACHE_KEY_GRILLA = 'reservas_ocupacion_{fecha}'
+CACHE_KEY_PARAMETROS = 'reservas_parametros'
+CACHE_TIMEOUT = 60 * 10  # 10 minutos (red de seguridad; la publicación es explícita)
+MINUTOS_FRANJA = 15  # Paso de la grilla para sugerir horarios
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def _hora(minutos):
+    return time(minutos // 60, minutos % 60)
+
+
+def parametros_reserva():
+    """
+    Duración, tolerancia y horario de reservas (ConfiguracionSistema), cacheados.
+
+    Returns:
+        dict: {'duracion', 'tolerancia', 'apertura', 'cierre'} en minutos
+    """
+    parametros = cache.get(CACHE_KEY_PARAMETROS)
+    if parametros is not None:
+        return parametros
+
+    from app.configuracion.models import ConfiguracionSistema
+
+    config = ConfiguracionSistema.get_configuracion()
+    parametros = {
+        'duracion': config.reserva_max_minutos,
+        'tolerancia': config.reserva_tolerancia_minutos,
+        'apertura': _minutos(_a_hora(config.hora_apertura)),
+        'cierre': _minutos(_a_hora(config.hora_cierre)),
+    }
+    cache.set(CACHE_KEY_PARAMETROS, parametros, CACHE_TIMEOUT)
+    return parametros
+
+
+def _a_hora(valor):
+    # Los defaults del modelo son strings ('08:00:00') hasta recargar de BD
+    return valor if isinstance(valor, time) else time.fromisoformat(valor)
+
+
+def invalidar_parametros():
+    """Se llama al guardar ConfiguracionSistema"""
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY_PARAMETROS))
+
+
+def _clave(fecha):
+    return CACHE_KEY_GRILLA.format(fecha=fecha.isoformat())
+
+
+def version_dia(fecha):
+    """Versión confirmada de las reservas del día (0 si nunca cambiaron)"""
+    from .models import VersionOcupacion
+
+    version = VersionOcupacion.objects.filter(fecha=fecha).values_list('version', flat=True).first()
+    return version or 0
+
+
+def _subir_version(fecha):
+    """
+    Sube la versión del día y la devuelve.
+
+    Debe llamarse dentro de la transacción que modifica las reservas: la fila
+    queda bloqueada hasta el commit, así las versiones siguen el orden en que
+    se confirman los cambios.
+    """
+    from .models import VersionOcupacion
+
+    tabla = VersionOcupacion._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (fecha, version) VALUES (%s, 1) "
+            f"ON CONFLICT (fecha) DO UPDATE SET version = {tabla}.version + 1 "
+            f"RETURNING version",
+            [fecha]
+        )
+        return cursor.fetchone()[0]
+
+
+def _construir_grilla(fecha):
+    """Grilla del día desde la BD (una consulta)"""
+    from .models import Reserva
+
+    filas = (
+        Reserva.objects
+        .filter(fecha_reserva=fecha, estado__in=ESTADOS_OCUPAN, mesa__isnull=False)
+        .order_by()
+        .values_list('id', 'mesa_id', 'hora_reserva', 'estado')
+    )
+    return {'reservas': {pk: [mesa_id, _minutos(hora), estado] for pk, mesa_id, hora, estado in filas}}
+
+
+def ocupacion_dia(fecha):
+    """
+    Ocupación de las mesas en un día (caché compartida validada contra la
+    versión de la BD, o una consulta).
+
+    Returns:
+        OcupacionDia
+    """
+    clave = _clave(fecha)
+    version = version_dia(fecha)
+    grilla = cache.get(clave)
+    if grilla is None or grilla.get('version') != version:
+        grilla = _construir_grilla(fecha)
+        grilla['version'] = version
+        # Solo se publica si ningún cambio se confirmó durante la consulta
+        if version_dia(fecha) == version:
+            cache.set(clave, grilla, CACHE_TIMEOUT)
+    return OcupacionDia(fecha, grilla['reservas'], parametros_reserva())
+
+
+class OcupacionDia:
+    """Grilla de un día: mesa → intervalos ocupados, con consultas en memoria"""
+
+    def __init__(self, fecha, reservas, parametros, ahora=None):
+        self.fecha = fecha
+        self.duracion = parametros['duracion']
+        self.tolerancia = parametros['tolerancia']
+        self.apertura = parametros['apertura']
+        self.cierre = parametros['cierre']
+
+        ahora = timezone.localtime(ahora or timezone.now())
+        # Minuto "actual" relativo al día consultado (para detectar no-shows)
+        if ahora.date() > fecha:
+            minuto_actual = 24 * 60 * (ahora.date() - fecha).days
+        elif ahora.date() == fecha:
+            minuto_actual = _minutos(ahora.time())
+        else:
+            minuto_actual = None
+
+        self.intervalos = {}
+        for reserva_id, (mesa_id, inicio, estado) in reservas.items():
+            no_show = (
+                minuto_actual is not None
+                and estado in ESTADOS_EN_ESPERA
+                and inicio + self.tolerancia < minuto_actual
+            )
+            if not no_show:
+                self.intervalos.setdefault(mesa_id, []).append((inicio, inicio + self.duracion, int(reserva_id)))
+
+    def ocupada(self, mesa_id, hora, excluir_reserva=None):
+        """
+        Indica si la mesa tiene una reserva que se solapa con [hora, hora + duración).
+
+        Args:
+            mesa_id (int): Mesa a revisar
+            hora (time): Inicio de la nueva reserva
+            excluir_reserva (int): Reserva a ignorar (edición/reasignación)
+        """
+        inicio = _minutos(hora)
+        fin = inicio + self.duracion
+        return any(
+            inicio < fin_otra and fin > inicio_otra
+            for inicio_otra, fin_otra, reserva_id in self.intervalos.get(mesa_id, ())
+            if reserva_id != excluir_reserva
+        )
+
+    def mesas_libres(self, mesas, hora, personas=None, excluir_reserva=None):
+        """
+        Mesas libres durante toda la reserva, de la más chica a la más grande.
+
+        Args:
+            mesas (iterable): Mesas candidatas (instancias con id y capacidad)
+            hora (time): Hora de la reserva
+            personas (int): Capacidad mínima (None = cualquiera)
+        """
+        libres = [
+            mesa for mesa in mesas
+            if (personas is None or mesa.capacidad >= personas)
+            and not self.ocupada(mesa.id, hora, excluir_reserva)
+        ]
+        return sorted(libres, key=lambda mesa: (mesa.capacidad, mesa.numero))
+
+    def proximos_horarios(self, mesas, personas, desde=None, cantidad=5):
+        """
+        Próximos horarios (cada MINUTOS_FRANJA) con al menos una mesa libre.
+
+        Returns:
+            list: [{'hora': time, 'mesas': [Mesa]}]
+        """
+        mesas = [mesa for mesa in mesas if mesa.capacidad >= personas]
+        inicio = max(self.apertura, _minutos(desde) if desde else self.apertura)
+        inicio += -inicio % MINUTOS_FRANJA
+        ultimo = self.cierre - self.duracion
+
+        horarios = []
+        for minuto in range(inicio, ultimo + 1, MINUTOS_FRANJA):
+            libres = self.mesas_libres(mesas, _hora(minuto))
+            if libres:
+                horarios.append({'hora': _hora(minuto), 'mesas': libres})
+                if len(horarios) >= cantidad:
+                    break
+        return horarios
+
+
+def _parchear(fecha, version, cambios):
+    """
+    Aplica {reserva_id: entrada o None} a la grilla del día en caché.
+
+    Es solo una optimización (evita la reconstrucción): se aplica únicamente
+    sobre la grilla de la versión anterior. Cualquier otra grilla ya no
+    coincide con la versión de la BD y se descarta en la próxima lectura.
+    """
+    clave = _clave(fecha)
+    grilla = cache.get(clave)
+    if grilla is None or grilla.get('version') != version - 1:
+        return
+    for reserva_id, entrada in cambios.items():
+        grilla['reservas'].pop(reserva_id, None)
+        if entrada:
+            grilla['reservas'][reserva_id] = entrada
+    grilla['version'] = version
+    cache.set(clave, grilla, CACHE_TIMEOUT)
+
+
+def registrar_cambio_reserva(reserva, fecha_anterior=None, eliminada=False):
+    """
+    Sube la versión del día (en la transacción actual) y parchea la grilla
+    con una reserva creada, modificada, cancelada, no-show o eliminada al
+    confirmar.
+
+    Args:
+        reserva (Reserva): Reserva afectada (estado ya actualizado)
+        fecha_anterior (date): Fecha antes del cambio, si se movió de día
+        eliminada (bool): La reserva se borró de la BD
+    """
+    reserva_id = reserva.pk
+    ocupa = not eliminada and reserva.estado in ESTADOS_OCUPAN and reserva.mesa_id
+    entrada = [reserva.mesa_id, _minutos(reserva.hora_reserva), reserva.estado] if ocupa else None
+    cambios = {reserva.fecha_reserva: {reserva_id: entrada}}
+    if fecha_anterior and fecha_anterior != reserva.fecha_reserva:
+        cambios[fecha_anterior] = {reserva_id: None}
+    _versionar(cambios)
+
+
+def quitar_reservas(reservas_por_fecha):
+    """
+    Quita de la grilla reservas que dejaron de ocupar mesa por un cambio en
+    lote (QuerySet.update, p. ej. el barrido de no-shows). Llamar dentro de
+    la transacción del cambio.
+
+    Args:
+        reservas_por_fecha (dict): {fecha: [reserva_id, ...]}
+    """
+    _versionar({fecha: dict.fromkeys(ids) for fecha, ids in reservas_por_fecha.items()})
+
+
+def _versionar(cambios_por_fecha):
+    # Fechas en orden fijo: dos transacciones que tocan los mismos días
+    # bloquean sus filas de versión en el mismo orden
+    versiones = [
+        (fecha, _subir_version(fecha), cambios)
+        for fecha, cambios in sorted(cambios_por_fecha.items())
+    ]
+
+    def publicar():
+        for fecha, version, cambios in versiones:
+            _parchear(fecha, version, cambios)
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0002_alter_reserva_mesa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionOcupacion',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de Ocupación',
+                'verbose_name_plural': 'Versiones de Ocupación',
+            },
+        ),
+    ]
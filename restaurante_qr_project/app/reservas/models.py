@@ -11,12 +11,14 @@ Gestiona las reservas de mesas del restaurante:
 IMPORTANTE: Las reservas tienen ventana de tolerancia (15 min) y se marcan
 automáticamente como no_presentado si no se confirma a tiempo.
 """
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from app.mesas.models import Mesa
 from django.utils import timezone
 from datetime import datetime, timedelta
 
+from .disponibilidad import parametros_reserva, registrar_cambio_reserva
+
 class Reserva(models.Model):
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
@@ -70,7 +72,7 @@ class Reserva(models.Model):
     
     def __str__(self):
         return f"{self.nombre_completo} - {self.fecha_reserva} {self.hora_reserva}"
-    
+
     @property
     def datetime_reserva(self):
         """Combina fecha y hora en un datetime"""
@@ -147,12 +149,13 @@ class Reserva(models.Model):
 
         return True
 
-    def validar_solapamiento(self, duracion_reserva_horas=2):
+    def validar_solapamiento(self, duracion_reserva_horas=None):
         """
         Valida que no haya otra reserva activa en la misma mesa al mismo tiempo.
 
         Args:
-            duracion_reserva_horas: Duración estimada de la reserva en horas (default: 2)
+            duracion_reserva_horas: Duración estimada de la reserva en horas
+                (default: ConfiguracionSistema.reserva_max_minutos)
 
         Returns:
             tuple: (es_valida, mensaje_error)
@@ -160,6 +163,9 @@ class Reserva(models.Model):
         if not self.mesa:
             return (True, None)  # Sin mesa asignada, no hay solapamiento
 
+        if duracion_reserva_horas is None:
+            duracion_reserva_horas = parametros_reserva()['duracion'] / 60
+
         # Calcular inicio y fin de esta reserva
         inicio_reserva = self.datetime_reserva
         if timezone.is_naive(inicio_reserva):
@@ -193,7 +199,7 @@ class Reserva(models.Model):
                     False,
                     f"Mesa {self.mesa.numero} ya tiene reserva de {reserva.nombre_completo} "
                     f"a las {reserva.hora_reserva.strftime('%H:%M')}. "
-                    f"Las reservas se solapan (duración estimada: {duracion_reserva_horas}h)"
+                    f"Las reservas se solapan (duración estimada: {duracion_reserva_horas:g}h)"
                 )
 
         return (True, None)
@@ -207,4 +213,45 @@ class Reserva(models.Model):
                 from django.core.exceptions import ValidationError
                 raise ValidationError(mensaje)
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+        # ✅ NUEVO: La versión de la grilla del día se sube en la misma
+        # transacción que el cambio (ver disponibilidad.py)
+        with transaction.atomic():
+            fecha_anterior = None
+            if self.pk and not self._state.adding:
+                # Fecha guardada, leída bajo bloqueo: si cambia, también se
+                # versiona la grilla del día anterior
+                fecha_anterior = (
+                    Reserva.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('fecha_reserva', flat=True)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            registrar_cambio_reserva(self, fecha_anterior=fecha_anterior)
+
+    def delete(self, *args, **kwargs):
+        reserva_id = self.pk
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            self.pk = reserva_id
+            registrar_cambio_reserva(self, eliminada=True)
+        self.pk = None
+        return resultado
+
+
+class VersionOcupacion(models.Model):
+    """
+    Versión de la grilla de ocupación de un día (ver disponibilidad.py).
+
+    Cada cambio en las reservas del día la sube dentro de su transacción, así
+    la versión se hace visible exactamente junto con el cambio.
+    """
+    fecha = models.DateField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versión de Ocupación"
+        verbose_name_plural = "Versiones de Ocupación"
+
+    def __str__(self):
+        return f"{self.fecha}: v{self.version}"
@@ -0,0 +1,119 @@
+"""
+Barrido de reservas no-show en lote.
+
+Una reserva pendiente/confirmada es no-show cuando su hora + tolerancia
+(ConfiguracionSistema.reserva_tolerancia_minutos) ya pasó. El barrido no
+recorre reservas en Python:
+
+1. SELECT ... FOR UPDATE SKIP LOCKED de las vencidas (id, mesa, fecha)
+2. Un UPDATE que las marca como no_show
+3. Un UPDATE que libera sus mesas (y los grupos combinados) que sigan
+   'reservada' y no tengan otra reserva activa ese día
+
+Después se sellan las versiones de las mesas (mapa de mesas) y se quitan
+las reservas de la grilla de disponibilidad, todo al confirmar. Lo ejecuta
+la tarea programada 'liberar_mesas_no_show' (ver configuracion.tareas) o el
+comando liberar_mesas_no_show.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .disponibilidad import ESTADOS_EN_ESPERA, ESTADOS_OCUPAN, parametros_reserva, quitar_reservas
+
+logger = logging.getLogger('app.reservas')
+
+
+def reservas_vencidas(ahora=None, minutos_tolerancia=None):
+    """
+    Reservas en espera cuya hora + tolerancia ya pasó (QuerySet).
+
+    Misma regla que Reserva.esta_vencida_con_tolerancia(), expresada en SQL.
+    """
+    from .models import Reserva
+
+    if minutos_tolerancia is None:
+        minutos_tolerancia = parametros_reserva()['tolerancia']
+    limite = timezone.localtime(ahora or timezone.now()) - timedelta(minutes=minutos_tolerancia)
+
+    return Reserva.objects.filter(estado__in=ESTADOS_EN_ESPERA).filter(
+        Q(fecha_reserva__lt=limite.date()) |
+        Q(fecha_reserva=limite.date(), hora_reserva__lt=limite.time())
+    )
+
+
+def _liberar_mesas(mesa_ids, hoy):
+    """
+    Libera en un UPDATE las mesas 'reservada' sin otra reserva activa hoy,
+    incluidas las demás mesas de sus grupos combinados.
+
+    Returns:
+        list: Números de las mesas liberadas
+    """
+    from app.mesas.models import Mesa
+    from app.pedidos.versionado import registrar_cambios
+    from .models import Reserva
+
+    otra_reserva = Reserva.objects.filter(mesa=OuterRef('pk'), fecha_reserva=hoy, estado__in=ESTADOS_OCUPAN)
+    mesas = (
+        Mesa.objects.filter(id__in=mesa_ids, estado='reservada')
+        .filter(~Exists(otra_reserva))
+        .values_list('id', 'es_combinada', 'mesas_combinadas')
+    )
+
+    ids, numeros_grupo = set(), set()
+    for mesa_id, es_combinada, combinadas in mesas:
+        ids.add(mesa_id)
+        if es_combinada and combinadas:
+            numeros_grupo.update(int(numero) for numero in combinadas.split(',') if numero.strip().isdigit())
+    if not ids:
+        return []
+
+    liberar = Mesa.objects.filter(Q(id__in=ids) | Q(numero__in=numeros_grupo))
+    filas = list(liberar.values_list('id', 'numero'))
+    Mesa.objects.filter(id__in=[pk for pk, _ in filas]).update(
+        estado='disponible', es_combinada=False, mesas_combinadas=None, capacidad_combinada=0
+    )
+    registrar_cambios(Mesa, [pk for pk, _ in filas])
+    return sorted(numero for _, numero in filas)
+
+
+@transaction.atomic
+def barrer_no_show(ahora=None, minutos_tolerancia=None):
+    """
+    Marca como no_show todas las reservas vencidas y libera sus mesas.
+
+    Args:
+        ahora (datetime): Momento de referencia (default: ahora)
+        minutos_tolerancia (int): Default ConfiguracionSistema.reserva_tolerancia_minutos
+
+    Returns:
+        dict: {'reservas': [ids], 'mesas': [números liberados]}
+    """
+    from .models import Reserva
+
+    ahora = ahora or timezone.now()
+    vencidas = list(
+        reservas_vencidas(ahora, minutos_tolerancia)
+        .select_for_update(skip_locked=True)
+        .order_by()
+        .values_list('id', 'mesa_id', 'fecha_reserva')
+    )
+    if not vencidas:
+        return {'reservas': [], 'mesas': []}
+
+    ids = [reserva_id for reserva_id, _, _ in vencidas]
+    Reserva.objects.filter(id__in=ids).update(estado='no_show', fecha_actualizacion=ahora)
+
+    mesas = _liberar_mesas({mesa_id for _, mesa_id, _ in vencidas if mesa_id}, timezone.localdate(ahora))
+
+    por_fecha = {}
+    for reserva_id, _, fecha in vencidas:
+        por_fecha.setdefault(fecha, []).append(reserva_id)
+    quitar_reservas(por_fecha)
+
+    logger.info(f"Barrido no-show: {len(ids)} reservas, mesas liberadas: {mesas}")
+    return {'reservas': ids, 'mesas': mesas}
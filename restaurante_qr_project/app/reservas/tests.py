@@ -1,7 +1,14 @@
+import json
+
+from django.core.cache import cache
 from django.test import TestCase
-from datetime import date, time, timedelta
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
 
 from app.mesas.models import Mesa
+from app.usuarios.models import Usuario
+from .disponibilidad import OcupacionDia, ocupacion_dia, parametros_reserva
 from .models import Reserva
 from .forms import ReservaForm
 
@@ -306,3 +313,211 @@ class ReservaIntegracionTestCase(TestCase):
         # Verificar que todas se crearon para el mismo día
         reservas_del_dia = Reserva.objects.filter(fecha_reserva=fecha_reserva)
         self.assertEqual(reservas_del_dia.count(), 3)
+
+
+class DisponibilidadTestCase(TestCase):
+    """Grilla de ocupación por día (intervalos con la duración configurada)"""
+
+    def setUp(self):
+        cache.clear()
+        self.fecha = date.today() + timedelta(days=1)
+        self.mesa_1 = Mesa.objects.create(numero=1, capacidad=4)
+        self.mesa_2 = Mesa.objects.create(numero=2, capacidad=4)
+        self.mesa_6 = Mesa.objects.create(numero=6, capacidad=6)
+
+    def _reservar(self, mesa, hora, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reserva.objects.create(
+                numero_carnet='1234567', nombre_completo='Cliente', fecha_reserva=self.fecha,
+                hora_reserva=hora, numero_personas=4, mesa=mesa, **extra
+            )
+
+    def _disponibles(self, hora, personas=4):
+        return self.client.get('/reservas/api/mesas-disponibles/', {
+            'fecha': self.fecha.isoformat(), 'hora': hora, 'personas': personas
+        }).json()
+
+    def test_solapamiento_con_duracion_configurada(self):
+        self._reservar(self.mesa_1, time(19, 0))
+
+        # 120 minutos por defecto: 20:30 se solapa, 21:00 ya no
+        self.assertEqual([m['numero'] for m in self._disponibles('20:30')['mesas']], [2, 6])
+        self.assertEqual([m['numero'] for m in self._disponibles('21:00')['mesas']], [1, 2, 6])
+        self.assertEqual([m['numero'] for m in self._disponibles('17:30')['mesas']], [2, 6])
+
+        # Grilla y parámetros en caché: lista de mesas y versión del día
+        with self.assertNumQueries(2):
+            self._disponibles('19:15')
+
+    def test_parche_incremental_al_crear_y_cancelar(self):
+        ocupacion_dia(self.fecha)  # Grilla en caché
+        reserva = self._reservar(self.mesa_6, time(20, 0))
+
+        # Grilla parcheada: solo se valida la versión
+        with self.assertNumQueries(1):
+            self.assertTrue(ocupacion_dia(self.fecha).ocupada(self.mesa_6.id, time(21, 0)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.estado = 'cancelada'
+            reserva.save()
+        with self.assertNumQueries(1):
+            self.assertFalse(ocupacion_dia(self.fecha).ocupada(self.mesa_6.id, time(21, 0)))
+
+    def test_cambio_de_fecha_libera_el_dia_anterior(self):
+        ocupacion_dia(self.fecha)
+        reserva = self._reservar(self.mesa_1, time(19, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = Reserva.objects.get(id=reserva.id)
+            reserva.fecha_reserva = self.fecha + timedelta(days=1)
+            reserva.save()
+
+        self.assertFalse(ocupacion_dia(self.fecha).ocupada(self.mesa_1.id, time(19, 0)))
+        self.assertTrue(ocupacion_dia(self.fecha + timedelta(days=1)).ocupada(self.mesa_1.id, time(19, 0)))
+
+    def test_parche_durante_la_reconstruccion_no_queda_obsoleto(self):
+        from . import disponibilidad
+
+        construir = disponibilidad._construir_grilla
+
+        def construir_y_reservar(fecha):
+            # La consulta ve el día sin la reserva; el parche llega antes de publicar
+            grilla = construir(fecha)
+            self._reservar(self.mesa_6, time(20, 0))
+            return grilla
+
+        with patch.object(disponibilidad, '_construir_grilla', construir_y_reservar):
+            self.assertFalse(ocupacion_dia(self.fecha).ocupada(self.mesa_6.id, time(20, 0)))
+
+        self.assertTrue(ocupacion_dia(self.fecha).ocupada(self.mesa_6.id, time(20, 0)))
+
+    def test_grilla_obsoleta_escrita_tarde_se_descarta(self):
+        from . import disponibilidad
+
+        ocupacion_dia(self.fecha)
+        clave = disponibilidad._clave(self.fecha)
+        grilla_del_otro = cache.get(clave)
+
+        self._reservar(self.mesa_1, time(19, 0))
+        # Otro worker publica tarde una grilla que no incluye esta reserva
+        cache.set(clave, grilla_del_otro)
+
+        self.assertTrue(ocupacion_dia(self.fecha).ocupada(self.mesa_1.id, time(19, 0)))
+
+    def test_cambio_sin_parche_se_detecta_por_la_version(self):
+        ocupacion_dia(self.fecha)
+        # El parche al confirmar nunca llega (p. ej. el worker murió)
+        Reserva.objects.create(
+            numero_carnet='1234567', nombre_completo='Cliente', fecha_reserva=self.fecha,
+            hora_reserva=time(19, 0), numero_personas=4, mesa=self.mesa_2
+        )
+
+        self.assertTrue(ocupacion_dia(self.fecha).ocupada(self.mesa_2.id, time(19, 0)))
+
+    def test_no_show_pasada_la_tolerancia_libera_la_mesa(self):
+        parametros = parametros_reserva()
+        grilla = {1: [self.mesa_1.id, 19 * 60, 'confirmada'], 2: [self.mesa_2.id, 19 * 60, 'en_uso']}
+        hoy = date.today()
+        ahora = timezone.make_aware(datetime.combine(hoy, time(19, parametros['tolerancia'] + 1)))
+
+        ocupacion = OcupacionDia(hoy, grilla, parametros, ahora=ahora)
+        self.assertFalse(ocupacion.ocupada(self.mesa_1.id, time(19, 30)))
+        self.assertTrue(ocupacion.ocupada(self.mesa_2.id, time(19, 30)))
+
+    def test_sin_mesas_sugiere_proximos_horarios(self):
+        self._reservar(self.mesa_6, time(17, 0))
+
+        data = self._disponibles('17:00', personas=6)
+        self.assertEqual(data['mesas'], [])
+        self.assertEqual(data['proximos_horarios'][0], {'hora': '19:00', 'mesas': [6]})
+
+    def test_asignacion_automatica_por_horario(self):
+        from app.mesas.utils import asignar_mesa_automatica
+
+        self._reservar(self.mesa_1, time(19, 0))
+        Mesa.objects.filter(id=self.mesa_2.id).update(estado='reservada')
+
+        # La mesa 2 está "reservada" hoy, pero libre mañana a las 19:00
+        resultado = asignar_mesa_automatica(4, fecha_reserva=self.fecha, hora_reserva=time(19, 0))
+        self.assertEqual(resultado['mesa'], self.mesa_2)
+
+    def test_api_asignar_mesa_ocupada(self):
+        Usuario.objects.create_user(username='gerente', password='testpass123', rol='gerente')
+        self.client.login(username='gerente', password='testpass123')
+        self._reservar(self.mesa_1, time(19, 0))
+        otra = self._reservar(None, time(20, 0))
+
+        response = self.client.post(
+            f'/api/pedidos/mesero/asignar-mesa/{otra.id}/',
+            data=json.dumps({'mesa_numero': 1}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['mesas_libres'], [2, 6])
+
+
+class BarridoNoShowTestCase(TestCase):
+    """Barrido no-show en lote (reservas y mesas con UPDATEs masivos)"""
+
+    def setUp(self):
+        cache.clear()
+        self.hoy = timezone.localdate()
+        self.ahora = timezone.make_aware(datetime.combine(self.hoy, time(23, 0)))
+        self.mesas = {
+            numero: Mesa.objects.create(numero=numero, capacidad=4, estado='reservada')
+            for numero in (1, 2, 3, 4)
+        }
+
+    def _reservar(self, numero, hora, estado='confirmada'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reserva.objects.create(
+                numero_carnet='1234567', nombre_completo='Cliente', fecha_reserva=self.hoy,
+                hora_reserva=hora, numero_personas=4, mesa=self.mesas[numero], estado=estado
+            )
+
+    def _barrer(self):
+        from .no_show import barrer_no_show
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return barrer_no_show(ahora=self.ahora)
+
+    def test_barrido_en_lote(self):
+        vencidas = [self._reservar(numero, time(12, 0)) for numero in (1, 2, 3)]
+        en_uso = self._reservar(4, time(12, 0), estado='en_uso')
+
+        # SAVEPOINT, SELECT FOR UPDATE, UPDATE reservas, SELECT mesas, SELECT
+        # grupo, UPDATE mesas, versión del día, RELEASE y sellado de
+        # versiones al confirmar: no depende de la cantidad de reservas
+        with self.assertNumQueries(9):
+            resultado = self._barrer()
+
+        self.assertEqual(sorted(resultado['reservas']), sorted(r.id for r in vencidas))
+        self.assertEqual(resultado['mesas'], [1, 2, 3])
+        self.assertEqual(Reserva.objects.filter(estado='no_show').count(), 3)
+        self.assertEqual(Reserva.objects.get(id=en_uso.id).estado, 'en_uso')
+        self.assertEqual(Mesa.objects.get(numero=4).estado, 'reservada')
+
+        # Segunda pasada: nada que hacer
+        self.assertEqual(self._barrer(), {'reservas': [], 'mesas': []})
+
+    def test_respeta_tolerancia_y_otras_reservas_del_dia(self):
+        self._reservar(1, time(12, 0))
+        self._reservar(1, time(22, 50))  # Sigue dentro de la tolerancia
+        self._reservar(2, time(22, 50))
+
+        resultado = self._barrer()
+        self.assertEqual(len(resultado['reservas']), 1)
+        self.assertEqual(resultado['mesas'], [])  # La mesa 1 tiene otra reserva activa hoy
+        self.assertEqual(Mesa.objects.get(numero=1).estado, 'reservada')
+
+    def test_libera_grupo_combinado_y_grilla(self):
+        Mesa.objects.filter(numero__in=[1, 2]).update(
+            es_combinada=True, mesas_combinadas='1,2', capacidad_combinada=8
+        )
+        self._reservar(1, time(12, 0))
+        ocupacion_dia(self.hoy)  # Grilla en caché
+
+        self.assertEqual(self._barrer()['mesas'], [1, 2])
+        mesa_2 = Mesa.objects.get(numero=2)
+        self.assertEqual((mesa_2.estado, mesa_2.es_combinada, mesa_2.mesas_combinadas), ('disponible', False, None))
+        with self.assertNumQueries(1):
+            self.assertEqual(ocupacion_dia(self.hoy).intervalos, {})
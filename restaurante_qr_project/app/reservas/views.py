@@ -9,6 +9,7 @@ from .models import Reserva
 from .forms import ReservaForm
 from app.mesas.models import Mesa
 from app.mesas.utils import asignar_mesa_automatica, combinar_mesas
+from .disponibilidad import ocupacion_dia
 from datetime import datetime, date
 import logging
 
@@ -160,28 +161,31 @@ def mesas_disponibles(request):
     except ValueError:
         return Response({'error': 'Formato de datos inválido'}, status=400)
     
-    # Buscar mesas con capacidad suficiente
+    # ✅ OPTIMIZADO: Solapamiento real de intervalos (duración configurada)
+    # resuelto en memoria con la grilla de ocupación del día
     mesas_adecuadas = Mesa.objects.filter(
         capacidad__gte=personas_int,
-        disponible=True
-    )
-    
-    # Filtrar mesas ya reservadas en esa fecha/hora
-    reservas_existentes = Reserva.objects.filter(
-        fecha_reserva=fecha_obj,
-        hora_reserva=hora_obj,
-        estado__in=['pendiente', 'confirmada', 'en_uso']
-    ).values_list('mesa_id', flat=True)
-    
-    mesas_disponibles = mesas_adecuadas.exclude(id__in=reservas_existentes)
-    
+        disponible=True,
+        activo=True
+    ).only('id', 'numero', 'capacidad')
+    ocupacion = ocupacion_dia(fecha_obj)
+    libres = ocupacion.mesas_libres(mesas_adecuadas, hora_obj)
+
     mesas_data = [{
         'id': mesa.id,
         'numero': mesa.numero,
         'capacidad': mesa.capacidad
-    } for mesa in mesas_disponibles]
-    
-    return Response({'mesas': mesas_data})
+    } for mesa in libres]
+
+    respuesta = {'mesas': mesas_data}
+    if not libres:
+        # Sugerir los próximos horarios con mesa para ese grupo
+        respuesta['proximos_horarios'] = [
+            {'hora': horario['hora'].strftime('%H:%M'), 'mesas': [mesa.numero for mesa in horario['mesas']]}
+            for horario in ocupacion.proximos_horarios(mesas_adecuadas, personas_int, desde=hora_obj)
+        ]
+
+    return Response(respuesta)
 
 # ✅ SOLUCIONADO: Agregar permiso público para cancelar reserva
 @api_view(['POST'])
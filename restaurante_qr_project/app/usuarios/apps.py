@@ -4,3 +4,9 @@ class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app.usuarios'  # ✅ CORRECTO
 
+    def ready(self):
+        # ✅ NUEVO: Indexar toda sesión autenticada, sea cual sea la vista de login
+        from django.contrib.auth.signals import user_logged_in
+        from .sesiones import registrar_sesion_login
+
+        user_logged_in.connect(registrar_sesion_login, dispatch_uid='usuarios.registrar_sesion_login')
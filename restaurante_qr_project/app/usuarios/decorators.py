@@ -155,11 +155,64 @@ def superusuario_requerido(view_func):
 # ✅ NUEVO: RATE LIMITING
 # ========================================
 import logging
-from django.core.cache import cache
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import IntentoLogin
 
 logger = logging.getLogger('app.usuarios')
 
 
+def _registrar_fallo(clave, max_attempts, lockout_duration):
+    """
+    Suma un intento fallido en la BD y bloquea al llegar a max_attempts.
+
+    La ventana de conteo dura lockout_duration desde el primer fallo.
+
+    El UPDATE con F() es atómico y deja la fila bloqueada hasta el commit:
+    la lectura siguiente devuelve el valor de este intento aunque otros
+    workers fallen al mismo tiempo.
+
+    Returns:
+        int: Intentos en la ventana actual
+    """
+    ahora = timezone.now()
+    duracion = timedelta(seconds=lockout_duration)
+    vencida = Q(inicio__lte=ahora - duracion)
+    with transaction.atomic():
+        IntentoLogin.objects.bulk_create(
+            [IntentoLogin(clave=clave, intentos=0, inicio=ahora)], ignore_conflicts=True
+        )
+        filas = IntentoLogin.objects.filter(clave=clave)
+        filas.update(
+            # Ventana vencida: el conteo vuelve a empezar en este intento
+            intentos=Case(When(vencida, then=Value(1)), default=F('intentos') + 1),
+            inicio=Case(When(vencida, then=Value(ahora)), default=F('inicio')),
+        )
+        attempts = filas.values_list('intentos', flat=True).get()
+        if attempts >= max_attempts:
+            filas.update(bloqueado_hasta=ahora + duracion)
+    return attempts
+
+
+def limpiar_intentos_login():
+    """
+    Borra intentos sin bloqueo vigente cuya ventana ya venció (tarea
+    programada 'limpiar_intentos_login').
+
+    Returns:
+        int: Filas borradas
+    """
+    ahora = timezone.now()
+    borradas, _ = IntentoLogin.objects.filter(
+        inicio__lte=ahora - timedelta(days=1)
+    ).exclude(bloqueado_hasta__gt=ahora).delete()
+    return borradas
+
+
 def rate_limit_login(max_attempts=5, lockout_duration=300, login_type='general'):
     """
     Decorador para rate limiting de intentos de login
@@ -184,12 +237,11 @@ def rate_limit_login(max_attempts=5, lockout_duration=300, login_type='general')
             else:
                 client_ip = request.META.get('REMOTE_ADDR', 'unknown')
 
-            # Cache keys únicos por tipo de login e IP
-            attempts_key = f'{login_type}_login_attempts_{client_ip}'
-            lockout_key = f'{login_type}_login_lockout_{client_ip}'
+            # Contador único por tipo de login e IP (compartido por todos los workers)
+            clave = f'{login_type}:{client_ip}'[:100]
 
             # Verificar si está bloqueado
-            if cache.get(lockout_key):
+            if IntentoLogin.objects.filter(clave=clave, bloqueado_hasta__gt=timezone.now()).exists():
                 logger.warning(
                     f"[RATE LIMIT] Login {login_type} bloqueado - IP: {client_ip}"
                 )
@@ -233,11 +285,11 @@ def rate_limit_login(max_attempts=5, lockout_duration=300, login_type='general')
 
             # Manejar intentos fallidos
             if login_failed:
-                attempts = cache.get(attempts_key, 0) + 1
-                cache.set(attempts_key, attempts, lockout_duration)
+                # ✅ OPTIMIZADO: Contador en la BD con F(): atómico entre workers
+                # con cualquier CACHE_BACKEND (la caché de archivo o de BD no lo es)
+                attempts = _registrar_fallo(clave, max_attempts, lockout_duration)
 
                 if attempts >= max_attempts:
-                    cache.set(lockout_key, True, lockout_duration)
                     logger.error(
                         f"[RATE LIMIT] {login_type.upper()} bloqueado tras "
                         f"{attempts} intentos - IP: {client_ip}"
@@ -249,8 +301,7 @@ def rate_limit_login(max_attempts=5, lockout_duration=300, login_type='general')
                     )
             else:
                 # Login exitoso, limpiar contadores
-                cache.delete(attempts_key)
-                cache.delete(lockout_key)
+                IntentoLogin.objects.filter(clave=clave).delete()
                 logger.info(f"[RATE LIMIT] Login {login_type} exitoso - IP: {client_ip}")
 
             return response
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def indexar_sesiones(apps, schema_editor):
+    """Carga inicial del índice con las sesiones vigentes de empleados (única vez)"""
+    from django.contrib.sessions.backends.db import SessionStore
+
+    Session = apps.get_model('sessions', 'Session')
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    SesionUsuario = apps.get_model('usuarios', 'SesionUsuario')
+
+    decodificador = SessionStore()
+    por_usuario = {}
+    for session_key, data in Session.objects.filter(expire_date__gte=timezone.now()).values_list('session_key', 'session_data'):
+        user_id = decodificador.decode(data).get('_auth_user_id')
+        if user_id:
+            por_usuario[session_key] = str(user_id)
+
+    existentes = {str(pk) for pk in Usuario.objects.filter(id__in=set(por_usuario.values())).values_list('id', flat=True)}
+    SesionUsuario.objects.bulk_create([
+        SesionUsuario(sesion_id=session_key, usuario_id=user_id)
+        for session_key, user_id in por_usuario.items() if user_id in existentes
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sessions', '0001_initial'),
+        ('usuarios', '0009_alter_usuario_rol'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionUsuario',
+            fields=[
+                ('sesion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sesion_usuario', serialize=False, to='sessions.session')),
+                ('fecha_login', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sesiones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sesión de Usuario',
+                'verbose_name_plural': 'Sesiones de Usuario',
+            },
+        ),
+        migrations.RunPython(indexar_sesiones, migrations.RunPython.noop),
+    ]
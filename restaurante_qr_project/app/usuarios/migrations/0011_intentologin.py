@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0010_sesionusuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntentoLogin',
+            fields=[
+                ('clave', models.CharField(help_text='tipo_login:ip', max_length=100, primary_key=True, serialize=False)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('inicio', models.DateTimeField(help_text='Primer fallo de la ventana actual')),
+                ('bloqueado_hasta', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Intento de Login',
+                'verbose_name_plural': 'Intentos de Login',
+            },
+        ),
+    ]
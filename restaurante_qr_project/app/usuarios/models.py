@@ -371,3 +371,58 @@ class QRToken(models.Model):
         )
 
         return nuevo_token
+
+
+class SesionUsuario(models.Model):
+    """
+    Índice usuario → sesión (✅ NUEVO).
+
+    django_session solo guarda los datos codificados, así que para saber qué
+    sesiones son de un empleado había que decodificarlas todas. Los logins de
+    empleados registran aquí su sesión (ver app.usuarios.sesiones) y el cierre
+    de caja/jornada las elimina con una consulta indexada por rol.
+
+    La fila se borra en cascada con la sesión: logout (flush), rotación de
+    clave y clearsessions (expiradas) la limpian sin código adicional.
+    """
+    sesion = models.OneToOneField(
+        'sessions.Session',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sesion_usuario'
+    )
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='sesiones'
+    )
+    fecha_login = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Sesión de Usuario'
+        verbose_name_plural = 'Sesiones de Usuario'
+
+    def __str__(self):
+        return f"Sesión de {self.usuario.username} ({self.fecha_login:%Y-%m-%d %H:%M})"
+
+
+class IntentoLogin(models.Model):
+    """
+    Intentos fallidos de login por tipo e IP (✅ NUEVO, ver rate_limit_login).
+
+    El contador vive en la BD: se incrementa con UN UPDATE usando F(), atómico
+    con cualquier backend de caché (FileBasedCache y DatabaseCache no tienen
+    incr atómico entre workers). La ventana de conteo empieza en el primer
+    fallo; el bloqueo dura hasta bloqueado_hasta.
+    """
+    clave = models.CharField(max_length=100, primary_key=True, help_text='tipo_login:ip')
+    intentos = models.PositiveIntegerField(default=0)
+    inicio = models.DateTimeField(help_text='Primer fallo de la ventana actual')
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Intento de Login'
+        verbose_name_plural = 'Intentos de Login'
+
+    def __str__(self):
+        return f"{self.clave} ({self.intentos} intentos)"
@@ -0,0 +1,56 @@
+"""
+Índice de sesiones por usuario (SesionUsuario).
+
+Toda sesión autenticada queda indexada: el receptor de la señal
+user_logged_in (conectado en UsuariosConfig.ready()) cubre cualquier vía de
+login (PIN, QR, formulario, admin de Django, AdminUX) sin depender de cada
+vista. cerrar_sesiones() reemplaza el recorrido de django_session
+(decodificar cada sesión + un SELECT de Usuario por sesión) por una consulta
+indexada y un DELETE en lote.
+"""
+import logging
+
+from django.contrib.sessions.models import Session
+
+from .models import SesionUsuario
+
+logger = logging.getLogger('app.usuarios')
+
+# Roles cuyas sesiones se cierran al cerrar caja o finalizar la jornada
+ROLES_CIERRE_TURNO = ('mesero', 'cocinero')
+
+
+def registrar_sesion(request, usuario=None):
+    """Asocia la sesión actual (ya autenticada) a usuario (default: request.user)"""
+    if not request.session.session_key:
+        request.session.save()
+
+    SesionUsuario.objects.update_or_create(
+        sesion_id=request.session.session_key,
+        defaults={'usuario': usuario or request.user}
+    )
+
+
+def registrar_sesion_login(sender, request, user, **kwargs):
+    """Receptor de user_logged_in: indexa la sesión recién creada por login()"""
+    if request is None or not hasattr(request, 'session'):
+        return
+    registrar_sesion(request, user)
+
+
+def cerrar_sesiones(roles=ROLES_CIERRE_TURNO):
+    """
+    Elimina todas las sesiones de los usuarios con esos roles.
+
+    El DELETE arrastra las filas del índice (CASCADE); la cantidad de
+    consultas no depende del tamaño de django_session.
+
+    Returns:
+        int: Sesiones eliminadas
+    """
+    _, eliminadas = Session.objects.filter(sesion_usuario__usuario__rol__in=roles).delete()
+    cantidad = eliminadas.get(Session._meta.label, 0)
+
+    if cantidad:
+        logger.info(f"✅ {cantidad} sesión(es) cerrada(s) para roles {', '.join(roles)}")
+    return cantidad
@@ -1,11 +1,17 @@
 """
 Tests de autenticación - Login QR, PIN y Password
 """
-from django.test import TestCase, Client
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.http import JsonResponse
+from django.test import TestCase, Client, RequestFactory, TransactionTestCase
 from django.utils import timezone
 from django.core.cache import cache
 from datetime import timedelta
-from app.usuarios.models import Usuario, QRToken
+from app.usuarios.decorators import rate_limit_login
+from app.usuarios.models import IntentoLogin, Usuario, QRToken
 
 
 class QRLoginTestCase(TestCase):
@@ -194,3 +200,46 @@ class PasswordLoginTestCase(TestCase):
         )
 
         self.assertEqual(response.status_code, 400)
+
+
+class RateLimitConcurrenteTestCase(TransactionTestCase):
+    """Intentos fallidos simultáneos desde varios workers (hilos con conexiones propias)"""
+
+    HILOS = 12
+
+    def _vista(self, max_attempts):
+        return rate_limit_login(max_attempts=max_attempts, lockout_duration=300, login_type='test')(
+            lambda request: JsonResponse({'success': False, 'error': 'PIN incorrecto'})
+        )
+
+    def _intento(self, vista):
+        request = RequestFactory().post('/usuarios/login-pin/', REMOTE_ADDR='10.0.0.5', HTTP_ACCEPT='application/json')
+        return vista(request).status_code
+
+    def test_intentos_concurrentes_no_se_pierden(self):
+        vista = self._vista(max_attempts=100)
+        barrera = threading.Barrier(self.HILOS)
+
+        def intento(_):
+            try:
+                barrera.wait()
+                return self._intento(vista)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.HILOS) as pool:
+            self.assertEqual(list(pool.map(intento, range(self.HILOS))), [200] * self.HILOS)
+
+        self.assertEqual(IntentoLogin.objects.get(clave='test:10.0.0.5').intentos, self.HILOS)
+
+    def test_bloqueo_al_llegar_al_maximo_y_ventana_vencida(self):
+        vista = self._vista(max_attempts=3)
+        for _ in range(3):
+            self.assertEqual(self._intento(vista), 200)
+        self.assertEqual(self._intento(vista), 429)
+
+        # Bloqueo y ventana vencidos: el conteo empieza de nuevo
+        hace_rato = timezone.now() - timedelta(seconds=301)
+        IntentoLogin.objects.update(inicio=hace_rato, bloqueado_hasta=hace_rato)
+        self.assertEqual(self._intento(vista), 200)
+        self.assertEqual(IntentoLogin.objects.get().intentos, 1)
@@ -0,0 +1,81 @@
+"""
+Tests del índice usuario → sesión (cierre de sesiones de empleados)
+"""
+from decimal import Decimal
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from app.caja.models import CierreCaja, JornadaLaboral
+from app.usuarios.models import QRToken, SesionUsuario, Usuario
+from app.usuarios.sesiones import cerrar_sesiones
+
+
+class SesionUsuarioTestCase(TestCase):
+    """Los logins de empleados registran su sesión; el cierre las elimina en lote"""
+
+    def setUp(self):
+        cache.clear()
+        self.mesero = Usuario.objects.create_user(username='mesero', password='test123', rol='mesero')
+        self.cocinero = Usuario.objects.create_user(username='cocinero', password='test123', rol='cocinero')
+        self.cajero = Usuario.objects.create_user(username='cajero', password='test123', rol='cajero', pin='1234')
+
+    def _login_empleados(self):
+        clientes = [Client(), Client(), Client()]
+        token = QRToken.generar_token(self.mesero, '127.0.0.1', duracion_horas=24)
+        clientes[0].get(f'/qr-login/{token.token}/')
+        clientes[1].post('/usuarios/session-login/', {'username': 'cocinero', 'password': 'test123', 'rol': 'cocinero'})
+        clientes[2].post('/usuarios/login-pin/', data='{"pin": "1234"}', content_type='application/json')
+        Client().get('/')  # Sesión anónima: no se indexa
+        return clientes
+
+    def test_login_registra_la_sesion(self):
+        clientes = self._login_empleados()
+
+        self.assertEqual(
+            set(SesionUsuario.objects.values_list('usuario__username', flat=True)),
+            {'mesero', 'cocinero', 'cajero'}
+        )
+        self.assertEqual(clientes[0].session.session_key, self.mesero.sesiones.get().sesion_id)
+
+    def test_otras_vias_de_login_tambien_se_indexan(self):
+        # login-admin y el admin de Django no llaman a registrar_sesion():
+        # la señal user_logged_in indexa cualquier login()
+        Usuario.objects.filter(id=self.cocinero.id).update(is_staff=True)
+        Client().post('/usuarios/login-admin/', {'username': 'mesero', 'password': 'test123'})
+        Client().post('/admin/login/', {'username': 'cocinero', 'password': 'test123', 'next': '/admin/'})
+
+        self.assertEqual(
+            set(SesionUsuario.objects.values_list('usuario__username', flat=True)), {'mesero', 'cocinero'}
+        )
+        self.assertEqual(cerrar_sesiones(), 2)
+        self.assertFalse(Session.objects.exists())
+
+    def test_logout_limpia_el_indice(self):
+        clientes = self._login_empleados()
+        clientes[0].get('/usuarios/logout/')
+
+        self.assertFalse(self.mesero.sesiones.exists())
+
+    def test_cerrar_sesiones_solo_meseros_y_cocineros(self):
+        self._login_empleados()
+        sesiones_antes = Session.objects.count()
+
+        # SELECT indexado + DELETE del índice + DELETE de sesiones, sin
+        # importar cuántas sesiones (de clientes u otros) haya en la tabla
+        with self.assertNumQueries(3):
+            self.assertEqual(cerrar_sesiones(), 2)
+
+        self.assertEqual(Session.objects.count(), sesiones_antes - 2)
+        self.assertEqual(list(SesionUsuario.objects.values_list('usuario__username', flat=True)), ['cajero'])
+
+    def test_cierre_de_caja_y_jornada(self):
+        self._login_empleados()
+        CierreCaja.objects.create(cajero=self.cajero, turno='manana').cerrar_caja(efectivo_real=Decimal('0'))
+        self.assertFalse(SesionUsuario.objects.filter(usuario__rol__in=['mesero', 'cocinero']).exists())
+
+        self._login_empleados()
+        JornadaLaboral.objects.create(cajero=self.cajero).finalizar(self.cajero)
+        self.assertEqual(SesionUsuario.objects.filter(usuario__rol__in=['mesero', 'cocinero']).count(), 0)
+        self.assertTrue(self.cajero.sesiones.exists())
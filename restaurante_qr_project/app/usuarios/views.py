@@ -450,7 +450,11 @@ def ver_todos_qr(request):
         ip_servidor = "localhost:8000"
 
     # Obtener todas las mesas activas
-    mesas = Mesa.objects.filter(activo=True).order_by('numero')
+    mesas = list(Mesa.objects.filter(activo=True).order_by('numero'))
+
+    # ✅ NUEVO: Generar en lote los QR encolados por Mesa.save()
+    from app.mesas.qr import asegurar_qr
+    asegurar_qr(mesas)
 
     # Obtener empleados que pueden usar QR
     empleados = Usuario.objects.filter(
@@ -92,6 +92,7 @@ INSTALLED_APPS = [
     #reportes contables
     'app.reportes',
     'app.reservas',
+    'app.rendimiento',  # Benchmarks de APIs (sin modelos)
 
     "colorfield",
 ]
@@ -272,17 +273,62 @@ CSRF_COOKIE_SAMESITE = config('CSRF_COOKIE_SAMESITE', default='Lax')
 APPEND_SLASH = True
 PREPEND_WWW = False
 
-# ⚡ CONFIGURACIÓN DE CACHÉ (para optimizar middleware)
-CACHES = {
-    'default': {
+# ⚡ CONFIGURACIÓN DE CACHÉ (compartida entre workers de gunicorn)
+# El estado de jornada vive en la caché: con LocMemCache cada worker tiene su
+# propia copia (consultas repetidas a BD). Los contadores de rate limiting de
+# login están en la BD (IntentoLogin): file y db no tienen incr atómico entre
+# workers. CACHE_BACKEND:
+#   file   -> FileBasedCache en CACHE_LOCATION (default, compartida en un mismo nodo)
+#   db     -> DatabaseCache en PostgreSQL (varios nodos; requiere `manage.py createcachetable`)
+#   redis  -> RedisCache en REDIS_URL (varios nodos; requiere el paquete `redis`)
+#   locmem -> por proceso, solo para desarrollo con runserver
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CACHE_BACKENDS = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'tmp', 'cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'sgir_cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+    },
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
+    },
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    print(f"ERROR CRÍTICO: CACHE_BACKEND inválido '{CACHE_BACKEND}' (opciones: {', '.join(CACHE_BACKENDS)})", file=sys.stderr)
+    sys.exit(1)
+
+CACHES = {
+    'default': {
+        **CACHE_BACKENDS[CACHE_BACKEND],
         'TIMEOUT': 300,  # 5 minutos por defecto
+        'KEY_PREFIX': 'sgir',
         'OPTIONS': {
             'MAX_ENTRIES': 1000
-        }
+        } if CACHE_BACKEND != 'redis' else {},
     }
 }
+
+# 🍳 FEED PUSH DE COCINA (SSE)
+# Cada conexión dura COCINA_STREAM_DURACION segundos (< timeout de gunicorn) y el
+# navegador reconecta solo con Last-Event-ID. Requiere workers gthread en producción.
+COCINA_STREAM_DURACION = config('COCINA_STREAM_DURACION', default=55, cast=int)
+COCINA_STREAM_INTERVALO = config('COCINA_STREAM_INTERVALO', default=1, cast=float)
+COCINA_STREAM_HEARTBEAT = 15
+
+# 🗺️ Proyección cacheada del mapa de mesas (clave por cursor de cambios; 0 = sin caché)
+MAPA_MESAS_CACHE_TIMEOUT = config('MAPA_MESAS_CACHE_TIMEOUT', default=60, cast=int)
+
+# 📑 Exportaciones XLSX en streaming: filas por lote al iterar la BD
+REPORTES_XLSX_CHUNK_SIZE = config('REPORTES_XLSX_CHUNK_SIZE', default=2000, cast=int)
+
 # 📊 CONFIGURACIÓN DE LOGGING
 LOGGING = {
     'version': 1,
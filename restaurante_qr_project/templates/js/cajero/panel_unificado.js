@@ -935,101 +935,128 @@ function mostrarNotificacion(mensaje, tipo = 'info') {
 // ============================================
 // CARGAR MAPA DE MESAS
 // ============================================
+// ✅ NUEVO: Estado local para polling incremental (?since= + ETag)
+const mapaMesasEstado = new Map();
+let mapaMesasCursor = null;
+let mapaMesasEtag = null;
+
 async function cargarMapaMesas() {
     const container = document.getElementById('mapaMesasContainer');
-    container.innerHTML = '<div class="loading">Cargando mapa de mesas...</div>';
+    if (mapaMesasEstado.size === 0) {
+        container.innerHTML = '<div class="loading">Cargando mapa de mesas...</div>';
+    }
 
     try {
-        const response = await fetch('/api/caja/mapa-mesas/', {
-            headers: { 'X-CSRFToken': getCookie('csrftoken') }
-        });
+        const headers = { 'X-CSRFToken': getCookie('csrftoken') };
+        if (mapaMesasEtag) headers['If-None-Match'] = mapaMesasEtag;
+        const url = mapaMesasCursor !== null
+            ? `/api/caja/mapa-mesas/?since=${mapaMesasCursor}`
+            : '/api/caja/mapa-mesas/';
+
+        const response = await fetch(url, { headers });
+
+        // Sin cambios: el mapa ya está actualizado
+        if (response.status === 304) return;
 
         if (!response.ok) throw new Error('Error al cargar mapa');
 
         const data = await response.json();
 
-        if (!data.mesas || data.mesas.length === 0) {
-            container.innerHTML = `
-                <div class="empty-state">
-                    <i class='bx bx-table'></i>
-                    <h3>No hay mesas registradas</h3>
-                    <p>Contacta al administrador para crear mesas</p>
-                </div>
-            `;
-            return;
-        }
+        if (!data.delta) mapaMesasEstado.clear();
+        (data.mesas || []).forEach(mesa => mapaMesasEstado.set(mesa.id, mesa));
+        mapaMesasCursor = data.cursor;
+        mapaMesasEtag = response.headers.get('ETag');
 
-        // Renderizar el mapa de mesas
-        let html = `
-            <div class="mapa-header">
-                <div class="mapa-leyenda">
-                    <span class="leyenda-item"><div class="color-box verde"></div> Disponible</span>
-                    <span class="leyenda-item"><div class="color-box amarillo"></div> Reservada</span>
-                    <span class="leyenda-item"><div class="color-box rojo"></div> Ocupada</span>
-                    <span class="leyenda-item"><div class="color-box azul"></div> Pagando</span>
-                </div>
+        renderizarMapaMesas(
+            Array.from(mapaMesasEstado.values()).sort((a, b) => a.numero - b.numero)
+        );
+
+    } catch (error) {
+        console.error('[DEBUG] Error cargando mapa de mesas:', error);
+        container.innerHTML = '<p style="color: red;">Error al cargar mapa de mesas</p>';
+    }
+}
+
+function renderizarMapaMesas(mesas) {
+    const container = document.getElementById('mapaMesasContainer');
+
+    if (!mesas || mesas.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <i class='bx bx-table'></i>
+                <h3>No hay mesas registradas</h3>
+                <p>Contacta al administrador para crear mesas</p>
             </div>
-            <div class="mapa-grid">
         `;
+        return;
+    }
 
-        data.mesas.forEach(mesa => {
-            const estadoTexto = {
-                'disponible': 'Disponible',
-                'ocupada': 'Ocupada',
-                'reservada': 'Reservada',
-                'pagando': 'Procesando Pago'
-            };
-
-            // Renderizar lista de productos
-            let productosHTML = '';
-            if (mesa.productos && mesa.productos.length > 0) {
-                productosHTML = `
-                    <div class="mesa-productos-lista">
-                        <div class="productos-titulo">Productos:</div>
-                        ${mesa.productos.map(p => `
-                            <div class="producto-item-mesa">
-                                • ${p.nombre} x${p.cantidad}
-                            </div>
-                        `).join('')}
-                    </div>
-                `;
-            }
+    // Renderizar el mapa de mesas
+    let html = `
+        <div class="mapa-header">
+            <div class="mapa-leyenda">
+                <span class="leyenda-item"><div class="color-box verde"></div> Disponible</span>
+                <span class="leyenda-item"><div class="color-box amarillo"></div> Reservada</span>
+                <span class="leyenda-item"><div class="color-box rojo"></div> Ocupada</span>
+                <span class="leyenda-item"><div class="color-box azul"></div> Pagando</span>
+            </div>
+        </div>
+        <div class="mapa-grid">
+    `;
 
-            // Determinar si la mesa es clickeable
-            const esClickeable = mesa.pedidos_activos > 0;
-            const cursorStyle = esClickeable ? 'cursor: pointer;' : '';
-            const onclickAttr = esClickeable ? `onclick="expandirMesa(${mesa.id})"` : '';
+    mesas.forEach(mesa => {
+        const estadoTexto = {
+            'disponible': 'Disponible',
+            'ocupada': 'Ocupada',
+            'reservada': 'Reservada',
+            'pagando': 'Procesando Pago'
+        };
 
-            html += `
-                <div class="mesa-card ${mesa.color} ${esClickeable ? 'mesa-clickeable' : ''}"
-                     data-mesa-id="${mesa.id}"
-                     ${onclickAttr}
-                     style="${cursorStyle}">
-                    <div class="mesa-numero">Mesa ${mesa.numero}</div>
-                    <div class="mesa-info">
-                        <span class="mesa-capacidad">
-                            <i class='bx bx-group'></i> ${mesa.capacidad}
-                        </span>
-                        <span class="mesa-estado">${estadoTexto[mesa.estado] || mesa.estado}</span>
-                    </div>
-                    ${mesa.pedidos_activos > 0 ? `
-                        <div class="mesa-resumen">
-                            <span><i class='bx bx-receipt'></i> ${mesa.pedidos_activos} pedido(s)</span>
-                            <span class="mesa-total">Bs/ ${parseFloat(mesa.total_pendiente).toFixed(2)}</span>
+        // Renderizar lista de productos
+        let productosHTML = '';
+        if (mesa.productos && mesa.productos.length > 0) {
+            productosHTML = `
+                <div class="mesa-productos-lista">
+                    <div class="productos-titulo">Productos:</div>
+                    ${mesa.productos.map(p => `
+                        <div class="producto-item-mesa">
+                            • ${p.nombre} x${p.cantidad}
                         </div>
-                        ${productosHTML}
-                    ` : ''}
+                    `).join('')}
                 </div>
             `;
-        });
+        }
 
-        html += '</div>';
-        container.innerHTML = html;
+        // Determinar si la mesa es clickeable
+        const esClickeable = mesa.pedidos_activos > 0;
+        const cursorStyle = esClickeable ? 'cursor: pointer;' : '';
+        const onclickAttr = esClickeable ? `onclick="expandirMesa(${mesa.id})"` : '';
+
+        html += `
+            <div class="mesa-card ${mesa.color} ${esClickeable ? 'mesa-clickeable' : ''}"
+                 data-mesa-id="${mesa.id}"
+                 ${onclickAttr}
+                 style="${cursorStyle}">
+                <div class="mesa-numero">Mesa ${mesa.numero}</div>
+                <div class="mesa-info">
+                    <span class="mesa-capacidad">
+                        <i class='bx bx-group'></i> ${mesa.capacidad}
+                    </span>
+                    <span class="mesa-estado">${estadoTexto[mesa.estado] || mesa.estado}</span>
+                </div>
+                ${mesa.pedidos_activos > 0 ? `
+                    <div class="mesa-resumen">
+                        <span><i class='bx bx-receipt'></i> ${mesa.pedidos_activos} pedido(s)</span>
+                        <span class="mesa-total">Bs/ ${parseFloat(mesa.total_pendiente).toFixed(2)}</span>
+                    </div>
+                    ${productosHTML}
+                ` : ''}
+            </div>
+        `;
+    });
 
-    } catch (error) {
-        console.error('[DEBUG] Error cargando mapa de mesas:', error);
-        container.innerHTML = '<p style="color: red;">Error al cargar mapa de mesas</p>';
-    }
+    html += '</div>';
+    container.innerHTML = html;
 }
 
 
@@ -2206,21 +2233,43 @@ console.log('✅ Panel Unificado de Caja cargado correctamente');
 // ============================================
 let kanbanTimerInterval = null;
 
+// ✅ NUEVO: Estado local para polling incremental (?since= + ETag)
+const COLUMNAS_KANBAN = ['pedido', 'preparando', 'listo', 'entregado'];
+const kanbanEstado = new Map();  // id -> { columna, pedido }
+let kanbanCursor = null;
+let kanbanEtag = null;
+
 async function cargarKanban() {
     try {
-        const response = await fetch('/api/caja/pedidos/kanban/', {
-            headers: {
-                'X-CSRFToken': getCookie('csrftoken')
-            }
-        });
+        const headers = { 'X-CSRFToken': getCookie('csrftoken') };
+        if (kanbanEtag) headers['If-None-Match'] = kanbanEtag;
+        const url = kanbanCursor !== null
+            ? `/api/caja/pedidos/kanban/?since=${kanbanCursor}`
+            : '/api/caja/pedidos/kanban/';
+
+        const response = await fetch(url, { headers });
+
+        // Sin cambios: los temporizadores siguen corriendo en el cliente
+        if (response.status === 304) return;
 
         if (!response.ok) throw new Error('Error al cargar kanban');
 
         const data = await response.json();
 
-        // Actualizar cada columna
-        ['pedido', 'preparando', 'listo', 'entregado'].forEach(estado => {
-            const pedidos = data[estado] || [];
+        if (!data.delta) kanbanEstado.clear();
+        (data.removidos || []).forEach(id => kanbanEstado.delete(id));
+        COLUMNAS_KANBAN.forEach(columna => {
+            (data[columna] || []).forEach(pedido => kanbanEstado.set(pedido.id, { columna, pedido, recibido: Date.now() }));
+        });
+        kanbanCursor = data.cursor;
+        kanbanEtag = response.headers.get('ETag');
+
+        // Actualizar cada columna (FIFO por id; renderizarColumnaKanban invierte ENTREGADO)
+        COLUMNAS_KANBAN.forEach(estado => {
+            const pedidos = Array.from(kanbanEstado.values())
+                .filter(item => item.columna === estado)
+                .map(item => conTiempoActual(item))
+                .sort((a, b) => a.id - b.id);
             renderizarColumnaKanban(estado, pedidos);
         });
 
@@ -2233,6 +2282,20 @@ async function cargarKanban() {
     }
 }
 
+// Los pedidos no cambiados conservan el payload anterior: ajustar el tiempo transcurrido
+function conTiempoActual(item) {
+    if (item.columna === 'entregado') return item.pedido;
+    const extra = Math.floor((Date.now() - item.recibido) / 1000);
+    const total = item.pedido.tiempo_total_segundos + extra;
+    return {
+        ...item.pedido,
+        tiempo_total_segundos: total,
+        tiempo_minutos: Math.floor(total / 60),
+        tiempo_segundos: total % 60,
+        alerta_20min: Math.floor(total / 60) >= 20
+    };
+}
+
 // ✅ NUEVO: Función para actualizar temporizadores en tiempo real
 function iniciarTimerKanban() {
     // Limpiar intervalo anterior si existe
@@ -153,10 +153,14 @@ class RestaurantOrderSystem {
                     html += `
                         <div class="product-card" data-product-id="${product.id}">
                             <div class="product-image" onclick="orderSystem.openProductModal(${product.id})" style="cursor: pointer;">
-                                <img src="${imageUrl}"
-                                     alt="${product.nombre}"
-                                     loading="lazy"
-                                     onerror="this.onerror=null; this.src='https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=300&h=200&fit=crop&crop=center';">
+                                <picture>
+                                    ${product.srcset ? `<source type="image/webp" srcset="${product.srcset}" sizes="(max-width: 600px) 50vw, 300px">` : ''}
+                                    <img src="${imageUrl}"
+                                         ${product.srcset_jpeg ? `srcset="${product.srcset_jpeg}" sizes="(max-width: 600px) 50vw, 300px"` : ''}
+                                         alt="${product.nombre}"
+                                         loading="lazy"
+                                         onerror="this.onerror=null; this.parentElement.querySelector('source')?.remove(); this.removeAttribute('srcset'); this.src='https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=300&h=200&fit=crop&crop=center';">
+                                </picture>
                             </div>
                             <div class="product-info" onclick="orderSystem.openProductModal(${product.id})" style="cursor: pointer;">
                                 <div class="product-name">${product.nombre}</div>
@@ -571,7 +575,15 @@ class RestaurantOrderSystem {
                 document.getElementById('modalProductPrice').textContent = `Bs/ ${parseFloat(product.precio).toFixed(2)}`;
 
                 const imageUrl = this.getProductImage(product);
-                document.getElementById('modalProductImage').src = imageUrl;
+                const modalImage = document.getElementById('modalProductImage');
+                // ✅ NUEVO: Miniatura responsiva (el modal ocupa el ancho de la pantalla)
+                if (product.srcset_jpeg) {
+                    modalImage.srcset = product.srcset_jpeg;
+                    modalImage.sizes = '100vw';
+                } else {
+                    modalImage.removeAttribute('srcset');
+                }
+                modalImage.src = imageUrl;
                 document.getElementById('modalProductImage').alt = product.nombre;
 
                 document.getElementById('modalQuantity').textContent = this.modalQuantity;
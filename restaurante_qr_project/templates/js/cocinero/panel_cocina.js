@@ -6,6 +6,12 @@
 
         let autoUpdateTimer;
 
+        // ✅ NUEVO: Feed push (SSE) - snapshot inicial + deltas por pedido
+        const STREAM_URL = '/api/pedidos/cocina/stream/';
+        const ESTADOS_COCINA = ['creado', 'confirmado', 'en_preparacion'];
+        const pedidosCocina = new Map();
+        let streamCocina = null;
+
         // CARGAR PEDIDOS DE LA COCINA
         async function cargarPedidos() {
             try {
@@ -131,6 +137,61 @@
             document.getElementById('pedidos-count').textContent = pedidos.length;
         }
 
+        // STREAM SSE DE COCINA
+        function conectarStream() {
+            if (!window.EventSource) {
+                return false;
+            }
+
+            streamCocina = new EventSource(STREAM_URL);
+
+            streamCocina.addEventListener('snapshot', (event) => {
+                const pedidos = JSON.parse(event.data);
+                pedidosCocina.clear();
+                pedidos.forEach(pedido => pedidosCocina.set(pedido.id, pedido));
+                renderizarDesdeStream();
+            });
+
+            streamCocina.addEventListener('pedido', (event) => {
+                const delta = JSON.parse(event.data);
+                const pedido = delta.pedido;
+                if (ESTADOS_COCINA.includes(pedido.estado)) {
+                    if (delta.tipo === 'creado' && !pedidosCocina.has(pedido.id)) {
+                        mostrarNotificacion(`🆕 Nuevo pedido - Mesa ${pedido.mesa}`, 'info');
+                    }
+                    pedidosCocina.set(pedido.id, pedido);
+                } else {
+                    pedidosCocina.delete(pedido.id);
+                }
+                renderizarDesdeStream();
+            });
+
+            streamCocina.onerror = () => {
+                // EventSource reconecta solo (con Last-Event-ID); si se cerró, volver a polling
+                if (streamCocina.readyState === EventSource.CLOSED) {
+                    console.warn('⚠️ Stream de cocina cerrado, usando polling');
+                    streamCocina = null;
+                    cargarPedidos();
+                    iniciarAutoActualizacion();
+                }
+            };
+
+            return true;
+        }
+
+        function desconectarStream() {
+            if (streamCocina) {
+                streamCocina.close();
+                streamCocina = null;
+            }
+        }
+
+        function renderizarDesdeStream() {
+            const pedidos = Array.from(pedidosCocina.values())
+                .sort((a, b) => new Date(b.fecha) - new Date(a.fecha));
+            renderizarPedidos(pedidos);
+        }
+
         // CAMBIAR ESTADO DEL PEDIDO
         async function cambiarEstado(pedidoId, nuevoEstado) {
             try {
@@ -151,7 +212,9 @@
                 
                 if (response.ok && data.mensaje) {
                     mostrarNotificacion(`✅ ${data.mensaje}`, 'success');
-                    cargarPedidos(); // Recargar pedidos
+                    if (!streamCocina) {
+                        cargarPedidos(); // Recargar pedidos (el stream ya envía el delta)
+                    }
                 } else {
                     throw new Error(data.error || 'Error desconocido');
                 }
@@ -190,6 +253,7 @@
 
         // AUTO-ACTUALIZACIÓN
         function iniciarAutoActualizacion() {
+            detenerAutoActualizacion();
             autoUpdateTimer = setInterval(() => {
                 cargarPedidos();
                 console.log(`🔄 Auto-actualización: ${new Date().toLocaleTimeString()}`);
@@ -205,21 +269,24 @@
         // INICIALIZACIÓN
         document.addEventListener('DOMContentLoaded', function() {
             console.log('👨‍🍳 Panel de Cocina iniciado');
-            console.log('🔧 API URL: /api/pedidos/cocina/');
-            
-            // Cargar pedidos iniciales
-            cargarPedidos();
+            console.log('🔧 Stream URL: ' + STREAM_URL);
             
-            // Iniciar auto-actualización
-            iniciarAutoActualizacion();
+            // Preferir el feed push; polling solo como fallback
+            if (!conectarStream()) {
+                cargarPedidos();
+                iniciarAutoActualizacion();
+            }
             
-            // Pausar auto-actualización cuando la página no esté visible
+            // Pausar actualizaciones cuando la página no esté visible
             document.addEventListener('visibilitychange', function() {
                 if (document.hidden) {
+                    desconectarStream();
                     detenerAutoActualizacion();
                     console.log('⏸️ Auto-actualización pausada');
                 } else {
-                    iniciarAutoActualizacion();
+                    if (!conectarStream()) {
+                        iniciarAutoActualizacion();
+                    }
                     console.log('▶️ Auto-actualización reanudada');
                 }
             });
@@ -227,5 +294,6 @@
 
         // Cleanup al salir
         window.addEventListener('beforeunload', function() {
+            desconectarStream();
             detenerAutoActualizacion();
         });
\ No newline at end of file
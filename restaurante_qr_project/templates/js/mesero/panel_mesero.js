@@ -7,6 +7,12 @@
         let autoUpdateTimer;
         let lastUpdateTime = Date.now();
 
+        // ✅ NUEVO: Estado local para polling incremental (?since= + ETag)
+        let pedidosCursor = null;
+        let pedidosEtag = null;
+        const pedidosListos = new Map();
+        const pedidosEntregados = new Map();
+
         // CAMBIO DE PESTAÑAS
         function switchTab(tabName) {
             // Actualizar pestañas
@@ -33,17 +39,26 @@
         async function loadPedidos() {
             try {
                 console.log('🔄 Cargando pedidos del mesero...');
-                showNotification('🔄 Actualizando pedidos...', 'info');
-                
-                const response = await fetch('/api/pedidos/mesero/pedidos/', {
-                    method: 'GET',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': getCsrfToken()
-                    }
-                });
+
+                const headers = {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCsrfToken()
+                };
+                if (pedidosEtag) {
+                    headers['If-None-Match'] = pedidosEtag;
+                }
+                const url = pedidosCursor !== null
+                    ? `/api/pedidos/mesero/pedidos/?since=${pedidosCursor}`
+                    : '/api/pedidos/mesero/pedidos/';
+
+                const response = await fetch(url, { method: 'GET', headers });
                 
                 console.log('📡 Respuesta pedidos:', response.status, response.statusText);
+
+                // Sin cambios desde el último poll
+                if (response.status === 304) {
+                    return;
+                }
                 
                 if (!response.ok) {
                     throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -53,9 +68,14 @@
                 console.log('📦 Datos pedidos recibidos:', data);
                 
                 if (data.success) {
-                    renderPedidosListos(data.pedidos_listos || []);
-                    renderPedidosEntregados(data.pedidos_entregados || []);
-                    updateCounters('pedidos', data.pedidos_listos?.length || 0);
+                    aplicarPedidosMesero(data);
+                    pedidosCursor = data.cursor;
+                    pedidosEtag = response.headers.get('ETag');
+
+                    const listos = ordenarPorId(pedidosListos);
+                    renderPedidosListos(listos);
+                    renderPedidosEntregados(ordenarPorId(pedidosEntregados));
+                    updateCounters('pedidos', listos.length);
                     showNotification('✅ Pedidos actualizados', 'success');
                 } else {
                     throw new Error(data.error || 'Error desconocido en pedidos');
@@ -83,6 +103,31 @@
             }
         }
 
+        // ✅ NUEVO: Aplicar respuesta completa o delta al estado local
+        function aplicarPedidosMesero(data) {
+            const listos = data.pedidos_listos || [];
+            const entregados = data.pedidos_entregados || [];
+
+            if (!data.delta) {
+                pedidosListos.clear();
+                pedidosEntregados.clear();
+            } else {
+                // Un pedido cambiado puede haber pasado de lista o salido de ambas
+                const cambiados = [...(data.removidos || []), ...listos.map(p => p.id), ...entregados.map(p => p.id)];
+                cambiados.forEach(id => {
+                    pedidosListos.delete(id);
+                    pedidosEntregados.delete(id);
+                });
+            }
+
+            listos.forEach(p => pedidosListos.set(p.id, p));
+            entregados.forEach(p => pedidosEntregados.set(p.id, p));
+        }
+
+        function ordenarPorId(mapa) {
+            return Array.from(mapa.values()).sort((a, b) => b.id - a.id);
+        }
+
         // ✅ CARGAR RESERVAS CON URL CORREGIDA
         async function loadReservas() {
             try {